@@ -1298,6 +1298,17 @@ class Global(APIBase):
                 'info': hostapi.get_stats(self._cif,
                                           sampling.host_samples.stats())}
 
+    def getRecoveryStatus(self):
+        """
+        Report the progress of the recovery of the running VMs.
+
+        Unlike other verbs, this one is served while vdsm is still
+        recovering, so clients can follow the recovery instead of polling
+        blindly.
+        """
+        return {'status': doneCode,
+                'recovery': self._cif.getRecoveryStatus()}
+
     def setLogLevel(self, level, name=''):
         """
         Set verbosity level of vdsm's log.
@@ -1406,8 +1417,9 @@ class Global(APIBase):
 
         try:
             self._cif._netConfigDirty = True
-            supervdsm.getProxy().setupNetworks(networks, bondings, options)
-            return {'status': doneCode}
+            timings = supervdsm.getProxy().setupNetworks(
+                networks, bondings, options)
+            return {'status': doneCode, 'timings': timings}
         except ConfigNetworkError as e:
             self.log.error(e.message, exc_info=True)
             return {'status': {'code': e.errCode, 'message': e.message}}
@@ -1446,6 +1458,9 @@ class Global(APIBase):
     def getStorageRepoStats(self, domains=()):
         return self._irs.repoStats(domains=domains)
 
+    def getResourceStats(self):
+        return self._irs.getResourceStats()
+
     def startMonitoringDomain(self, sdUUID, hostID):
         return self._irs.startMonitoringDomain(sdUUID, hostID)
 
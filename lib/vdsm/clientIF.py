@@ -19,6 +19,7 @@
 #
 from __future__ import absolute_import
 
+from contextlib import contextmanager
 import errno
 import os
 import os.path
@@ -91,6 +92,7 @@ class clientIF(object):
             self.irs.registerDomainStateChangeCallback(self._contEIOVmsCB)
         self.log = log
         self._recovery = True
+        self._recovery_progress = recovery.Progress()
         self.channelListener = Listener(self.log)
         self.mom = None
         self.servers = {}
@@ -150,6 +152,14 @@ class clientIF(object):
     def ready(self):
         return (self.irs is None or self.irs.ready) and not self._recovery
 
+    def getRecoveryStatus(self):
+        """
+        Report the progress of the recovery of the running VMs.
+        """
+        status = self._recovery_progress.info()
+        status['ready'] = self.ready
+        return status
+
     def notify(self, event_id, params=None):
         """
         Send notification using provided subscription id as
@@ -335,16 +345,7 @@ class clientIF(object):
                 if res['status']['code']:
                     raise vm.VolumeError(drive)
 
-                # The order of imgVolumesInfo is not guaranteed
-                drive['volumeChain'] = res['imgVolumesInfo']
-                drive['volumeInfo'] = res['info']
-
-                # Not applicable for Ceph network disk as
-                # Ceph disks are not vdsm images
-                if drive.get('diskType') == DISK_TYPE.NETWORK:
-                    volPath = self._prepare_network_drive(drive, res)
-                else:
-                    volPath = res['path']
+                volPath = self._prepared_image_path(drive, res)
             # GUID drive format
             elif "GUID" in drive:
                 res = self.irs.getDevicesVisibility([drive["GUID"]])
@@ -395,6 +396,56 @@ class clientIF(object):
         self.log.info("prepared volume path: %s", volPath)
         return volPath
 
+    def prepareVolumePaths(self, drives, vmId=None):
+        """
+        Prepare the paths of drives, returning a list of paths in the order
+        of drives.
+
+        The vdsm images are prepared together, so the volumes of all the
+        images on a storage domain are activated at once. Other drives are
+        prepared like prepareVolumePath().
+        """
+        images = [drive for drive in drives
+                  if isinstance(drive, dict) and
+                  drive.get('device') == 'disk' and isVdsmImage(drive)]
+        prepared = {}
+        if images:
+            res = self.irs.prepareImages(
+                [{'domainID': drive['domainID'],
+                  'poolID': drive['poolID'],
+                  'imageID': drive['imageID'],
+                  'volumeID': drive['volumeID']} for drive in images])
+
+            if res['status']['code']:
+                raise vm.VolumeError(images)
+
+            for drive, img in zip(images, res['images']):
+                prepared[id(drive)] = self._prepared_image_path(drive, img)
+                self.log.info("prepared volume path: %s", prepared[id(drive)])
+
+        paths = []
+        for drive in drives:
+            if id(drive) in prepared:
+                paths.append(prepared[id(drive)])
+            else:
+                paths.append(self.prepareVolumePath(drive, vmId))
+        return paths
+
+    def _prepared_image_path(self, drive, res):
+        """
+        Update drive with the volume chain of the prepared image, and return
+        the drive path.
+        """
+        # The order of imgVolumesInfo is not guaranteed
+        drive['volumeChain'] = res['imgVolumesInfo']
+        drive['volumeInfo'] = res['info']
+
+        # Not applicable for Ceph network disk as
+        # Ceph disks are not vdsm images
+        if drive.get('diskType') == DISK_TYPE.NETWORK:
+            return self._prepare_network_drive(drive, res)
+        return res['path']
+
     def _prepareVolumePathFromPayload(self, vmId, device, payload):
         """
         param vmId:
@@ -426,6 +477,33 @@ class clientIF(object):
 
         return res['status']['code']
 
+    def teardownVolumePaths(self, drives):
+        """
+        Teardown the paths of drives. The vdsm images are deactivated
+        together; if that fails, they are deactivated one by one, so one
+        failing image does not keep the others active.
+        """
+        images = []
+        for drive in drives:
+            try:
+                if isVdsmImage(drive):
+                    images.append(drive)
+                    continue
+            except TypeError:
+                # paths (strings) are not vdsm images
+                pass
+            self.teardownVolumePath(drive)
+
+        if images:
+            res = self.irs.teardownImages(
+                [{'domainID': drive['domainID'],
+                  'imageID': drive['imageID']} for drive in images])
+            if res['status']['code']:
+                self.log.warning("Tearing down images failed: %s, tearing "
+                                 "down one by one", res['status'])
+                for drive in images:
+                    self.teardownVolumePath(drive)
+
     def getDiskAlignment(self, drive):
         """
         Returns the alignment of the disk partitions
@@ -495,9 +573,11 @@ class clientIF(object):
                       numa.cpu_topology().cores)
             migration.SourceThread.ongoingMigrations.bound = mog
 
-            recovery.all_domains(self)
+            recovery.all_domains(self, self._recovery_progress)
 
             # recover stage 3: waiting for domains to go up
+            self._recovery_progress.start_stage(
+                recovery.Progress.WAITING_FOR_DOMAINS)
             self._waitForDomainsUp()
 
             recovery.clean_vm_files(self)
@@ -512,6 +592,7 @@ class clientIF(object):
 
             self._preparePathsForRecoveredVMs()
 
+            self._recovery_progress.start_stage(recovery.Progress.DONE)
             self.log.info('recovery: completed in %is',
                           vdsm.common.time.monotonic_time() - start_time)
 
@@ -586,21 +667,51 @@ class clientIF(object):
             time.sleep(5)
 
     def _preparePathsForRecoveredVMs(self):
-        vm_objects = self.vmContainer.values()
+        vm_objects = list(self.vmContainer.values())
         num_vm_objects = len(vm_objects)
-        for idx, vm_obj in enumerate(vm_objects):
+        self._recovery_progress.start_stage(
+            recovery.Progress.PREPARING_PATHS, num_vm_objects)
+
+        # VMs are prepared concurrently, but we limit the number of VMs
+        # preparing paths on the same storage domain at the same time.
+        per_domain = config.getint('vars', 'recovery_workers_per_domain')
+        vm_domains = {}
+        domain_limits = {}
+        for vm_obj in vm_objects:
+            sd_ids = sorted(set(drive.domainID
+                                for drive in vm_obj.getDiskDevices()
+                                if isVdsmImage(drive)))
+            vm_domains[vm_obj.id] = sd_ids
+            for sd_id in sd_ids:
+                if sd_id not in domain_limits:
+                    domain_limits[sd_id] = threading.BoundedSemaphore(
+                        per_domain)
+
+        def prepare(item):
+            idx, vm_obj = item
             # Let's recover as much VMs as possible
             try:
                 # Do not prepare volumes when system goes down
                 if self._enabled:
-                    self.log.info(
-                        'recovery [%d/%d]: preparing paths for'
-                        ' domain %s', idx + 1, num_vm_objects, vm_obj.id)
-                    vm_obj.preparePaths()
+                    # Acquiring in sorted order avoids deadlocks between
+                    # VMs using the same domains.
+                    with _acquire_all(domain_limits[sd_id]
+                                      for sd_id in vm_domains[vm_obj.id]):
+                        self.log.info(
+                            'recovery [%d/%d]: preparing paths for'
+                            ' domain %s', idx + 1, num_vm_objects,
+                            vm_obj.id)
+                        vm_obj.preparePaths()
             except:
+                self._recovery_progress.item_done(succeeded=False)
                 self.log.exception(
                     "recovery [%d/%d]: failed for vm %s",
                     idx + 1, num_vm_objects, vm_obj.id)
+            else:
+                self._recovery_progress.item_done()
+
+        concurrent.tmap(prepare, enumerate(vm_objects),
+                        max_workers=config.getint('vars', 'recovery_workers'))
 
     def _prepare_network_drive(self, drive, res):
         """
@@ -634,3 +745,16 @@ class clientIF(object):
         # https://bugzilla.redhat.com/1465810
         drive['hosts'] = [volinfo['hosts'][0]]
         return volinfo['path']
+
+
+@contextmanager
+def _acquire_all(locks):
+    acquired = []
+    try:
+        for lock in locks:
+            lock.acquire()
+            acquired.append(lock)
+        yield
+    finally:
+        for lock in reversed(acquired):
+            lock.release()
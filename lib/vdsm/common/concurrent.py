@@ -136,19 +136,39 @@ class Barrier(object):
 Result = namedtuple("Result", ["succeeded", "value"])
 
 
-def tmap(func, iterable):
+def tmap(func, iterable, max_workers=None):
+    """
+    Run func with each item of iterable in other threads, and return a list
+    of Result objects, in the same order as the items.
+
+    If max_workers is None, run each item in its own thread. Otherwise, run
+    the items using at most max_workers threads.
+    """
     args = list(iterable)
     results = [None] * len(args)
 
-    def worker(i, f, arg):
-        try:
-            results[i] = Result(True, f(arg))
-        except Exception as e:
-            results[i] = Result(False, e)
+    if max_workers is None or max_workers >= len(args):
+        workers_count = len(args)
+    else:
+        workers_count = max(1, max_workers)
+
+    indexes = iter(range(len(args)))
+    indexes_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with indexes_lock:
+                i = next(indexes, None)
+            if i is None:
+                return
+            try:
+                results[i] = Result(True, func(args[i]))
+            except Exception as e:
+                results[i] = Result(False, e)
 
     threads = []
-    for i, arg in enumerate(args):
-        t = thread(worker, args=(i, func, arg), name="tmap/%d" % i)
+    for i in range(workers_count):
+        t = thread(worker, name="tmap/%d" % i)
         t.start()
         threads.append(t)
 
@@ -18,8 +18,11 @@
 #
 from __future__ import absolute_import
 
+import ctypes
+import ctypes.util
 import os
 import collections
+import time
 
 from contextlib import contextmanager
 
@@ -42,6 +45,39 @@ def monotonic_time():
     return os.times()[4]
 
 
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+_CLOCK_THREAD_CPUTIME_ID = 3
+
+_clock_gettime = None
+
+
+def thread_time():
+    """
+    Return the CPU time (user and system) consumed by the calling thread, in
+    seconds.
+    """
+    try:
+        return time.thread_time()
+    except AttributeError:
+        # Python < 3.7
+        pass
+
+    global _clock_gettime
+    if _clock_gettime is None:
+        librt = ctypes.CDLL(ctypes.util.find_library("rt"), use_errno=True)
+        _clock_gettime = librt.clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+
+    ts = _Timespec()
+    if _clock_gettime(_CLOCK_THREAD_CPUTIME_ID, ctypes.byref(ts)) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
 class Clock(object):
     """
     Measure time for complex flows.
@@ -23,11 +23,14 @@ from __future__ import absolute_import
 Blocked tasks may be discarded, and the worker pool is automatically
 replenished."""
 
+import bisect
 import collections
 import functools
 import logging
 import threading
 
+import six
+
 from vdsm.common import concurrent
 from vdsm.common import time
 
@@ -71,11 +74,23 @@ class Executor(object):
       the stuck task finishes.  This prevents creating an excessive number
       of threads when many tasks are stuck.
 
+    - Optionally, tasks are served by priority classes (see `priorities`
+      constructor parameter), each limiting the number of its tasks running
+      at the same time, so different kinds of tasks can share one executor
+      without starving each other.
+
+    - Optionally, the number of the workers scales between `workers_count`
+      and `max_active_workers` following the queue depth.  Workers are added
+      when tasks are waiting and no worker is idle, and the extra workers
+      exit after being idle for `idle_timeout` seconds.  The limits may be
+      changed at any time using `resize()`.
+
     """
     _log = logging.getLogger('Executor')
 
     def __init__(self, name, workers_count, max_tasks, scheduler,
-                 max_workers=None, log=None):
+                 max_workers=None, log=None, priorities=None,
+                 max_active_workers=None, idle_timeout=60):
         """
         :param name: Name of the executor; no special purpose, just for
           logging and debugging.
@@ -100,24 +115,53 @@ class Executor(object):
         :param log: logger instance to override the default logger. This is
           useful for testing
         :type log: logger as returned by logging.getLogger()
+        :param priorities: Priority classes, from the highest priority to
+          the lowest, as (name, max_running) tuples.  `max_running` limits
+          the number of tasks of the class running at the same time, stuck
+          tasks included; None means no limit.  If None, tasks are served
+          in FIFO order.
+        :type priorities: list of (basestring, int or None) tuples
+        :param max_active_workers: If not None, add workers processing the
+          tasks up to this number when tasks are waiting in the queue.
+          The extra workers exit when idle.  Must not exceed `max_tasks`.
+        :type max_active_workers: int or None
+        :param idle_timeout: Seconds an extra worker waits for tasks before
+          exiting.
+        :type idle_timeout: float
 
         """
+        if max_active_workers is None:
+            max_active_workers = workers_count
+        self._check_limits(workers_count, max_active_workers, max_tasks)
         self._name = name
         self._workers_count = workers_count
+        self._max_active_workers = max_active_workers
+        self._idle_timeout = idle_timeout
         self._max_workers = max_workers
         self._worker_id = 0
-        self._tasks = TaskQueue(max_tasks)
+        if priorities is None:
+            self._tasks = TaskQueue(max_tasks)
+        else:
+            self._tasks = PriorityTaskQueue(max_tasks, priorities)
+        self._wait_times = {name: WaitHistogram()
+                            for name in self._tasks.priorities}
         self._scheduler = scheduler
         if log is not None:
             self._log = log
         self._workers = set()
         self._lock = threading.Lock()
         self._running = False
+        # Set when workers may be in excess after resize().
+        self._shrinking = False
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def priorities(self):
+        return self._tasks.priorities
+
     def start(self):
         self._log.debug('Starting executor')
         with self._lock:
@@ -132,13 +176,78 @@ class Executor(object):
         with self._lock:
             self._running = False
             self._tasks.clear()
-            for _ in range(self._workers_count):
+            for _ in range(self._active_workers):
                 self._tasks.put(_STOP)
             workers = tuple(self._workers) if wait else ()
         for worker in workers:
             worker.join()
 
-    def dispatch(self, callable, timeout=None, discard=True):
+    def resize(self, workers_count, max_active_workers=None):
+        """
+        Change the number of the workers processing the tasks.
+
+        New workers are started at once, while workers in excess exit after
+        completing their current task.
+
+        :param workers_count: Minimum number of workers.
+        :type workers_count: int
+        :param max_active_workers: Maximum number of workers when scaling
+          with the queue depth, see the constructor.
+        :type max_active_workers: int or None
+        """
+        if max_active_workers is None:
+            max_active_workers = workers_count
+        self._check_limits(workers_count, max_active_workers,
+                           self._tasks.max_tasks)
+        with self._lock:
+            self._log.info("Resizing executor (workers_count=%s, "
+                           "max_active_workers=%s)",
+                           workers_count, max_active_workers)
+            self._workers_count = workers_count
+            self._max_active_workers = max_active_workers
+            if not self._running:
+                return
+            if self._active_workers > max_active_workers:
+                self._shrinking = True
+            while self._may_add_workers():
+                self._add_worker()
+        # Wake up idle workers, so those in excess can exit.
+        self._tasks.wakeup()
+
+    def stats(self):
+        """
+        Return a dict describing the executor state, for debugging and
+        monitoring:
+
+        - workers: number of the workers ready for processing (active),
+          of all the workers including the discarded ones (total), and of
+          the workers waiting for tasks (idle).
+        - priorities: for each priority class, the number of the tasks
+          queued and running, and a histogram of the time the tasks
+          waited in the queue (see `WaitHistogram`).
+        """
+        queued = self._tasks.queued()
+        running = collections.Counter(
+            task.priority for task in
+            (worker.task for worker in tuple(self._workers))
+            if task is not None)
+        return {
+            'workers': {
+                'active': self._active_workers,
+                'total': self._total_workers,
+                'idle': self._tasks.waiting,
+            },
+            'priorities': {
+                name: {
+                    'queued': queued[name],
+                    'running': running[name],
+                    'wait': self._wait_times[name].counts(),
+                }
+                for name in self._tasks.priorities
+            },
+        }
+
+    def dispatch(self, callable, timeout=None, discard=True, priority=None):
         """
         Dispatches a new task to the executor.
 
@@ -159,10 +268,19 @@ class Executor(object):
           completed, emits a warning in the log if it didn't complete,
           and reschedules the check after `timeout` seconds.
         :type discard: boolean
+        :param priority: name of the priority class of the task, see the
+          constructor.  Defaults to the lowest priority.  Ignored if the
+          executor has no priority classes.
+        :type priority: basestring
         """
         if not self._running:
             raise NotRunning()
-        self._tasks.put(Task(callable, timeout, discard))
+        self._tasks.put(Task(callable, timeout, discard, priority))
+        # Unlocked check, to keep the common case cheap. Missing a worker
+        # here is harmless, the next dispatch will add it.
+        if (self._max_active_workers > self._workers_count and
+                len(self._tasks) > self._tasks.waiting):
+            self._scale_up()
 
     # Serving workers
 
@@ -174,11 +292,40 @@ class Executor(object):
     def _total_workers(self):
         return len(self._workers)
 
-    def _may_add_workers(self):
-        return (self._active_workers < self._workers_count and
+    def _may_add_workers(self, limit=None):
+        if limit is None:
+            limit = self._workers_count
+        return (self._active_workers < limit and
                 (self._max_workers is None or
                  self._total_workers < self._max_workers))
 
+    def _scale_up(self):
+        with self._lock:
+            if not self._running:
+                return
+            if not self._may_add_workers(self._max_active_workers):
+                return
+            self._add_worker()
+        self._log.debug("Worker added for queued tasks (%s active, "
+                        "%s total workers)",
+                        self._active_workers, self._total_workers)
+
+    def _retire_if_excess(self, worker, idle):
+        """
+        Called from the worker thread waiting for tasks. Raises
+        _WorkerRetired if the worker is in excess, either after resize()
+        or, if idle, because the queue is not deep enough.
+        """
+        with self._lock:
+            active = self._active_workers
+            if (active > self._max_active_workers or
+                    (idle and active > self._workers_count)):
+                # Removed at once, so other workers don't retire as well.
+                self._workers.discard(worker)
+                raise _WorkerRetired()
+            if not idle:
+                self._shrinking = False
+
     def _worker_discarded(self, worker):
         """
         Called from scheduler thread when worker was discarded. The worker
@@ -218,7 +365,8 @@ class Executor(object):
         worker_added = False
 
         with self._lock:
-            self._workers.remove(worker)
+            # Retired workers were already removed.
+            self._workers.discard(worker)
             if not self._running:
                 return
             if self._may_add_workers():
@@ -229,18 +377,47 @@ class Executor(object):
             self._log.info("New worker added (%s active, %s total workers)",
                            self._active_workers, self._total_workers)
 
-    def _next_task(self):
+    def _next_task(self, worker):
         """
         Called from the worker thread to get the next task from the task queue.
-        Raises NotRunning exception if executor was stopped.
+        Raises NotRunning exception if executor was stopped, and
+        _WorkerRetired if the worker is in excess.
         """
-        task = self._tasks.get()
-        if task is _STOP:
-            raise NotRunning()
-        return task
+        while True:
+            if self._shrinking:
+                self._retire_if_excess(worker, idle=False)
+            if self._max_active_workers == self._workers_count:
+                # Fixed number of workers, no need to wake up when idle.
+                timeout = None
+            else:
+                timeout = self._idle_timeout
+            task = self._tasks.get(timeout)
+            if task is _STOP:
+                raise NotRunning()
+            if task is not None:
+                self._wait_times[task.priority].add(task.wait_time)
+                return task
+            self._retire_if_excess(worker, idle=True)
+
+    def _task_done(self, task):
+        """
+        Called from the worker thread when a task is completed.
+        """
+        self._tasks.task_done(task)
 
     # Private
 
+    def _check_limits(self, workers_count, max_active_workers, max_tasks):
+        if max_active_workers < workers_count:
+            raise ValueError("max_active_workers (%s) smaller than "
+                             "workers_count (%s)" %
+                             (max_active_workers, workers_count))
+        # stop() puts a _STOP pill in the queue for every active worker.
+        if max_active_workers > max_tasks:
+            raise ValueError("max_active_workers (%s) larger than "
+                             "max_tasks (%s)" %
+                             (max_active_workers, max_tasks))
+
     def _add_worker(self):
         name = "%s/%d" % (self.name, self._worker_id)
         self._worker_id += 1
@@ -256,6 +433,10 @@ class _WorkerDiscarded(Exception):
     """ Raised if worker was discarded during execution of a task """
 
 
+class _WorkerRetired(Exception):
+    """ Raised if worker is in excess when waiting for tasks """
+
+
 class _Worker(object):
 
     _log = logging.getLogger('Executor')
@@ -288,6 +469,10 @@ class _Worker(object):
     def discarded(self):
         return self._discarded
 
+    @property
+    def task(self):
+        return self._task
+
     def _run(self):
         self._log.debug('Worker started')
         try:
@@ -297,11 +482,13 @@ class _Worker(object):
             self._log.debug('Worker stopped')
         except _WorkerDiscarded:
             self._log.info('Worker was discarded')
+        except _WorkerRetired:
+            self._log.debug('Worker retired')
         finally:
             self._executor._worker_stopped(self)
 
     def _execute_task(self):
-        task = self._executor._next_task()
+        task = self._executor._next_task(self)
         with self._lock:
             self._scheduled_check = self._check_after(task.timeout)
         self._task = task
@@ -311,6 +498,7 @@ class _Worker(object):
             self._log.exception("Unhandled exception in %s", task)
         finally:
             self._task = None
+            self._executor._task_done(task)
             # We want to discard workers that were too slow to disarm
             # the timer. It does not matter if the thread was still
             # blocked on callable when we discard it or it just finished.
@@ -363,10 +551,12 @@ class _Worker(object):
 
 class Task(object):
 
-    def __init__(self, callable, timeout, discard=True):
+    def __init__(self, callable, timeout, discard=True, priority=None):
         self._callable = callable
         self.timeout = timeout
         self.discard = discard
+        self.priority = priority
+        self._queued = time.monotonic_time()
         self._start = None
 
     @property
@@ -375,6 +565,15 @@ class Task(object):
             return 0
         return time.monotonic_time() - self._start
 
+    @property
+    def wait_time(self):
+        """
+        Time spent in the queue before running.
+        """
+        if self._start is None:
+            return time.monotonic_time() - self._queued
+        return self._start - self._queued
+
     def __call__(self):
         self._start = time.monotonic_time()
         self._callable()
@@ -397,10 +596,19 @@ class TaskQueue(object):
     * Queue.Queue lacks the clear() operation, which is needed to implement
       the 'poison pill' pattern (described for example in
       http://pymotw.com/2/multiprocessing/communication.html )
+
+    Tasks are served in FIFO order, using the single DEFAULT_PRIORITY class.
     """
 
+    DEFAULT_PRIORITY = 'default'
+
+    priorities = (DEFAULT_PRIORITY,)
+
     def __init__(self, max_tasks):
-        self._max_tasks = max_tasks
+        self.max_tasks = max_tasks
+        # Number of threads waiting for tasks.
+        self.waiting = 0
+        self._wakeups = 0
         self._tasks = collections.deque()
         # Deque supports thread-safe append and pop from both ends. We need
         # this condition for waking up threads waiting on an empty queue and
@@ -408,29 +616,214 @@ class TaskQueue(object):
         # https://docs.python.org/2/library/collections.html#deque-objects
         self._cond = threading.Condition(threading.Lock())
 
+    def __len__(self):
+        return len(self._tasks)
+
     def put(self, task):
         """
         Put a new task in the queue.
         Do not block when full, raises TooManyTasks instead.
         """
+        if task is not _STOP:
+            task.priority = self.DEFAULT_PRIORITY
         with self._cond:
-            if len(self._tasks) == self._max_tasks:
+            if len(self._tasks) == self.max_tasks:
                 raise TooManyTasks()
             self._tasks.append(task)
             self._cond.notify()
 
-    def get(self):
+    def get(self, timeout=None):
         """
-        Get a new task. Blocks if empty.
+        Get a new task. Blocks if empty, up to timeout seconds if timeout is
+        not None. Returns None if no task was available, or if woken up by
+        wakeup().
         """
+        deadline = None
         while True:
             try:
                 return self._tasks.popleft()
             except IndexError:
                 with self._cond:
                     if not self._tasks:
-                        self._cond.wait()
+                        if timeout is not None:
+                            if deadline is None:
+                                deadline = time.monotonic_time() + timeout
+                            remaining = deadline - time.monotonic_time()
+                            if remaining <= 0:
+                                return None
+                        else:
+                            remaining = None
+                        wakeups = self._wakeups
+                        self.waiting += 1
+                        try:
+                            self._cond.wait(remaining)
+                        finally:
+                            self.waiting -= 1
+                        if wakeups != self._wakeups:
+                            return None
+
+    def task_done(self, task):
+        pass
+
+    def wakeup(self):
+        """
+        Wake up all the threads waiting for tasks.
+        """
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+    def queued(self):
+        return {self.DEFAULT_PRIORITY: len(self._tasks)}
 
     def clear(self):
         with self._cond:
             self._tasks.clear()
+
+
+class PriorityTaskQueue(object):
+    """
+    TaskQueue serving the tasks by priority class.
+
+    Each class has its own FIFO queue, and may limit the number of its tasks
+    running at the same time. The tasks of a class at its limit stay in the
+    queue, without blocking the tasks of the other classes.
+    """
+
+    def __init__(self, max_tasks, priorities):
+        """
+        :param priorities: list of (name, max_running) tuples, from the
+          highest priority to the lowest. max_running may be None.
+        """
+        if not priorities:
+            raise ValueError("No priority classes")
+        self.max_tasks = max_tasks
+        self.priorities = tuple(name for name, _ in priorities)
+        self.waiting = 0
+        self._wakeups = 0
+        self._limits = dict(priorities)
+        self._queues = {name: collections.deque() for name in self.priorities}
+        self._running = dict.fromkeys(self.priorities, 0)
+        self._len = 0
+        self._stops = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return self._len
+
+    def put(self, task):
+        """
+        Put a new task in the queue.
+        Do not block when full, raises TooManyTasks instead.
+        Raises ValueError if the task priority is unknown.
+        """
+        with self._cond:
+            if task is _STOP:
+                self._stops += 1
+                self._cond.notify()
+                return
+            if task.priority is None:
+                task.priority = self.priorities[-1]
+            elif task.priority not in self._queues:
+                raise ValueError("Unknown priority: %r" % task.priority)
+            if self._len == self.max_tasks:
+                raise TooManyTasks()
+            self._queues[task.priority].append(task)
+            self._len += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Get the next task that may run. Blocks if there is none, up to
+        timeout seconds if timeout is not None. Returns None if no task was
+        available, or if woken up by wakeup().
+        """
+        deadline = None
+        with self._cond:
+            while True:
+                task = self._pop()
+                if task is not None:
+                    return task
+                if timeout is not None:
+                    if deadline is None:
+                        deadline = time.monotonic_time() + timeout
+                    remaining = deadline - time.monotonic_time()
+                    if remaining <= 0:
+                        return None
+                else:
+                    remaining = None
+                wakeups = self._wakeups
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                if wakeups != self._wakeups:
+                    return None
+
+    def task_done(self, task):
+        """
+        Called when a task returned by get() completed.
+        """
+        with self._cond:
+            self._running[task.priority] -= 1
+            if self._queues[task.priority]:
+                # A task of this class may run now.
+                self._cond.notify()
+
+    def wakeup(self):
+        with self._cond:
+            self._wakeups += 1
+            self._cond.notify_all()
+
+    def queued(self):
+        with self._cond:
+            return {name: len(self._queues[name]) for name in self.priorities}
+
+    def clear(self):
+        with self._cond:
+            for queue in six.itervalues(self._queues):
+                queue.clear()
+            self._len = 0
+            self._stops = 0
+
+    def _pop(self):
+        if self._stops:
+            self._stops -= 1
+            return _STOP
+        for name in self.priorities:
+            queue = self._queues[name]
+            if not queue:
+                continue
+            limit = self._limits[name]
+            if limit is not None and self._running[name] >= limit:
+                continue
+            self._running[name] += 1
+            self._len -= 1
+            return queue.popleft()
+        return None
+
+
+class WaitHistogram(object):
+    """
+    Histogram of the time the tasks waited in the queue.
+    """
+
+    # Upper bounds of the buckets, in seconds.
+    BOUNDS = (0.001, 0.01, 0.1, 1.0, 10.0, float('inf'))
+
+    def __init__(self):
+        self._counts = [0] * len(self.BOUNDS)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        index = bisect.bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            self._counts[index] += 1
+
+    def counts(self):
+        """
+        Return a list of (upper bound, count) tuples.
+        """
+        with self._lock:
+            return list(zip(self.BOUNDS, self._counts))
@@ -20,13 +20,19 @@
 """Collect host capabilities"""
 from __future__ import absolute_import
 
+import copy
+import errno
 import os
 import logging
+import threading
 import xml.etree.ElementTree as ET
 
 import libvirt
 
 from vdsm.common import cache
+from vdsm.common import concurrent
+from vdsm.common import constants
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.host import rngsources
 from vdsm.storage import hba
@@ -50,6 +56,16 @@ try:
 except ImportError:
     haClient = None
 
+# Modification of these files means that packages were installed, updated or
+# removed.
+_PACKAGE_DBS = ('/var/lib/rpm/Packages', '/var/lib/dpkg/status')
+
+_ONLINE_CPUS = '/sys/devices/system/cpu/online'
+
+_ISCSI_INITIATOR_NAME = '/etc/iscsi/initiatorname.iscsi'
+
+_FC_HOSTS = '/sys/class/fc_host'
+
 
 def _getFreshCapsXMLStr():
     return libvirtconnection.get().getCapabilities()
@@ -137,19 +153,109 @@ def _parseKeyVal(lines, delim='='):
 
 def _getIscsiIniName():
     try:
-        with open('/etc/iscsi/initiatorname.iscsi') as f:
+        with open(_ISCSI_INITIATOR_NAME) as f:
             return _parseKeyVal(f)['InitiatorName']
     except:
         logging.error('reporting empty InitiatorName', exc_info=True)
     return ''
 
 
-def get():
+class _Section(object):
+    """
+    A section of the capabilities, collected again only when one of its
+    sources changed.
+
+    A source is a function returning a fingerprint of something the section
+    depends on, like the modification time of the rpm database. A section
+    without sources is collected once, and a section with sources=None is
+    collected on every call.
+    """
+
+    def __init__(self, name, collect, sources=()):
+        self.name = name
+        self._collect = collect
+        self._sources = sources
+        self._lock = threading.Lock()
+        self._caps = None
+        self._fingerprint = None
+
+    def get(self):
+        """
+        Return the caps of the section. The caller owns the returned dict.
+        """
+        if self._sources is None:
+            fingerprint = None
+        else:
+            fingerprint = tuple(source() for source in self._sources)
+        with self._lock:
+            if (self._caps is None or self._sources is None or
+                    fingerprint != self._fingerprint):
+                start = monotonic_time()
+                self._caps = self._collect()
+                self._fingerprint = fingerprint
+                logging.debug('Collected %s capabilities in %.3f seconds',
+                              self.name, monotonic_time() - start)
+            return copy.deepcopy(self._caps)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return None
+
+
+def _package_dbs():
+    return tuple(_mtime(path) for path in _PACKAGE_DBS)
+
+
+def _online_cpus():
+    with open(_ONLINE_CPUS) as f:
+        return f.read()
+
+
+def _hook_scripts():
+    """
+    Return the name, mode, size and modification time of the hook scripts.
+    """
+    scripts = []
+    for dirpath, dirnames, filenames in os.walk(constants.P_VDSM_HOOKS):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+                continue
+            scripts.append((path, st.st_mode, st.st_size, st.st_mtime))
+    return sorted(scripts)
+
+
+def _storage_adapters():
+    """
+    Return the iSCSI initiator name modification time and the FC hosts,
+    added and removed by udev.
+    """
+    try:
+        fc_hosts = sorted(os.listdir(_FC_HOSTS))
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        fc_hosts = []
+    return _mtime(_ISCSI_INITIATOR_NAME), fc_hosts
+
+
+def _cpu_caps():
+    # The CPU models and machine types of libvirt change with its packages.
+    machinetype.compatible_cpu_models.invalidate()
+    machinetype.emulated_machines.invalidate()
+
     caps = {}
     cpu_topology = numa.cpu_topology()
 
-    caps['kvmEnabled'] = str(os.path.exists('/dev/kvm')).lower()
-
     if config.getboolean('vars', 'report_host_threads_as_cores'):
         caps['cpuCores'] = str(cpu_topology.threads)
     else:
@@ -162,47 +268,59 @@ def get():
     caps['cpuModel'] = cpuinfo.model()
     caps['cpuFlags'] = ','.join(cpuinfo.flags() +
                                 machinetype.compatible_cpu_models())
+    caps['emulatedMachines'] = machinetype.emulated_machines(
+        cpuarch.effective())
+    return caps
+
 
-    caps.update(_getVersionInfo())
+def _network_caps():
+    return supervdsm.getProxy().network_caps()
 
-    net_caps = supervdsm.getProxy().network_caps()
-    caps.update(net_caps)
 
+def _hooks_caps():
     try:
-        caps['hooks'] = hooks.installed()
+        return {'hooks': hooks.installed()}
     except:
         logging.debug('not reporting hooks', exc_info=True)
+        return {}
+
 
+def _os_caps():
+    caps = {}
     caps['operatingSystem'] = osinfo.version()
     caps['uuid'] = host.uuid()
     caps['packages2'] = osinfo.package_versions()
     caps['realtimeKernel'] = osinfo.runtime_kernel_flags().realtime
     caps['kernelArgs'] = osinfo.kernel_args()
     caps['nestedVirtualization'] = osinfo.nested_virtualization().enabled
-    caps['emulatedMachines'] = machinetype.emulated_machines(
-        cpuarch.effective())
+    return caps
+
+
+def _storage_caps():
+    caps = {}
     caps['ISCSIInitiatorName'] = _getIscsiIniName()
     caps['HBAInventory'] = hba.HBAInventory()
-    caps['vmTypes'] = ['kvm']
-
-    caps['memSize'] = str(utils.readMemInfo()['MemTotal'] / 1024)
-    caps['reservedMem'] = str(config.getint('vars', 'host_mem_reserve') +
-                              config.getint('vars', 'extra_mem_reserve'))
-    caps['guestOverhead'] = config.get('vars', 'guest_ram_overhead')
+    return caps
 
-    caps['rngSources'] = rngsources.list_available()
 
+def _numa_caps():
+    caps = {}
     caps['numaNodes'] = dict(numa.topology())
     caps['numaNodeDistance'] = dict(numa.distances())
-    caps['autoNumaBalancing'] = numa.autonuma_status()
+    return caps
 
-    caps['selinux'] = osinfo.selinux_status()
+
+def _features_caps():
+    caps = {}
+    caps['vmTypes'] = ['kvm']
+    caps['reservedMem'] = str(config.getint('vars', 'host_mem_reserve') +
+                              config.getint('vars', 'extra_mem_reserve'))
+    caps['guestOverhead'] = config.get('vars', 'guest_ram_overhead')
 
     liveSnapSupported = _getLiveSnapshotSupport(cpuarch.effective())
     if liveSnapSupported is not None:
         caps['liveSnapshot'] = str(liveSnapSupported).lower()
     caps['liveMerge'] = str(getLiveMergeSupport()).lower()
-    caps['kdumpStatus'] = osinfo.kdump_status()
 
     caps['hostdevPassthrough'] = str(hostdev.is_supported()).lower()
     # TODO This needs to be removed after adding engine side support
@@ -212,11 +330,23 @@ def get():
         from vdsm.gluster.api import glusterAdditionalFeatures
         caps['additionalFeatures'].extend(glusterAdditionalFeatures())
     caps['containers'] = containersconnection.is_supported()
-    caps['hostedEngineDeployed'] = _isHostedEngineDeployed()
     caps['hugepages'] = hugepages.supported()
     return caps
 
 
+def _runtime_caps():
+    caps = {}
+    caps['kvmEnabled'] = str(os.path.exists('/dev/kvm')).lower()
+    caps['memSize'] = str(utils.readMemInfo()['MemTotal'] / 1024)
+    caps['rngSources'] = rngsources.list_available()
+    caps['selinux'] = osinfo.selinux_status()
+    caps['kdumpStatus'] = osinfo.kdump_status()
+    # kernel.numa_balancing can be changed at any time using sysctl.
+    caps['autoNumaBalancing'] = numa.autonuma_status()
+    caps['hostedEngineDeployed'] = _isHostedEngineDeployed()
+    return caps
+
+
 def _dropVersion(vstring, logMessage):
     logging.error(logMessage)
 
@@ -268,3 +398,29 @@ def _isHostedEngineDeployed():
         return False
 
     return is_deployed()
+
+
+_SECTIONS = (
+    _Section('cpu', _cpu_caps, sources=(_online_cpus, _package_dbs)),
+    _Section('version', _getVersionInfo),
+    _Section('network', _network_caps, sources=None),
+    _Section('hooks', _hooks_caps, sources=(_hook_scripts,)),
+    _Section('os', _os_caps, sources=(_package_dbs,)),
+    _Section('storage', _storage_caps, sources=(_storage_adapters,)),
+    _Section('numa', _numa_caps, sources=(_online_cpus,)),
+    _Section('features', _features_caps, sources=(_package_dbs,)),
+    _Section('runtime', _runtime_caps, sources=None),
+)
+
+
+def get():
+    """
+    Return the host capabilities. Sections are collected in parallel, and
+    only if one of their sources changed since they were last collected.
+    """
+    caps = {}
+    for result in concurrent.tmap(_Section.get, _SECTIONS):
+        if not result.succeeded:
+            raise result.value
+        caps.update(result.value)
+    return caps
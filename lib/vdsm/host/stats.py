@@ -31,7 +31,6 @@ from vdsm import v2v
 
 
 JIFFIES_BOUND = 2 ** 32
-NETSTATS_BOUND = 2 ** 32
 
 
 _clock = time.monotonic_time
@@ -99,66 +98,57 @@ def produce(first_sample, last_sample):
 
 def _get_cpu_core_stats(first_sample, last_sample):
     interval = last_sample.timestamp - first_sample.timestamp
+    first_cores = first_sample.cpuCores
+    last_cores = last_sample.cpuCores
 
-    def compute_cpu_usage(cpu_core, mode):
-        first_core_sample = first_sample.cpuCores.getCoreSample(cpu_core)
-        last_core_sample = last_sample.cpuCores.getCoreSample(cpu_core)
-        if not first_core_sample or not last_core_sample:
-            raise MissingSample()
-        jiffies = (
-            last_core_sample[mode] - first_core_sample[mode]
-        ) % JIFFIES_BOUND
-        return ("%.2f" % (jiffies / interval))
+    # Compute the rates of all the cores in one pass over the counters;
+    # only cores present in both samples are reported.
+    user_rates = _rates(first_cores.user, last_cores.user, interval)
+    sys_rates = _rates(first_cores.sys, last_cores.sys, interval)
+    online = [first and last for first, last in
+              zip(first_cores.online, last_cores.online)]
+    num_cores = len(online)
 
     cpu_core_stats = {}
     for node_index, numa_node in six.iteritems(numa.topology()):
-        cpu_cores = numa_node['cpus']
-        for cpu_core in cpu_cores:
-            try:
-                user_cpu_usage = compute_cpu_usage(cpu_core, 'user')
-                system_cpu_usage = compute_cpu_usage(cpu_core, 'sys')
-            except MissingSample:
+        node_index = int(node_index)
+        for cpu_core in numa_node['cpus']:
+            core = int(cpu_core)
+            if core >= num_cores or not online[core]:
                 # Only collect data when all required samples already present
                 continue
-            core_stat = {
-                'nodeIndex': int(node_index),
+            user_cpu_usage = "%.2f" % user_rates[core]
+            system_cpu_usage = "%.2f" % sys_rates[core]
+            cpu_core_stats[str(cpu_core)] = {
+                'nodeIndex': node_index,
                 'cpuUser': user_cpu_usage,
                 'cpuSys': system_cpu_usage,
+                'cpuIdle': "%.2f" % max(0.0,
+                                        100.0 -
+                                        float(user_cpu_usage) -
+                                        float(system_cpu_usage)),
             }
-            core_stat['cpuIdle'] = (
-                "%.2f" % max(0.0,
-                             100.0 -
-                             float(core_stat['cpuUser']) -
-                             float(core_stat['cpuSys'])))
-            cpu_core_stats[str(cpu_core)] = core_stat
     return cpu_core_stats
 
 
-class MissingSample(Exception):
-    pass
+def _rates(first_counters, last_counters, interval):
+    return [((last - first) % JIFFIES_BOUND) / interval
+            for first, last in zip(first_counters, last_counters)]
 
 
 def _get_interfaces_stats(first_sample, last_sample):
-    rx = tx = rxDropped = txDropped = 0
-    stats = {'network': {}}
-    for ifid in last_sample.interfaces:
+    rxDropped = txDropped = 0
+    network = {}
+    first_interfaces = first_sample.interfaces
+    sample_time = last_sample.timestamp
+    for ifid, iface in six.iteritems(last_sample.interfaces):
         # it skips hot-plugged devices if we haven't enough information
         # to count stats from it
-        if ifid not in first_sample.interfaces:
+        if ifid not in first_interfaces:
             continue
 
-        ifrate = last_sample.interfaces[ifid].speed or 1000
-        thisRx = (
-            last_sample.interfaces[ifid].rx -
-            first_sample.interfaces[ifid].rx
-        ) % NETSTATS_BOUND
-        thisTx = (
-            last_sample.interfaces[ifid].tx -
-            first_sample.interfaces[ifid].tx
-        ) % NETSTATS_BOUND
-        iface = last_sample.interfaces[ifid]
-        stats['network'][ifid] = {
-            'name': ifid, 'speed': str(ifrate),
+        network[ifid] = {
+            'name': ifid, 'speed': str(iface.speed or 1000),
             'rxDropped': str(iface.rxDropped),
             'txDropped': str(iface.txDropped),
             'rxErrors': str(iface.rxErrors),
@@ -166,17 +156,16 @@ def _get_interfaces_stats(first_sample, last_sample):
             'state': iface.operstate,
             'rx': str(iface.rx),
             'tx': str(iface.tx),
-            'sampleTime': last_sample.timestamp,
+            'sampleTime': sample_time,
         }
-        rx += thisRx
-        tx += thisTx
-        rxDropped += last_sample.interfaces[ifid].rxDropped
-        txDropped += last_sample.interfaces[ifid].txDropped
+        rxDropped += iface.rxDropped
+        txDropped += iface.txDropped
 
-    stats['rxDropped'] = rxDropped
-    stats['txDropped'] = txDropped
-
-    return stats
+    return {
+        'network': network,
+        'rxDropped': rxDropped,
+        'txDropped': txDropped,
+    }
 
 
 _PROC_STAT_PATH = '/proc/stat'
@@ -103,6 +103,14 @@ class Job(object):
     def progress(self):
         return None
 
+    @property
+    def throughput(self):
+        return None
+
+    @property
+    def eta(self):
+        return None
+
     @property
     def job_type(self):
         return self._JOB_TYPE
@@ -120,6 +128,12 @@ class Job(object):
         if self.progress is not None:
             ret['progress'] = self.progress
 
+        if self.throughput is not None:
+            ret['throughput'] = self.throughput
+
+        if self.eta is not None:
+            ret['eta'] = self.eta
+
         if self.error:
             ret['error'] = self.error.info()
 
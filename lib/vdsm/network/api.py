@@ -36,8 +36,12 @@ from vdsm.network.ipwrapper import DUMMY_BRIDGE
 from vdsm.network.link import iface as link_iface
 from vdsm.network.link import sriov
 from vdsm.network.lldp import info as lldp_info
+from vdsm.network.netinfo import cache as netinfo_cache
+from vdsm.network.netinfo import qos as netinfo_qos
+from vdsm.network.ovs import info as ovs_info
 
 from . ip import address as ipaddress
+from . ip import dhclient
 from . canonicalize import canonicalize_networks, canonicalize_bondings
 from . errors import RollbackIncomplete
 from . import netconfpersistence
@@ -180,6 +184,9 @@ def setupNetworks(networks, bondings, options):
                         connectivityTimeout=<int>
                         _inRollback=True|False
 
+    Returns:
+        dict of key=setup step, value=seconds spent in the step
+
     Notes:
         When you edit a network that is attached to a bonding, it's not
         necessary to re-specify the bonding (you need only to note
@@ -199,9 +206,10 @@ def setupNetworks(networks, bondings, options):
         running_config = netconfpersistence.RunningConfig()
         if netswitch.configurator.switch_type_change_needed(
                 networks, bondings, running_config):
-            _change_switch_type(networks, bondings, options, running_config)
+            timings = _change_switch_type(
+                networks, bondings, options, running_config)
         else:
-            _setup_networks(networks, bondings, options)
+            timings = _setup_networks(networks, bondings, options)
     except:
         # TODO: it might be useful to pass failure description in 'response'
         # field
@@ -214,6 +222,15 @@ def setupNetworks(networks, bondings, options):
     else:
         hooks.after_network_setup(
             _build_setup_hook_dict(networks, bondings, options))
+        return timings
+    finally:
+        # Bridge options and IPv6 autoconf change without netlink events.
+        netinfo_cache.invalidate_devices_cache()
+        # The setup may not be reported yet by the ovsdb and netlink monitors.
+        ovs_info.invalidate_cache()
+        netinfo_qos.invalidate_cache()
+        # dhclients started or stopped by the setup.
+        dhclient.invalidate_registry()
 
 
 def _setup_networks(networks, bondings, options):
@@ -222,7 +239,8 @@ def _setup_networks(networks, bondings, options):
     logging.debug('Applying...')
     in_rollback = options.get('_inRollback', False)
     with _rollback():
-        netswitch.configurator.setup(networks, bondings, options, in_rollback)
+        return netswitch.configurator.setup(
+            networks, bondings, options, in_rollback)
 
 
 def _change_switch_type(networks, bondings, options, running_config):
@@ -235,12 +253,13 @@ def _change_switch_type(networks, bondings, options, running_config):
 
     logging.debug('Removing current switch configuration')
     with _rollback():
-        _remove_nets_and_bonds(networks, bondings, in_rollback)
+        removal_timings = _remove_nets_and_bonds(
+            networks, bondings, in_rollback)
 
     logging.debug('Setting up requested switch configuration')
     try:
         with _rollback():
-            netswitch.configurator.setup(
+            timings = netswitch.configurator.setup(
                 networks, bondings, options, in_rollback)
     except:
         logging.exception('Requested switch setup failed, rolling back to '
@@ -255,11 +274,14 @@ def _change_switch_type(networks, bondings, options, running_config):
             raise
         raise
 
+    timings['remove_switch'] = round(sum(six.itervalues(removal_timings)), 3)
+    return timings
+
 
 def _remove_nets_and_bonds(nets, bonds, in_rollback):
     nets_removal = {name: {'remove': True} for name in six.iterkeys(nets)}
     bonds_removal = {name: {'remove': True} for name in six.iterkeys(bonds)}
-    netswitch.configurator.setup(
+    return netswitch.configurator.setup(
         nets_removal, bonds_removal, {'connectivityCheck': False}, in_rollback)
 
 
@@ -18,6 +18,7 @@
 #
 from __future__ import absolute_import
 
+import collections
 from contextlib import contextmanager
 import copy
 import errno
@@ -59,7 +60,7 @@ from vdsm.network.netlink import waitfor
 from . import Configurator, getEthtoolOpts
 from .ifcfg_acquire import IfcfgAcquire
 from ..errors import ConfigNetworkError, ERR_BAD_BONDING, ERR_FAILED_IFUP
-from ..models import Nic, Bridge, Bond as bond_model
+from ..models import Nic, Bridge, Vlan, Bond as bond_model
 from ..sourceroute import StaticSourceRoute
 
 NET_CONF_DIR = '/etc/sysconfig/network-scripts/'
@@ -72,6 +73,9 @@ EXT_BRCTL = '/usr/sbin/brctl'
 EXT_IFDOWN = '/sbin/ifdown'
 EXT_IFUP = '/sbin/ifup'
 
+# Maximum number of devices brought up in parallel by ifup_deferred().
+IFUP_WORKERS = 16
+
 
 def is_available():
     return True
@@ -86,6 +90,9 @@ class Ifcfg(Configurator):
                                     is_unipersistence,
                                     inRollback)
         self.runningConfig = RunningConfig()
+        self._ifups = None
+        self._ifup_networks = None
+        self._network = None
 
     def rollback(self):
         """This reimplementation always returns None since Ifcfg can rollback
@@ -100,6 +107,62 @@ class Ifcfg(Configurator):
         self.runningConfig.save()
         self.runningConfig = None
 
+    def defer_ifups(self):
+        """
+        Record the bridges, vlans and nics configured from now on instead of
+        bringing them up, until ifup_deferred() is called. Bonds and vlans on
+        bonds are still brought up immediately.
+        """
+        self._ifups = collections.OrderedDict()
+        self._ifup_networks = {}
+        self._network = None
+
+    def defer_network(self, network):
+        """
+        Record the devices configured from now on as devices of network,
+        reported by ifup_deferred() if bringing them up fails.
+        """
+        self._network = network
+
+    def ifup_deferred(self):
+        """
+        Bring up the recorded devices, each one after the device it is
+        stacked on. Devices not depending on each other are brought up in
+        parallel.
+
+        Return the errors bringing up the devices, by network. The devices
+        stacked on a device that failed are not brought up.
+        """
+        errors = collections.OrderedDict()
+        if self._ifups is None:
+            return errors
+        ifaces = list(self._ifups.values())
+        networks = self._ifup_networks
+        self._ifups = None
+        self._ifup_networks = None
+        failed = set()
+        for level in _ifup_levels(ifaces):
+            ready = []
+            for iface in level:
+                lower = _lower_iface(iface)
+                if lower is not None and lower.name in failed:
+                    failed.add(iface.name)
+                else:
+                    ready.append(iface)
+            results = concurrent.tmap(_ifup, ready, max_workers=IFUP_WORKERS)
+            for iface, result in zip(ready, results):
+                if not result.succeeded:
+                    failed.add(iface.name)
+                    errors.setdefault(networks[iface.name], result.value)
+        return errors
+
+    def _ifup(self, iface):
+        if self._ifups is None:
+            _ifup(iface)
+        else:
+            self._ifups[iface.name] = iface
+            self._ifup_networks.setdefault(iface.name, self._network)
+
     def configureBridge(self, bridge, **opts):
         if not self.owned_device(bridge.name):
             IfcfgAcquire.acquire_device(bridge.name)
@@ -108,7 +171,7 @@ class Ifcfg(Configurator):
         if bridge.port:
             bridge.port.configure(**opts)
         self._addSourceRoute(bridge)
-        _ifup(bridge)
+        self._ifup(bridge)
 
     def configureVlan(self, vlan, **opts):
         if not self.owned_device(vlan.name):
@@ -120,7 +183,7 @@ class Ifcfg(Configurator):
         if isinstance(vlan.device, bond_model):
             Ifcfg._ifup_vlan_with_slave_bond_hwaddr_sync(vlan)
         else:
-            _ifup(vlan)
+            self._ifup(vlan)
 
     def configureBond(self, bond, **opts):
         if not self.owned_device(bond.name):
@@ -201,7 +264,7 @@ class Ifcfg(Configurator):
         if nic.bond is None:
             if not vlans.is_vlanned(nic.name):
                 ifdown(nic.name)
-            _ifup(nic)
+            self._ifup(nic)
 
     def removeBridge(self, bridge):
         if not self.owned_device(bridge.name):
@@ -934,6 +997,40 @@ def _ifup(iface, cgroup=dhclient.DHCLIENT_CGROUP, blocking=None):
         t.start()
 
 
+def _ifup_levels(ifaces):
+    """
+    Group ifaces by the order they should be brought up: an iface comes
+    after the iface it is stacked on, if that iface is in ifaces too.
+    """
+    by_name = {iface.name: iface for iface in ifaces}
+    levels = {}
+
+    def level(iface):
+        if iface.name not in levels:
+            lower = _lower_iface(iface)
+            if lower is not None and lower.name in by_name:
+                levels[iface.name] = level(by_name[lower.name]) + 1
+            else:
+                levels[iface.name] = 0
+        return levels[iface.name]
+
+    grouped = []
+    for iface in ifaces:
+        n = level(iface)
+        while len(grouped) <= n:
+            grouped.append([])
+        grouped[n].append(iface)
+    return grouped
+
+
+def _lower_iface(iface):
+    if isinstance(iface, Bridge):
+        return iface.port
+    if isinstance(iface, Vlan):
+        return iface.device
+    return None
+
+
 def _blocking_action_required(iface):
     return iface.blockingdhcp or not _dhcp_required(iface)
 
@@ -21,16 +21,27 @@ from __future__ import absolute_import
 import logging
 
 from vdsm import supervdsm
+from vdsm.config import config
 from vdsm.network import dhclient_monitor
 from vdsm.network import lldp
 from vdsm.network import netswitch
+from vdsm.network.ip import dhcp_registry
+from vdsm.network.netinfo import cache as netinfo_cache
+from vdsm.network.netinfo import qos as netinfo_qos
 from vdsm.network.nm import networkmanager
+from vdsm.network.ovs import info as ovs_info
 
 Lldp = lldp.driver()
 
 
 def init_privileged_network_components():
     networkmanager.init()
+    if config.getboolean('vars', 'net_report_cache'):
+        netinfo_cache.start_devices_cache()
+        dhcp_registry.start()
+        netinfo_qos.start_cache()
+        if netswitch.configurator.is_ovs_service_running():
+            ovs_info.start_cache()
     _lldp_init()
 
 
@@ -44,6 +44,11 @@ LEASE_FILE = os.path.join(LEASE_DIR, 'dhclient{0}--{1}.lease')
 DHCP4 = 'dhcpv4'
 DHCP6 = 'dhcpv6'
 
+_NO_DHCP = {DHCP4: False, DHCP6: False}
+
+# DHCP status registry, see dhcp_registry.
+_registry = None
+
 
 class DhcpClient(object):
     PID_FILE = '/var/run/dhclient%s-%s.pid'
@@ -115,7 +120,24 @@ def is_active(device_name, family):
 
 
 def dhcp_info(devices):
-    info = {devname: {DHCP4: False, DHCP6: False} for devname in devices}
+    """
+    Return the DHCP status of devices, served by the DHCP registry when it
+    is running.
+    """
+    registry = _registry
+    if registry is not None and registry.running:
+        dhclients = registry.running_dhclients()
+    else:
+        dhclients = running_dhclients()
+    return {devname: dict(dhclients.get(devname, _NO_DHCP))
+            for devname in devices}
+
+
+def running_dhclients():
+    """
+    Return the DHCP status of the devices with a running dhclient.
+    """
+    info = {}
 
     for pid in pgrep('dhclient'):
         args = _read_cmdline(pid)
@@ -123,15 +145,31 @@ def dhcp_info(devices):
             continue
 
         dev = args[-1]
-        if dev not in info:
-            continue
-
         dhcp_version_key = DHCP6 if '-6' in args[:-1] else DHCP4
-        info[dev][dhcp_version_key] = True
+        info.setdefault(dev, dict(_NO_DHCP))[dhcp_version_key] = True
 
     return info
 
 
+def invalidate_registry():
+    """
+    Must be called after starting or stopping dhclients, which must be
+    reported before their inotify events are handled.
+    """
+    registry = _registry
+    if registry is not None:
+        registry.changed()
+
+
+def set_registry(registry):
+    """
+    Serve dhcp_info() from registry, or read the dhclient processes again if
+    registry is None.
+    """
+    global _registry
+    _registry = registry
+
+
 def _pid_lookup(device_name, family):
     for pid in pgrep('dhclient'):
         args = _read_cmdline(pid)
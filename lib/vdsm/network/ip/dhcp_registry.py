@@ -0,0 +1,169 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+dhcp_registry - DHCP status of the devices, maintained from dhclient events.
+
+Finding the devices with a running dhclient means reading every process in
+/proc, and every network report needs the DHCP status of all the devices.
+The registry keeps the running dhclients in memory, and finds them again
+only after a dhclient started, got a lease or stopped, as reported by
+inotify events on:
+
+- the dhclient pid files
+- the dhclient lease files
+- the responses of the dhclientmon hook, handled by dhclient_monitor
+
+A watched directory missing when the registry starts is watched once it is
+created, using a watch on its parent directory.
+
+A dhclient killed without removing its pid file is not reported, so the
+dhclients are also found again RESYNC_INTERVAL seconds after the last read.
+"""
+
+from __future__ import absolute_import
+
+import os
+import threading
+
+import pyinotify
+
+from vdsm.common.constants import P_VDSM_RUN
+from vdsm.common.time import monotonic_time
+
+from . import dhclient
+
+RESYNC_INTERVAL = 60
+
+DHCLIENTMON_DIR = os.path.join(P_VDSM_RUN, 'dhclientmon')
+
+WATCHED_DIRS = ('/var/run', dhclient.LEASE_DIR, DHCLIENTMON_DIR)
+
+_WATCHED_EVENTS = (pyinotify.IN_CREATE | pyinotify.IN_CLOSE_WRITE |
+                   pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM |
+                   pyinotify.IN_MOVED_TO)
+
+
+class DhcpRegistry(object):
+
+    def __init__(self, dirs=WATCHED_DIRS):
+        self._dirs = dirs
+        self._lock = threading.Lock()
+        self._dhclients = {}
+        self._changed = True
+        self._scanned = None
+        self._watch_manager = None
+        self._notifier = None
+        # Watched directories not created yet, watched by their parent.
+        self._missing = set()
+
+    def start(self):
+        self._watch_manager = pyinotify.WatchManager()
+        self._notifier = pyinotify.ThreadedNotifier(
+            self._watch_manager, _EventHandler(registry=self))
+        self._notifier.name = 'dhcp-registry'
+        self._notifier.daemon = True
+        for path in self._dirs:
+            # The lease directory is created by the first vdsm dhclient.
+            if os.path.isdir(path):
+                self._watch_manager.add_watch(path, _WATCHED_EVENTS)
+            else:
+                self._missing.add(path)
+                self._watch_manager.add_watch(os.path.dirname(path),
+                                              _WATCHED_EVENTS)
+        self._notifier.start()
+
+    def created(self, path):
+        """
+        Called from the notifier thread when path was created in a watched
+        directory. Return True if path is a watched directory.
+        """
+        if path not in self._missing:
+            return False
+        self._missing.discard(path)
+        self._watch_manager.add_watch(path, _WATCHED_EVENTS)
+        # Files may have been created before the watch was added.
+        self.changed()
+        return True
+
+    def stop(self):
+        self._notifier.stop()
+
+    @property
+    def running(self):
+        return self._notifier is not None and self._notifier.is_alive()
+
+    def changed(self):
+        """
+        Find the running dhclients again on the next call to
+        running_dhclients().
+        """
+        with self._lock:
+            self._changed = True
+
+    def running_dhclients(self):
+        """
+        Return the DHCP status of the devices with a running dhclient, like
+        dhclient.running_dhclients(). The returned dict must not be
+        modified.
+        """
+        now = monotonic_time()
+        with self._lock:
+            if self._changed or now - self._scanned >= RESYNC_INTERVAL:
+                self._changed = False
+                self._dhclients = dhclient.running_dhclients()
+                self._scanned = now
+            return self._dhclients
+
+
+class _EventHandler(pyinotify.ProcessEvent):
+
+    def my_init(self, registry):
+        self._registry = registry
+
+    def process_default(self, event):
+        if event.dir and self._registry.created(event.pathname):
+            return
+        if (event.path == DHCLIENTMON_DIR or
+                event.name.startswith('dhclient')):
+            self._registry.changed()
+
+
+_registry = None
+
+
+def start():
+    """
+    Start maintaining the running dhclients from inotify events, serving
+    dhclient.dhcp_info() from memory.
+    """
+    global _registry
+    registry = DhcpRegistry()
+    registry.start()
+    dhclient.set_registry(registry)
+    _registry = registry
+
+
+def stop():
+    global _registry
+    registry = _registry
+    if registry is not None:
+        _registry = None
+        dhclient.set_registry(None)
+        registry.stop()
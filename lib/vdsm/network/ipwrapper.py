@@ -24,6 +24,7 @@ from glob import iglob
 import errno
 import itertools
 import os
+import tempfile
 from subprocess import Popen
 
 import six
@@ -260,12 +261,18 @@ def _bondExists(bondName):
     return os.path.exists('/sys/class/net/%s/bonding' % bondName)
 
 
-def getLinks():
-    """Return an iterator of Link objects, each per a link in the system."""
+def getLinks(snapshot=None):
+    """Return an iterator of Link objects, each per a link in the system.
+    If a netlink snapshot is provided, the links are taken from it."""
+    if snapshot is None:
+        links = link.iter_links()
+    else:
+        # Link.fromDict() modifies the dict, owned by the snapshot.
+        links = (dict(data) for data in snapshot.links)
     dpdk_links = (dpdk.link_info(dev_name, dev_info['pci_addr'])
                   for dev_name, dev_info
                   in six.viewitems(dpdk.get_dpdk_devices()))
-    for data in itertools.chain(link.iter_links(), dpdk_links):
+    for data in itertools.chain(links, dpdk_links):
         try:
             yield Link.fromDict(data)
         except IOError:  # If a link goes missing we just don't report it
@@ -590,6 +597,21 @@ def linkSet(dev, linkArgs):
     _exec_cmd(command)
 
 
+def batch(commands):
+    """
+    Run ip commands, given as lists of arguments without the ip binary, in
+    one ip process. Stops on the first failing command.
+    """
+    commands = list(commands)
+    if not commands:
+        return
+    with tempfile.NamedTemporaryFile(mode='w', prefix='ip-batch-') as f:
+        for command in commands:
+            f.write(' '.join(command) + '\n')
+        f.flush()
+        _exec_cmd([_IP_BINARY.cmd, '-batch', f.name])
+
+
 def linkDel(dev):
     command = [_IP_BINARY.cmd, 'link', 'del', 'dev', dev]
     _exec_cmd(command)
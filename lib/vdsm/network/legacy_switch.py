@@ -230,8 +230,8 @@ def _update_mtu_for_an_existing_bridge(dev_name, configurator, mtu):
 
 
 def _update_bridge_ports_mtu(bridge, mtu):
-    for port in bridges.ports(bridge):
-        ipwrapper.linkSet(port, ['mtu', str(mtu)])
+    ipwrapper.batch(['link', 'set', 'dev', port, 'mtu', str(mtu)]
+                    for port in bridges.ports(bridge))
 
 
 def _assert_bridge_clean(bridge, vlan, bonding, nics):
@@ -418,6 +418,7 @@ def add_missing_networks(configurator, networks, bondings, _netinfo):
             _check_bonding_availability(bond, bondings, _netinfo)
 
         logging.debug('Adding network %r', network)
+        configurator.defer_network(network)
         try:
             _add_network(network, configurator, _netinfo, **attrs)
         except ConfigNetworkError as cne:
@@ -431,6 +432,24 @@ def add_missing_networks(configurator, networks, bondings, _netinfo):
         _netinfo.updateDevices()  # Things like a bond mtu can change
 
 
+def ifup_added_networks(configurator, networks):
+    """
+    Bring up the devices of the added networks deferred by the
+    configurator, cleaning up the networks whose devices failed to come up.
+    """
+    failures = configurator.ifup_deferred()
+    for network, error in six.iteritems(failures):
+        if (network is not None and
+                isinstance(error, ConfigNetworkError) and
+                error.errCode == ne.ERR_FAILED_IFUP):
+            logging.debug('Bringing up network %r failed. Running '
+                          'orphan-devices cleanup', network)
+            _emergency_network_cleanup(network, networks[network],
+                                       configurator)
+    if failures:
+        raise next(six.itervalues(failures))
+
+
 def _emergency_network_cleanup(network, networkAttrs, configurator):
     """Remove all leftovers after failed setupNetwork"""
     _netinfo = CachingNetInfo()
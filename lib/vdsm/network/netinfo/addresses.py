@@ -67,9 +67,12 @@ def getIpInfo(dev, ipaddrs=None, ipv4_gateway=None):
     return ipv4addr, ipv4netmask, ipv4addrs, ipv6addrs
 
 
-def getIpAddrs():
+def getIpAddrs(snapshot=None):
+    """Returns the addresses data dictionaries by device name, taken from the
+    netlink snapshot if provided."""
     addrs = defaultdict(list)
-    for addr in nl_addr.iter_addrs():
+    for addr in (nl_addr.iter_addrs() if snapshot is None else
+                 snapshot.addrs):
         addrs[addr['label']].append(addr)
     return addrs
 
@@ -19,16 +19,23 @@
 #
 
 from __future__ import absolute_import
+import copy
 import logging
 import errno
+import threading
 import six
 
+from vdsm.common import concurrent
+from vdsm.common.time import monotonic_time
 from vdsm.network.ip.address import ipv6_supported
 from vdsm.network.ip import dhclient
-from vdsm.network.ipwrapper import getLinks
+from vdsm.network.ipwrapper import getLink, getLinks
 from vdsm.network.link import dpdk
 from vdsm.network.link import iface as link_iface
 from vdsm.network.netconfpersistence import RunningConfig
+from vdsm.network.netlink import monitor
+from vdsm.network.netlink import snapshot as nl_snapshot
+from vdsm.network.netlink.libnl import RtKnownTables
 
 from .addresses import getIpAddrs, getIpInfo, is_ipv6_local_auto
 from . import bonding
@@ -45,11 +52,30 @@ from .qos import report_network_qos
 # TODO: Get switch type from the system.
 LEGACY_SWITCH = {'switch': 'legacy'}
 
+# Some device attributes, like bridge options or IPv6 autoconf, change without
+# a netlink event. The devices cache is rebuilt from scratch when it is older
+# than this interval in seconds, bounding their staleness.
+RESYNC_INTERVAL = 300
+
+_MONITOR_GROUPS = ('link', 'ipv4-ifaddr', 'ipv6-ifaddr', 'ipv4-route',
+                   'ipv6-route')
+
+_DEVICE_TYPES = ('bondings', 'bridges', 'nics', 'vlans')
+
+# Keys of a network report taken from the report of its interface.
+_NET_DEVICE_KEYS = ('addr', 'netmask', 'ipv4addrs', 'ipv6addrs',
+                    'ipv6autoconf', 'gateway', 'ipv6gateway',
+                    'ipv4defaultroute', 'mtu')
+
 
 class NetworkIsMissing(Exception):
     pass
 
 
+class CacheInconsistency(Exception):
+    pass
+
+
 def _get(vdsmnets=None):
     """
     Generate a networking report for all devices.
@@ -57,11 +83,12 @@ def _get(vdsmnets=None):
     retrieving data from the running config.
     :return: Dict of networking devices with all their details.
     """
-    ipaddrs = getIpAddrs()
-    routes = get_routes()
+    devices_info = _cached_devices_report()
+    if devices_info is None:
+        devices_info = _devices_report(nl_snapshot.take())
+    _devices_dhcp_info(devices_info)
 
-    devices_info = _devices_report(ipaddrs, routes)
-    nets_info = _networks_report(vdsmnets, routes, ipaddrs, devices_info)
+    nets_info = _networks_report(vdsmnets, devices_info)
 
     networking_report = {'networks': nets_info}
     networking_report.update(devices_info)
@@ -72,10 +99,10 @@ def _get(vdsmnets=None):
     return networking_report
 
 
-def _networks_report(vdsmnets, routes, ipaddrs, devices_info):
+def _networks_report(vdsmnets, devices_info):
     if vdsmnets is None:
         running_nets = RunningConfig().networks
-        nets_info = networks_base_info(running_nets, routes, ipaddrs)
+        nets_info = _networks_devices_info(running_nets, devices_info)
     else:
         nets_info = vdsmnets
 
@@ -91,39 +118,94 @@ def _networks_report(vdsmnets, routes, ipaddrs, devices_info):
     return nets_info
 
 
-def _devices_report(ipaddrs, routes):
-    devs_report = {'bondings': {}, 'bridges': {}, 'nics': {}, 'vlans': {}}
+def _networks_devices_info(running_nets, devices_info):
+    """
+    Like networks_base_info(), taking the info of the network interfaces from
+    devices_info. Networks with an interface missing in devices_info, like an
+    OVS bridge or a hidden device, are looked up in the system.
+    """
+    devinfos = {}
+    for devtype in _DEVICE_TYPES:
+        devinfos.update(devices_info[devtype])
 
-    devinfo_by_devname = {}
-    for dev in (link for link in getLinks() if not link.isHidden()):
-        if dev.isBRIDGE():
-            devinfo = devs_report['bridges'][dev.name] = bridges.info(dev)
-        elif dev.isNICLike():
-            if dev.isDPDK():
-                devinfo = devs_report['nics'][dev.name] = dpdk.info(dev)
-            else:
-                devinfo = devs_report['nics'][dev.name] = nics.info(dev)
-            devinfo.update(bonding.get_bond_slave_agg_info(dev.name))
-        elif dev.isBOND():
-            devinfo = devs_report['bondings'][dev.name] = bonding.info(dev)
-            devinfo.update(bonding.get_bond_agg_info(dev.name))
-            devinfo.update(LEGACY_SWITCH)
-        elif dev.isVLAN():
-            devinfo = devs_report['vlans'][dev.name] = vlans.info(dev)
+    info = {}
+    missing_nets = {}
+    for net, attrs in six.viewitems(running_nets):
+        iface = get_net_iface_from_config(net, attrs)
+        if iface in devinfos:
+            info[net] = _net_info_from_device(
+                iface, attrs['bridged'], devinfos[iface])
         else:
-            continue
-        devinfo.update(_devinfo(dev, routes, ipaddrs))
-        devinfo_by_devname[dev.name] = devinfo
+            missing_nets[net] = attrs
+
+    if missing_nets:
+        info.update(networks_base_info(missing_nets))
+    return info
 
-    dhcp_info = dhclient.dhcp_info(frozenset(devinfo_by_devname))
-    for devname, devinfo in devinfo_by_devname.items():
-        devinfo.update(dhcp_info[devname])
+
+def _net_info_from_device(iface, bridged, devinfo):
+    if bridged:
+        data = {'ports': list(devinfo['ports']), 'stp': devinfo['stp']}
+    else:
+        # See _getNetInfo() about the "interface" attribute.
+        data = {'interface': iface}
+    data.update({'iface': iface, 'bridged': bridged})
+    for key in _NET_DEVICE_KEYS:
+        data[key] = copy.deepcopy(devinfo[key])
+    return data
+
+
+def _devices_report(snapshot):
+    routes = get_routes(snapshot)
+    ipaddrs = getIpAddrs(snapshot)
+    devs_report = {devtype: {} for devtype in _DEVICE_TYPES}
+
+    for dev in (link for link in getLinks(snapshot) if not link.isHidden()):
+        info = _device_info(dev, routes, ipaddrs)
+        if info is not None:
+            devtype, devinfo = info
+            devs_report[devtype][dev.name] = devinfo
 
     _permanent_hwaddr_info(devs_report)
 
     return devs_report
 
 
+def _device_info(dev, routes, ipaddrs):
+    """
+    Return the report type and the info of device dev, or None if devices of
+    this kind are not reported.
+    """
+    if dev.isBRIDGE():
+        devtype, devinfo = 'bridges', bridges.info(dev)
+    elif dev.isNICLike():
+        if dev.isDPDK():
+            devtype, devinfo = 'nics', dpdk.info(dev)
+        else:
+            devtype, devinfo = 'nics', nics.info(dev)
+        devinfo.update(bonding.get_bond_slave_agg_info(dev.name))
+    elif dev.isBOND():
+        devtype, devinfo = 'bondings', bonding.info(dev)
+        devinfo.update(bonding.get_bond_agg_info(dev.name))
+        devinfo.update(LEGACY_SWITCH)
+    elif dev.isVLAN():
+        devtype, devinfo = 'vlans', vlans.info(dev)
+    else:
+        return None
+    devinfo.update(_devinfo(dev, routes, ipaddrs))
+    return devtype, devinfo
+
+
+def _devices_dhcp_info(devs_report):
+    devinfo_by_devname = {}
+    for devtype in _DEVICE_TYPES:
+        devinfo_by_devname.update(devs_report[devtype])
+
+    dhcp_info = dhclient.dhcp_info(frozenset(devinfo_by_devname))
+    for devname, devinfo in devinfo_by_devname.items():
+        devinfo.update(dhcp_info[devname])
+
+
 def _permanent_hwaddr_info(devs_report):
     paddr = bonding.permanent_address()
     nics_info = devs_report.get('nics', {})
@@ -132,6 +214,243 @@ def _permanent_hwaddr_info(devs_report):
             nicinfo['permhwaddr'] = paddr[nic]
 
 
+class _DevicesCache(object):
+    """
+    Devices report maintained by netlink link, address and route events.
+
+    The report is built once, and then only the devices affected by events
+    are read again. Events which cannot be attributed to a device, and a
+    report older than RESYNC_INTERVAL, trigger a full resync.
+
+    In check mode, every report is compared with a report built from
+    scratch, raising CacheInconsistency if they differ. This is expensive,
+    and meant for tests.
+    """
+
+    def __init__(self, check=False):
+        self._check = check
+        # Protects the event state: _names, _masters, _dirty and _resync.
+        self._lock = threading.Lock()
+        # Serializes updates of _devices.
+        self._update_lock = threading.Lock()
+        self._devices = {}
+        self._names = {}
+        self._masters = {}
+        self._dirty = set()
+        self._resync = True
+        self._synced = None
+        self._monitor = None
+        self._thread = None
+
+    def start(self):
+        self._monitor = monitor.Monitor(groups=_MONITOR_GROUPS)
+        self._monitor.start()
+        self.invalidate()
+        self._thread = concurrent.thread(self._run, name='netinfo/cache')
+        self._thread.start()
+
+    def stop(self):
+        if not self._monitor.is_stopped():
+            self._monitor.stop()
+        self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def invalidate(self):
+        """
+        Rebuild the entire report on the next call to report().
+        """
+        with self._lock:
+            self._resync = True
+
+    def report(self):
+        """
+        Return the devices report, like _devices_report(). The caller owns
+        the returned report.
+        """
+        with self._update_lock:
+            self._update()
+            devices = copy.deepcopy(self._devices)
+
+        devs_report = {devtype: {} for devtype in _DEVICE_TYPES}
+        for name, (devtype, devinfo) in six.iteritems(devices):
+            devs_report[devtype][name] = devinfo
+
+        if self._check:
+            expected = _devices_report(nl_snapshot.take())
+            if devs_report != expected:
+                raise CacheInconsistency(
+                    'Cached devices report %s differs from the system %s' %
+                    (devs_report, expected))
+
+        return devs_report
+
+    def _run(self):
+        try:
+            for event in self._monitor:
+                self._handle_event(event)
+        except Exception:
+            logging.exception('Netlink monitor failed, not caching devices')
+        finally:
+            self.invalidate()
+
+    def _handle_event(self, event):
+        kind = event.get('event', '')
+        with self._lock:
+            if kind.endswith('_link'):
+                self._link_event(event)
+            elif kind.endswith('_addr'):
+                name = event.get('label') or self._names.get(event['index'])
+                if name is None:
+                    self._resync = True
+                else:
+                    self._dirty.add(name)
+            elif kind.endswith('_route'):
+                if (event.get('destination') == 'none' and
+                        event.get('table') == RtKnownTables.RT_TABLE_MAIN):
+                    # The ipv4defaultroute of every device depends on the
+                    # main default route.
+                    self._dirty.update(six.itervalues(self._names))
+                else:
+                    name = event.get('oif') or self._names.get(
+                        event.get('oif_index'))
+                    if name is not None:
+                        self._dirty.add(name)
+
+    def _link_event(self, event):
+        name = event['name']
+        index = event['index']
+        old_name = self._names.get(index)
+        if old_name is not None and old_name != name:
+            self._dirty.add(old_name)
+        self._dirty.add(name)
+
+        # Bond slaves and bridge ports are reported by their master.
+        for master in (self._masters.get(name), event.get('master')):
+            if master is not None:
+                self._dirty.add(master)
+
+        if event['event'] == 'del_link':
+            self._names.pop(index, None)
+            self._masters.pop(name, None)
+        else:
+            self._names[index] = name
+            self._masters[name] = event.get('master')
+
+    def _update(self):
+        now = monotonic_time()
+        with self._lock:
+            resync = (self._resync or self._synced is None or
+                      now - self._synced >= RESYNC_INTERVAL)
+            dirty = self._dirty
+            self._dirty = set()
+            self._resync = False
+        try:
+            if resync:
+                self._sync_all(now)
+            elif dirty:
+                self._sync_devices(dirty)
+        except:
+            self.invalidate()
+            raise
+
+    def _sync_all(self, now):
+        snapshot = nl_snapshot.take()
+        links = list(getLinks(snapshot))
+        # DPDK devices are not kernel devices, and have no netlink events.
+        kernel_links = [link for link in links if not link.isDPDK()]
+        with self._lock:
+            self._names = {link.index: link.name for link in kernel_links}
+            self._masters = {link.name: link.master for link in kernel_links}
+
+        routes = get_routes(snapshot)
+        ipaddrs = getIpAddrs(snapshot)
+        devices = {}
+        for link in links:
+            if not link.isHidden():
+                info = _device_info(link, routes, ipaddrs)
+                if info is not None:
+                    devices[link.name] = info
+        _permanent_hwaddr_info(_nics_report(devices))
+
+        logging.debug('Devices cache synced: %d devices', len(devices))
+        self._devices = devices
+        self._synced = now
+
+    def _sync_devices(self, names):
+        snapshot = nl_snapshot.take()
+        routes = get_routes(snapshot)
+        ipaddrs = getIpAddrs(snapshot)
+        updated = {}
+        for name in names:
+            try:
+                link = getLink(name)
+                if not link.isHidden():
+                    info = _device_info(link, routes, ipaddrs)
+                    if info is not None:
+                        updated[name] = info
+            except (IOError, OSError) as e:
+                if e.errno not in (errno.ENOENT, errno.ENODEV):
+                    raise
+                # The device was removed.
+            if name not in updated:
+                self._devices.pop(name, None)
+        _permanent_hwaddr_info(_nics_report(updated))
+
+        logging.debug('Devices cache updated: %s', sorted(names))
+        self._devices.update(updated)
+
+
+def _nics_report(devices):
+    return {'nics': {name: devinfo
+                     for name, (devtype, devinfo) in six.iteritems(devices)
+                     if devtype == 'nics'}}
+
+
+_devices_cache = None
+
+
+def start_devices_cache(check=False):
+    """
+    Start maintaining the devices report from netlink events, serving the
+    devices of get() from memory.
+    """
+    global _devices_cache
+    cache = _DevicesCache(check=check)
+    cache.start()
+    _devices_cache = cache
+
+
+def stop_devices_cache():
+    global _devices_cache
+    cache = _devices_cache
+    if cache is not None:
+        _devices_cache = None
+        cache.stop()
+
+
+def invalidate_devices_cache():
+    """
+    Must be called after changes not reported by netlink events, like bridge
+    options or IPv6 autoconf.
+    """
+    cache = _devices_cache
+    if cache is not None:
+        cache.invalidate()
+
+
+def _cached_devices_report():
+    """
+    Return the cached devices report, or None if the cache is not running.
+    """
+    cache = _devices_cache
+    if cache is None or not cache.running:
+        return None
+    return cache.report()
+
+
 def get(vdsmnets=None, compatibility=None):
     if compatibility is None:
         return _get(vdsmnets)
@@ -150,10 +469,12 @@ def _stringify_mtus(netinfo_data):
 
 
 def networks_base_info(running_nets, routes=None, ipaddrs=None):
-    if routes is None:
-        routes = get_routes()
-    if ipaddrs is None:
-        ipaddrs = getIpAddrs()
+    if routes is None or ipaddrs is None:
+        snapshot = nl_snapshot.take()
+        if routes is None:
+            routes = get_routes(snapshot)
+        if ipaddrs is None:
+            ipaddrs = getIpAddrs(snapshot)
 
     info = {}
     for net, attrs in six.viewitems(running_nets):
@@ -180,8 +501,9 @@ def get_net_iface_from_config(net, netattrs):
 
 
 def libvirt_vdsm_nets(nets):
-    routes = get_routes()
-    ipaddrs = getIpAddrs()
+    snapshot = nl_snapshot.take()
+    routes = get_routes(snapshot)
+    ipaddrs = getIpAddrs(snapshot)
 
     d = {}
     for net, netAttr in six.iteritems(nets):
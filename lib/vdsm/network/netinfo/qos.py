@@ -20,21 +20,32 @@
 from __future__ import absolute_import
 
 from collections import defaultdict
+import copy
 import logging
+import threading
 
 import six
 
+from vdsm.common import concurrent
 from vdsm.network import tc
+from vdsm.network.netlink import monitor
+from vdsm.network.netlink import tc as nl_tc
 
 NON_VLANNED_ID = 5000
 DEFAULT_CLASSID = '%x' % NON_VLANNED_ID
 
+_MONITOR_GROUPS = ('tc', 'link')
+
 
 def report_network_qos(nets_info, devs_info):
     """Augment netinfo information with QoS data for the engine"""
-    qdiscs = defaultdict(list)
-    for qdisc in tc.qdiscs(dev=None):  # None -> all dev qdiscs
-        qdiscs[qdisc['dev']].append(qdisc)
+    cache = _tc_cache
+    if cache is not None and cache.running:
+        qdiscs = cache.qdiscs()
+        get_classes = cache.classes
+    else:
+        qdiscs = _qdiscs_by_dev(tc.qdiscs(dev=None))  # None -> all devs
+        get_classes = _tc_classes
     for net, attrs in six.viewitems(nets_info):
         iface = attrs['iface']
         if iface in devs_info['bridges']:
@@ -64,14 +75,137 @@ def report_network_qos(nets_info, devs_info):
                         DEFAULT_CLASSID)
 
         # Now that iface is either a bond or a nic, let's get the QoS info
-        classes = [cls for cls in tc.classes(iface, classid=class_id) if
+        classes = [cls for cls in get_classes(iface, class_id) if
                    cls['kind'] == 'hfsc']
         if classes:
             cls, = classes
-            attrs['hostQos'] = {'out': cls['hfsc']}
+            attrs['hostQos'] = {'out': copy.deepcopy(cls['hfsc'])}
+
+
+def _qdiscs_by_dev(qdiscs):
+    qdiscs_by_dev = defaultdict(list)
+    for qdisc in qdiscs:
+        qdiscs_by_dev[qdisc['dev']].append(qdisc)
+    return qdiscs_by_dev
+
+
+def _tc_classes(dev, classid):
+    return tc.classes(dev, classid=classid)
 
 
 def get_root_qdisc(qdiscs):
     for qdisc in qdiscs:
         if 'root' in qdisc:
             return qdisc
+
+
+class _TcCache(object):
+    """
+    tc qdiscs and classes read from netlink dumps, dropped on netlink tc and
+    link events.
+
+    The qdiscs of all the devices are dumped once, and the classes of a
+    device when they are first reported. Reading the classes with the tc
+    parser is needed only with a libnl without HFSC support.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._qdiscs = None
+        self._classes = {}
+        self._monitor = None
+        self._thread = None
+
+    def start(self):
+        self._monitor = monitor.Monitor(groups=_MONITOR_GROUPS)
+        self._monitor.start()
+        self._thread = concurrent.thread(self._run, name='netinfo/qos')
+        self._thread.start()
+
+    def stop(self):
+        if not self._monitor.is_stopped():
+            self._monitor.stop()
+        self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def invalidate(self):
+        """
+        Read the qdiscs and classes again when they are next reported.
+        """
+        with self._lock:
+            self._qdiscs = None
+            self._classes = {}
+
+    def qdiscs(self):
+        """
+        Return the qdiscs of the devices, like _qdiscs_by_dev(tc.qdiscs()).
+        The returned dict must not be modified.
+        """
+        with self._lock:
+            return self._get_qdiscs()
+
+    def classes(self, dev, classid):
+        """
+        Return the classes of dev with classid, like tc.classes(). The
+        returned classes must not be modified.
+        """
+        with self._lock:
+            classes = self._classes.get(dev)
+            if classes is None:
+                classes = self._classes[dev] = self._read_classes(dev)
+        return [cls for cls in classes if cls['handle'] == classid]
+
+    def _get_qdiscs(self):
+        if self._qdiscs is None:
+            self._qdiscs = _qdiscs_by_dev(nl_tc.iter_qdiscs())
+        return self._qdiscs
+
+    def _read_classes(self, dev):
+        if not nl_tc.hfsc_supported():
+            return list(tc.classes(dev))
+        dev_qdiscs = self._get_qdiscs().get(dev)
+        if not dev_qdiscs:
+            return []
+        return list(nl_tc.iter_classes(dev_qdiscs[0]['index']))
+
+    def _run(self):
+        try:
+            for event in self._monitor:
+                self.invalidate()
+        except Exception:
+            logging.exception('Netlink monitor failed, not caching tc state')
+
+
+_tc_cache = None
+
+
+def start_cache():
+    """
+    Start caching the tc qdiscs and classes of the QoS report, reading them
+    again only after netlink tc and link events.
+    """
+    global _tc_cache
+    cache = _TcCache()
+    cache.start()
+    _tc_cache = cache
+
+
+def stop_cache():
+    global _tc_cache
+    cache = _tc_cache
+    if cache is not None:
+        _tc_cache = None
+        cache.stop()
+
+
+def invalidate_cache():
+    """
+    Must be called after tc changes which must be reported before their
+    netlink events are handled.
+    """
+    cache = _tc_cache
+    if cache is not None:
+        cache.invalidate()
@@ -107,10 +107,12 @@ def get_gateway(
             return '::' if family == 6 else ''
 
 
-def get_routes():
-    """Returns all the routes data dictionaries"""
+def get_routes(snapshot=None):
+    """Returns all the routes data dictionaries, taken from the netlink
+    snapshot if provided"""
     routes = defaultdict(list)
-    for route in nl_route.iter_routes():
+    for route in (nl_route.iter_routes() if snapshot is None else
+                  snapshot.routes):
         oif = route.get('oif')
         if oif is not None:
             routes[oif].append(route)
@@ -38,7 +38,7 @@ def iter_addrs():
                     addr = libnl.nl_cache_get_next(addr)
 
 
-def _addr_info(addr, link_cache=None):
+def _addr_info(addr, link_cache=None, names=None):
     """Returns a dictionary with the address information."""
     index = libnl.rtnl_addr_get_ifindex(addr)
     local_address = libnl.rtnl_addr_get_local(addr)
@@ -51,7 +51,8 @@ def _addr_info(addr, link_cache=None):
         'address': libnl.nl_addr2str(local_address) if local_address else None
     }
     try:
-        data['label'] = _link_index_to_name(index, cache=link_cache)
+        data['label'] = _link_index_to_name(index, cache=link_cache,
+                                            names=names)
     except IOError as err:
         if err.errno != errno.ENODEV:
             raise
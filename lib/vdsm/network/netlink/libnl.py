@@ -32,8 +32,9 @@ native Python manner.
 
 from __future__ import absolute_import
 
-from ctypes import CDLL, CFUNCTYPE, sizeof, get_errno, byref
-from ctypes import c_char, c_char_p, c_int, c_void_p, c_size_t, py_object
+from ctypes import CDLL, CFUNCTYPE, Structure, sizeof, get_errno, byref
+from ctypes import (c_char, c_char_p, c_int, c_uint32, c_void_p, c_size_t,
+                    py_object)
 
 from vdsm.common.cache import memoized
 from vdsm.network import py2to3
@@ -162,6 +163,20 @@ class RtnlObjectType(object):
     BASE = 'route'
     ADDR = BASE + '/addr'  # libnl/lib/route/addr.c
     LINK = BASE + '/link'  # libnl/lib/route/link.c
+    QDISC = BASE + '/qdisc'  # libnl/lib/route/qdisc.c
+    CLASS = BASE + '/class'  # libnl/lib/route/class.c
+    CLS = BASE + '/cls'  # libnl/lib/route/cls.c
+
+
+# libnl/include/linux-private/linux/pkt_sched.h
+TC_H_ROOT = 0xFFFFFFFF
+
+
+# libnl/include/linux-private/linux/pkt_sched.h
+class TcServiceCurve(Structure):
+    _fields_ = [('m1', c_uint32),  # Slope of the first segment in bytes/s
+                ('d', c_uint32),  # Length of the first segment in us
+                ('m2', c_uint32)]  # Slope of the second segment in bytes/s
 
 
 def nl_geterror(error_code):
@@ -959,6 +974,130 @@ def rtnl_route_nh_get_gateway(next_hop):
     return _rtnl_route_nh_get_gateway(next_hop)
 
 
+def rtnl_qdisc_alloc_cache(socket):
+    """Allocate new cache and fill it with the qdiscs of all the links.
+
+    @arg socket          Netlink socket
+
+    @return Newly allocated cache with qdiscs obtained from kernel.
+    """
+    _rtnl_qdisc_alloc_cache = _libnl_route(
+        'rtnl_qdisc_alloc_cache', c_int, c_void_p, c_void_p)
+    cache = c_void_p()
+    err = _rtnl_qdisc_alloc_cache(socket, byref(cache))
+    if err:
+        raise IOError(-err, nl_geterror(err))
+    return cache
+
+
+def rtnl_class_alloc_cache(socket, ifindex):
+    """Allocate new cache and fill it with the classes of a link.
+
+    @arg socket          Netlink socket
+    @arg ifindex         Interface index of the link
+
+    @return Newly allocated cache with classes obtained from kernel.
+    """
+    _rtnl_class_alloc_cache = _libnl_route(
+        'rtnl_class_alloc_cache', c_int, c_void_p, c_int, c_void_p)
+    cache = c_void_p()
+    err = _rtnl_class_alloc_cache(socket, ifindex, byref(cache))
+    if err:
+        raise IOError(-err, nl_geterror(err))
+    return cache
+
+
+def rtnl_tc_get_ifindex(tc):
+    """Return interface index of a traffic control object.
+
+    @arg tc              Qdisc, class or classifier object
+
+    @return Interface index.
+    """
+    _rtnl_tc_get_ifindex = _libnl_route(
+        'rtnl_tc_get_ifindex', c_int, c_void_p)
+    return _rtnl_tc_get_ifindex(tc)
+
+
+def rtnl_tc_get_kind(tc):
+    """Return kind of a traffic control object.
+
+    @arg tc              Qdisc, class or classifier object
+
+    @return Kind of the object, e.g. 'hfsc', or None if not specified.
+    """
+    _rtnl_tc_get_kind = _libnl_route('rtnl_tc_get_kind', c_char_p, c_void_p)
+    kind = _rtnl_tc_get_kind(tc)
+    return py2to3.to_str(kind) if kind else None
+
+
+def rtnl_tc_get_handle(tc):
+    """Return handle of a traffic control object.
+
+    @arg tc              Qdisc, class or classifier object
+
+    @return Handle, with the major number in the upper 16 bits.
+    """
+    _rtnl_tc_get_handle = _libnl_route(
+        'rtnl_tc_get_handle', c_uint32, c_void_p)
+    return _rtnl_tc_get_handle(tc)
+
+
+def rtnl_tc_get_parent(tc):
+    """Return handle of the parent of a traffic control object.
+
+    @arg tc              Qdisc, class or classifier object
+
+    @return Parent handle, TC_H_ROOT for a root object.
+    """
+    _rtnl_tc_get_parent = _libnl_route(
+        'rtnl_tc_get_parent', c_uint32, c_void_p)
+    return _rtnl_tc_get_parent(tc)
+
+
+def rtnl_class_hfsc_supported():
+    """Return True if libnl parses HFSC classes (libnl >= 3.2.29)."""
+    return hasattr(LIBNL_ROUTE, 'rtnl_class_hfsc_get_rsc')
+
+
+def rtnl_class_hfsc_get_rsc(hfsc_class):
+    """Return real-time service curve of a HFSC class.
+
+    @arg hfsc_class      HFSC class object
+
+    @return TcServiceCurve or None if the curve is not set.
+    """
+    return _rtnl_class_hfsc_get_curve('rtnl_class_hfsc_get_rsc', hfsc_class)
+
+
+def rtnl_class_hfsc_get_fsc(hfsc_class):
+    """Return link-sharing service curve of a HFSC class.
+
+    @arg hfsc_class      HFSC class object
+
+    @return TcServiceCurve or None if the curve is not set.
+    """
+    return _rtnl_class_hfsc_get_curve('rtnl_class_hfsc_get_fsc', hfsc_class)
+
+
+def rtnl_class_hfsc_get_usc(hfsc_class):
+    """Return upper-limit service curve of a HFSC class.
+
+    @arg hfsc_class      HFSC class object
+
+    @return TcServiceCurve or None if the curve is not set.
+    """
+    return _rtnl_class_hfsc_get_curve('rtnl_class_hfsc_get_usc', hfsc_class)
+
+
+def _rtnl_class_hfsc_get_curve(function_name, hfsc_class):
+    _get_curve = _libnl_route(function_name, c_int, c_void_p, c_void_p)
+    curve = TcServiceCurve()
+    if _get_curve(hfsc_class, byref(curve)):
+        return None
+    return curve
+
+
 def c_object_argument(argument):
     """Prepare prepare Python object to be used as an C argument.
 
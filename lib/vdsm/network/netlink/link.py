@@ -63,7 +63,7 @@ def is_link_up(link_flags, check_oper_status):
     return bool(iface_up)
 
 
-def _link_info(link, cache=None):
+def _link_info(link, cache=None, names=None):
     """Returns a dictionary with the information of the link object."""
     info = {}
     address = libnl.rtnl_link_get_addr(link)
@@ -84,7 +84,7 @@ def _link_info(link, cache=None):
         info['device_index'] = underlying_device_index
         try:
             info['device'] = _link_index_to_name(underlying_device_index,
-                                                 cache=cache)
+                                                 cache=cache, names=names)
         except IOError as err:
             if err.errno != errno.ENODEV:
                 raise
@@ -93,7 +93,8 @@ def _link_info(link, cache=None):
     if master_index:
         info['master_index'] = master_index
         try:
-            info['master'] = _link_index_to_name(master_index, cache=cache)
+            info['master'] = _link_index_to_name(master_index, cache=cache,
+                                                 names=names)
         except IOError as err:
             if err.errno != errno.ENODEV:
                 raise
@@ -104,9 +105,17 @@ def _link_info(link, cache=None):
     return info
 
 
-def _link_index_to_name(link_index, cache=None):
-    """Returns the textual name of the link with index equal to link_index."""
-    if cache is None:
+def _link_index_to_name(link_index, cache=None, names=None):
+    """Returns the textual name of the link with index equal to link_index.
+    The name is looked up in the names dictionary mapping indexes to names,
+    or in the link cache, or queried from the kernel."""
+    if names is not None:
+        try:
+            return names[link_index]
+        except KeyError:
+            raise IOError(errno.ENODEV, 'Dev with index %s is not present '
+                                        'in the system' % link_index)
+    elif cache is None:
         with _get_link(index=link_index) as link:
             if link is None:
                 raise IOError(errno.ENODEV, 'Dev with index %s is not present '
@@ -35,6 +35,7 @@ from . import libnl
 from .addr import _addr_info
 from .link import _link_info
 from .route import _route_info
+from .tc import _tc_info
 
 # If monitoring thread is running, queue waiting for new value and we call
 # stop(), we have to stop queue by passing special code.
@@ -44,6 +45,9 @@ _TIMEOUT_FLAG = 32
 E_NOT_RUNNING = 1
 E_TIMEOUT = 2
 
+_TC_OBJECT_TYPES = (libnl.RtnlObjectType.QDISC, libnl.RtnlObjectType.CLASS,
+                    libnl.RtnlObjectType.CLS)
+
 
 class MonitorError(Exception):
     pass
@@ -193,6 +197,8 @@ def _object_input(obj, queue):
         obj_dict = _addr_info(obj)
     elif obj_type == libnl.RtnlObjectType.LINK:
         obj_dict = _link_info(obj)
+    elif obj_type in _TC_OBJECT_TYPES:
+        obj_dict = _tc_info(obj)
     elif obj_type.split('/', 1)[0] == libnl.RtnlObjectType.BASE:
         obj_dict = _route_info(obj)
 
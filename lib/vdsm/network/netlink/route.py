@@ -39,7 +39,7 @@ def iter_routes():
                     route = libnl.nl_cache_get_next(route)
 
 
-def _route_info(route, link_cache=None):
+def _route_info(route, link_cache=None, names=None):
     destination = libnl.rtnl_route_get_dst(route)
     source = libnl.rtnl_route_get_src(route)
     gateway = _rtnl_route_get_gateway(route)
@@ -54,7 +54,8 @@ def _route_info(route, link_cache=None):
     if oif_index > 0:
         data['oif_index'] = oif_index
         try:
-            data['oif'] = _link_index_to_name(oif_index, cache=link_cache)
+            data['oif'] = _link_index_to_name(oif_index, cache=link_cache,
+                                              names=names)
         except IOError as err:
             if err.errno != errno.ENODEV:
                 raise
@@ -0,0 +1,86 @@
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+snapshot - dump links, addresses and routes together.
+
+iter_links(), iter_addrs() and iter_routes() each take a socket and dump
+the links of the system, to name the devices of addresses and routes.
+A network report needs all of them, dumping the links three times, and
+looking up every device name in a libnl cache.
+
+A snapshot dumps the links once, addresses and routes over the same socket,
+naming their devices from a dictionary built from the links dump. Consumers
+of the same report should share one snapshot.
+"""
+
+from __future__ import absolute_import
+
+from . import _pool
+from . import libnl
+from .addr import _addr_info, _nl_addr_cache
+from .link import _link_info, _nl_link_cache
+from .route import _route_info, _nl_route_cache
+
+
+class Snapshot(object):
+    """
+    Links, addresses and routes of the system, as the information
+    dictionaries yielded by iter_links(), iter_addrs() and iter_routes(),
+    and a dictionary mapping link indexes to names.
+
+    Consumers must not modify the dictionaries.
+    """
+
+    __slots__ = ('links', 'addrs', 'routes', 'names')
+
+    def __init__(self, links, addrs, routes, names):
+        self.links = links
+        self.addrs = addrs
+        self.routes = routes
+        self.names = names
+
+    def __repr__(self):
+        return ('<Snapshot links=%d addrs=%d routes=%d at %#x>'
+                % (len(self.links), len(self.addrs), len(self.routes),
+                   id(self)))
+
+
+def take():
+    """Returns a Snapshot of the links, addresses and routes."""
+    with _pool.socket() as sock:
+        with _nl_link_cache(sock) as link_cache:
+            names = {libnl.rtnl_link_get_ifindex(link):
+                     libnl.rtnl_link_get_name(link)
+                     for link in _iter_cache(link_cache)}
+            links = [_link_info(link, names=names)
+                     for link in _iter_cache(link_cache)]
+        with _nl_addr_cache(sock) as addr_cache:
+            addrs = [_addr_info(addr, names=names)
+                     for addr in _iter_cache(addr_cache)]
+        with _nl_route_cache(sock) as route_cache:
+            routes = [_route_info(route, names=names)
+                      for route in _iter_cache(route_cache)]
+    return Snapshot(links, addrs, routes, names)
+
+
+def _iter_cache(cache):
+    obj = libnl.nl_cache_get_first(cache)
+    while obj:
+        yield obj
+        obj = libnl.nl_cache_get_next(obj)
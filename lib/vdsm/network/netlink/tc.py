@@ -0,0 +1,133 @@
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+from __future__ import absolute_import
+from functools import partial
+import errno
+
+from . import _cache_manager
+from . import _pool
+from . import libnl
+from .link import _nl_link_cache, _link_index_to_name
+
+
+def iter_qdiscs():
+    """Generator that yields an information dictionary for each qdisc in the
+    system, like tc.qdiscs(), skipping noqueue qdiscs. Only the general qdisc
+    attributes are reported."""
+    with _pool.socket() as sock:
+        with _nl_qdisc_cache(sock) as qdisc_cache:
+            with _nl_link_cache(sock) as link_cache:  # for index to dev
+                qdisc = libnl.nl_cache_get_first(qdisc_cache)
+                while qdisc:
+                    data = _tc_info(qdisc, link_cache=link_cache)
+                    if data['kind'] != 'noqueue':
+                        yield data
+                    qdisc = libnl.nl_cache_get_next(qdisc)
+
+
+def iter_classes(index):
+    """Generator that yields an information dictionary for each class of the
+    link with index, like tc.classes() without the leaf attribute. HFSC
+    service curves are reported only if libnl supports HFSC, see
+    hfsc_supported()."""
+    with _pool.socket() as sock:
+        with _nl_class_cache(sock, index) as class_cache:
+            with _nl_link_cache(sock) as link_cache:  # for index to dev
+                cls = libnl.nl_cache_get_first(class_cache)
+                while cls:
+                    data = _tc_info(cls, link_cache=link_cache)
+                    if data['kind'] == 'hfsc' and hfsc_supported():
+                        curves = _hfsc_curves(cls)
+                        if curves:
+                            data['hfsc'] = curves
+                    yield data
+                    cls = libnl.nl_cache_get_next(cls)
+
+
+def hfsc_supported():
+    return libnl.rtnl_class_hfsc_supported()
+
+
+def _tc_info(tc, link_cache=None):
+    """Returns a dictionary with the general attributes of a qdisc, class or
+    classifier."""
+    index = libnl.rtnl_tc_get_ifindex(tc)
+    data = {
+        'index': index,
+        'kind': libnl.rtnl_tc_get_kind(tc),
+        'handle': _handle_str(libnl.rtnl_tc_get_handle(tc)),
+    }
+    parent = libnl.rtnl_tc_get_parent(tc)
+    if parent == libnl.TC_H_ROOT:
+        data['root'] = True
+    else:
+        data['parent'] = _handle_str(parent)
+    if link_cache is not None:
+        try:
+            data['dev'] = _link_index_to_name(index, cache=link_cache)
+        except IOError as err:
+            if err.errno != errno.ENODEV:
+                raise
+    return data
+
+
+def _handle_str(handle):
+    """Returns the handle in tc notation, e.g. '1389:' or '1389:5000'."""
+    major, minor = handle >> 16, handle & 0xFFFF
+    if minor:
+        return '%x:%x' % (major, minor)
+    return '%x:' % major
+
+
+def _hfsc_curves(cls):
+    """Returns the service curves of a HFSC class like tc.classes(): rates in
+    bits, and link-sharing curves divided by 8, see
+    tc.cls._adapt_qos_options_link_share_for_reporting()."""
+    curves = {}
+    rsc = libnl.rtnl_class_hfsc_get_rsc(cls)
+    fsc = libnl.rtnl_class_hfsc_get_fsc(cls)
+    usc = libnl.rtnl_class_hfsc_get_usc(cls)
+    if fsc is not None:
+        # Rates are in bytes/s, reported divided by 8 from bits/s.
+        curves['ls'] = {'m1': fsc.m1, 'd': fsc.d / 8, 'm2': fsc.m2}
+    if rsc is not None:
+        if fsc is not None and _curve_tuple(rsc) == _curve_tuple(fsc):
+            # tc shows equal curves as 'sc', reported as both rt and ls.
+            curves['rt'] = dict(curves['ls'])
+        else:
+            curves['rt'] = _curve_bits(rsc)
+    if usc is not None:
+        curves['ul'] = _curve_bits(usc)
+    return curves
+
+
+def _curve_bits(curve):
+    return {'m1': curve.m1 * 8, 'd': curve.d, 'm2': curve.m2 * 8}
+
+
+def _curve_tuple(curve):
+    return curve.m1, curve.d, curve.m2
+
+
+_nl_qdisc_cache = partial(_cache_manager, libnl.rtnl_qdisc_alloc_cache)
+
+
+def _nl_class_cache(sock, index):
+    return _cache_manager(partial(libnl.rtnl_class_alloc_cache,
+                                  ifindex=index), sock)
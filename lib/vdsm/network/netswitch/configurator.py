@@ -18,11 +18,14 @@
 #
 from __future__ import absolute_import
 
+import collections
+from contextlib import contextmanager
 import itertools
 
 import six
 
 from vdsm.common.cache import memoized
+from vdsm.common.time import monotonic_time
 from vdsm.network import connectivity
 from vdsm.network import ifacquire
 from vdsm.network import legacy_switch
@@ -126,19 +129,35 @@ def validate(networks, bondings):
 
 
 def setup(networks, bondings, options, in_rollback):
+    """
+    Apply the networks and bondings setup, returning the seconds spent in
+    each step of the setup.
+    """
     legacy_nets, ovs_nets, legacy_bonds, ovs_bonds = _split_switch_type(
         networks, bondings)
 
     use_legacy_switch = legacy_nets or legacy_bonds
     use_ovs_switch = ovs_nets or ovs_bonds
 
+    timings = collections.OrderedDict()
     if use_legacy_switch:
-        _setup_legacy(legacy_nets, legacy_bonds, options, in_rollback)
+        _setup_legacy(legacy_nets, legacy_bonds, options, in_rollback,
+                      timings)
     elif use_ovs_switch:
-        _setup_ovs(ovs_nets, ovs_bonds, options, in_rollback)
+        _setup_ovs(ovs_nets, ovs_bonds, options, in_rollback, timings)
+    return timings
+
+
+@contextmanager
+def _timed(timings, step):
+    start = monotonic_time()
+    try:
+        yield
+    finally:
+        timings[step] = round(monotonic_time() - start, 3)
 
 
-def _setup_legacy(networks, bondings, options, in_rollback):
+def _setup_legacy(networks, bondings, options, in_rollback, timings):
     running_nets = RunningConfig().networks
     _netinfo = CachingNetInfo(netinfo_get(networks_base_info(running_nets)))
 
@@ -146,19 +165,32 @@ def _setup_legacy(networks, bondings, options, in_rollback):
         # from this point forward, any exception thrown will be handled by
         # Configurator.__exit__.
 
-        legacy_switch.remove_networks(networks, bondings, configurator,
-                                      _netinfo)
+        with _timed(timings, 'remove_networks'):
+            legacy_switch.remove_networks(networks, bondings, configurator,
+                                          _netinfo)
 
-        legacy_switch.bonds_setup(bondings, configurator, _netinfo,
-                                  in_rollback)
+        with _timed(timings, 'setup_bonds'):
+            legacy_switch.bonds_setup(bondings, configurator, _netinfo,
+                                      in_rollback)
 
-        legacy_switch.add_missing_networks(configurator, networks,
-                                           bondings, _netinfo)
+        # Bring up the added networks together once they are all written.
+        # A failed rollback is not rolled back again, so it keeps bringing
+        # up the networks one by one.
+        if not in_rollback:
+            configurator.defer_ifups()
 
-        connectivity.check(options)
+        with _timed(timings, 'add_networks'):
+            legacy_switch.add_missing_networks(configurator, networks,
+                                               bondings, _netinfo)
 
+        with _timed(timings, 'ifup'):
+            legacy_switch.ifup_added_networks(configurator, networks)
 
-def _setup_ovs(networks, bondings, options, in_rollback):
+        with _timed(timings, 'connectivity_check'):
+            connectivity.check(options)
+
+
+def _setup_ovs(networks, bondings, options, in_rollback, timings):
     _ovs_info = ovs_info.OvsInfo()
     ovs_nets = ovs_info.create_netinfo(_ovs_info)['networks']
     _netinfo = netinfo()
@@ -177,9 +209,11 @@ def _setup_ovs(networks, bondings, options, in_rollback):
     with Transaction(in_rollback=in_rollback) as config:
         setup_bonds = SetupBonds(bonds2add, bonds2edit, bonds2remove, config)
         with ifacquire.Transaction(ovs_nets) as acq:
-            _remove_networks(nets2remove, _ovs_info, config)
+            with _timed(timings, 'remove_networks'):
+                _remove_networks(nets2remove, _ovs_info, config)
 
-            setup_bonds.remove_bonds()
+            with _timed(timings, 'remove_bonds'):
+                setup_bonds.remove_bonds()
 
             # Post removal of nets, update ovs_nets.
             ovs_nets = ovs_info.create_netinfo(_ovs_info)['networks']
@@ -187,17 +221,21 @@ def _setup_ovs(networks, bondings, options, in_rollback):
                 nets2add, bonds2add,
                 _get_kernel_nets_nics(ovs_nets), _get_kernel_bonds_slaves())
 
-            acq.acquire(setup_bonds.ifaces_for_acquirement)
-            setup_bonds.edit_bonds()
-            setup_bonds.add_bonds()
+            with _timed(timings, 'setup_bonds'):
+                acq.acquire(setup_bonds.ifaces_for_acquirement)
+                setup_bonds.edit_bonds()
+                setup_bonds.add_bonds()
 
-            _add_networks(nets2add, _ovs_info, config, acq)
+            with _timed(timings, 'add_networks'):
+                _add_networks(nets2add, _ovs_info, config, acq)
 
-            setup_ipv6autoconf(networks)
-            set_ovs_links_up(nets2add, bonds2add, bonds2edit)
-            setup_ovs_ip_config(nets2add, nets2remove)
+            with _timed(timings, 'ifup'):
+                setup_ipv6autoconf(networks)
+                set_ovs_links_up(nets2add, bonds2add, bonds2edit)
+                setup_ovs_ip_config(nets2add, nets2remove)
 
-            connectivity.check(options)
+            with _timed(timings, 'connectivity_check'):
+                connectivity.check(options)
 
 
 def _get_kernel_nets_nics(ovs_networks):
@@ -309,11 +347,11 @@ def netinfo(vdsmnets=None, compatibility=None):
     # TODO: Version requests by engine to ease handling of compatibility.
     _netinfo = netinfo_get(vdsmnets, compatibility)
 
-    if _is_ovs_service_running():
+    if is_ovs_service_running():
         try:
             ovs_netinfo = ovs_info.get_netinfo()
         except ne.OvsDBConnectionError:
-            _is_ovs_service_running.invalidate()
+            is_ovs_service_running.invalidate()
             raise
 
         running_networks = RunningConfig().networks
@@ -347,7 +385,7 @@ def _set_bond_type_by_usage(_netinfo):
 
 
 @memoized
-def _is_ovs_service_running():
+def is_ovs_service_running():
     return service_status('openvswitch', verbose=False) == 0
 
 
@@ -381,7 +419,7 @@ def _split_setup_actions(query, running_entries):
 
 
 def ovs_net2bridge(network_name):
-    if not _is_ovs_service_running():
+    if not is_ovs_service_running():
         return None
 
     return ovs_info.bridge_info(network_name)
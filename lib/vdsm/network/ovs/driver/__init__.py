@@ -53,6 +53,30 @@ class Command(object):
         pass
 
 
+@six.add_metaclass(abc.ABCMeta)
+class Monitor(object):
+    """
+    Changes of OVS database tables. Iterating over a started Monitor yields
+    the current rows of the tables, and then every change, as (table,
+    action, row) tuples, until the Monitor is stopped.
+
+    action is one of 'initial', 'insert', 'delete', 'old' and 'new'. A
+    modified row is reported as an 'old' row followed by a 'new' row. row is
+    a dict of the monitored columns, including '_uuid'.
+    """
+    @abc.abstractmethod
+    def start(self):
+        pass
+
+    @abc.abstractmethod
+    def stop(self):
+        pass
+
+    @abc.abstractmethod
+    def __iter__(self):
+        pass
+
+
 @six.add_metaclass(abc.ABCMeta)
 class OvsApi(object):
     """
@@ -63,6 +87,13 @@ class OvsApi(object):
     def transaction(self):
         pass
 
+    @abc.abstractmethod
+    def monitor(self, tables):
+        """
+        Return a Monitor of tables, a dict of table name to the list of the
+        monitored columns.
+        """
+
     @abc.abstractmethod
     def add_br(self, bridge, may_exist=False):
         pass
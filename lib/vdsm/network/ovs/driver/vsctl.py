@@ -22,15 +22,21 @@ from __future__ import absolute_import
 import collections
 import json
 import logging
+import subprocess
 import uuid
 
+import six
+
 from vdsm.common.cache import memoized
+from vdsm.common.compat import CPopen
 from vdsm.network import cmd as netcmd
 from vdsm.network import errors as ne
+from vdsm.network import py2to3
 from vdsm.network.errors import ConfigNetworkError, OvsDBConnectionError
 from vdsm.common.cmdutils import CommandPath
 
 from . import (OvsApi,
+               Monitor as DriverMonitor,
                Transaction as DriverTransaction,
                Command as DriverCommand)
 
@@ -120,11 +126,73 @@ class DBResultCommand(Command):
         self._result = results
 
 
+class Monitor(DriverMonitor):
+    """
+    Monitor reading the changes reported by ovsdb-client monitor.
+    """
+
+    def __init__(self, tables):
+        self._tables = tables
+        self._proc = None
+
+    def start(self):
+        exec_line = [_ovsdb_client_cmd(), 'monitor', '--format=json',
+                     'Open_vSwitch']
+        for table, columns in six.iteritems(self._tables):
+            exec_line += [table, ','.join(columns)]
+        logging.debug('Executing commands: %s' % ' '.join(exec_line))
+        self._proc = CPopen(exec_line, close_fds=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def stop(self):
+        if self._proc.poll() is None:
+            self._proc.terminate()
+        self._proc.wait()
+
+    def __iter__(self):
+        for line in iter(self._proc.stdout.readline, b''):
+            for change in _parse_monitor_line(py2to3.to_str(line),
+                                              self._tables):
+                yield change
+        if self._proc.wait() > 0:
+            logging.warning('ovsdb-client monitor failed: %s',
+                            py2to3.to_str(self._proc.stderr.read()))
+
+
+def _parse_monitor_line(data, tables):
+    """
+    Parse one table of an update, reported as "<table> table" in the
+    caption.
+    """
+    jdata = json.loads(data)
+    caption = jdata.get('caption')
+    if caption:
+        table = caption.rsplit(' ', 1)[0]
+    else:
+        table, = tables
+
+    headings = jdata['headings']
+    for record in jdata['data']:
+        action = None
+        row = {}
+        for heading, value in zip(headings, record):
+            if heading == 'row':
+                row['_uuid'] = uuid.UUID(value)
+            elif heading == 'action':
+                action = value
+            else:
+                row[heading] = _normalize(heading, _val_to_py(value))
+        yield table, action, row
+
+
 class Ovs(OvsApi):
 
     def transaction(self):
         return Transaction()
 
+    def monitor(self, tables):
+        return Monitor(tables)
+
     def add_br(self, bridge, may_exist=False):
         command = []
         if may_exist:
@@ -254,6 +322,13 @@ def _normalize(heading, value):
     return value
 
 
+@memoized
+def _ovsdb_client_cmd():
+    return CommandPath('ovsdb-client',
+                       '/usr/sbin/ovsdb-client',
+                       '/usr/bin/ovsdb-client').cmd
+
+
 @memoized
 def _ovs_vsctl_cmd():
     return CommandPath('ovs-vsctl',
@@ -18,8 +18,15 @@
 #
 from __future__ import absolute_import
 
+import collections
+import copy
+import logging
+import threading
+
 import six
 
+from vdsm.common import concurrent
+from vdsm.common.time import monotonic_time
 from vdsm.network.ip import dhclient
 from vdsm.network.link.bond import Bond
 from vdsm.network.netinfo.addresses import (
@@ -27,6 +34,8 @@ from vdsm.network.netinfo.addresses import (
 from vdsm.network.netinfo.routes import (get_routes, get_gateway,
                                          is_default_route)
 from vdsm.network.link.iface import get_mtu
+from vdsm.network.netinfo.cache import CacheInconsistency
+from vdsm.network.netlink import snapshot as nl_snapshot
 from . import driver
 
 
@@ -51,6 +60,19 @@ SHARED_NETWORK_ATTRIBUTES = [
     'mtu', 'addr', 'ipv4addrs', 'gateway', 'ipv4defaultroute', 'netmask',
     'dhcpv4', 'ipv6addrs', 'ipv6autoconf', 'ipv6gateway', 'dhcpv6']
 
+# Seconds before the cache reads the tables again, in case a change was
+# missed.
+RESYNC_INTERVAL = 300
+
+# Columns read by OvsInfo.
+MONITORED_TABLES = {
+    'Bridge': ('name', 'ports', 'stp_enable', 'datapath_type'),
+    'Port': ('name', 'tag', 'other_config'),
+    'Interface': ('name', 'mac_in_use'),
+}
+
+_CachedDB = collections.namedtuple('_CachedDB', 'bridges, ports, ifaces')
+
 
 class OvsDB(object):
     def __init__(self, ovsdb):
@@ -69,8 +91,14 @@ class OvsDB(object):
 
 
 class OvsInfo(object):
-    def __init__(self):
-        ovs_db = OvsDB(driver.create())
+    def __init__(self, ovs_db=None):
+        if ovs_db is None:
+            cached = _cached_info()
+            if cached is not None:
+                (self._bridges, self._bridges_by_sb,
+                 self._northbounds_by_sb) = cached
+                return
+            ovs_db = OvsDB(driver.create())
         self._ports_uuids = {port['_uuid']: port for port in ovs_db.ports}
         self._ifaces_uuids = {iface['_uuid']: iface for iface in ovs_db.ifaces}
         self._ifaces_macs = {iface['mac_in_use']: iface
@@ -139,6 +167,169 @@ class OvsInfo(object):
                 if attrs['level'] == NORTHBOUND)
 
 
+class _OvsCache(object):
+    """
+    OVS bridges, ports and interfaces maintained by an ovsdb monitor.
+
+    The tables are read once, and then updated with the rows reported by
+    the monitor. The OvsInfo indexes are built again only after a change.
+    A row referring to a row not reported yet, and tables older than
+    RESYNC_INTERVAL, trigger reading the tables again.
+
+    In check mode, every info is compared with info read from the database,
+    raising CacheInconsistency if they differ. This is expensive, and meant
+    for tests.
+    """
+
+    def __init__(self, ovsdb=None, check=False):
+        self._ovsdb = ovsdb or driver.create()
+        self._check = check
+        self._lock = threading.Lock()
+        self._tables = None
+        self._info = None
+        self._resync = True
+        self._synced = None
+        self._monitor = None
+        self._thread = None
+
+    def start(self):
+        self._monitor = self._ovsdb.monitor(MONITORED_TABLES)
+        self._monitor.start()
+        self._thread = concurrent.thread(self._run, name='ovs/cache')
+        self._thread.start()
+
+    def stop(self):
+        self._monitor.stop()
+        self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def invalidate(self):
+        """
+        Read the tables again on the next call to info().
+        """
+        with self._lock:
+            self._resync = True
+
+    def info(self):
+        """
+        Return the bridges, bridges_by_sb and northbounds_by_sb of OvsInfo.
+        The caller owns the returned values.
+        """
+        with self._lock:
+            if (self._resync or self._synced is None or
+                    monotonic_time() - self._synced >= RESYNC_INTERVAL):
+                self._sync()
+            if self._info is None:
+                try:
+                    self._info = _indexes(OvsInfo(self._cached_db()))
+                except KeyError:
+                    # The monitor did not report the referred row yet.
+                    self._sync()
+                    self._info = _indexes(OvsInfo(self._cached_db()))
+            info = copy.deepcopy(self._info)
+
+        if self._check:
+            expected = _indexes(OvsInfo(OvsDB(self._ovsdb)))
+            if info != expected:
+                raise CacheInconsistency(
+                    'Cached OVS info %s differs from the database %s' %
+                    (info, expected))
+
+        return info
+
+    def _run(self):
+        try:
+            for table, action, row in self._monitor:
+                self._update(table, action, row)
+        except Exception:
+            logging.exception('OVS monitor failed, not caching OVS info')
+        finally:
+            self.invalidate()
+
+    def _update(self, table, action, row):
+        # The initial rows are read by _sync(). A change reported before
+        # _sync() is applied again after it, leaving the row as it was
+        # after the last change.
+        if action in ('initial', 'old'):
+            return
+        with self._lock:
+            if self._tables is None:
+                return
+            rows = self._tables[table]
+            if action == 'delete':
+                rows.pop(row['_uuid'], None)
+            else:
+                rows.setdefault(row['_uuid'], {}).update(row)
+            self._info = None
+
+    def _sync(self):
+        ovs_db = OvsDB(self._ovsdb)
+        self._tables = {
+            'Bridge': _rows_by_uuid(ovs_db.bridges),
+            'Port': _rows_by_uuid(ovs_db.ports),
+            'Interface': _rows_by_uuid(ovs_db.ifaces),
+        }
+        self._info = None
+        self._resync = False
+        self._synced = monotonic_time()
+
+    def _cached_db(self):
+        return _CachedDB(
+            bridges=list(six.itervalues(self._tables['Bridge'])),
+            ports=list(six.itervalues(self._tables['Port'])),
+            ifaces=list(six.itervalues(self._tables['Interface'])))
+
+
+def _rows_by_uuid(rows):
+    return {row['_uuid']: row for row in rows}
+
+
+def _indexes(ovs_info):
+    return (ovs_info.bridges, ovs_info.bridges_by_sb,
+            ovs_info.northbounds_by_sb)
+
+
+_cache = None
+
+
+def start_cache(ovsdb=None, check=False):
+    """
+    Start maintaining the OVS tables from an ovsdb monitor, serving OvsInfo
+    from memory.
+    """
+    global _cache
+    cache = _OvsCache(ovsdb=ovsdb, check=check)
+    cache.start()
+    _cache = cache
+
+
+def stop_cache():
+    global _cache
+    cache = _cache
+    if cache is not None:
+        _cache = None
+        cache.stop()
+
+
+def invalidate_cache():
+    cache = _cache
+    if cache is not None:
+        cache.invalidate()
+
+
+def _cached_info():
+    """
+    Return the cached OvsInfo indexes, or None if the cache is not running.
+    """
+    cache = _cache
+    if cache is None or not cache.running:
+        return None
+    return cache.info()
+
+
 def get_netinfo():
     netinfo = create_netinfo(OvsInfo())
     netinfo.update(_fake_devices(netinfo['networks']))
@@ -202,8 +393,9 @@ def _fake_vlan(net_attrs, vlanid):
 
 
 def create_netinfo(ovs_info):
-    addresses = getIpAddrs()
-    routes = get_routes()
+    snapshot = nl_snapshot.take()
+    addresses = getIpAddrs(snapshot)
+    routes = get_routes(snapshot)
 
     _netinfo = {'networks': {}}
 
@@ -83,10 +83,10 @@ def cpu_topology(capabilities=None):
     return _numa(capabilities).cpu_topology
 
 
-@cache.memoized
 def autonuma_status():
     '''
-    Query system for autonuma status. Returns one of following:
+    Query system for autonuma status. Not cached, kernel.numa_balancing can
+    be changed at any time. Returns one of following:
 
         AUTONUMA_STATUS_DISABLE = 0
         AUTONUMA_STATUS_ENABLE = 1
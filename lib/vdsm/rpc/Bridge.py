@@ -272,6 +272,15 @@ def Host_getVMFullList_Call(api, args):
     return API.Global().getVMList(True, vmList, False)
 
 
+def Host_setupNetworks_Ret(ret):
+    """
+    Report the seconds spent in each step of the setup with the status.
+    """
+    status = dict(ret['status'])
+    status['timings'] = ret.get('timings', {})
+    return status
+
+
 def StoragePool_getInfo_Ret(ret):
     """
     The result contains two data structures which must be merged
@@ -342,6 +351,8 @@ command_info = {
     'Host_getLldp': {'ret': 'info'},
     'Host_getHardwareInfo': {'ret': 'info'},
     'Host_getLVMVolumeGroups': {'ret': 'vglist'},
+    'Host_getRecoveryStatus': {'ret': 'recovery'},
+    'Host_getResourceStats': {'ret': 'resourceStats'},
     'Host_getStats': {'ret': 'info'},
     'Host_getStorageDomains': {'ret': 'domlist'},
     'Host_getStorageRepoStats': {'ret': Host_getStorageRepoStats_Ret},
@@ -351,7 +362,7 @@ command_info = {
     'Host_getVMFullList': {'call': Host_getVMFullList_Call, 'ret': 'vmList'},
     'Host_getAllVmStats': {'ret': 'statsList'},
     'Host_getAllVmIoTunePolicies': {'ret': 'io_tune_policies_dict'},
-    'Host_setupNetworks': {'ret': 'status'},
+    'Host_setupNetworks': {'ret': Host_setupNetworks_Ret},
     'Host_setKsmTune': {'ret': 'status'},
     'Host_setHaMaintenanceMode': {'ret': 'status'},
     'Image_cloneStructure': {'ret': 'uuid'},
@@ -56,10 +56,17 @@ Finally, when the scheduler is not needed any more:
     scheduler.stop()
 
 This will cancel any pending calls and terminate the scheduler thread.
+
+When scheduling many calls, for example periodic calls for thousands of VMs,
+use a WheelScheduler. It has the same interface, schedules and cancels calls
+in constant time, but runs calls up to one tick after their deadline.
+
+    scheduler = schedule.WheelScheduler(clock=monotonic_time, tick=0.1)
 """
 
 import heapq
 import logging
+import math
 import threading
 import time
 
@@ -131,11 +138,18 @@ class Scheduler(object):
         with self._cond:
             if not self._running:
                 raise AssertionError("Scheduler not running")
-            heapq.heappush(self._calls, call)
-            if self._calls[0] is call:
+            if self._add_call(call):
                 self._cond.notify()
         return call
 
+    def _add_call(self, call):
+        """
+        Called with the lock held. Returns True if the scheduler thread must
+        wake up to handle the call earlier.
+        """
+        heapq.heappush(self._calls, call)
+        return self._calls[0] is call
+
     def _run(self):
         self._log.debug("started")
         try:
@@ -182,6 +196,170 @@ class Scheduler(object):
                 call.cancel()
 
 
+class WheelScheduler(Scheduler):
+    """
+    Scheduler keeping the calls in a hierarchical timer wheel.
+
+    Time is divided in ticks. The first wheel has a slot for every tick in
+    the next WHEEL0_SIZE ticks; every slot of the next wheels covers all the
+    slots of the previous wheel. When the first wheel wraps, the calls in the
+    current slot of the next wheel are moved ("cascaded") to the previous
+    wheel. Scheduling and cancelling a call take constant time, no matter
+    how many calls are scheduled.
+
+    Calls are run in batches, once per tick, up to one tick after their
+    deadline. Cancelled calls are dropped when their slot is cascaded or
+    expired.
+    """
+
+    DEFAULT_TICK = 0.1
+
+    WHEEL0_BITS = 8
+    WHEEL_BITS = 6
+    WHEELS = 4
+
+    def __init__(self, name="Scheduler", clock=time.time, tick=DEFAULT_TICK):
+        """
+        Initialize a scheduler.
+
+        Arguments:
+          name      Used as scheduler thread name
+          clock     Callable returning current time (default time.time)
+          tick      Resolution of the scheduler in seconds
+        """
+        super(WheelScheduler, self).__init__(name=name, clock=clock)
+        self._tick = tick
+        self._base = clock()
+        # Next tick to process
+        self._current = 0
+        self._wheel0_size = 1 << self.WHEEL0_BITS
+        self._wheel0_mask = self._wheel0_size - 1
+        self._wheels = [[[] for _ in range(self._wheel0_size)]]
+        for _ in range(self.WHEELS - 1):
+            self._wheels.append([[] for _ in range(1 << self.WHEEL_BITS)])
+        # Ticks handled by each wheel (the span of its slots), and the
+        # largest delay the wheels can hold.
+        self._shifts = [0]
+        shift = self.WHEEL0_BITS
+        for _ in range(self.WHEELS - 1):
+            self._shifts.append(shift)
+            shift += self.WHEEL_BITS
+        self._max_delta = (1 << shift) - 1
+        # Tick the scheduler thread will wake up at
+        self._wakeup = None
+
+    def _ticks(self, when):
+        # Rounded so the current time on a tick boundary is not off by one
+        # tick because of floating point errors.
+        return round((when - self._base) / self._tick, 6)
+
+    def _expires(self, call):
+        return int(math.ceil((call._deadline - self._base) / self._tick))
+
+    def _add_call(self, call):
+        # Hot path, the common case of a call in the first wheel is inlined.
+        expires = int(math.ceil((call._deadline - self._base) / self._tick))
+        if expires < self._current:
+            expires = self._current
+        if expires - self._current < self._wheel0_size:
+            self._wheels[0][expires & self._wheel0_mask].append(call)
+        else:
+            self._insert(call, expires)
+        return self._wakeup is None or expires < self._wakeup
+
+    def _insert(self, call, expires):
+        delta = expires - self._current
+        wheel0 = self._wheels[0]
+        if delta < len(wheel0):
+            wheel0[expires & (len(wheel0) - 1)].append(call)
+            return
+        if delta > self._max_delta:
+            # Cascaded again when reaching the last wheel slot.
+            expires = self._current + self._max_delta
+            delta = self._max_delta
+        level = 1
+        while (level < self.WHEELS - 1 and
+               delta >= 1 << self._shifts[level + 1]):
+            level += 1
+        wheel = self._wheels[level]
+        slot = (expires >> self._shifts[level]) & (len(wheel) - 1)
+        wheel[slot].append(call)
+
+    def _time_until_deadline(self):
+        now_tick = self._ticks(self._clock())
+        wakeup = self._next_tick()
+        if wakeup is None:
+            self._wakeup = None
+            return self.DEFAULT_DELAY
+        self._wakeup = wakeup
+        return min((wakeup - now_tick) * self._tick, self.DEFAULT_DELAY)
+
+    def _next_tick(self):
+        """
+        Return the next tick that may have work to do: a non-empty slot in
+        the first wheel, or the next cascade. None if the wheels are empty.
+        """
+        wheel0 = self._wheels[0]
+        mask = len(wheel0) - 1
+        # The first wheel holds the calls of the next len(wheel0) ticks;
+        # slots before the current index hold the ticks after the wrap.
+        next_tick = None
+        for tick in range(self._current, self._current + len(wheel0)):
+            if wheel0[tick & mask]:
+                next_tick = tick
+                break
+        if any(slot for wheel in self._wheels[1:] for slot in wheel):
+            end = (self._current | mask) + 1
+            if next_tick is None or end < next_tick:
+                return end
+        return next_tick
+
+    def _pop_expired_calls(self):
+        now = self._clock()
+        now_tick = int(math.floor(self._ticks(now)))
+        wheel0 = self._wheels[0]
+        mask = len(wheel0) - 1
+        expired = []
+        while self._current <= now_tick:
+            tick = self._current
+            if tick & mask == 0:
+                self._cascade(tick)
+            slot = wheel0[tick & mask]
+            if slot:
+                wheel0[tick & mask] = []
+                for call in slot:
+                    if not call.valid():
+                        continue
+                    if call._deadline > now:
+                        # Off by a rounding error, never run calls early.
+                        wheel0[(tick + 1) & mask].append(call)
+                    else:
+                        expired.append(call)
+            self._current += 1
+        return expired
+
+    def _cascade(self, tick):
+        for level in range(1, self.WHEELS):
+            wheel = self._wheels[level]
+            index = (tick >> self._shifts[level]) & (len(wheel) - 1)
+            calls = wheel[index]
+            wheel[index] = []
+            for call in calls:
+                if call.valid():
+                    self._insert(call, max(self._expires(call), tick))
+            if index != 0:
+                break
+
+    def _cancel_calls(self):
+        # Help the garbage collector by breaking reference cycles
+        with self._cond:
+            for wheel in self._wheels:
+                for slot in wheel:
+                    for call in slot:
+                        call.cancel()
+                    del slot[:]
+
+
 class ScheduledCall(object):
     """
     Returned when a callable is scheduled. The caller may cancel the call if it
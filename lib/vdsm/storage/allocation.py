@@ -0,0 +1,253 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+allocation - compute the allocation needed by copy and merge operations.
+
+The clusters allocated in a volume are read from qemu-img map, keeping only
+the data allocated in the volume itself, not in its backing chain. From the
+clusters of the volumes we compute:
+
+- the size of a copy of a volume, or of a collapsed chain, to a qcow2
+  volume: metadata for the virtual size, and the union of the clusters
+- the size of a base volume after merging a top volume into it: the current
+  end of the base image, the clusters of top not allocated in base, and the
+  qcow2 metadata needed to map them
+
+Mapping a big volume is not free, and the same volumes are mapped again by
+every copy and merge of the chain. Internal volumes are not modified, so
+their clusters are cached, keyed by the volume generation and allocated
+size. Leaf volumes may be written by a running VM and are always mapped.
+"""
+
+from __future__ import absolute_import
+
+import collections
+import logging
+import threading
+
+from vdsm.storage import constants as sc
+from vdsm.storage import qcow2
+from vdsm.storage import qemuimg
+
+log = logging.getLogger("storage.allocation")
+
+# Maximum number of volumes in the cache.
+CACHE_SIZE = 256
+
+# Number of clusters mapped by one L2 table.
+L2_CLUSTERS = qcow2.CLUSTER_SIZE // qcow2.SIZEOF_INT_64
+
+# Number of clusters counted by one refcount block.
+REFBLOCK_CLUSTERS = qcow2.CLUSTER_SIZE * 8 // (1 << qcow2.REFCOUNT_ORDER)
+
+_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+class Clusters(object):
+    """
+    Immutable set of qcow2 clusters, kept as sorted, non overlapping
+    (start, end) ranges of cluster indexes.
+    """
+
+    def __init__(self, ranges=()):
+        self._ranges = tuple(_coalesce(ranges))
+
+    @classmethod
+    def from_map(cls, runs):
+        """
+        Create clusters from qemu-img map runs, including only the clusters
+        with data allocated in the mapped image. A run smaller than a cluster
+        allocates the entire cluster.
+        """
+        ranges = []
+        for r in runs:
+            if r.get("depth", 0) != 0 or not r["data"]:
+                continue
+            start = r["start"] // qcow2.CLUSTER_SIZE
+            end = _div_round_up(r["start"] + r["length"], qcow2.CLUSTER_SIZE)
+            ranges.append((start, end))
+        return cls(ranges)
+
+    @property
+    def ranges(self):
+        return self._ranges
+
+    def union(self, other):
+        return Clusters(self._ranges + other._ranges)
+
+    def difference(self, other):
+        """
+        Return the clusters in self which are not in other.
+        """
+        result = []
+        others = other._ranges
+        i = 0
+        for start, end in self._ranges:
+            while i < len(others) and others[i][1] <= start:
+                i += 1
+            j = i
+            while j < len(others) and others[j][0] < end:
+                other_start, other_end = others[j]
+                if other_start > start:
+                    result.append((start, other_start))
+                start = max(start, other_end)
+                j += 1
+            if start < end:
+                result.append((start, end))
+        return Clusters(result)
+
+    def regions(self, size):
+        """
+        Return the set of indexes of the regions of size clusters including
+        any of the clusters.
+        """
+        result = set()
+        for start, end in self._ranges:
+            result.update(range(start // size, (end - 1) // size + 1))
+        return result
+
+    def size(self):
+        """
+        Return the size of the clusters in bytes.
+        """
+        return len(self) * qcow2.CLUSTER_SIZE
+
+    def __len__(self):
+        return sum(end - start for start, end in self._ranges)
+
+    def __eq__(self, other):
+        return self._ranges == other._ranges
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "<Clusters %s at %#x>" % (list(self._ranges), id(self))
+
+
+def _coalesce(ranges):
+    result = []
+    for start, end in sorted(ranges):
+        if result and start <= result[-1][1]:
+            if end > result[-1][1]:
+                result[-1] = (result[-1][0], end)
+        else:
+            result.append((start, end))
+    return result
+
+
+def _div_round_up(n, d):
+    return (n + d - 1) // d
+
+
+def clusters(vol):
+    """
+    Return the clusters allocated in vol. The volume and its backing chain
+    must be prepared, unless the clusters of the volume are cached.
+    """
+    if vol.isLeaf():
+        return _map(vol)
+
+    key = (vol.sdUUID, vol.imgUUID, vol.volUUID)
+    fingerprint = _fingerprint(vol)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            # Move to the end, keeping the least recently used first.
+            del _cache[key]
+            _cache[key] = entry
+            return entry[1]
+
+    result = _map(vol)
+
+    with _lock:
+        _cache.pop(key, None)
+        _cache[key] = (fingerprint, result)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def invalidate(sd_id, img_id):
+    """
+    Drop the cached clusters of the volumes of image img_id. Must be called
+    when internal volumes of the image are modified, for example by merge.
+    """
+    with _lock:
+        for key in list(_cache):
+            if key[:2] == (sd_id, img_id):
+                del _cache[key]
+
+
+def _map(vol):
+    runs = qemuimg.map(vol.getVolumePath())
+    result = Clusters.from_map(runs)
+    log.debug("Volume %s has %d allocated clusters", vol.volUUID,
+              len(result))
+    return result
+
+
+def _fingerprint(vol):
+    generation = vol.getMetadata().get(sc.GENERATION, sc.DEFAULT_GENERATION)
+    return generation, vol.getVolumeTrueSize(bs=1)
+
+
+def copy_size(chain):
+    """
+    Return the size in bytes of a qcow2 volume with the data of chain,
+    ordered from base to top. Copying a single volume is copying a chain of
+    one volume.
+    """
+    virtual_size = chain[-1].getSize() * sc.BLOCK_SIZE
+    data = Clusters()
+    for vol in chain:
+        data = data.union(clusters(vol))
+    return qcow2.estimate_metadata_size(virtual_size) + data.size()
+
+
+def merge_size(base_vol, top_vol):
+    """
+    Return the size in bytes of qcow2 base_vol after committing top_vol
+    into it.
+
+    The clusters of top already allocated in base are rewritten in place.
+    The other clusters are appended to the end of the image, with new L2
+    tables for regions not mapped in base, new refcount blocks for the
+    appended clusters, and a new refcount table and L1 table if they need
+    to grow.
+    """
+    end = qemuimg.check(base_vol.getVolumePath(),
+                        qemuimg.FORMAT.QCOW2)["offset"]
+    base = clusters(base_vol)
+    new = clusters(top_vol).difference(base)
+    if not new:
+        return end
+
+    virtual_size = max(base_vol.getSize(), top_vol.getSize()) * sc.BLOCK_SIZE
+    l2_tables = len(new.regions(L2_CLUSTERS) - base.regions(L2_CLUSTERS))
+    appended = len(new) + l2_tables
+    refblocks = _div_round_up(appended, REFBLOCK_CLUSTERS) + 1
+    l1_table = _div_round_up(
+        _div_round_up(virtual_size, L2_CLUSTERS * qcow2.CLUSTER_SIZE) *
+        qcow2.SIZEOF_INT_64, qcow2.CLUSTER_SIZE)
+    refcount_table = 1
+    metadata = l2_tables + refblocks + l1_table + refcount_table
+    return end + (len(new) + metadata) * qcow2.CLUSTER_SIZE
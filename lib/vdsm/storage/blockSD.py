@@ -1277,10 +1277,19 @@ class BlockStorageDomain(sd.StorageDomain):
         If the image is based on a template image it should be expressly
         deactivated.
         """
-        self.removeImageLinks(imgUUID)
+        self.deactivateImages([imgUUID])
+
+    def deactivateImages(self, imgUUIDs):
+        """
+        Deactivate the volumes of many images using one lvm command.
+        """
         allVols = self.getAllVolumes()
-        volUUIDs = self._manifest._getImgExclusiveVols(imgUUID, allVols)
-        lvm.deactivateLVs(self.sdUUID, volUUIDs)
+        volUUIDs = []
+        for imgUUID in imgUUIDs:
+            self.removeImageLinks(imgUUID)
+            volUUIDs.extend(
+                self._manifest._getImgExclusiveVols(imgUUID, allVols))
+        lvm.deactivateLVs(self.sdUUID, utils.unique(volUUIDs))
 
     def linkBCImage(self, imgPath, imgUUID):
         dst = self.getLinkBCImagePath(imgUUID)
@@ -1347,9 +1356,24 @@ class BlockStorageDomain(sd.StorageDomain):
 
         If the image is based on a template image it will be activated.
         """
-        lvm.activateLVs(self.sdUUID, volUUIDs)
+        return self.activateImages({imgUUID: volUUIDs})[imgUUID]
+
+    def activateImages(self, images):
+        """
+        Activate the volumes of many images using one lvm command.
+
+        images: dict mapping image uuid to a list of the image volumes uuids.
+        A template volume shared by several images is activated once.
+
+        Returns a dict mapping image uuid to the image run directory.
+        """
+        lvNames = utils.unique(volUUID
+                               for volUUIDs in six.itervalues(images)
+                               for volUUID in volUUIDs)
+        lvm.activateLVs(self.sdUUID, lvNames)
         vgDir = os.path.join("/dev", self.sdUUID)
-        return self.createImageLinks(vgDir, imgUUID, volUUIDs)
+        return {imgUUID: self.createImageLinks(vgDir, imgUUID, volUUIDs)
+                for imgUUID, volUUIDs in six.iteritems(images)}
 
     def validateMasterMount(self):
         return mount.isMounted(self.getMasterDir())
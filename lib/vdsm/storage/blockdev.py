@@ -25,6 +25,7 @@ blockdev - data operations on block devices.
 from __future__ import absolute_import
 
 import logging
+import threading
 
 from contextlib import contextmanager
 
@@ -37,6 +38,7 @@ from vdsm.config import config
 from vdsm.storage import blkdiscard
 from vdsm.storage import fsutils
 from vdsm.storage import operation
+from vdsm.storage import zeroing
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 
@@ -74,6 +76,8 @@ def zero(device_path, size=None, task=_NullTask()):
         `vdsm.common.exception.ActionStopped` if the wipe was aborted
         `vdsm.storage.exception.VolumesZeroingError` if writing to storage
             failed.
+        `vdsm.common.exception.InvalidConfiguration` if irs:zero_method is
+            invalid.
         `vdsm.storage.exception.InvalidParameterException` if size is not
             aligned to `vdsm.storage.constants.BLOCK_SIZE`.
     """
@@ -83,22 +87,34 @@ def zero(device_path, size=None, task=_NullTask()):
     elif size % sc.BLOCK_SIZE:
         raise se.InvalidParameterException("size", size)
 
-    log.info("Zeroing device %s (size=%d)", device_path, size)
-    with utils.stopwatch("Zero device %s" % device_path,
-                         level=logging.INFO, log=log):
-        zero_method = config.get('irs', 'zero_method')
-        try:
-            if zero_method == "blkdiscard":
-                _zero_blkdiscard(device_path, size, task)
-            elif zero_method == "dd":
-                _zero_dd(device_path, size, task)
-            else:
-                raise exception.InvalidConfiguration(
-                    reason="Unsupported value for irs:zero_method",
-                    zero_method=zero_method)
-        except se.StorageException as e:
-            raise se.VolumesZeroingError("Zeroing device %s failed: %s"
-                                         % (device_path, e))
+    zero_method = config.get('irs', 'zero_method')
+    if zero_method == "native":
+        zero_func = _zero_native
+    elif zero_method == "blkdiscard":
+        zero_func = _zero_blkdiscard
+    elif zero_method == "dd":
+        zero_func = _zero_dd
+    else:
+        raise exception.InvalidConfiguration(
+            reason="Unsupported value for irs:zero_method",
+            zero_method=zero_method)
+
+    with _limit.slot(task):
+        log.info("Zeroing device %s (size=%d)", device_path, size)
+        with utils.stopwatch("Zero device %s" % device_path,
+                             level=logging.INFO, log=log):
+            try:
+                zero_func(device_path, size, task)
+            except (se.StorageException, EnvironmentError) as e:
+                raise se.VolumesZeroingError("Zeroing device %s failed: %s"
+                                             % (device_path, e))
+
+
+def _zero_native(device_path, size, task):
+    op = zeroing.Zero(device_path, size)
+    with task.abort_callback(op.abort):
+        op.run()
+    log.debug("Zeroed device %s using %s", device_path, op.method)
 
 
 def _zero_blkdiscard(device_path, size, task):
@@ -137,6 +153,54 @@ def _run_dd(path, offset, block_size, count, task):
         op.run()
 
 
+class _Limit(object):
+    """
+    Limit the number of devices zeroed at the same time to
+    irs:zero_concurrency.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._running = 0
+
+    @contextmanager
+    def slot(self, task):
+        """
+        Wait until a device can be zeroed.
+
+        Raises:
+            `vdsm.common.exception.ActionStopped` if the task was aborted
+                while waiting.
+        """
+        aborted = []
+
+        def abort():
+            with self._cond:
+                aborted.append(True)
+                self._cond.notify_all()
+
+        with task.abort_callback(abort):
+            with self._cond:
+                limit = max(config.getint('irs', 'zero_concurrency'), 1)
+                if self._running >= limit:
+                    log.debug("Waiting until one of %d running zero "
+                              "operations completes", self._running)
+                while self._running >= limit and not aborted:
+                    self._cond.wait()
+                if aborted:
+                    raise exception.ActionStopped()
+                self._running += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+
+_limit = _Limit()
+
+
 def discard(device_path):
     """
     Discard a block device.
@@ -0,0 +1,274 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Copy engine running volume copies concurrently.
+
+Copying an image runs one qemu-img convert per volume. Every destination
+volume gets only the data allocated in its source volume, so once the source
+and destination chains are prepared, the volumes are independent and can be
+copied concurrently.
+
+The number of copies writing to a storage domain at the same time is
+limited by irs:copy_parallelism. The limit is shared by all the copies
+to the domain, so copying many images to the same domain does not overload
+it.
+
+The engine reports the aggregate progress of the copies weighted by their
+size, the throughput, and the estimated time to complete.
+"""
+
+from __future__ import absolute_import
+
+import collections
+import logging
+import sys
+import threading
+
+import six
+
+from vdsm import utils
+from vdsm.common import concurrent
+from vdsm.common import time
+from vdsm.common.exception import ActionStopped
+from vdsm.config import config
+from vdsm.storage import qemuimg
+
+log = logging.getLogger("storage.copyengine")
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+def convert_options(dst_format, backing=None):
+    """
+    Return qemuimg.convert() keyword arguments tuning the copy according to
+    the configuration.
+
+    Out of order writes are used only for raw destination volumes without a
+    backing file, where the order of the writes does not affect the
+    allocation of the destination.
+    """
+    options = {}
+    coroutines = config.getint("irs", "copy_coroutines")
+    if coroutines > 0:
+        options["coroutines"] = coroutines
+    if (config.getboolean("irs", "copy_unordered_writes") and
+            dst_format == qemuimg.FORMAT.RAW and backing is None):
+        options["unorderedWrites"] = True
+    return options
+
+
+class Copy(object):
+    """
+    A copy of size bytes performed by operation, an object with run(),
+    abort() and progress (0-100), like qemuimg.ProgressCommand.
+    """
+
+    def __init__(self, name, size, operation):
+        self.name = name
+        self.size = size
+        self.operation = operation
+        self.done = False
+
+    def copied(self):
+        """
+        Return the number of bytes copied so far.
+        """
+        if self.done:
+            return self.size
+        progress = self.operation.progress or 0.0
+        return int(self.size * progress / 100)
+
+    def __repr__(self):
+        return "<Copy %s size=%d at %#x>" % (self.name, self.size, id(self))
+
+
+class Engine(object):
+    """
+    Run copies to storage domain sd_id, as many as the domain allows at the
+    same time.
+    """
+
+    def __init__(self, sd_id, copies):
+        self._sd_id = sd_id
+        self._copies = list(copies)
+        self._pending = collections.deque(self._copies)
+        self._slots = _domain_slots(sd_id)
+        self._lock = threading.Lock()
+        self._aborted = False
+        self._exc_info = None
+        self._started = None
+
+    @property
+    def aborted(self):
+        return self._aborted
+
+    def run(self):
+        """
+        Run all the copies, returning when they are done. If a copy fails,
+        abort the other copies and raise the error of the failed copy.
+
+        Raises:
+            `exception.ActionStopped` if the engine was aborted
+        """
+        self._started = time.monotonic_time()
+        workers = min(len(self._copies), self._slots.size)
+        log.debug("Copying %d volumes to domain %s using %d workers",
+                  len(self._copies), self._sd_id, workers)
+        if workers == 1:
+            self._worker()
+        else:
+            threads = []
+            for i in range(workers):
+                name = "copy/%s/%d" % (self._sd_id[:8], i)
+                t = concurrent.thread(self._worker, name=name)
+                t.start()
+                threads.append(t)
+            for t in threads:
+                t.join()
+
+        if self._exc_info:
+            six.reraise(*self._exc_info)
+        if self._aborted:
+            raise ActionStopped()
+
+    def abort(self):
+        """
+        Abort the running copies and the copies not started yet.
+
+        This method is threadsafe and may be called from any thread.
+        """
+        with self._lock:
+            self._aborted = True
+            copies = [c for c in self._copies if not c.done]
+        for c in copies:
+            c.operation.abort()
+        self._slots.wakeup()
+
+    @property
+    def progress(self):
+        """
+        Return the progress of all the copies as float between 0 and 100.
+        """
+        total = self._total()
+        if total == 0:
+            done = sum(1 for c in self._copies if c.done)
+            return 100.0 * done / max(len(self._copies), 1)
+        return 100.0 * self._copied() / total
+
+    @property
+    def throughput(self):
+        """
+        Return the average copy throughput in bytes per second, or None if
+        the engine was not started.
+        """
+        if self._started is None:
+            return None
+        elapsed = time.monotonic_time() - self._started
+        if elapsed <= 0:
+            return None
+        return int(self._copied() / elapsed)
+
+    @property
+    def eta(self):
+        """
+        Return the estimated number of seconds to complete the copies, or
+        None if nothing was copied yet.
+        """
+        throughput = self.throughput
+        if not throughput:
+            return None
+        return int((self._total() - self._copied()) / throughput)
+
+    def _total(self):
+        return sum(c.size for c in self._copies)
+
+    def _copied(self):
+        return sum(c.copied() for c in self._copies)
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                if self._aborted or not self._pending:
+                    return
+                copy = self._pending.popleft()
+            if not self._slots.acquire(self):
+                return
+            try:
+                with utils.stopwatch("Copy volume %s" % copy.name):
+                    copy.operation.run()
+                copy.done = True
+            except Exception:
+                self._failed(copy, sys.exc_info())
+                return
+            finally:
+                self._slots.release()
+
+    def _failed(self, copy, exc_info):
+        with self._lock:
+            if self._aborted:
+                return
+            log.error("Copy %s failed, aborting the other copies", copy,
+                      exc_info=exc_info)
+            self._exc_info = exc_info
+        self.abort()
+
+
+def _domain_slots(sd_id):
+    with _slots_lock:
+        slots = _slots.get(sd_id)
+        if slots is None:
+            size = max(config.getint("irs", "copy_parallelism"), 1)
+            slots = _slots[sd_id] = _Slots(size)
+        return slots
+
+
+class _Slots(object):
+    """
+    Limit the number of concurrent copies to a storage domain.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._free = size
+        self._cond = threading.Condition(threading.Lock())
+
+    def acquire(self, engine):
+        """
+        Wait for a free slot. Returns False if the engine was aborted while
+        waiting.
+        """
+        with self._cond:
+            while self._free == 0 and not engine.aborted:
+                self._cond.wait()
+            if engine.aborted:
+                return False
+            self._free -= 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._free += 1
+            # Waiters of different engines may be waiting.
+            self._cond.notify_all()
+
+    def wakeup(self):
+        with self._cond:
+            self._cond.notify_all()
@@ -0,0 +1,197 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+devicemonitor - track the block devices added, removed and changed between
+storage refreshes, from udev events.
+
+udev sends an event after processing it, so the events of a rescan may be
+received after udevadm settle returns. Before reporting the changes, we
+wait until all the events emitted by the kernel so far were received,
+using the event sequence numbers. If an event was not received in time, or
+the monitor is not running, the changes are unknown.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+from collections import namedtuple
+
+from vdsm import udevadm
+from vdsm.common import concurrent
+from vdsm.common import time
+
+SEQNUM_PATH = "/sys/kernel/uevent_seqnum"
+
+# Maximum number of seconds to wait for the events emitted by the kernel.
+SYNC_TIMEOUT = 2.0
+
+Changes = namedtuple("Changes", "added, removed, changed")
+
+log = logging.getLogger("storage.devicemonitor")
+
+
+class DeviceMonitor(object):
+
+    def __init__(self, monitor=None):
+        self._monitor = monitor or udevadm.Monitor()
+        self._cond = threading.Condition(threading.Lock())
+        self._thread = None
+        # Sequence number of the last kernel event before the monitor was
+        # started, and the next event expected.
+        self._start = None
+        self._next = None
+        self._received = set()
+        self._added = set()
+        self._removed = set()
+        self._changed = set()
+        self._complete = False
+
+    def start(self):
+        self._start = _read_seqnum()
+        self._monitor.start()
+        try:
+            thread = concurrent.thread(self._run, name="storage/devmon",
+                                       log=log)
+            thread.start()
+        except:
+            self._monitor.stop()
+            raise
+        self._thread = thread
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._monitor.stop()
+        self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def changes(self):
+        """
+        Return the Changes since the last call, or None if they are unknown.
+        """
+        target = _read_seqnum()
+        deadline = time.monotonic_time() + SYNC_TIMEOUT
+        with self._cond:
+            while not self._synced(target):
+                remaining = deadline - time.monotonic_time()
+                if remaining <= 0 or not self.running:
+                    log.warning("Events up to %d not received", target)
+                    # Track changes from now, the caller assumes that
+                    # anything may have changed.
+                    self._next = max(target, self._next or 0) + 1
+                    # Keep the events after target received meanwhile.
+                    self._received = set(n for n in self._received
+                                         if n > target)
+                    self._advance()
+                    self._reset()
+                    return None
+                self._cond.wait(remaining)
+
+            if self._complete and self.running:
+                result = Changes(frozenset(self._added),
+                                 frozenset(self._removed),
+                                 frozenset(self._changed))
+            else:
+                result = None
+            self._reset()
+            return result
+
+    def _reset(self):
+        self._added.clear()
+        self._removed.clear()
+        self._changed.clear()
+        self._complete = True
+
+    def _synced(self, seqnum):
+        if seqnum <= self._start:
+            return True
+        return self._next is not None and self._next > seqnum
+
+    def _run(self):
+        try:
+            for event in self._monitor:
+                self._update(event)
+        finally:
+            with self._cond:
+                self._cond.notify_all()
+
+    def _update(self, event):
+        props = event.properties
+        with self._cond:
+            if props.get("SUBSYSTEM") == "block" and "DEVNAME" in props:
+                name = os.path.basename(props["DEVNAME"])
+                if event.action == "add":
+                    self._added.add(name)
+                elif event.action == "remove":
+                    self._removed.add(name)
+                elif event.action == "change":
+                    self._changed.add(name)
+
+            seqnum = int(props.get("SEQNUM", 0))
+            if self._next is None:
+                if seqnum > self._start + 1:
+                    # Events were emitted before we started listening.
+                    self._complete = False
+                self._next = seqnum + 1
+            elif seqnum >= self._next:
+                self._received.add(seqnum)
+                self._advance()
+            self._cond.notify_all()
+
+    def _advance(self):
+        while self._next in self._received:
+            self._received.remove(self._next)
+            self._next += 1
+
+
+def _read_seqnum():
+    with open(SEQNUM_PATH) as f:
+        return int(f.read())
+
+
+_monitor = None
+
+
+def start():
+    global _monitor
+    monitor = DeviceMonitor()
+    monitor.start()
+    _monitor = monitor
+
+
+def stop():
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor = None
+
+
+def changes():
+    """
+    Return the Changes since the last call, or None if they are unknown.
+    """
+    if _monitor is None or not _monitor.running:
+        return None
+    return _monitor.changes()
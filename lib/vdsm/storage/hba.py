@@ -24,9 +24,10 @@ Collect HBA information
 
 from __future__ import absolute_import
 
-import glob
+import errno
 import logging
 import os
+import threading
 
 from vdsm import commands
 from vdsm import constants
@@ -40,11 +41,15 @@ log = logging.getLogger("storage.HBA")
 ISCSI_INITIATOR_NAME = "/etc/iscsi/initiatorname.iscsi"
 INITIATOR_NAME = "InitiatorName"
 
-FC_HOST_MASK = "/sys/class/fc_host/host*"
+FC_HOSTS_DIR = "/sys/class/fc_host"
 
 PORT_NAME = "port_name"
 NODE_NAME = "node_name"
 
+# FC HBAs read by getFCInitiators(), by SCSI host name.
+_fcHosts = {}
+_fcHostsLock = threading.Lock()
+
 
 class Error(Exception):
     """ hba operation failed """
@@ -123,25 +128,52 @@ def getModelDesc(fch, host):
 
 
 def getFCInitiators():
+    """
+    Return the FC HBAs. A FC host is read once: the kernel does not reuse
+    SCSI host numbers, and the port and model of a host do not change.
+    """
+    try:
+        hosts = sorted(os.listdir(FC_HOSTS_DIR))
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        hosts = []
+
+    with _fcHostsLock:
+        for host in list(_fcHosts):
+            if host not in hosts:
+                del _fcHosts[host]
+
     hbas = []
-    fcHosts = glob.glob(FC_HOST_MASK)
-    for fch in fcHosts:
-        host = os.path.basename(fch)
-        # Get FC HBA port name
-        portName = os.path.join(fch, PORT_NAME)
-        with open(portName) as port_file:
-            wwpn = port_file.read().strip().lstrip("0x")
-        # Get FC HBA node name
-        nodeName = os.path.join(fch, NODE_NAME)
-        with open(nodeName) as node_file:
-            wwnn = node_file.read().strip().lstrip("0x")
-        # Get model name and description
-        model = "%s - %s" % getModelDesc(fch, host)
-        # Construct FC HBA descriptor
-        hbas.append({"wwpn": wwpn, "wwnn": wwnn, "model": model})
+    for host in hosts:
+        if not host.startswith("host"):
+            continue
+        with _fcHostsLock:
+            hba = _fcHosts.get(host)
+        if hba is None:
+            hba = _readFCHost(host)
+            with _fcHostsLock:
+                _fcHosts[host] = hba
+        hbas.append(dict(hba))
     return hbas
 
 
+def _readFCHost(host):
+    fch = os.path.join(FC_HOSTS_DIR, host)
+    # Get FC HBA port name
+    portName = os.path.join(fch, PORT_NAME)
+    with open(portName) as port_file:
+        wwpn = port_file.read().strip().lstrip("0x")
+    # Get FC HBA node name
+    nodeName = os.path.join(fch, NODE_NAME)
+    with open(nodeName) as node_file:
+        wwnn = node_file.read().strip().lstrip("0x")
+    # Get model name and description
+    model = "%s - %s" % getModelDesc(fch, host)
+    # Construct FC HBA descriptor
+    return {"wwpn": wwpn, "wwnn": wwnn, "model": model}
+
+
 def HBAInventory():
     """
     Returns the inventory of the hosts HBAs and their parameters.
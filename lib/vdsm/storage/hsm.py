@@ -28,7 +28,7 @@ import logging
 import glob
 from fnmatch import fnmatch
 from itertools import imap
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from functools import partial
 import errno
 import time
@@ -50,6 +50,7 @@ from vdsm.storage import blockSD
 from vdsm.storage import clusterlock
 from vdsm.storage import constants as sc
 from vdsm.storage import devicemapper
+from vdsm.storage import devicemonitor
 from vdsm.storage import dispatcher
 from vdsm.storage import exception as se
 from vdsm.storage import fileUtils
@@ -379,6 +380,13 @@ class HSM(object):
         except Exception:
             self.log.warn("Failed to clean Storage Repository.", exc_info=True)
 
+        try:
+            devicemonitor.start()
+        except Exception:
+            self.log.warning("Failed to start device monitor, refreshing "
+                             "storage will invalidate all LVM caches",
+                             exc_info=True)
+
         def storageRefresh():
             sdCache.refreshStorage()
             lvm.bootstrap(refreshlvs=blockSD.SPECIAL_LVS_V4)
@@ -3096,24 +3104,91 @@ class HSM(object):
 
         vars.task.getSharedLock(STORAGE, sdUUID)
 
-        imgVolumesInfo = []
         dom = sdCache.produce(sdUUID)
-        allVols = dom.getAllVolumes()
-        # Filter volumes related to this image
-        imgVolumes = sd.getVolsOfImage(allVols, imgUUID).keys()
+        return self._prepareImages(dom, [(spUUID, imgUUID, leafUUID)],
+                                   allowIllegal)[0]
 
-        if leafUUID not in imgVolumes:
-            raise se.VolumeDoesNotExist(leafUUID)
+    @public
+    def prepareImages(self, images, allowIllegal=False):
+        """
+        Prepare many images, typically all the disks of a VM. The volumes of
+        all the images on a storage domain are activated together, using one
+        lvm command for block domains.
 
-        for volUUID in imgVolumes:
-            legality = dom.produceVolume(imgUUID, volUUID).getLegality()
-            if legality == sc.ILLEGAL_VOL:
-                if allowIllegal:
-                    self.log.info("Preparing illegal volume %s", leafUUID)
-                else:
-                    raise se.prepareIllegalVolumeError(volUUID)
+        :param images: The images to prepare.
+        :type images: list of dicts with the keys domainID, poolID, imageID
+                      and volumeID (the leaf volume)
+
+        Return a dict with the key 'images', a list of prepareImage() results
+        in the order of images.
+        """
+        domains = OrderedDict()
+        for i, img in enumerate(images):
+            domains.setdefault(img['domainID'], []).append(
+                (i, img['poolID'], img['imageID'], img['volumeID']))
+
+        results = [None] * len(images)
+        for sdUUID, domImages in domains.items():
+            for spUUID in utils.unique(img[1] for img in domImages):
+                if spUUID != sd.BLANK_UUID:
+                    self.getPool(spUUID)
+
+            vars.task.getSharedLock(STORAGE, sdUUID)
+
+            dom = sdCache.produce(sdUUID)
+            prepared = self._prepareImages(
+                dom, [img[1:] for img in domImages], allowIllegal)
+            for img, res in zip(domImages, prepared):
+                results[img[0]] = res
+
+        return {'images': results}
+
+    def _prepareImages(self, dom, images, allowIllegal):
+        """
+        Prepare images on storage domain dom.
+
+        images: list of (spUUID, imgUUID, leafUUID) tuples.
+
+        Returns a list of prepareImage() results in the order of images.
+        """
+        with utils.stopwatch("Validating %d images on domain %s"
+                             % (len(images), dom.sdUUID)):
+            allVols = dom.getAllVolumes()
+            imgVolumes = {}
+            for spUUID, imgUUID, leafUUID in images:
+                # Filter volumes related to this image
+                volUUIDs = sd.getVolsOfImage(allVols, imgUUID).keys()
 
-        imgPath = dom.activateVolumes(imgUUID, imgVolumes)
+                if leafUUID not in volUUIDs:
+                    raise se.VolumeDoesNotExist(leafUUID)
+
+                for volUUID in volUUIDs:
+                    vol = dom.produceVolume(imgUUID, volUUID)
+                    if vol.getLegality() == sc.ILLEGAL_VOL:
+                        if allowIllegal:
+                            self.log.info("Preparing illegal volume %s",
+                                          leafUUID)
+                        else:
+                            raise se.prepareIllegalVolumeError(volUUID)
+
+                imgVolumes[imgUUID] = volUUIDs
+
+        with utils.stopwatch("Activating %d images on domain %s"
+                             % (len(images), dom.sdUUID)):
+            imgPaths = dom.activateImages(imgVolumes)
+
+        with utils.stopwatch("Linking %d images on domain %s"
+                             % (len(images), dom.sdUUID)):
+            results = []
+            for spUUID, imgUUID, leafUUID in images:
+                results.append(self._preparedImageInfo(
+                    dom, spUUID, imgUUID, leafUUID, imgPaths[imgUUID],
+                    imgVolumes[imgUUID]))
+
+        return results
+
+    def _preparedImageInfo(self, dom, spUUID, imgUUID, leafUUID, imgPath,
+                           imgVolumes):
         if spUUID and spUUID != sd.BLANK_UUID:
             runImgPath = dom.linkBCImage(imgPath, imgUUID)
         else:
@@ -3122,10 +3197,11 @@ class HSM(object):
         leafInfo = dom.produceVolume(imgUUID, leafUUID).getVmVolumeInfo()
 
         leafPath = os.path.join(runImgPath, leafUUID)
+        imgVolumesInfo = []
         for volUUID in imgVolumes:
             path = os.path.join(dom.domaindir, sd.DOMAIN_IMAGES, imgUUID,
                                 volUUID)
-            volInfo = {'domainID': sdUUID, 'imageID': imgUUID,
+            volInfo = {'domainID': dom.sdUUID, 'imageID': imgUUID,
                        'volumeID': volUUID, 'path': path}
 
             lease = dom.getVolumeLease(imgUUID, volUUID)
@@ -3159,6 +3235,29 @@ class HSM(object):
         dom.unlinkBCImage(imgUUID)
         dom.deactivateImage(imgUUID)
 
+    @public
+    def teardownImages(self, images):
+        """
+        Teardown many images, deactivating the volumes of all the images on
+        a storage domain together.
+
+        :param images: The images to teardown.
+        :type images: list of dicts with the keys domainID and imageID
+        """
+        domains = OrderedDict()
+        for img in images:
+            domains.setdefault(img['domainID'], []).append(img['imageID'])
+
+        for sdUUID, imgUUIDs in domains.items():
+            vars.task.getSharedLock(STORAGE, sdUUID)
+
+            dom = sdCache.produce(sdUUID)
+            with utils.stopwatch("Deactivating %d images on domain %s"
+                                 % (len(imgUUIDs), sdUUID)):
+                for imgUUID in imgUUIDs:
+                    dom.unlinkBCImage(imgUUID)
+                dom.deactivateImages(imgUUIDs)
+
     @public
     def getVolumesList(self, sdUUID, spUUID, imgUUID=sc.BLANK_UUID,
                        options=None):
@@ -3276,6 +3375,11 @@ class HSM(object):
                                  exc_info=True)
 
             self.taskMng.prepareForShutdown()
+            try:
+                devicemonitor.stop()
+            except Exception:
+                self.log.warning("Failed to stop device monitor",
+                                 exc_info=True)
             oop.stop()
         except:
             pass
@@ -3458,6 +3562,16 @@ class HSM(object):
 
         return result
 
+    @public
+    def getResourceStats(self):
+        """
+        Return contention statistics of the storage resources (locks): the
+        statistics of every resource in use, keyed by resource full name,
+        and the totals of the resources freed since their namespace was
+        registered, keyed by namespace name.
+        """
+        return dict(resourceStats=rm.getStats())
+
     @deprecated
     @public
     def startMonitoringDomain(self, sdUUID, hostID, options=None):
@@ -32,7 +32,9 @@ from vdsm import virtsparsify
 from vdsm.config import config
 from vdsm.common import logutils
 from vdsm.common.threadlocal import vars
+from vdsm.storage import allocation
 from vdsm.storage import constants as sc
+from vdsm.storage import copyengine
 from vdsm.storage import exception as se
 from vdsm.storage import imageSharing
 from vdsm.storage import misc
@@ -155,24 +157,24 @@ class Image:
 
     def estimateChainSize(self, sdUUID, imgUUID, volUUID, size):
         """
-        Compute an estimate of the whole chain size
-        using the sum of the actual size of the chain's volumes
+        Compute the allocation of a qcow2 volume with the data of the whole
+        chain, using the clusters allocated in the chain's volumes. The
+        volumes must be prepared.
+
+        Returns:
+            Volume allocation in blocks
         """
         chain = self.getChain(sdUUID, imgUUID, volUUID)
         log_str = logutils.volume_chain_to_str(vol.volUUID for vol in chain)
         self.log.info("chain=%s ", log_str)
 
-        newsize = 0
         template = chain[0].getParentVolume()
         if template:
-            newsize = template.getVolumeSize()
-        for vol in chain:
-            newsize += vol.getVolumeSize()
-        if newsize > size:
-            newsize = size
-        # allocate %10 more for cow metadata
-        newsize = int(newsize * sc.COW_OVERHEAD)
-        return newsize
+            chain.insert(0, template)
+        newsize = allocation.copy_size(chain)
+        # Never more than a fully allocated volume.
+        newsize = min(newsize, int(size * sc.BLOCK_SIZE * sc.COW_OVERHEAD))
+        return (newsize + sc.BLOCK_SIZE - 1) // sc.BLOCK_SIZE
 
     def getChain(self, sdUUID, imgUUID, volUUID=None):
         """
@@ -443,49 +445,55 @@ class Image:
             raise
 
         try:
+            copies = []
             for srcVol in chains['srcChain']:
-                # Do the actual copy
-                try:
-                    dstVol = destDom.produceVolume(imgUUID=imgUUID,
-                                                   volUUID=srcVol.volUUID)
-
-                    if workarounds.invalid_vm_conf_disk(srcVol):
-                        srcFormat = dstFormat = qemuimg.FORMAT.RAW
-                    else:
-                        srcFormat = sc.fmt2str(srcVol.getFormat())
-                        dstFormat = sc.fmt2str(dstVol.getFormat())
+                dstVol = destDom.produceVolume(imgUUID=imgUUID,
+                                               volUUID=srcVol.volUUID)
 
-                    parentVol = dstVol.getParentVolume()
+                if workarounds.invalid_vm_conf_disk(srcVol):
+                    srcFormat = dstFormat = qemuimg.FORMAT.RAW
+                else:
+                    srcFormat = sc.fmt2str(srcVol.getFormat())
+                    dstFormat = sc.fmt2str(dstVol.getFormat())
 
-                    if parentVol is not None:
-                        backing = volume.getBackingVolumePath(
-                            imgUUID, parentVol.volUUID)
-                        backingFormat = sc.fmt2str(parentVol.getFormat())
-                    else:
-                        backing = None
-                        backingFormat = None
+                parentVol = dstVol.getParentVolume()
 
-                    operation = qemuimg.convert(
-                        srcVol.getVolumePath(),
-                        dstVol.getVolumePath(),
-                        srcFormat=srcFormat,
-                        dstFormat=dstFormat,
-                        dstQcow2Compat=destDom.qcow2_compat(),
-                        backing=backing,
-                        backingFormat=backingFormat)
-                    with utils.stopwatch("Copy volume %s"
-                                         % srcVol.volUUID):
-                        self._run_qemuimg_operation(operation)
-                except ActionStopped:
-                    raise
-                except se.StorageException:
-                    self.log.error("Unexpected error", exc_info=True)
-                    raise
-                except Exception:
-                    self.log.error("Copy image error: image=%s, src domain=%s,"
-                                   " dst domain=%s", imgUUID, srcSdUUID,
-                                   destDom.sdUUID, exc_info=True)
-                    raise se.CopyImageError()
+                if parentVol is not None:
+                    backing = volume.getBackingVolumePath(
+                        imgUUID, parentVol.volUUID)
+                    backingFormat = sc.fmt2str(parentVol.getFormat())
+                else:
+                    backing = None
+                    backingFormat = None
+
+                operation = qemuimg.convert(
+                    srcVol.getVolumePath(),
+                    dstVol.getVolumePath(),
+                    srcFormat=srcFormat,
+                    dstFormat=dstFormat,
+                    dstQcow2Compat=destDom.qcow2_compat(),
+                    backing=backing,
+                    backingFormat=backingFormat,
+                    **copyengine.convert_options(dstFormat, backing))
+                copies.append(copyengine.Copy(
+                    srcVol.volUUID, srcVol.getVolumeTrueSize(bs=1),
+                    operation))
+
+            # The volumes of the chain are independent once the chains are
+            # prepared, copy them concurrently.
+            engine = copyengine.Engine(destDom.sdUUID, copies)
+            with utils.stopwatch("Copy image %s" % imgUUID):
+                self._run_qemuimg_operation(engine)
+        except ActionStopped:
+            raise
+        except se.StorageException:
+            self.log.error("Unexpected error", exc_info=True)
+            raise
+        except Exception:
+            self.log.error("Copy image error: image=%s, src domain=%s,"
+                           " dst domain=%s", imgUUID, srcSdUUID,
+                           destDom.sdUUID, exc_info=True)
+            raise se.CopyImageError()
         finally:
             # teardown volumes
             self.__cleanupMove(srcLeafVol, dstLeafVol)
@@ -874,9 +882,13 @@ class Image:
                         src_vol_params['volUUID'], src_vol_params['size'])
                 else:
                     # source 'cow' without parent.
-                    # The source volume should already contains the
-                    # qcow metadata.
-                    return src_vol_params['apparentsize']
+                    # The source volume contains the qcow metadata, but it
+                    # may also contain clusters which are not copied.
+                    return min(src_vol_params['apparentsize'],
+                               self.estimateChainSize(
+                                   src_sd_id, src_vol_params['imgUUID'],
+                                   src_vol_params['volUUID'],
+                                   src_vol_params['size']))
             else:
                 # source 'raw'.
                 # Add additional space for qcow2 metadata.
@@ -1157,6 +1169,8 @@ class Image:
         Fix volume metadata to reflect the given actual chain.  This function
         is used to correct the volume chain linkage after a live merge.
         """
+        # The base volume was modified by the merge.
+        allocation.invalidate(sdUUID, imgUUID)
         curChain = self.getChain(sdUUID, imgUUID, volUUID)
         log_str = logutils.volume_chain_to_str(vol.volUUID for vol in curChain)
         self.log.info("Current chain=%s ", log_str)
@@ -26,13 +26,12 @@ facility
 from __future__ import absolute_import
 
 import errno
-import glob
 import logging
 import os
 import re
 
 from collections import namedtuple
-from threading import RLock
+from threading import Lock, RLock
 
 from vdsm import supervdsm
 from vdsm.config import config
@@ -74,6 +73,12 @@ class IscsiTarget(namedtuple("IscsiTarget", "portal, tpgt, iqn")):
 
 DEFAULT_TPGT = 1
 
+ISCSI_SESSIONS_DIR = "/sys/class/iscsi_session"
+
+# Sessions info read by iterateIscsiSessions(), by session id.
+_sessions = {}
+_sessionsLock = Lock()
+
 IscsiSession = namedtuple("IscsiSession", "id, iface, target, credentials")
 
 _iscsiadmTransactionLock = RLock()
@@ -115,6 +120,10 @@ def getSessionInfo(sessionID):
     return supervdsm.getProxy().readSessionInfo(sessionID)
 
 
+def getSessionsInfo(sessionIDs):
+    return supervdsm.getProxy().readSessionsInfo(sessionIDs)
+
+
 def getIscsiSessionPath(sessionId):
     return os.path.join("/sys", "class", "iscsi_session",
                         "session%d" % sessionId)
@@ -194,6 +203,21 @@ def readSessionInfo(sessionID):
     return IscsiSession(sessionID, iface, target, cred)
 
 
+def readSessionsInfo(sessionIDs):
+    """
+    Return a dict mapping session id to IscsiSession, for the sessions of
+    sessionIDs which still exist.
+    """
+    sessions = {}
+    for sessionID in sessionIDs:
+        try:
+            sessions[sessionID] = readSessionInfo(sessionID)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+    return sessions
+
+
 def addIscsiNode(iface, target, credentials=None):
     # There are 2 formats for an iSCSI node record. An old style format where
     # the path is /var/lib/iscsi/nodes/{target}/{portal} and a new style format
@@ -285,15 +309,42 @@ def discoverSendTargets(iface, portal, credentials=None):
 
 
 def iterateIscsiSessions():
-    for sessionDir in glob.iglob("/sys/class/iscsi_session/session*"):
-        sessionID = int(os.path.basename(sessionDir)[len("session"):])
-        try:
-            yield getSessionInfo(sessionID)
-        except OSError as e:
-            if e.errno != errno.ENOENT:
-                raise
+    """
+    Iterate over the iSCSI sessions.
 
-            continue
+    Reading a session needs supervdsm, and is done once per session: the
+    kernel does not reuse session ids, and the info of a session does not
+    change while it exists. Only new sessions are read, in one supervdsm
+    call.
+    """
+    sessionIDs = _sessionIDs()
+    with _sessionsLock:
+        for sessionID in list(_sessions):
+            if sessionID not in sessionIDs:
+                del _sessions[sessionID]
+        missing = [sid for sid in sessionIDs if sid not in _sessions]
+
+    if missing:
+        found = getSessionsInfo(missing)
+        with _sessionsLock:
+            _sessions.update(found)
+
+    with _sessionsLock:
+        sessions = [_sessions[sid] for sid in sessionIDs if sid in _sessions]
+
+    for session in sessions:
+        yield session
+
+
+def _sessionIDs():
+    try:
+        names = os.listdir(ISCSI_SESSIONS_DIR)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return []
+    return sorted(int(name[len("session"):]) for name in names
+                  if name.startswith("session"))
 
 
 class ChapCredentials(object):
@@ -703,6 +703,13 @@ def invalidateCache():
     _lvminfo.invalidateCache()
 
 
+def invalidateMetadata():
+    """
+    Invalidate the cached PVs, VGs and LVs, keeping the devices filter.
+    """
+    _lvminfo.flush()
+
+
 def _fqpvname(pv):
     if pv and not pv.startswith(PV_PREFIX):
         pv = os.path.join(PV_PREFIX, pv)
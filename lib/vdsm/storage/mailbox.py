@@ -232,9 +232,8 @@ class HSM_MailMonitor(object):
     def __init__(self, inbox, outbox, hostID, queue, monitorInterval):
         # Save arguments
         tpSize = config.getint('irs', 'thread_pool_size') / 2
-        waitTimeout = wait_timeout(monitorInterval)
         maxTasks = config.getint('irs', 'max_tasks')
-        self.tp = ThreadPool("mailbox-hsm", tpSize, waitTimeout, maxTasks)
+        self.tp = ThreadPool("mailbox-hsm", tpSize, maxTasks)
         self._stop = False
         self._flush = False
         self._queue = queue
@@ -535,9 +534,8 @@ class SPM_MailMonitor:
         self._stopped = False
         self._poolID = poolID
         tpSize = config.getint('irs', 'thread_pool_size') / 2
-        waitTimeout = wait_timeout(monitorInterval)
         maxTasks = config.getint('irs', 'max_tasks')
-        self.tp = ThreadPool("mailbox-spm", tpSize, waitTimeout, maxTasks)
+        self.tp = ThreadPool("mailbox-spm", tpSize, maxTasks)
         self._inbox = inbox
         if not os.path.exists(self._inbox):
             self.log.error("SPM_MailMonitor create failed - inbox %s does not "
@@ -804,12 +802,3 @@ class SPM_MailMonitor:
             self.tp.joinAll(waitForTasks=False)
             self.log.info("SPM_MailMonitor - Incoming mail monitoring thread "
                           "stopped")
-
-
-def wait_timeout(monitor_interval):
-    """
-    Designed to return 3 seconds wait timeout for monitor interval of 2
-    seconds, keeping the behaivor in runtime the same as it was in the last 8
-    years, while allowing shorter times for testing.
-    """
-    return monitor_interval * 3 / 2
@@ -41,6 +41,7 @@ from vdsm import utils
 from vdsm.common import properties
 from vdsm.config import config
 
+from vdsm.storage import allocation
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 from vdsm.storage import guarded
@@ -176,6 +177,8 @@ class SubchainInfo(properties.Owner):
 def prepare(subchain):
     log.info("Preparing subchain %s for merge", subchain)
     with guarded.context(subchain.locks):
+        # A previous merge may have failed after modifying the base.
+        allocation.invalidate(subchain.sd_id, subchain.img_id)
         with subchain.prepare():
             _update_base_capacity(subchain.base_vol,
                                   subchain.top_vol)
@@ -209,12 +212,12 @@ def _extend_base_allocation(base_vol, top_vol):
     if not (base_vol.is_block() and base_vol.getFormat() == sc.COW_FORMAT):
         return
 
-    base_alloc = base_vol.getVolumeSize(bs=1)
-    top_alloc = top_vol.getVolumeSize(bs=1)
-    vol_chunk_size = (config.getint('irs', 'volume_utilization_chunk_mb') *
-                      constants.MEGAB)
-    potential_alloc = base_alloc + top_alloc + vol_chunk_size
-    # TODO: add chunk_size only if top is leaf.
+    potential_alloc = allocation.merge_size(base_vol, top_vol)
+    if top_vol.isLeaf():
+        # The base will become the leaf, add extra room so we don't have to
+        # extend it immediately when a vm is started.
+        potential_alloc += (config.getint('irs', 'volume_utilization_chunk_mb')
+                            * constants.MEGAB)
     capacity = base_vol.getSize() * sc.BLOCK_SIZE
     max_alloc = utils.round(capacity * sc.COW_OVERHEAD, constants.MEGAB)
     actual_alloc = min(potential_alloc, max_alloc)
@@ -271,6 +274,8 @@ def finalize(subchain):
         if subchain.base_vol.chunked():
             _shrink_base_volume(subchain, optimal_size)
 
+        allocation.invalidate(subchain.sd_id, subchain.img_id)
+
 
 def _finalize_leaf_merge(dom, subchain):
     _update_vdsm_metadata(dom, subchain)
@@ -28,6 +28,7 @@ import errno
 from glob import glob
 import logging
 import re
+import threading
 from collections import namedtuple
 
 from vdsm import commands
@@ -35,6 +36,7 @@ from vdsm import supervdsm
 from vdsm import udevadm
 from vdsm import utils
 from vdsm.common import cmdutils
+from vdsm.common import concurrent
 from vdsm.config import config
 from vdsm.storage import devicemapper
 from vdsm.storage import hba
@@ -59,6 +61,11 @@ _MULTIPATHD = cmdutils.CommandPath("multipathd",
                                    "/usr/sbin/multipathd",  # Fedora, EL7
                                    "/sbin/multipathd")      # Ubuntu
 
+# Serials of the multipath devices reported by pathListIter(), by (dm id,
+# guid).
+_serials = {}
+_serialsLock = threading.Lock()
+
 
 class Error(Exception):
     """ multipath operation failed """
@@ -72,9 +79,12 @@ def rescan():
     Should only be called from hsm._rescanDevices()
     """
 
-    # First rescan iSCSI and FCP connections
-    iscsi.rescan()
-    hba.rescan()
+    # First rescan iSCSI and FCP connections. The scans are independent and
+    # each may take up to irs:scsi_rescan_maximal_timeout seconds.
+    results = concurrent.tmap(lambda scan: scan(), (iscsi.rescan, hba.rescan))
+    for res in results:
+        if not res.succeeded:
+            raise res.value
 
     # Scanning SCSI interconnects starts a storm of udev events. Wait until all
     # events are processed, ensuring detection of new devices and creation or
@@ -194,6 +204,53 @@ def getScsiSerial(physdev):
                 return line.split("=")[1]
     return ""
 
+
+def getScsiSerials(physdevs):
+    """
+    Return a dict mapping the devices of physdevs to their serial. Called
+    from supervdsm, running scsi_id for up to irs:scsi_id_workers devices
+    in parallel.
+    """
+    workers = config.getint("irs", "scsi_id_workers")
+    results = concurrent.tmap(getScsiSerial, physdevs, max_workers=workers)
+    serials = {}
+    for dev, res in zip(physdevs, results):
+        if not res.succeeded:
+            raise res.value
+        serials[dev] = res.value
+    return serials
+
+
+def _getSerials(devs, evict=False):
+    """
+    Return a dict mapping the (dm id, guid) of devs to the device serial.
+
+    The serial of a LUN does not change, so it is read once per device,
+    running scsi_id only for devices not seen before, in one supervdsm call.
+    An empty serial is not cached, scsi_id may have failed temporarily.
+
+    If evict is True, devs must list all the multipath devices, and the
+    serials of devices not in devs are dropped.
+    """
+    with _serialsLock:
+        if evict:
+            for key in list(_serials):
+                if key not in devs:
+                    del _serials[key]
+        missing = [key for key in devs if key not in _serials]
+
+    if missing:
+        found = supervdsm.getProxy().getScsiSerials(
+            [dmId for dmId, _ in missing])
+        with _serialsLock:
+            for dmId, guid in missing:
+                if found.get(dmId):
+                    _serials[(dmId, guid)] = found[dmId]
+
+    with _serialsLock:
+        return {key: _serials.get(key, "") for key in devs}
+
+
 HBTL = namedtuple("HBTL", "host bus target lun")
 
 
@@ -221,28 +278,36 @@ def getHBTL(physdev):
 
 
 def pathListIter(filterGuids=()):
-    filterLen = len(filterGuids) if filterGuids else -1
-    devsFound = 0
-
-    knownSessions = {}
-
-    svdsm = supervdsm.getProxy()
-    pathStatuses = devicemapper.getPathsStatus()
+    """
+    Iterate over the info of the multipath devices, or of the devices of
+    filterGuids.
 
+    The devices, their serials, the paths status and the iSCSI sessions are
+    read once, before reporting the first device.
+    """
+    filterLen = len(filterGuids) if filterGuids else -1
+    devs = []
     for dmId, guid in getMPDevsIter():
-        if devsFound == filterLen:
+        if len(devs) == filterLen:
             break
 
         if filterGuids and guid not in filterGuids:
             continue
 
-        devsFound += 1
+        devs.append((dmId, guid))
+
+    # Only an unfiltered listing tells which devices were removed.
+    serials = _getSerials(devs, evict=not filterGuids)
+    pathStatuses = devicemapper.getPathsStatus()
+    sessions = None
+    knownSessions = {}
 
+    for dmId, guid in devs:
         devInfo = {
             "guid": guid,
             "dm": dmId,
             "capacity": str(getDeviceSize(dmId)),
-            "serial": svdsm.getScsiSerial(dmId),
+            "serial": serials[(dmId, guid)],
             "paths": [],
             "connections": [],
             "devtypes": [],
@@ -314,10 +379,16 @@ def pathListIter(filterGuids=()):
                 pathInfo["type"] = DEV_ISCSI
                 sessionID = iscsi.getiScsiSession(slave)
                 if sessionID not in knownSessions:
+                    if sessions is None:
+                        sessions = {s.id: s
+                                    for s in iscsi.iterateIscsiSessions()}
+                    sess = sessions.get(sessionID)
+                    if sess is None:
+                        # Added after the sessions were read.
+                        sess = iscsi.getSessionInfo(sessionID)
                     # FIXME: This entire part is for BC. It should be moved to
                     # hsm and not preserved for new APIs. New APIs should keep
                     # numeric types and sane field names.
-                    sess = iscsi.getSessionInfo(sessionID)
                     sessionInfo = {
                         "connection": sess.target.portal.hostname,
                         "port": str(sess.target.portal.port),
@@ -60,7 +60,7 @@ def _div_round_up(n, d):
     return (n + d - 1) // d
 
 
-def _estimate_metadata_size(virtual_size):
+def estimate_metadata_size(virtual_size):
     """
     This code is ported from the qemu calculation implemented in block/qcow2.c
     in the method qcow2_create2
@@ -157,7 +157,7 @@ def estimate_size(filename):
 
     # Get used clusters and virtual size of destination volume.
     virtual_size = info['virtualsize']
-    meta_size = _estimate_metadata_size(virtual_size)
+    meta_size = estimate_metadata_size(virtual_size)
     runs = qemuimg.map(filename)
     used_clusters = count_clusters(runs)
 
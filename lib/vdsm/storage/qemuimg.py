@@ -142,11 +142,25 @@ def check(image, format=None):
 
 
 def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
-            dstQcow2Compat=None, backing=None, backingFormat=None):
+            dstQcow2Compat=None, backing=None, backingFormat=None,
+            unorderedWrites=False, coroutines=None):
+    """
+    Convert srcImage to dstImage.
+
+    unorderedWrites allows qemu-img to write out of order (-W), and
+    coroutines sets the number of parallel coroutines (-m). Both require
+    qemu-img 2.9 or later.
+    """
     cmd = [_qemuimg.cmd, "convert", "-p", "-t", "none", "-T", "none"]
     options = []
     cwdPath = None
 
+    if unorderedWrites:
+        cmd.append("-W")
+
+    if coroutines:
+        cmd.extend(("-m", str(coroutines)))
+
     if srcFormat:
         cmd.extend(("-f", srcFormat))
 
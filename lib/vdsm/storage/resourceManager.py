@@ -19,10 +19,12 @@
 #
 from __future__ import absolute_import
 
+import collections
 import threading
 import logging
 import re
 import weakref
+from contextlib import contextmanager
 from functools import partial
 from uuid import uuid4
 
@@ -30,6 +32,7 @@ from six.moves import queue
 
 from vdsm import utils
 from vdsm.common import concurrent
+from vdsm.common import time
 from vdsm.common.logutils import SimpleLogAdapter
 from vdsm.storage import exception as se
 from vdsm.storage import guarded
@@ -60,6 +63,11 @@ class RequestTimedOutError(ResourceManagerError):
 SHARED = "shared"
 EXCLUSIVE = "exclusive"
 
+# Resources of a namespace are spread over this number of shards, each with
+# its own lock, so requests for different resources of the same namespace do
+# not serialize on one lock.
+NAMESPACE_SHARDS = 16
+
 
 class LockState:
     free = "free"
@@ -177,6 +185,7 @@ class Request(object):
         self._isCanceled = False
         self._doneEvent = threading.Event()
         self._callback = callback
+        self.created = time.monotonic_time()
         self.reqID = str(uuid4())
         self._log = SimpleLogAdapter(self._log, {"ResName": self.fullName,
                                                  "ReqID": self.reqID})
@@ -346,9 +355,13 @@ class _ResourceManager(object):
     _namespaceValidator = re.compile(r"^[\w\d_-]+$")
     _resourceNameValidator = re.compile(r"^[^\s.]+$")
 
-    def __init__(self):
-        self._syncRoot = rwlock.RWLock()
+    def __init__(self, shards=NAMESPACE_SHARDS):
+        # Serializes namespaces registration. Requests look up namespaces
+        # without locking, and check that the namespace is still registered
+        # under the namespace shard lock.
+        self._lock = threading.Lock()
         self._namespaces = {}
+        self._shards = shards
 
     def registerNamespace(self, namespace, factory):
         if not self._namespaceValidator.match(namespace):
@@ -358,17 +371,17 @@ class _ResourceManager(object):
             raise NamespaceRegistered("Namespace '%s' already registered"
                                       % namespace)
 
-        with self._syncRoot.exclusive:
+        with self._lock:
             if namespace in self._namespaces:
                 raise NamespaceRegistered("Namespace '%s' already registered"
                                           % namespace)
 
             self._log.debug("Registering namespace '%s'", namespace)
 
-            self._namespaces[namespace] = Namespace(factory)
+            self._namespaces[namespace] = Namespace(factory, self._shards)
 
     def unregisterNamespace(self, namespace):
-        with self._syncRoot.exclusive:
+        with self._lock:
             if namespace not in self._namespaces:
                 raise KeyError("Namespace '%s' doesn't exist" % namespace)
 
@@ -376,41 +389,90 @@ class _ResourceManager(object):
 
     def _unregisterNamespaceLocked(self, namespace):
         """
-        Must be called when holding self._syncRoot.exclusive, and namespace
-        exists in self._namespaces.
+        Must be called when holding self._lock, and namespace exists in
+        self._namespaces.
         """
         self._log.debug("Unregistering namespace '%s'", namespace)
         namespaceObj = self._namespaces[namespace]
-        with namespaceObj.lock:
-            if len(namespaceObj.resources) > 0:
+        with namespaceObj.locked():
+            if namespaceObj.hasResources():
                 raise ResourceManagerError("Cannot unregister Resource "
                                            "Factory '%s'. It has active "
                                            "resources." % (namespace))
 
+            namespaceObj.registered = False
             del self._namespaces[namespace]
 
+    def _getNamespace(self, namespace):
+        try:
+            return self._namespaces[namespace]
+        except KeyError:
+            raise ValueError("Namespace '%s' is not registered with this "
+                             "manager" % namespace)
+
+    @contextmanager
+    def _lockedShard(self, namespace, name):
+        """
+        Lock the shard of resource name in namespace, and return the
+        namespace and the shard.
+        """
+        namespaceObj = self._getNamespace(namespace)
+        shard = namespaceObj.shard(name)
+        with shard.lock:
+            if not namespaceObj.registered:
+                raise ValueError("Namespace '%s' is not registered with this "
+                                 "manager" % namespace)
+            yield namespaceObj, shard
+
     def getResourceStatus(self, namespace, name):
         if not self._resourceNameValidator.match(name):
             raise ValueError("Invalid resource name '%s'" % name)
 
-        with self._syncRoot.shared:
-            try:
-                namespaceObj = self._namespaces[namespace]
-            except KeyError:
-                raise ValueError("Namespace '%s' is not registered with this "
-                                 "manager" % namespace)
-            resources = namespaceObj.resources
-            with namespaceObj.lock:
-                if not namespaceObj.factory.resourceExists(name):
-                    raise KeyError("No such resource '%s.%s'" % (namespace,
-                                                                 name))
+        with self._lockedShard(namespace, name) as (namespaceObj, shard):
+            if not namespaceObj.factory.resourceExists(name):
+                raise KeyError("No such resource '%s.%s'" % (namespace,
+                                                             name))
 
-                if name not in resources:
-                    return LockState.free
+            if name not in shard.resources:
+                return LockState.free
 
-                return LockState.fromType(resources[name].currentLock)
+            return LockState.fromType(shard.resources[name].currentLock)
 
-    def _switchLockType(self, resourceInfo, newLockType):
+    def getStats(self):
+        """
+        Return contention statistics of the resources used since their
+        namespace was registered. Resources in use are keyed by full name,
+        the statistics of freed resources are summed per namespace, keyed by
+        namespace name.
+        """
+        stats = {}
+        for namespace, namespaceObj in list(self._namespaces.items()):
+            freed = _ResourceStats()
+            for shard in namespaceObj.shards:
+                with shard.lock:
+                    freed.merge(shard.freed)
+                    for name, resource in shard.resources.items():
+                        info = resource.stats.info()
+                        info["state"] = LockState.fromType(
+                            resource.currentLock)
+                        info["queue"] = len(resource.queue)
+                        info["users"] = resource.activeUsers
+                        stats["%s.%s" % (namespace, name)] = info
+            info = freed.info()
+            info["state"] = LockState.free
+            info["queue"] = 0
+            info["users"] = 0
+            stats[namespace] = info
+        return stats
+
+    def _granted(self, shard, resource, request, contended):
+        """
+        Account a granted request. Must be called with the shard lock held.
+        """
+        waitTime = time.monotonic_time() - request.created
+        resource.stats.granted(waitTime, contended)
+
+    def _switchLockType(self, namespaceObj, resourceInfo, newLockType):
         switchLock = (resourceInfo.currentLock != newLockType)
         resourceInfo.currentLock = newLockType
 
@@ -430,8 +492,7 @@ class _ResourceManager(object):
             # If the resource can't switch we just release it and create it
             # again under a different locktype
             self._freeResource(resourceInfo)
-            namespace = self._namespaces[resourceInfo.namespace]
-            resourceInfo.realObj = namespace.factory.createResource(
+            resourceInfo.realObj = namespaceObj.factory.createResource(
                 resourceInfo.name, resourceInfo.currentLock)
 
     def _freeResource(self, resourceInfo):
@@ -493,70 +554,68 @@ class _ResourceManager(object):
         request = Request(namespace, name, lockType, callback)
         self._log.debug("Trying to register resource '%s' for lock type '%s'",
                         fullName, lockType)
-        with utils.RollbackContext() as contextCleanup, self._syncRoot.shared:
+        with utils.RollbackContext() as contextCleanup, \
+                self._lockedShard(namespace, name) as (namespaceObj, shard):
+            resources = shard.resources
             try:
-                namespaceObj = self._namespaces[namespace]
+                resource = resources[name]
             except KeyError:
-                raise ValueError("Namespace '%s' is not registered with this "
-                                 "manager" % namespace)
-
-            resources = namespaceObj.resources
-            with namespaceObj.lock:
-                try:
-                    resource = resources[name]
-                except KeyError:
-                    if not namespaceObj.factory.resourceExists(name):
-                        raise KeyError("No such resource '%s'" % (fullName))
-                else:
-                    if len(resource.queue) == 0 and \
-                            resource.currentLock == SHARED and \
-                            request.lockType == SHARED:
-                        resource.activeUsers += 1
-                        self._log.debug("Resource '%s' found in shared state "
-                                        "and queue is empty, Joining current "
-                                        "shared lock (%d active users)",
-                                        fullName, resource.activeUsers)
-                        request.grant()
-                        contextCleanup.defer(request.emit,
-                                             ResourceRef(namespace, name,
-                                                         resource.realObj,
-                                                         request.reqID))
-                        return RequestRef(request)
-
-                    resource.queue.insert(0, request)
-                    self._log.debug("Resource '%s' is currently locked, "
-                                    "Entering queue (%d in queue)",
-                                    fullName, len(resource.queue))
-                    return RequestRef(request)
-
-                # TODO : Creating the object inside the namespace lock causes
-                #        the entire namespace to lock and might cause
-                #        performance issues. As this is no currently a problem
-                #        I left it as it is to keep the code simple. If there
-                #        is a bottleneck in the resource framework, its
-                #        probably here.
-                try:
-                    obj = namespaceObj.factory.createResource(name, lockType)
-                except:
-                    self._log.warn("Resource factory failed to create resource"
-                                   " '%s'. Canceling request.", fullName,
-                                   exc_info=True)
-                    contextCleanup.defer(request.cancel)
+                if not namespaceObj.factory.resourceExists(name):
+                    raise KeyError("No such resource '%s'" % (fullName))
+            else:
+                if len(resource.queue) == 0 and \
+                        resource.currentLock == SHARED and \
+                        request.lockType == SHARED:
+                    resource.activeUsers += 1
+                    self._log.debug("Resource '%s' found in shared state "
+                                    "and queue is empty, Joining current "
+                                    "shared lock (%d active users)",
+                                    fullName, resource.activeUsers)
+                    request.grant()
+                    self._granted(shard, resource, request, False)
+                    contextCleanup.defer(request.emit,
+                                         ResourceRef(namespace, name,
+                                                     resource.realObj,
+                                                     request.reqID))
                     return RequestRef(request)
 
-                resource = resources[name] = ResourceInfo(obj, namespace, name)
-                resource.currentLock = request.lockType
-                resource.activeUsers += 1
+                resource.queue.appendleft(request)
+                resource.stats.queued(len(resource.queue))
+                self._log.debug("Resource '%s' is currently locked, "
+                                "Entering queue (%d in queue)",
+                                fullName, len(resource.queue))
+                return RequestRef(request)
 
-                self._log.debug("Resource '%s' is free. Now locking as '%s' "
-                                "(1 active user)", fullName, request.lockType)
-                request.grant()
-                contextCleanup.defer(request.emit,
-                                     ResourceRef(namespace, name,
-                                                 resource.realObj,
-                                                 request.reqID))
+            # TODO : Creating the object inside the shard lock causes the
+            #        other resources in the shard to lock and might cause
+            #        performance issues. As this is no currently a problem
+            #        I left it as it is to keep the code simple. If there
+            #        is a bottleneck in the resource framework, its
+            #        probably here.
+            try:
+                obj = namespaceObj.factory.createResource(name, lockType)
+            except:
+                self._log.warn("Resource factory failed to create resource"
+                               " '%s'. Canceling request.", fullName,
+                               exc_info=True)
+                contextCleanup.defer(request.cancel)
                 return RequestRef(request)
 
+            resource = resources[name] = ResourceInfo(obj, namespace, name)
+            resource.currentLock = request.lockType
+            resource.activeUsers += 1
+            resource.heldSince = time.monotonic_time()
+
+            self._log.debug("Resource '%s' is free. Now locking as '%s' "
+                            "(1 active user)", fullName, request.lockType)
+            request.grant()
+            self._granted(shard, resource, request, False)
+            contextCleanup.defer(request.emit,
+                                 ResourceRef(namespace, name,
+                                             resource.realObj,
+                                             request.reqID))
+            return RequestRef(request)
+
     def releaseResource(self, namespace, name):
         # WARN : unlike in resource acquire the user now has the request
         #        object and can CANCEL THE REQUEST at any time. Always use
@@ -565,119 +624,213 @@ class _ResourceManager(object):
         fullName = "%s.%s" % (namespace, name)
 
         self._log.debug("Trying to release resource '%s'", fullName)
-        with utils.RollbackContext() as contextCleanup, self._syncRoot.shared:
+        with utils.RollbackContext() as contextCleanup, \
+                self._lockedShard(namespace, name) as (namespaceObj, shard):
+            resources = shard.resources
             try:
-                namespaceObj = self._namespaces[namespace]
+                resource = resources[name]
             except KeyError:
-                raise ValueError("Namespace '%s' is not registered with this "
-                                 "manager", namespace)
-            resources = namespaceObj.resources
+                raise ValueError("Resource '%s.%s' is not currently "
+                                 "registered" % (namespace, name))
 
-            with namespaceObj.lock:
-                try:
-                    resource = resources[name]
-                except KeyError:
-                    raise ValueError("Resource '%s.%s' is not currently "
-                                     "registered" % (namespace, name))
+            resource.activeUsers -= 1
+            self._log.debug("Released resource '%s' (%d active users)",
+                            fullName, resource.activeUsers)
 
-                resource.activeUsers -= 1
-                self._log.debug("Released resource '%s' (%d active users)",
-                                fullName, resource.activeUsers)
+            # Is some one else is using the resource
+            if resource.activeUsers > 0:
+                return
 
-                # Is some one else is using the resource
-                if resource.activeUsers > 0:
-                    return
-                self._log.debug("Resource '%s' is free, finding out if anyone "
-                                "is waiting for it.", fullName)
-                # Grant a request
-                while True:
-                    # Is there someone waiting for the resource
-                    if len(resource.queue) == 0:
-                        self._freeResource(resources[name])
-                        del resources[name]
-                        self._log.debug("No one is waiting for resource '%s', "
-                                        "Clearing records.", fullName)
-                        return
-
-                    self._log.debug("Resource '%s' has %d requests in queue. "
-                                    "Handling top request.", fullName,
-                                    len(resource.queue))
-                    nextRequest = resource.queue.pop()
-                    # We lock the request to simulate a transaction. We cannot
-                    # grant the request before there is a resource switch. And
-                    # we can't do a resource switch before we can guarantee
-                    # that the request will be granted.
-                    with nextRequest.syncRoot:
-                        if nextRequest.canceled():
-                            self._log.debug("Request '%s' was canceled, "
-                                            "Ignoring it.", nextRequest)
-                            continue
-
-                        try:
-                            self._switchLockType(resource,
-                                                 nextRequest.lockType)
-                        except Exception:
-                            self._log.warn("Resource factory failed to create "
-                                           "resource '%s'. Canceling request.",
-                                           fullName, exc_info=True)
-                            nextRequest.cancel()
-                            continue
-
-                        nextRequest.grant()
-                        contextCleanup.defer(
-                            partial(nextRequest.emit,
-                                    ResourceRef(namespace, name,
-                                                resource.realObj,
-                                                nextRequest.reqID)))
-
-                        resource.activeUsers += 1
-
-                        self._log.debug("Request '%s' was granted",
-                                        nextRequest)
-                        break
-
-                # If the lock is exclusive were done
-                if resource.currentLock == EXCLUSIVE:
+            now = time.monotonic_time()
+            resource.stats.held(now - resource.heldSince)
+
+            self._log.debug("Resource '%s' is free, finding out if anyone "
+                            "is waiting for it.", fullName)
+            # Grant a request
+            while True:
+                # Is there someone waiting for the resource
+                if len(resource.queue) == 0:
+                    self._freeResource(resources[name])
+                    shard.freed.merge(resource.stats)
+                    del resources[name]
+                    self._log.debug("No one is waiting for resource '%s', "
+                                    "Clearing records.", fullName)
                     return
 
-                # Keep granting shared locks
-                self._log.debug("This is a shared lock. Granting all shared "
-                                "requests")
-                while len(resource.queue) > 0:
-
-                    nextRequest = resource.queue[-1]
+                self._log.debug("Resource '%s' has %d requests in queue. "
+                                "Handling top request.", fullName,
+                                len(resource.queue))
+                nextRequest = resource.queue.pop()
+                # We lock the request to simulate a transaction. We cannot
+                # grant the request before there is a resource switch. And
+                # we can't do a resource switch before we can guarantee
+                # that the request will be granted.
+                with nextRequest.syncRoot:
                     if nextRequest.canceled():
-                        resource.queue.pop()
+                        self._log.debug("Request '%s' was canceled, "
+                                        "Ignoring it.", nextRequest)
                         continue
 
-                    if nextRequest.lockType == EXCLUSIVE:
-                        break
-
-                    nextRequest = resource.queue.pop()
                     try:
-                        nextRequest.grant()
-                        contextCleanup.defer(
-                            partial(nextRequest.emit,
-                                    ResourceRef(namespace, name,
-                                                resource.realObj,
-                                                nextRequest.reqID)))
-                    except RequestAlreadyProcessedError:
+                        self._switchLockType(namespaceObj, resource,
+                                             nextRequest.lockType)
+                    except Exception:
+                        self._log.warn("Resource factory failed to create "
+                                       "resource '%s'. Canceling request.",
+                                       fullName, exc_info=True)
+                        nextRequest.cancel()
                         continue
 
+                    nextRequest.grant()
+                    self._granted(shard, resource, nextRequest, True)
+                    contextCleanup.defer(
+                        partial(nextRequest.emit,
+                                ResourceRef(namespace, name,
+                                            resource.realObj,
+                                            nextRequest.reqID)))
+
                     resource.activeUsers += 1
-                    self._log.debug("Request '%s' was granted (%d "
-                                    "active users)", nextRequest,
-                                    resource.activeUsers)
+                    resource.heldSince = time.monotonic_time()
+
+                    self._log.debug("Request '%s' was granted",
+                                    nextRequest)
+                    break
+
+            # If the lock is exclusive were done
+            if resource.currentLock == EXCLUSIVE:
+                return
+
+            # Keep granting shared locks
+            self._log.debug("This is a shared lock. Granting all shared "
+                            "requests")
+            while len(resource.queue) > 0:
+
+                nextRequest = resource.queue[-1]
+                if nextRequest.canceled():
+                    resource.queue.pop()
+                    continue
+
+                if nextRequest.lockType == EXCLUSIVE:
+                    break
+
+                nextRequest = resource.queue.pop()
+                try:
+                    nextRequest.grant()
+                    contextCleanup.defer(
+                        partial(nextRequest.emit,
+                                ResourceRef(namespace, name,
+                                            resource.realObj,
+                                            nextRequest.reqID)))
+                except RequestAlreadyProcessedError:
+                    continue
+
+                self._granted(shard, resource, nextRequest, True)
+                resource.activeUsers += 1
+                self._log.debug("Request '%s' was granted (%d "
+                                "active users)", nextRequest,
+                                resource.activeUsers)
 
 
 class Namespace(object):
     """
     Namespace struct
     """
-    def __init__(self, factory):
-        self.resources = {}
-        self.lock = threading.Lock()  # rwlock.RWLock()
+    def __init__(self, factory, shards=NAMESPACE_SHARDS):
+        self.shards = tuple(_Shard() for i in range(shards))
         self.factory = factory
+        self.registered = True
+
+    def shard(self, name):
+        return self.shards[hash(name) % len(self.shards)]
+
+    def hasResources(self):
+        return any(shard.resources for shard in self.shards)
+
+    @contextmanager
+    def locked(self):
+        """
+        Lock all the shards of the namespace.
+        """
+        acquired = []
+        try:
+            for shard in self.shards:
+                shard.lock.acquire()
+                acquired.append(shard.lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+class _Shard(object):
+    """
+    Resources of a namespace guarded by the same lock.
+    """
+
+    __slots__ = ("lock", "resources", "freed")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.resources = {}
+        # Statistics of the resources freed since the namespace was
+        # registered, so they do not grow with the number of resources used.
+        self.freed = _ResourceStats()
+
+
+class _ResourceStats(object):
+    """
+    Contention statistics of a resource, modified under the shard lock.
+    """
+
+    __slots__ = ("acquired", "contended", "waitTime", "maxWaitTime",
+                 "holds", "holdTime", "maxHoldTime", "maxQueue")
+
+    def __init__(self):
+        self.acquired = 0
+        self.contended = 0
+        self.waitTime = 0.0
+        self.maxWaitTime = 0.0
+        self.holds = 0
+        self.holdTime = 0.0
+        self.maxHoldTime = 0.0
+        self.maxQueue = 0
+
+    def granted(self, waitTime, contended):
+        self.acquired += 1
+        if contended:
+            self.contended += 1
+            self.waitTime += waitTime
+            self.maxWaitTime = max(self.maxWaitTime, waitTime)
+
+    def held(self, holdTime):
+        self.holds += 1
+        self.holdTime += holdTime
+        self.maxHoldTime = max(self.maxHoldTime, holdTime)
+
+    def queued(self, length):
+        self.maxQueue = max(self.maxQueue, length)
+
+    def merge(self, other):
+        self.acquired += other.acquired
+        self.contended += other.contended
+        self.waitTime += other.waitTime
+        self.maxWaitTime = max(self.maxWaitTime, other.maxWaitTime)
+        self.holds += other.holds
+        self.holdTime += other.holdTime
+        self.maxHoldTime = max(self.maxHoldTime, other.maxHoldTime)
+        self.maxQueue = max(self.maxQueue, other.maxQueue)
+
+    def info(self):
+        return {
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "wait_time": self.waitTime,
+            "max_wait_time": self.maxWaitTime,
+            "holds": self.holds,
+            "hold_time": self.holdTime,
+            "max_hold_time": self.maxHoldTime,
+            "max_queue": self.maxQueue,
+        }
 
 
 class ResourceInfo(object):
@@ -685,13 +838,17 @@ class ResourceInfo(object):
     Resource struct
     """
     def __init__(self, realObj, namespace, name):
-        self.queue = []
+        self.queue = collections.deque()
         self.activeUsers = 0
         self.currentLock = None
         self.realObj = realObj
         self.namespace = namespace
         self.name = name
         self.fullName = "%s.%s" % (namespace, name)
+        # Start of the current lock period, ending when the last user
+        # releases the resource.
+        self.heldSince = None
+        self.stats = _ResourceStats()
 
 
 class Owner(object):
@@ -1029,6 +1186,15 @@ def releaseResource(namespace, name):
     _manager.releaseResource(namespace, name)
 
 
+def getStats():
+    """
+    Return contention statistics of the resources in use, keyed by resource
+    full name, and the totals of the freed resources of every namespace,
+    keyed by namespace name.
+    """
+    return _manager.getStats()
+
+
 def getNamespace(*args):
     """
     Format namespace stirng from sequence of names.
@@ -19,7 +19,41 @@
 #
 
 from __future__ import absolute_import
+
+import bisect
+import sys
 import threading
+import time
+import traceback
+
+from six.moves import _thread
+
+# Number of longest waits kept for every lock name.
+LONGEST_WAITS = 5
+
+# Number of frames kept in the stack of the longest waits.
+STACK_DEPTH = 10
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def stats():
+    """
+    Return contention statistics of the instrumented locks, keyed by lock
+    name.
+    """
+    with _stats_lock:
+        items = list(_stats.items())
+    return {name: lock_stats.info() for name, lock_stats in items}
+
+
+def _lock_stats(name):
+    with _stats_lock:
+        lock_stats = _stats.get(name)
+        if lock_stats is None:
+            lock_stats = _stats[name] = LockStats()
+        return lock_stats
 
 
 class RWLock(object):
@@ -73,74 +107,231 @@ class RWLock(object):
     storage code locking same resource from different layers.
 
     Lock promotion or demotion is forbidden and will raise RuntimeError.
+
+    Both acquire_write() and acquire_read() accept a timeout in seconds, and
+    return False if the lock could not be acquired in time.
+
+    A lock created with a name is instrumented: the time waiting for the lock
+    and holding it is recorded in histograms shared by all the locks with the
+    same name, together with the longest waits and the stack of the waiting
+    thread. Use stats() to get the statistics. Unnamed locks are not
+    instrumented and pay nothing for it.
     """
 
-    def __init__(self):
+    def __init__(self, name=None):
         self.shared = Context(self.acquire_read, self.release)
         self.exclusive = Context(self.acquire_write, self.release)
         self._lock = threading.Lock()
         self._waiters = []
+        # Thread ident -> recursion count
         self._holders = {}
         self._writer = None
-
-    def acquire_write(self):
-        me = threading.current_thread()
-        if me is self._writer:
+        if name is None:
+            self._stats = None
+        else:
+            self._stats = _lock_stats(name)
+            # Thread ident -> time the thread acquired the lock.
+            self._acquired = {}
+
+    def acquire_write(self, timeout=None):
+        me = _thread.get_ident()
+        if me == self._writer:
             self._holders[me] += 1
-            return
+            return True
         if me in self._holders:
             raise RuntimeError("Lock promotion is forbidden")
         with self._lock:
             if self._holders or self._waiters:
-                self._wait(True)
+                if not self._wait(True, timeout):
+                    return False
+            elif self._stats:
+                self._acquired_now(me, True, None)
             self._holders[me] = 1
             self._writer = me
+        return True
 
-    def acquire_read(self):
-        me = threading.current_thread()
-        if me is self._writer:
+    def acquire_read(self, timeout=None):
+        me = _thread.get_ident()
+        if me == self._writer:
             raise RuntimeError("Lock demotion is forbidden")
         if me in self._holders:
             self._holders[me] += 1
-            return
+            return True
         with self._lock:
-            if self._writer or self._waiters:
-                self._wait(False)
+            # The fast path: no writer and nobody waiting.
+            if self._writer is not None or self._waiters:
+                if not self._wait(False, timeout):
+                    return False
+            elif self._stats:
+                self._acquired_now(me, False, None)
             self._holders[me] = 1
             if self._waiters:
                 self._grant_next_waiter()
+        return True
 
     def release(self):
-        me = threading.current_thread()
+        me = _thread.get_ident()
         if me not in self._holders:
             raise RuntimeError("Thread %s attempted to release a lock it "
-                               "does not hold" % me)
+                               "does not hold" % threading.current_thread())
         self._holders[me] -= 1
         if self._holders[me] > 0:
             return
         with self._lock:
             self._writer = None
             del self._holders[me]
+            if self._stats:
+                self._released_now(me)
             if self._waiters:
                 self._grant_next_waiter()
 
-    def _wait(self, wants_write):
+    def _wait(self, wants_write, timeout):
+        """
+        Must be called with self._lock held. Returns True if the lock was
+        granted, False on timeout.
+        """
         waiter = Waiter(wants_write)
         self._waiters.append(waiter)
+        start = time.time() if self._stats else None
         try:
             self._lock.release()
             try:
-                waiter.wait()
+                granted = waiter.wait(timeout)
             finally:
                 self._lock.acquire()
+            if not granted:
+                # We may have been granted after the timeout expired.
+                granted = waiter.granted
+            if not granted and self._waiters[0] is waiter and \
+                    len(self._waiters) > 1 and self._writer is None:
+                # We are going away, let the next waiter try.
+                self._waiters.remove(waiter)
+                self._grant_next_waiter()
         finally:
-            self._waiters.remove(waiter)
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        if self._stats:
+            me = _thread.get_ident()
+            if granted:
+                self._acquired_now(me, wants_write, start)
+            else:
+                self._stats.timed_out()
+        return granted
 
     def _grant_next_waiter(self):
         if self._holders and self._waiters[0].wants_write:
             return
         self._waiters[0].grant()
 
+    def _acquired_now(self, me, wants_write, start):
+        now = time.time()
+        self._acquired[me] = now
+        if start is None:
+            self._stats.acquired(wants_write, 0.0)
+        else:
+            self._stats.acquired(wants_write, max(0.0, now - start))
+
+    def _released_now(self, me):
+        acquired = self._acquired.pop(me)
+        self._stats.released(max(0.0, time.time() - acquired))
+
+
+class LockStats(object):
+    """
+    Contention statistics of all the locks with the same name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._writes = 0
+        self._contended = 0
+        self._timeouts = 0
+        self._wait = Histogram()
+        self._hold = Histogram()
+        # Sorted list of (seconds, mode, thread name, stack) tuples, longest
+        # first.
+        self._longest = []
+
+    def acquired(self, wants_write, wait):
+        longest = None
+        if wait > 0 and (len(self._longest) < LONGEST_WAITS or
+                         wait > self._longest[-1][0]):
+            # Done only for the longest waits, so it does not slow down the
+            # common case.
+            longest = (wait,
+                       "write" if wants_write else "read",
+                       threading.current_thread().name,
+                       _caller_stack())
+        with self._lock:
+            if wants_write:
+                self._writes += 1
+            else:
+                self._reads += 1
+            if wait > 0:
+                self._contended += 1
+            self._wait.add(wait)
+            if longest:
+                self._longest.append(longest)
+                self._longest.sort(key=lambda w: w[0], reverse=True)
+                del self._longest[LONGEST_WAITS:]
+
+    def released(self, hold):
+        with self._lock:
+            self._hold.add(hold)
+
+    def timed_out(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def info(self):
+        with self._lock:
+            return {
+                "reads": self._reads,
+                "writes": self._writes,
+                "contended": self._contended,
+                "timeouts": self._timeouts,
+                "wait": self._wait.counts(),
+                "hold": self._hold.counts(),
+                "longest_waits": [
+                    {"wait": wait, "mode": mode, "thread": thread,
+                     "stack": stack}
+                    for wait, mode, thread, stack in self._longest],
+            }
+
+
+def _caller_stack():
+    """
+    Return the formatted stack of the thread acquiring the lock, without the
+    frames of this module.
+    """
+    here = sys._getframe().f_code.co_filename
+    frames = traceback.extract_stack(limit=STACK_DEPTH + 8)
+    while frames and frames[-1][0] == here:
+        frames.pop()
+    return "".join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+class Histogram(object):
+    """
+    Histogram of lock wait or hold times. Not thread safe.
+    """
+
+    # Upper bounds of the buckets, in seconds.
+    BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0, float('inf'))
+
+    def __init__(self):
+        self._counts = [0] * len(self.BOUNDS)
+
+    def add(self, seconds):
+        self._counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+
+    def counts(self):
+        """
+        Return a list of (upper bound, count) tuples.
+        """
+        return list(zip(self.BOUNDS, self._counts))
+
 
 class Waiter(object):
 
@@ -148,8 +339,12 @@ class Waiter(object):
         self.wants_write = wants_write
         self._event = threading.Event()
 
-    def wait(self):
-        self._event.wait()
+    @property
+    def granted(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
 
     def grant(self):
         self._event.set()
@@ -27,6 +27,8 @@ from collections import namedtuple
 import codecs
 from contextlib import contextmanager
 
+import six
+
 from vdsm import utils
 from vdsm.common import exception
 from vdsm.common.threadlocal import vars
@@ -325,7 +327,8 @@ class StorageDomainManifest(object):
         self.domaindir = domaindir
         self.replaceMetadata(metadata)
         self._domainLock = self._makeDomainLock()
-        self._external_leases_lock = rwlock.RWLock()
+        self._external_leases_lock = rwlock.RWLock(
+            name="sd.external_leases")
 
     @classmethod
     def special_volumes(cls, version):
@@ -684,6 +687,24 @@ class StorageDomain(object):
     def getAllVolumes(self):
         return self._manifest.getAllVolumes()
 
+    def activateImages(self, images):
+        """
+        Activate the volumes of many images.
+
+        images: dict mapping image uuid to a list of the image volumes uuids.
+
+        Returns a dict mapping image uuid to the image run directory.
+        """
+        return {imgUUID: self.activateVolumes(imgUUID, volUUIDs)
+                for imgUUID, volUUIDs in six.iteritems(images)}
+
+    def deactivateImages(self, imgUUIDs):
+        """
+        Deactivate the volumes of many images.
+        """
+        for imgUUID in imgUUIDs:
+            self.deactivateImage(imgUUID)
+
     def prepareMailbox(self):
         """
         This method has been introduced in order to prepare the mailbox
@@ -28,12 +28,23 @@ import logging
 import threading
 
 from vdsm.config import config
+from vdsm.storage import devicemonitor
 from vdsm.storage import exception as se
 from vdsm.storage import lvm
 from vdsm.storage import misc
 from vdsm.storage import multipath
 
 
+def _devicesChanged(changes):
+    """
+    Return True if devices were added or removed, or a device mapper device
+    changed, e.g. a multipath map was created or resized.
+    """
+    if changes.added or changes.removed:
+        return True
+    return any(name.startswith("dm-") for name in changes.changed)
+
+
 class DomainProxy(object):
     """
     Keeps domain references valid even when underlying domain object changes
@@ -82,7 +93,14 @@ class StorageDomainCache:
         multipath.rescan()
         if resize:
             multipath.resize_devices()
-        lvm.invalidateCache()
+
+        # LVM metadata may be modified by other hosts, but the devices filter
+        # needs to change only if the multipath devices changed.
+        changes = devicemonitor.changes()
+        if changes is None or _devicesChanged(changes):
+            lvm.invalidateCache()
+        else:
+            lvm.invalidateMetadata()
 
         # If a new invalidateStorage request came in after the refresh
         # started then we cannot flag the storages as updated (force a
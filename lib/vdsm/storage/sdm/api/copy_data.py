@@ -25,6 +25,7 @@ import logging
 from vdsm import jobs
 from vdsm.common import properties
 from vdsm.storage import constants as sc
+from vdsm.storage import copyengine
 from vdsm.storage import guarded
 from vdsm.storage import qemuimg
 from vdsm.storage import resourceManager as rm
@@ -52,6 +53,14 @@ class Job(base.Job):
     def progress(self):
         return getattr(self._operation, 'progress', None)
 
+    @property
+    def throughput(self):
+        return getattr(self._operation, 'throughput', None)
+
+    @property
+    def eta(self):
+        return getattr(self._operation, 'eta', None)
+
     def _abort(self):
         if self._operation:
             self._operation.abort()
@@ -72,14 +81,21 @@ class Job(base.Job):
                     dst_format = self._dest.qemu_format
 
                 with self._dest.volume_operation():
-                    self._operation = qemuimg.convert(
+                    backing = self._dest.backing_path
+                    operation = qemuimg.convert(
                         self._source.path,
                         self._dest.path,
                         srcFormat=src_format,
                         dstFormat=dst_format,
                         dstQcow2Compat=self._dest.qcow2_compat,
-                        backing=self._dest.backing_path,
-                        backingFormat=self._dest.backing_qemu_format)
+                        backing=backing,
+                        backingFormat=self._dest.backing_qemu_format,
+                        **copyengine.convert_options(dst_format, backing))
+                    copy = copyengine.Copy(self._source.vol_id,
+                                           self._source.size,
+                                           operation)
+                    self._operation = copyengine.Engine(self._dest.sd_id,
+                                                        [copy])
                     self._operation.run()
 
 
@@ -138,6 +154,13 @@ class CopyDataDivEndpoint(properties.Owner):
             return None
         return volume.getBackingVolumePath(self.img_id, parent_vol.volUUID)
 
+    @property
+    def size(self):
+        """
+        Size of the storage allocated for the volume in bytes.
+        """
+        return self.volume.getVolumeTrueSize(bs=1)
+
     @property
     def qcow2_compat(self):
         dom = sdCache.produce_manifest(self.sd_id)
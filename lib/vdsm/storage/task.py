@@ -57,6 +57,7 @@ from vdsm.common.threadlocal import vars
 from vdsm.storage import exception as se
 from vdsm.storage import outOfProcess as oop
 from vdsm.storage import resourceManager
+from vdsm.storage import taskjournal
 
 import uuid
 from weakref import proxy
@@ -480,6 +481,7 @@ class Task:
         self.persistPolicy = TaskPersistType.none
         self.cleanPolicy = TaskCleanType.auto
         self.store = None
+        self.journal = None
         self.defaultException = None
 
         self.state = State(State.init)
@@ -503,20 +505,19 @@ class Task:
         self.log = SimpleLogAdapter(self.log, {"Task": self.id})
 
     def __del__(self):
-        def finalize(log, owner, taskDir):
+        def finalize(log, owner, taskID, store):
             log.warn("Task was autocleaned")
             owner.releaseAll()
-            if taskDir is not None:
-                getProcPool().fileUtils.cleanupdir(taskDir)
+            if store is not None:
+                _cleanStore(store, taskID)
 
         if not self.state.isDone():
-            taskDir = None
-            if (self.cleanPolicy == TaskCleanType.auto and
-                    self.store is not None):
-                taskDir = os.path.join(self.store, self.id)
+            store = None
+            if self.cleanPolicy == TaskCleanType.auto:
+                store = self.store
             t = concurrent.thread(
                 finalize,
-                args=(self.log, self.resOwner, taskDir),
+                args=(self.log, self.resOwner, self.id, store),
                 name="task/" + self.id[:8])
             t.start()
 
@@ -625,7 +626,16 @@ class Task:
     @classmethod
     def _loadMetaFile(cls, filename, obj, fields):
         try:
-            for line in getProcPool().readLines(filename):
+            lines = getProcPool().readLines(filename)
+        except Exception:
+            cls.log.error("Unexpected error", exc_info=True)
+            raise se.TaskMetaDataLoadError(filename)
+        cls._loadMetaLines(filename, lines, obj, fields)
+
+    @classmethod
+    def _loadMetaLines(cls, filename, lines, obj, fields):
+        try:
+            for line in lines:
                 # process current line
                 line = line.encode('utf8')
                 if line.find(KEY_SEPARATOR) < 0:
@@ -748,7 +758,55 @@ class Task:
             self._loadRecoveryMetaFile(taskDir, rn)
             self.recoveries[rn].setOwnerTask(self)
 
+    def _snapshot(self):
+        snapshot = {
+            "task": self._dump(self, Task.fields),
+            "jobs": [self._dump(j, Job.fields) for j in self.jobs],
+            "recoveries": [self._dump(r, Recovery.fields)
+                           for r in self.recoveries],
+        }
+        if self.state == State.finished:
+            snapshot["result"] = self._dump(self.result, TaskResult.fields)
+        return snapshot
+
+    def _loadSnapshot(self, snapshot):
+        self.log.debug("%s: load from journal", self)
+        if self.state != State.init:
+            raise se.TaskMetaDataLoadError("task %s - can't load self: "
+                                           "not in init state" % self)
+        oldid = self.id
+        self._loadMetaLines(self.id, snapshot["task"], self, Task.fields)
+        if self.id != oldid:
+            raise se.TaskMetaDataLoadError("task %s: loaded record do not "
+                                           "match id (%s != %s)" %
+                                           (self, self.id, oldid))
+        if self.state == State.finished:
+            self._loadMetaLines(self.id, snapshot["result"], self.result,
+                                TaskResult.fields)
+        for lines in snapshot["jobs"]:
+            job = Job("load", None)
+            self._loadMetaLines(self.id, lines, job, Job.fields)
+            job.setOwnerTask(self)
+            self.jobs.append(job)
+        for lines in snapshot["recoveries"]:
+            recovery = Recovery("load", "load", "load", "load", "")
+            self._loadMetaLines(self.id, lines, recovery, Recovery.fields)
+            recovery.setOwnerTask(self)
+            self.recoveries.append(recovery)
+
+    def _saveJournal(self):
+        self.njobs = len(self.jobs)
+        self.nrecoveries = len(self.recoveries)
+        try:
+            self.journal.save(self.id, self._snapshot())
+        except Exception as e:
+            self.log.error("Unexpected error", exc_info=True)
+            raise se.TaskPersistError("%s persist failed: %s" % (self, e))
+
     def _save(self, storPath):
+        if self.journal is not None:
+            self._saveJournal()
+            return
         origTaskDir = os.path.join(storPath, self.id)
         if not getProcPool().os.path.exists(origTaskDir):
             raise se.TaskDirError("_save: no such task dir '%s'" % origTaskDir)
@@ -782,8 +840,7 @@ class Task:
         getProcPool().fileUtils.fsyncPath(origTaskDir)
 
     def _clean(self, storPath):
-        taskDir = os.path.join(storPath, self.id)
-        getProcPool().fileUtils.cleanupdir(taskDir)
+        _cleanStore(storPath, self.id)
 
     def _recoverDone(self):
         # protect agains races with stop/abort
@@ -1106,13 +1163,17 @@ class Task:
         self.setCleanPolicy(cleanPolicy)
         if self.persistPolicy != TaskPersistType.none and not self.store:
             raise se.TaskPersistError("no store defined")
-        taskDir = os.path.join(self.store, self.id)
-        try:
-            getProcPool().fileUtils.createdir(taskDir)
-        except Exception as e:
-            self.log.error("Unexpected error", exc_info=True)
-            raise se.TaskPersistError("%s: cannot access/create taskdir"
-                                      " %s: %s" % (self, taskDir, e))
+        if config.getboolean('irs', 'task_journal'):
+            self.journal = taskjournal.get(self.store)
+        else:
+            self.journal = None
+            taskDir = os.path.join(self.store, self.id)
+            try:
+                getProcPool().fileUtils.createdir(taskDir)
+            except Exception as e:
+                self.log.error("Unexpected error", exc_info=True)
+                raise se.TaskPersistError("%s: cannot access/create taskdir"
+                                          " %s: %s" % (self, taskDir, e))
         if (self.persistPolicy == TaskPersistType.auto and
                 self.state != State.init):
             self.persist()
@@ -1158,6 +1219,12 @@ class Task:
         t._load(store, ext)
         return t
 
+    @classmethod
+    def loadJournaledTask(cls, taskid, snapshot):
+        t = Task(taskid)
+        t._loadSnapshot(snapshot)
+        return t
+
     @threadlocal_task
     def prepare(self, func, *args, **kwargs):
         message = self.error
@@ -1377,3 +1444,17 @@ class Task:
                               resName,
                               resourceManager.SHARED,
                               timeout)
+
+
+def _cleanStore(store, taskID):
+    """
+    Remove a task from the store, both from the journal and the task
+    directory written by older versions or when the journal is disabled.
+
+    Tasks are loaded from an existing journal even when it is disabled, so
+    the task is removed from the journal whatever irs:task_journal is.
+    """
+    journal = taskjournal.get(store)
+    if journal.exists():
+        journal.remove(taskID)
+    getProcPool().fileUtils.cleanupdir(os.path.join(store, taskID))
@@ -25,6 +25,7 @@ import threading
 
 from vdsm.config import config
 from vdsm.storage import exception as se
+from vdsm.storage import taskjournal
 from vdsm.storage.task import Task, Job, TaskCleanType
 from vdsm.storage.threadPool import ThreadPool
 
@@ -34,10 +35,9 @@ class TaskManager:
 
     def __init__(self,
                  tpSize=config.getint('irs', 'thread_pool_size'),
-                 waitTimeout=3,
                  maxTasks=config.getint('irs', 'max_tasks')):
         self.storage_repository = config.get('irs', 'repository')
-        self.tp = ThreadPool("tasks", tpSize, waitTimeout, maxTasks)
+        self.tp = ThreadPool("tasks", tpSize, maxTasks)
         self._tasks = {}
         self._unqueuedTasks = []
         self._insertTaskLock = threading.Lock()
@@ -207,22 +207,59 @@ class TaskManager:
         if not os.path.exists(store):
             self.log.debug("task dump path %s does not exist.", store)
             return
-        # taskID is the root part of each (root.ext) entry in the dump task dir
-        tasksIDs = set(os.path.splitext(tid)[0] for tid in os.listdir(store))
-        for taskID in tasksIDs:
-            self.log.debug("Loading dumped task %s", taskID)
+        tasks = {}
+        journal = taskjournal.get(store)
+        useJournal = config.getboolean('irs', 'task_journal')
+        # Tasks persisted by the enabled method replace stale copies
+        # persisted by the other one before the configuration was changed.
+        if useJournal:
+            self._loadTaskDirs(store, tasks)
+            self._loadJournal(journal, tasks)
+        else:
+            self._loadJournal(journal, tasks)
+            self._loadTaskDirs(store, tasks)
+        for taskID, t in tasks.items():
             try:
-                t = Task.loadTask(store, taskID)
                 t.setPersistence(store,
                                  str(t.persistPolicy),
                                  str(t.cleanPolicy))
                 self._unqueuedTasks.append(t)
+            except Exception:
+                self.log.error("taskManager: Skipping task: %s",
+                               taskID,
+                               exc_info=True)
+
+    def _loadTaskDirs(self, store, tasks):
+        # taskID is the root part of each (root.ext) entry in the dump task dir
+        tasksIDs = set(os.path.splitext(tid)[0] for tid in os.listdir(store)
+                       if not taskjournal.is_journal(tid))
+        for taskID in tasksIDs:
+            self.log.debug("Loading dumped task %s", taskID)
+            try:
+                tasks[taskID] = Task.loadTask(store, taskID)
             except Exception:
                 self.log.error("taskManager: Skipping directory: %s",
                                taskID,
                                exc_info=True)
                 continue
 
+    def _loadJournal(self, journal, tasks):
+        try:
+            snapshots = journal.load()
+        except Exception:
+            self.log.error("taskManager: Cannot load journal %s",
+                           journal.path, exc_info=True)
+            return
+        for taskID, snapshot in snapshots.items():
+            taskID = str(taskID)
+            self.log.debug("Loading journaled task %s", taskID)
+            try:
+                tasks[taskID] = Task.loadJournaledTask(taskID, snapshot)
+            except Exception:
+                self.log.error("taskManager: Skipping journaled task: %s",
+                               taskID,
+                               exc_info=True)
+
     def recoverDumpedTasks(self):
         for task in self._unqueuedTasks[:]:
             self.queueRecovery(task)
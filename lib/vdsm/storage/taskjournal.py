@@ -0,0 +1,220 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Journal of persisted tasks.
+
+Instead of rewriting a task directory and syncing it on every task state
+change, the snapshots of all the live tasks of a tasks directory are kept
+in a single journal file, one task per line.
+
+Concurrent writers are committed together: the first writer becomes the
+leader and writes the records of all the writers that arrived meanwhile,
+writing the live records to a temporary file and renaming it over the
+journal, once for the whole batch. Writers return only when their record is
+on storage, like the task directories.
+
+Like the task directories, the journal is accessed through ioprocess, so a
+hung master mount fails the commit after the ioprocess timeout instead of
+blocking the writers. The file is written on each commit, so a journal in
+the master file system follows the master domain when it migrates.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import json
+import logging
+import os
+import threading
+
+from vdsm.storage import outOfProcess as oop
+
+JOURNAL_NAME = "tasks.journal"
+TEMP_EXT = ".tmp"
+
+log = logging.getLogger("storage.TaskJournal")
+
+getProcPool = oop.getGlobalProcPool
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get(store):
+    """
+    Return the journal of the tasks directory store, shared by all the tasks
+    persisted in this directory.
+    """
+    with _journals_lock:
+        journal = _journals.get(store)
+        if journal is None:
+            journal = _journals[store] = Journal(store)
+        return journal
+
+
+def is_journal(name):
+    """
+    Return True if name is a journal file in a tasks directory.
+    """
+    return name.startswith(JOURNAL_NAME)
+
+
+class Journal(object):
+
+    def __init__(self, store):
+        self._path = os.path.join(store, JOURNAL_NAME)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # Latest record of every live task, in journal format.
+        self._records = None
+        self._batch = _Batch()
+        self._committing = False
+        self._commits = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    def exists(self):
+        return getProcPool().os.path.exists(self._path)
+
+    def load(self):
+        """
+        Read the journal from storage, and return a dict of task snapshots
+        keyed by task id.
+        """
+        with self._lock:
+            self._wait_for_commit()
+            self._read()
+            return {task_id: json.loads(line)["task"]
+                    for task_id, line in self._records.items()}
+
+    def save(self, task_id, snapshot):
+        """
+        Persist task snapshot, replacing the previous snapshot of the task.
+        """
+        line = json.dumps({"id": task_id, "task": snapshot})
+        self._commit(task_id, line)
+
+    def remove(self, task_id):
+        """
+        Remove the task from the journal. Does nothing if the task is not in
+        the journal.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if task_id not in self._records:
+                return
+        self._commit(task_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "commits": self._commits,
+                "tasks": len(self._records or ()),
+            }
+
+    # Private
+
+    def _commit(self, task_id, line):
+        with self._lock:
+            self._ensure_loaded()
+            if line is None:
+                self._records.pop(task_id, None)
+            else:
+                self._records[task_id] = line
+            batch = self._batch
+
+            while self._committing and not batch.done:
+                self._cond.wait()
+
+            if batch.done:
+                if batch.error:
+                    raise batch.error
+                return
+
+            # We are the leader, commit the batch, including the changes of
+            # the writers that arrived while the previous batch was written.
+            self._committing = True
+            self._batch = _Batch()
+            lines = list(self._records.values())
+
+        try:
+            self._write(lines)
+        except Exception as e:
+            # Includes ioprocess timeouts when the master mount is hung.
+            log.error("Error writing journal %s", self._path, exc_info=True)
+            error = e
+        else:
+            error = None
+
+        with self._lock:
+            if not error:
+                self._commits += 1
+            batch.done = True
+            batch.error = error
+            self._committing = False
+            self._cond.notify_all()
+
+        if error:
+            raise error
+
+    def _wait_for_commit(self):
+        while self._committing:
+            self._cond.wait()
+
+    def _ensure_loaded(self):
+        if self._records is None:
+            self._read()
+
+    def _read(self):
+        self._records = {}
+        try:
+            lines = getProcPool().readLines(self._path)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return
+
+        for line in lines:
+            line = line.rstrip("\n")
+            try:
+                record = json.loads(line)
+                task_id = record["id"]
+            except (ValueError, KeyError, TypeError):
+                log.warning("Ignoring invalid record in journal %s: %r",
+                            self._path, line)
+                continue
+            self._records[task_id] = line
+
+    def _write(self, lines):
+        tmp = self._path + TEMP_EXT
+        getProcPool().writeLines(tmp, [line + "\n" for line in lines])
+        getProcPool().os.rename(tmp, self._path)
+        getProcPool().fileUtils.fsyncPath(os.path.dirname(self._path))
+
+
+class _Batch(object):
+
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = False
+        self.error = None
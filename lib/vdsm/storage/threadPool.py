@@ -5,21 +5,31 @@
 # License: PSF License
 # http://wiki.python.org/moin/PythonSoftwareFoundationLicenseV2Easy
 #
+"""
+Thread pool running the storage tasks and the mailbox messages.
+
+The design follows vdsm.executor: workers block on a task queue until a task
+is queued or the pool is stopped, so idle workers cost nothing and stopping
+the pool is immediate. The queue is bounded; when it is full queueTask()
+waits for room up to queueTimeout seconds, pushing back on the producers.
+
+Every worker accounts the tasks it ran and their wall and CPU time. Since a
+worker is the only writer of its counters, no lock is needed; stats() sums
+them.
+"""
 
 from __future__ import absolute_import
-from __future__ import print_function
 
+import collections
 import itertools
 import logging
 import threading
 
-from six.moves import queue
-from time import sleep
-
 from vdsm.common import concurrent
+from vdsm.common import time
 
 
-class ThreadPool:
+class ThreadPool(object):
 
     """Flexible thread pool class.  Creates a pool of threads, then
     accepts tasks that will be dispatched to the next available
@@ -27,152 +37,128 @@ class ThreadPool:
 
     log = logging.getLogger('storage.ThreadPool')
 
-    def __init__(self, name, numThreads, waitTimeout=3, maxTasks=100):
-
-        """Initialize the thread pool with numThreads workers."""
-
-        self.log.debug("Enter - name: %s, numThreads: %s, waitTimeout: %s, "
-                       "maxTasks: %s",
-                       name, numThreads, waitTimeout, maxTasks)
+    def __init__(self, name, numThreads, maxTasks=100, queueTimeout=None):
+        """
+        Initialize the thread pool with numThreads workers.
+
+        Arguments:
+          name          Used as prefix for the worker threads names
+          numThreads    Number of workers
+          maxTasks      Maximum number of tasks waiting in the queue
+          queueTimeout  Seconds queueTask() waits for room in a full
+                        queue; None waits until there is room
+        """
+        self.log.debug("Enter - name: %s, numThreads: %s, maxTasks: %s, "
+                       "queueTimeout: %s",
+                       name, numThreads, maxTasks, queueTimeout)
         self._name = name
         self._count = itertools.count()
-        self.__threads = []
-        self._taskThread = {}
-        self.__resizeLock = threading.Condition(threading.Lock())
-        self.__runningTasksLock = threading.Condition(threading.Lock())
-        self.__tasks = queue.Queue(maxTasks)
-        self.__isJoining = False
-        self.__runningTasks = 0
-        self.__waitTimeout = waitTimeout
+        self._queueTimeout = queueTimeout
+        self._tasks = _TaskQueue(maxTasks)
+        self._threads = []
+        # Accounting of the workers which exited
+        self._retired = _Accounting()
+        self._resizeLock = threading.Lock()
         self.setThreadCount(numThreads)
 
-    def setRunningTask(self, addTask):
-
-        """ Internal method to increase or decrease a counter of current
-        executing tasks."""
-
-        self.__runningTasksLock.acquire()
-        try:
-            if addTask:
-                self.__runningTasks += 1
-            else:
-                self.__runningTasks -= 1
-            self.log.debug("Number of running tasks: %s", self.__runningTasks)
-        finally:
-            self.__runningTasksLock.release()
-
     def getRunningTasks(self):
-        return self.__runningTasks
+        return sum(1 for t in tuple(self._threads) if t.running)
 
     def setThreadCount(self, newNumThreads):
 
-        """ External method to set the current pool size.  Acquires
-        the resizing lock, then calls the internal version to do real
-        work."""
+        """ Set the current pool size, spawning or terminating threads
+        if necessary. Terminated threads exit after completing their
+        current task."""
 
         # Can't change the thread count if we're shutting down the pool!
-        if self.__isJoining:
+        if self._tasks.closed:
             return False
 
-        self.__resizeLock.acquire()
-        try:
-            self.__setThreadCountNolock(newNumThreads)
-        finally:
-            self.__resizeLock.release()
+        with self._resizeLock:
+            self._setThreadCount(newNumThreads)
         return True
 
-    def __setThreadCountNolock(self, newNumThreads):
-
-        """Set the current pool size, spawning or terminating threads
-        if necessary.  Internal use only; assumes the resizing lock is
-        held."""
-
-        # If we need to grow the pool, do so
-        while newNumThreads > len(self.__threads):
+    def _setThreadCount(self, newNumThreads):
+        while newNumThreads > len(self._threads):
             name = "%s/%d" % (self._name, next(self._count))
             newThread = WorkerThread(self, name)
-            self.__threads.append(newThread)
+            self._threads.append(newThread)
             newThread.start()
-        # If we need to shrink the pool, do so
-        while newNumThreads < len(self.__threads):
-            self.__threads[0].goAway()
-            del self.__threads[0]
+        if newNumThreads < len(self._threads):
+            while newNumThreads < len(self._threads):
+                self._threads.pop(0).goAway()
+            # Wake up the idle workers told to go away.
+            self._tasks.wakeup()
 
     def getThreadCount(self):
 
         """Return the number of threads in the pool."""
 
-        self.__resizeLock.acquire()
-        try:
-            return len(self.__threads)
-        finally:
-            self.__resizeLock.release()
+        with self._resizeLock:
+            return len(self._threads)
 
     def queueTask(self, id, task, args=None, taskCallback=None):
 
         """Insert a task into the queue.  task must be callable;
-        args and taskCallback can be None."""
+        args and taskCallback can be None.
+
+        Returns False if the pool is stopped, or if the queue is still full
+        after waiting queueTimeout seconds."""
 
-        if self.__isJoining:
-            return False
         if not callable(task):
             return False
 
-        self.__tasks.put((id, task, args, taskCallback))
+        if not self._tasks.put((id, task, args, taskCallback),
+                               self._queueTimeout):
+            if not self._tasks.closed:
+                self.log.warning("Task queue full, rejecting task %s", id)
+            return False
 
         return True
 
-    def getNextTask(self):
-
-        """ Retrieve the next task from the task queue.  For use
-        only by WorkerThread objects contained in the pool."""
-        id = None
-        cmd = None
-        args = None
-        callback = None
-
-        try:
-            id, cmd, args, callback = self.__tasks.get(True,
-                                                       self.__waitTimeout)
-        except queue.Empty:
-            pass
+    def stats(self):
+        """
+        Return a dict with the number of threads, queued and running tasks,
+        and the number of tasks completed and failed with their total wall
+        and CPU time in seconds.
+        """
+        threads = tuple(self._threads)
+        total = _Accounting()
+        total.add(self._retired)
+        for t in threads:
+            total.add(t.accounting)
+        return {
+            'threads': len(threads),
+            'queued': len(self._tasks),
+            'running': sum(1 for t in threads if t.running),
+            'completed': total.completed,
+            'failed': total.failed,
+            'wall_time': total.wall_time,
+            'cpu_time': total.cpu_time,
+        }
 
-        return id, cmd, args, callback
+    def joinAll(self, waitForTasks=True, waitForThreads=True):
 
-    def stopThread(self):
-        return self.__tasks.put((None, None, None, None))
+        """ Stop the pool, terminating all pooled threads, optionally
+        running the queued tasks first and waiting until the threads
+        exit. Running tasks are never interrupted."""
 
-    def joinAll(self, waitForTasks=True, waitForThreads=True):
+        self._tasks.close(clear=not waitForTasks)
 
-        """ Clear the task queue and terminate all pooled threads,
-        optionally allowing the tasks and threads to finish."""
+        with self._resizeLock:
+            threads = self._threads
+            self._threads = []
 
-        # Mark the pool as joining to prevent any more task queuing
-        self.__isJoining = True
+        if waitForThreads:
+            for t in threads:
+                t.join()
 
-        # Wait for tasks to finish
-        if waitForTasks:
-            while not self.__tasks.empty():
-                sleep(0.1)
+    def _nextTask(self, worker):
+        return self._tasks.get(worker)
 
-        # Tell all the threads to quit
-        self.__resizeLock.acquire()
-        try:
-            # Wait until all threads have exited
-            if waitForThreads:
-                for t in self.__threads:
-                    t.goAway()
-                for t in self.__threads:
-                    t.join()
-#                    print t,"joined"
-                    del t
-            self.__setThreadCountNolock(0)
-            self.__isJoining = True
-
-            # Reset the pool for potential reuse
-            self.__isJoining = False
-        finally:
-            self.__resizeLock.release()
+    def _workerExited(self, worker):
+        with self._resizeLock:
+            self._retired.add(worker.accounting)
 
 
 class WorkerThread(object):
@@ -185,8 +171,14 @@ class WorkerThread(object):
 
         """ Initialize the thread and remember the pool. """
         self._thread = concurrent.thread(self.run, name=name)
-        self.__pool = pool
-        self.__isDying = False
+        self._pool = pool
+        self._isDying = False
+        self.running = False
+        self.accounting = _Accounting()
+
+    @property
+    def dying(self):
+        return self._isDying
 
     def start(self):
         self._thread.start()
@@ -195,94 +187,152 @@ class WorkerThread(object):
         self._thread.join()
 
     def _processNextTask(self):
-        id, cmd, args, callback = self.__pool.getNextTask()
+        item = self._pool._nextTask(self)
+        if item is None:
+            return False
+        id, cmd, args, callback = item
+        self.running = True
+        start = time.monotonic_time()
+        start_cpu = time.thread_time()
+        succeeded = False
         try:
-            if id is None:  # should retry.
-                pass
-            elif self.__isDying:
-                # return the task into the queue, since we abort.
-                self.__pool.__tasks.put((id, cmd, args, callback))
-            elif callback is None:
-                self.__pool.setRunningTask(True)
+            if callback is None:
                 self.log.info("START task %s (cmd=%r, args=%r)",
                               id, cmd, args)
                 cmd(args)
-                self.log.info("FINISH task %s", id)
-                self.__pool.setRunningTask(False)
             else:
-                self.__pool.setRunningTask(True)
                 self.log.info("START task %s (callback=%r, cmd=%r, args=%r)",
                               id, callback, cmd, args)
                 callback(cmd(args))
-                self.log.info("FINISH task %s", id)
-                self.__pool.setRunningTask(False)
+            succeeded = True
         except Exception:
             self.log.exception("FINISH task %s failed (callback=%r, "
                                "cmd=%r, args=%r)",
                                id, callback, cmd, args)
+        finally:
+            wall = time.monotonic_time() - start
+            cpu = time.thread_time() - start_cpu
+            self.accounting.record(succeeded, wall, cpu)
+            self.running = False
+        if succeeded:
+            self.log.info("FINISH task %s (wall=%.2f cpu=%.2f)",
+                          id, wall, cpu)
+        return True
 
     def run(self):
 
         """ Until told to quit, retrieve the next task and execute
         it, calling the callback if any.  """
 
-        while not self.__isDying:
-            self._processNextTask()
+        try:
+            while not self._isDying:
+                if not self._processNextTask():
+                    break
+        finally:
+            self._pool._workerExited(self)
 
     def goAway(self):
 
         """ Exit the run loop next time through."""
 
-        self.__isDying = True
-
-
-# Usage example
-if __name__ == "__main__":
-
-    from random import randrange
-
-    # Sample task 1: given a start and end value, shuffle integers,
-    # then sort them
-
-    def sortTask(data):
-        print("SortTask starting for ", data)
-        numbers = list(range(data[0], data[1]))
-        for a in numbers:
-            rnd = randrange(0, len(numbers) - 1)
-            a, numbers[rnd] = numbers[rnd], a
-        print("SortTask sorting for ", data)
-        numbers.sort()
-        print("SortTask done for ", data)
-        return "Sorter ", data
-
-    # Sample task 2: just sleep for a number of seconds.
-
-    def waitTask(data):
-        print("WaitTask starting for ", data)
-        print("WaitTask sleeping for %d seconds" % data)
-        sleep(data)
-        return "Waiter ", data
-
-    # Both tasks use the same callback
-
-    def taskCallback(data):
-        print("Callback called for", data)
-
-    # Create a pool with three worker threads
-
-    pool = ThreadPool("work", 100)
-
-    # Insert tasks into the queue and let them run
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(sortTask, (1000, 100000), taskCallback)
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(waitTask, 5, taskCallback)
-    pool.queueTask(sortTask, (200, 200000), taskCallback)
-    pool.queueTask(waitTask, 2, taskCallback)
-    print("Running tasks: ", pool.getRunningTasks(), "\n")
-    pool.queueTask(sortTask, (3, 30000), taskCallback)
-    pool.queueTask(waitTask, 7, taskCallback)
-
-    # When all tasks are finished, allow the threads to terminate
-    pool.joinAll()
-    print("ThreadPool sample done.\n")
+        self._isDying = True
+
+
+class _Accounting(object):
+    """
+    Counters of the tasks run by a worker, modified only by the worker
+    thread.
+    """
+
+    __slots__ = ('completed', 'failed', 'wall_time', 'cpu_time')
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    def record(self, succeeded, wall_time, cpu_time):
+        if succeeded:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+
+    def add(self, other):
+        self.completed += other.completed
+        self.failed += other.failed
+        self.wall_time += other.wall_time
+        self.cpu_time += other.cpu_time
+
+
+class _TaskQueue(object):
+    """
+    Bounded FIFO queue which can be closed, waking up all waiting threads.
+    """
+
+    def __init__(self, max_tasks):
+        self._max_tasks = max_tasks
+        self._tasks = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.closed = False
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def put(self, item, timeout=None):
+        """
+        Add item to the queue, waiting up to timeout seconds for room if the
+        queue is full. Returns False if the queue is closed or still full.
+        """
+        with self._lock:
+            if len(self._tasks) >= self._max_tasks:
+                deadline = None
+                if timeout is not None:
+                    deadline = time.monotonic_time() + timeout
+                while len(self._tasks) >= self._max_tasks:
+                    if self.closed:
+                        return False
+                    if deadline is None:
+                        self._not_full.wait()
+                    else:
+                        remaining = deadline - time.monotonic_time()
+                        if remaining <= 0:
+                            return False
+                        self._not_full.wait(remaining)
+            if self.closed:
+                return False
+            self._tasks.append(item)
+            self._not_empty.notify()
+            return True
+
+    def get(self, worker):
+        """
+        Get the next item, blocking until there is one. Returns None if the
+        queue was closed and emptied, or if the worker is dying.
+        """
+        with self._lock:
+            while not self._tasks:
+                if self.closed or worker.dying:
+                    return None
+                self._not_empty.wait()
+            if worker.dying:
+                return None
+            item = self._tasks.popleft()
+            self._not_full.notify()
+            return item
+
+    def wakeup(self):
+        with self._lock:
+            self._not_empty.notify_all()
+
+    def close(self, clear=False):
+        with self._lock:
+            self.closed = True
+            if clear:
+                self._tasks.clear()
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
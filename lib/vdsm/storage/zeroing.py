@@ -0,0 +1,278 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+zeroing - zero block devices and files in-process.
+
+The device is zeroed in chunks using the fastest method the device
+supports:
+
+- BLKZEROOUT ioctl, offloading the zeroing to the storage when it supports
+  WRITE SAME, or writing zeros in the kernel
+- fallocate(PUNCH_HOLE), deallocating the range, which reads back as zeros
+- direct I/O writes from a zero buffer shared by all operations
+
+The method is selected on the first chunk; the next chunks use the same
+method.
+
+Between chunks the operation checks if it was aborted, throttles the
+writes to irs:zero_rate_limit shared by all the zero operations, and
+reports progress every irs:progress_interval seconds.
+"""
+
+from __future__ import absolute_import
+
+import ctypes
+import errno
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from vdsm.common import time
+from vdsm.common.exception import ActionStopped
+from vdsm.config import config
+
+log = logging.getLogger("storage.zeroing")
+
+# Size of the range zeroed by one ioctl or fallocate call. Aligned to LVM
+# extent size; small enough to abort quickly.
+CHUNK_SIZE = 128 * 1024**2
+
+# Size of direct I/O writes, and of the zero buffer.
+WRITE_SIZE = 8 * 1024**2
+
+# linux/fs.h: _IO(0x12, 127)
+BLKZEROOUT = 0x127f
+
+# linux/falloc.h
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+
+# Errors meaning the method is not supported by this device.
+_UNSUPPORTED = (errno.ENOTTY, errno.EOPNOTSUPP, errno.EINVAL, errno.ENODEV)
+
+_libc = ctypes.CDLL("libc.so.6", use_errno=True)
+
+_fallocate = _libc.fallocate
+_fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64,
+                       ctypes.c_int64)
+_fallocate.restype = ctypes.c_int
+
+_pwrite = _libc.pwrite
+_pwrite.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t,
+                    ctypes.c_int64)
+_pwrite.restype = ctypes.c_ssize_t
+
+_zero_buffer = None
+_zero_buffer_lock = threading.Lock()
+
+
+class Zero(object):
+    """
+    Operation zeroing size bytes of path.
+    """
+
+    def __init__(self, path, size):
+        self._path = path
+        self._size = size
+        self._done = 0
+        self._aborted = threading.Event()
+        self._method = None
+
+    @property
+    def progress(self):
+        """
+        Returns operation progress as float between 0 and 100.
+
+        This method is threadsafe and may be called from any thread.
+        """
+        if self._size == 0:
+            return 100.0
+        return 100.0 * self._done / self._size
+
+    @property
+    def method(self):
+        """
+        Name of the method used to zero the device, or None if the operation
+        was not started.
+        """
+        return self._method.__name__.lstrip("_") if self._method else None
+
+    def run(self):
+        """
+        Raises:
+            `exception.ActionStopped` if the operation was aborted
+            `OSError` if zeroing failed
+        """
+        self._check_aborted()
+        fd = _open(self._path)
+        try:
+            self._zero(fd)
+        finally:
+            os.close(fd)
+
+    def abort(self):
+        """
+        Abort the operation. The running operation stops after zeroing the
+        current chunk.
+
+        This method is threadsafe and may be called from any thread.
+        """
+        self._aborted.set()
+
+    def _zero(self, fd):
+        interval = config.getint("irs", "progress_interval")
+        start = last_report = time.monotonic_time()
+        while self._done < self._size:
+            length = min(CHUNK_SIZE, self._size - self._done)
+            self._throttle(length)
+            self._check_aborted()
+            if self._method is None:
+                self._method = _select_method(fd, self._done, length)
+            else:
+                self._method(fd, self._done, length)
+            self._done += length
+
+            now = time.monotonic_time()
+            if now - last_report >= interval:
+                last_report = now
+                log.info("Zeroing %s: %d%% done (%.2f MiB/s)",
+                         self._path, self.progress,
+                         self._done / (now - start) / 1024**2)
+
+        if self._method is _write:
+            os.fsync(fd)
+
+    def _throttle(self, length):
+        # The throttle schedules writes with the monotonic clock, which has
+        # a lower resolution than the clock used by Event.wait(), so we may
+        # need to wait more than once.
+        deadline = time.monotonic_time() + _throttle.reserve(length)
+        while True:
+            delay = deadline - time.monotonic_time()
+            if delay <= 0:
+                return
+            if self._aborted.wait(delay):
+                raise ActionStopped()
+
+    def _check_aborted(self):
+        if self._aborted.is_set():
+            raise ActionStopped()
+
+    def __repr__(self):
+        return ("<Zero path=%s size=%d done=%d method=%s at %#x>"
+                % (self._path, self._size, self._done, self.method,
+                   id(self)))
+
+
+def _open(path):
+    try:
+        return os.open(path, os.O_WRONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno != errno.EINVAL:
+            raise
+        # File system does not support direct I/O, the data is synced
+        # before the operation completes.
+        return os.open(path, os.O_WRONLY)
+
+
+def _select_method(fd, offset, length):
+    """
+    Zero the range using the first supported method, and return it.
+    """
+    for method in (_zeroout, _punch_hole):
+        try:
+            method(fd, offset, length)
+        except EnvironmentError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            log.debug("Method %s not supported: %s", method.__name__, e)
+        else:
+            return method
+    _write(fd, offset, length)
+    return _write
+
+
+def _zeroout(fd, offset, length):
+    fcntl.ioctl(fd, BLKZEROOUT, struct.pack("QQ", offset, length))
+
+
+def _punch_hole(fd, offset, length):
+    mode = FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE
+    if _fallocate(fd, mode, offset, length) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+
+def _write(fd, offset, length):
+    buf = _get_zero_buffer()
+    end = offset + length
+    while offset < end:
+        n = _pwrite(fd, buf, min(WRITE_SIZE, end - offset), offset)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err == errno.EINTR:
+                continue
+            raise OSError(err, os.strerror(err))
+        offset += n
+
+
+def _get_zero_buffer():
+    """
+    Return the address of a page aligned zero buffer of WRITE_SIZE bytes,
+    allocated once and shared by all operations.
+    """
+    global _zero_buffer
+    with _zero_buffer_lock:
+        if _zero_buffer is None:
+            buf = mmap.mmap(-1, WRITE_SIZE)
+            _zero_buffer = (buf, ctypes.addressof(
+                ctypes.c_char.from_buffer(buf)))
+        return _zero_buffer[1]
+
+
+class _Throttle(object):
+    """
+    Limit the throughput of all the zero operations to irs:zero_rate_limit
+    MiB per second. Writes are scheduled in the order they are reserved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def reserve(self, length):
+        """
+        Reserve length bytes, returning the number of seconds to wait before
+        writing them.
+        """
+        rate = config.getint("irs", "zero_rate_limit") * 1024**2
+        if rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic_time()
+            start = max(now, self._next)
+            self._next = start + float(length) / rate
+            return start - now
+
+
+_throttle = _Throttle()
@@ -65,11 +65,13 @@ from vdsm.storage.fileUtils import chown, resolveGid, resolveUid
 from vdsm.storage.fileUtils import validateAccess as _validateAccess
 from vdsm.storage.iscsi import getDevIscsiInfo as _getdeviSCSIinfo
 from vdsm.storage.iscsi import readSessionInfo as _readSessionInfo
+from vdsm.storage.iscsi import readSessionsInfo as _readSessionsInfo
 from vdsm.supervdsm import _SuperVdsmManager
 
 from vdsm.network.initializer import init_privileged_network_components
 
 from vdsm.storage.multipath import getScsiSerial as _getScsiSerial
+from vdsm.storage.multipath import getScsiSerials as _getScsiSerials
 from vdsm.storage import multipath
 from vdsm.constants import METADATA_GROUP, \
     VDSM_USER, GLUSTER_MGMT_ENABLED
@@ -130,6 +132,10 @@ class _SuperVdsm(object):
     def getScsiSerial(self, *args, **kwargs):
         return _getScsiSerial(*args, **kwargs)
 
+    @logDecorator
+    def getScsiSerials(self, *args, **kwargs):
+        return _getScsiSerials(*args, **kwargs)
+
     @logDecorator
     def mount(self, fs_spec, fs_file, mntOpts=None, vfstype=None, timeout=None,
               cgroup=None):
@@ -158,6 +164,10 @@ class _SuperVdsm(object):
     def readSessionInfo(self, sessionID):
         return _readSessionInfo(sessionID)
 
+    @logDecorator
+    def readSessionsInfo(self, sessionIDs):
+        return _readSessionsInfo(sessionIDs)
+
     @logDecorator
     def getPathsStatus(self):
         return _getPathsStatus()
@@ -20,8 +20,11 @@
 
 from __future__ import absolute_import
 import logging
+import subprocess
+from collections import namedtuple
 
 from vdsm.common.cmdutils import CommandPath
+from vdsm.common.compat import CPopen
 from . import cmdutils
 from . import commands
 
@@ -99,6 +102,64 @@ def trigger(attr_matches=(), property_matches=(), subsystem_matches=()):
     _run_command(cmd)
 
 
+Event = namedtuple("Event", "action, properties")
+
+
+class Monitor(object):
+    '''
+    Events sent by udev after processing them. Iterating over a started
+    Monitor yields an Event for every device event of subsystems, until the
+    Monitor is stopped.
+
+    properties is a dict of the udev properties of the device, e.g.
+    DEVNAME, DEVTYPE and DM_NAME.
+    '''
+
+    def __init__(self, subsystems=()):
+        self._subsystems = subsystems
+        self._proc = None
+
+    def start(self):
+        cmd = [_UDEVADM.cmd, 'monitor', '--udev', '--property']
+        for name in self._subsystems:
+            cmd.append('--subsystem-match={}'.format(name))
+        logging.debug('Executing command: %s', ' '.join(cmd))
+        self._proc = CPopen(cmd, close_fds=True, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+
+    def stop(self):
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.terminate()
+        self._proc.wait()
+
+    def __iter__(self):
+        lines = iter(self._proc.stdout.readline, b'')
+        for event in _parse_events(line.decode('utf-8') for line in lines):
+            yield event
+        if self._proc.wait() > 0:
+            logging.warning('udevadm monitor failed: %s',
+                            self._proc.stderr.read())
+
+
+def _parse_events(lines):
+    '''
+    Parse udevadm monitor --property output: a header line followed by
+    KEY=VALUE lines for each event, and an empty line after each event.
+    '''
+    properties = {}
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line:
+            if 'ACTION' in properties:
+                yield Event(properties['ACTION'], properties)
+            properties = {}
+        elif '=' in line:
+            key, value = line.split('=', 1)
+            properties[key] = value
+
+
 def _run_command(args):
     cmd = [_UDEVADM.cmd]
     cmd.extend(args)
@@ -94,8 +94,8 @@ def serve_clients(log):
             except:
                 panic("Error initializing IRS")
 
-        scheduler = schedule.Scheduler(name="vdsm.Scheduler",
-                                       clock=time.monotonic_time)
+        scheduler = schedule.WheelScheduler(name="vdsm.Scheduler",
+                                            clock=time.monotonic_time)
         scheduler.start()
 
         from vdsm.clientIF import clientIF  # must import after config is read
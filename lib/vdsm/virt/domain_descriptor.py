@@ -19,9 +19,20 @@
 #
 from __future__ import absolute_import
 
+import re
+import xml.etree.ElementTree as etree
+
 from vdsm.virt import vmxml
 
 
+# libvirt domain XML has exactly one top level <devices> element; namespaced
+# elements in the metadata section (e.g. <ovirt-vm:device>) cannot match.
+_DEVICES_SECTION = re.compile(r'<devices\s*/>|<devices[\s>].*?</devices>',
+                              re.DOTALL)
+
+_UNSET = object()
+
+
 class MutableDomainDescriptor(object):
 
     def __init__(self, xmlStr):
@@ -90,21 +101,75 @@ class MutableDomainDescriptor(object):
 
 
 class DomainDescriptor(MutableDomainDescriptor):
+    """
+    Read only descriptor of a domain XML.
+
+    The XML is parsed lazily. The devices section is parsed on its own the
+    first time it is needed, and the whole document is parsed only when
+    other sections are requested. Parse results are cached for the lifetime
+    of the descriptor, and devices_hash is computed from the devices section
+    text without parsing it.
+    """
 
     def __init__(self, xmlStr):
-        super(DomainDescriptor, self).__init__(xmlStr)
         self._xml = xmlStr
-        self._devices = super(DomainDescriptor, self).devices
-        self._devices_hash = super(DomainDescriptor, self).devices_hash
+        self._root = None
+        self._id = _UNSET
+        self._name = _UNSET
+        self._devices = _UNSET
+        self._devices_xml = _UNSET
+        self._devices_hash = None
+
+    @property
+    def _dom(self):
+        if self._root is None:
+            self._root = vmxml.parse_xml(self._xml)
+        return self._root
 
     @property
     def xml(self):
         return self._xml
 
+    @property
+    def id(self):
+        if self._id is _UNSET:
+            self._id = self._dom.findtext('uuid')
+        return self._id
+
+    @property
+    def name(self):
+        if self._name is _UNSET:
+            self._name = self._dom.findtext('name')
+        return self._name
+
     @property
     def devices(self):
+        if self._devices is _UNSET:
+            self._devices = self._parse_devices()
         return self._devices
 
     @property
     def devices_hash(self):
+        if self._devices_hash is None:
+            devices_xml = self._get_devices_xml()
+            self._devices_hash = hash(devices_xml or '')
         return self._devices_hash
+
+    def _get_devices_xml(self):
+        if self._devices_xml is _UNSET:
+            match = _DEVICES_SECTION.search(self._xml)
+            self._devices_xml = match.group(0) if match else None
+        return self._devices_xml
+
+    def _parse_devices(self):
+        if self._root is None:
+            devices_xml = self._get_devices_xml()
+            if devices_xml is None:
+                return None
+            try:
+                return vmxml.parse_xml(devices_xml)
+            except etree.ParseError:
+                # The section may use namespace prefixes declared on the
+                # domain element; fall back to parsing the whole document.
+                pass
+        return vmxml.find_first(self._dom, 'devices', None)
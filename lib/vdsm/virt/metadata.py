@@ -348,6 +348,10 @@ class Descriptor(object):
         self._values = {}
         self._custom = {}
         self._devices = []
+        # Bumped on every change of the content; used together with the
+        # domain UUID to skip dumping content libvirt already has.
+        self._generation = 0
+        self._synced = None
 
     @classmethod
     def from_xml(
@@ -397,26 +401,39 @@ class Descriptor(object):
             # else `md_xml` not reassigned, so we will parse empty section
             # and that's exactly what we want.
 
-        self._log.debug(
-            'loading metadata for %s: %s', dom.UUIDString(), md_xml)
+        vm_id = dom.UUIDString()
+        self._log.debug('loading metadata for %s: %s', vm_id, md_xml)
         self._load(vmxml.parse_xml(md_xml))
+        with self._lock:
+            self._synced = (vm_id, self._generation)
 
     def dump(self, dom):
         """
         Serializes all the content stored in the descriptor, completely
         overwriting the content of the libvirt domain.
+        Does nothing if the content was not changed since it was last
+        loaded from or dumped to the same domain.
 
         :param dom: domain to access
         :type dom: libvirt.Domain
         """
+        vm_id = dom.UUIDString()
+        with self._lock:
+            current = (vm_id, self._generation)
+        if current == self._synced:
+            self._log.debug('metadata for %s not changed', vm_id)
+            return
         md_xml = self._build_xml()
         dom.setMetadata(libvirt.VIR_DOMAIN_METADATA_ELEMENT,
                         md_xml,
                         self._namespace,
                         self._namespace_uri,
                         0)
-        self._log.debug(
-            'dumped metadata for %s: %s', dom.UUIDString(), md_xml)
+        with self._lock:
+            # The content may have changed while we were dumping; in this
+            # case the next dump() will write it.
+            self._synced = current
+        self._log.debug('dumped metadata for %s: %s', vm_id, md_xml)
 
     def to_xml(self):
         """
@@ -469,10 +486,15 @@ class Descriptor(object):
         dev_data = self._find_device(kwargs)
         if dev_data is None:
             dev_data = self._add_device(kwargs)
+        # device data may be nested, and nested values may be changed in
+        # place; compare with a deep copy to detect any change.
+        orig_data = utils.picklecopy(dev_data)
         data = dev_data.copy()
         yield data
-        dev_data.clear()
-        dev_data.update(data)
+        if data != orig_data:
+            dev_data.clear()
+            dev_data.update(data)
+            self._changed()
 
     @contextmanager
     def values(self):
@@ -486,8 +508,10 @@ class Descriptor(object):
         """
         data = self._values.copy()
         yield data
-        self._values.clear()
-        self._values.update(data)
+        if data != self._values:
+            self._values.clear()
+            self._values.update(data)
+            self._changed()
 
     @property
     def custom(self):
@@ -574,6 +598,11 @@ class Descriptor(object):
             md_data.pop(_CUSTOM, None)
             md_data.pop(_DEVICE, None)
             self._values = md_data
+            self._generation += 1
+
+    def _changed(self):
+        with self._lock:
+            self._generation += 1
 
     def _build_xml(self, namespace=None, namespace_uri=None):
         metadata_obj = Metadata(namespace, namespace_uri)
@@ -101,17 +101,6 @@ def start(cif, scheduler):
 
     if config.getboolean('sampling', 'enable'):
         _operations.extend([
-            # libvirt sampling using bulk stats can block, but unresponsive
-            # domains are handled inside VMBulkstatsMonitor for performance
-            # reasons; thus, does not need dispatching.
-            Operation(
-                sampling.VMBulkstatsMonitor(
-                    libvirtconnection.get(cif),
-                    cif.getVMs,
-                    sampling.stats_cache),
-                config.getint('vars', 'vm_sample_interval'),
-                scheduler),
-
             Operation(
                 sampling.HostMonitor(cif=cif),
                 config.getint('vars', 'host_sample_stats_interval'),
@@ -120,12 +109,44 @@ def start(cif, scheduler):
                 exclusive=True,
                 discard=False),
         ])
+        _operations.extend(_bulk_stats_operations(cif, scheduler))
         host.stats.start()
 
     for op in _operations:
         op.start()
 
 
+def _bulk_stats_operations(cif, scheduler):
+    profiles = [name.strip() for name in
+                config.get('sampling', 'stats_profiles').split(',')
+                if name.strip()]
+    if config.getboolean('metrics', 'enabled'):
+        profiles.append('metrics')
+    schedule = sampling.stats_schedule(
+        profiles,
+        sampling.parse_group_intervals(
+            config.get('sampling', 'stats_group_intervals')),
+        config.getint('vars', 'vm_sample_interval'))
+
+    conn = libvirtconnection.get(cif)
+    operations = []
+    for index, (groups, interval) in enumerate(schedule):
+        # The first operation is the main sampling, see stats_schedule().
+        # libvirt sampling using bulk stats can block, but unresponsive
+        # domains are handled inside VMBulkstatsMonitor for performance
+        # reasons; thus, does not need dispatching.
+        operations.append(Operation(
+            sampling.VMBulkstatsMonitor(
+                conn,
+                cif.getVMs,
+                sampling.stats_cache,
+                stats_flags=sampling.stats_flags(groups),
+                groups=groups if index > 0 else None),
+            interval,
+            scheduler))
+    return operations
+
+
 def stop():
     for op in _operations:
         op.stop()
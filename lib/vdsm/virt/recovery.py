@@ -28,10 +28,13 @@ import time
 
 import libvirt
 
+from vdsm.common import concurrent
 from vdsm.common import fileutils
 from vdsm.common import response
+from vdsm.common.time import monotonic_time
 from vdsm.common.compat import pickle
 from vdsm import constants
+from vdsm.config import config
 from vdsm import containersconnection
 from vdsm import libvirtconnection
 from vdsm import utils
@@ -61,7 +64,15 @@ def _get_vdsm_domains():
     """
     Return a list of Domains created by VDSM.
     """
-    return [dom_obj for dom_obj, dom_xml in _list_domains()
+    return [dom_obj for dom_obj, dom_xml in _get_vdsm_domains_and_xml()]
+
+
+def _get_vdsm_domains_and_xml():
+    """
+    Return a list of (Domain, domain XML) tuples, for the Domains created by
+    VDSM.
+    """
+    return [(dom_obj, dom_xml) for dom_obj, dom_xml in _list_domains()
             if vmxml.has_channel(dom_xml, vmchannels.LEGACY_DEVICE_NAME) or
             vmxml.has_vdsm_metadata(dom_xml)]
 
@@ -174,37 +185,103 @@ class File(object):
         return params
 
 
-def all_domains(cif):
+class Progress(object):
+    """
+    Progress of the recovery, reported by Host.getRecoveryStatus.
+
+    The recovery runs in stages; each stage handles a known number of
+    items (e.g. domains), which may complete in any order.
+    """
+
+    STARTING = 'starting'
+    RUNNING_DOMAINS = 'running_domains'
+    DOMAINS_FROM_FILES = 'domains_from_files'
+    WAITING_FOR_DOMAINS = 'waiting_for_domains'
+    PREPARING_PATHS = 'preparing_paths'
+    DONE = 'done'
+
+    def __init__(self, clock=monotonic_time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._start_time = clock()
+        self._stage = self.STARTING
+        self._total = 0
+        self._done = 0
+        self._failed = 0
+
+    def start_stage(self, stage, total=0):
+        with self._lock:
+            self._stage = stage
+            self._total = total
+            self._done = 0
+            self._failed = 0
+
+    def item_done(self, succeeded=True):
+        """
+        Mark one item of the current stage as done, and return its ordinal
+        number, for logging.
+        """
+        with self._lock:
+            self._done += 1
+            if not succeeded:
+                self._failed += 1
+            return self._done
+
+    def info(self):
+        with self._lock:
+            return {
+                'stage': self._stage,
+                'total': self._total,
+                'done': self._done,
+                'failed': self._failed,
+                'elapsed': self._clock() - self._start_time,
+            }
+
+
+def all_domains(cif, progress=None):
+    if progress is None:
+        progress = Progress()
+
     # Recover stage 1: domains from libvirt, or from containers
-    _all_domains_running(cif)
+    _all_domains_running(cif, progress)
 
     # Recover stage 2: domains from recovery files
     # we do this to safely handle VMs which disappeared
     # from the host while VDSM was down/restarting
-    _all_domains_from_files(cif)
+    _all_domains_from_files(cif, progress)
 
 
-def _all_domains_running(cif):
-    doms = _get_vdsm_domains() + containersconnection.recovery()
+def _all_domains_running(cif, progress):
+    doms = _get_vdsm_domains_and_xml()
+    doms.extend((dom, _get_domain_xml(dom))
+                for dom in containersconnection.recovery())
     num_doms = len(doms)
-    for idx, v in enumerate(doms):
+    progress.start_stage(Progress.RUNNING_DOMAINS, num_doms)
+
+    def recover(dom_and_xml):
+        v, vm_xml = dom_and_xml
         vm_id = v.UUIDString()
-        vm_xml = _get_domain_xml(v)
         vm_state = File(vm_id)
         if vm_state.load(cif, vm_xml):
+            idx = progress.item_done()
             cif.log.info(
                 'recovery [1:%d/%d]: recovered domain %s',
-                idx + 1, num_doms, vm_id)
+                idx, num_doms, vm_id)
         else:
+            idx = progress.item_done(succeeded=False)
             cif.log.info(
                 'recovery [1:%d/%d]: loose domain %s found, killing it.',
-                idx + 1, num_doms, vm_id)
+                idx, num_doms, vm_id)
             try:
                 v.destroy()
             except libvirt.libvirtError:
                 cif.log.exception(
                     'recovery [1:%d/%d]: failed to kill loose domain %s',
-                    idx + 1, num_doms, vm_id)
+                    idx, num_doms, vm_id)
+
+    # Every domain is recovered independently, using its own Vm object.
+    concurrent.tmap(recover, doms,
+                    max_workers=config.getint('vars', 'recovery_workers'))
 
 
 def _get_domain_xml(libvirt_dom):
@@ -214,9 +291,10 @@ def _get_domain_xml(libvirt_dom):
         return None
 
 
-def _all_domains_from_files(cif):
+def _all_domains_from_files(cif, progress):
     rec_vms = _find_vdsm_vms_from_files(cif)
     num_rec_vms = len(rec_vms)
+    progress.start_stage(Progress.DOMAINS_FROM_FILES, num_rec_vms)
     if rec_vms:
         cif.log.warning(
             'recovery: found %i VMs from recovery files not'
@@ -225,10 +303,12 @@ def _all_domains_from_files(cif):
 
     for idx, vm_state in enumerate(rec_vms):
         if vm_state.load(cif):
+            progress.item_done()
             cif.log.info(
                 'recovery [2:%d/%d]: recovered domain %s'
                 ' from data file', idx + 1, num_rec_vms, vm_state.vmid)
         else:
+            progress.item_done(succeeded=False)
             cif.log.warning(
                 'recovery [2:%d/%d]: VM %s failed to recover from data'
                 ' file, reported as Down', idx + 1, num_rec_vms, vm_state.vmid)
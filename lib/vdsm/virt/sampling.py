@@ -24,6 +24,7 @@ import six
 Support for VM and host statistics sampling.
 """
 
+from array import array
 from collections import defaultdict, deque, namedtuple
 import errno
 import logging
@@ -32,6 +33,8 @@ import re
 import threading
 import time
 
+import libvirt
+
 from vdsm import hugepages
 from vdsm import numa
 from vdsm import utils
@@ -57,6 +60,9 @@ class InterfaceSample(object):
 
     The sample is set at the time of initialization and can't be updated.
     """
+    __slots__ = ('rx', 'tx', 'rxDropped', 'txDropped', 'rxErrors',
+                 'txErrors', 'operstate', 'speed', 'duplex')
+
     def readIfaceStat(self, ifid, stat):
         """
         Get and interface's stat.
@@ -112,6 +118,8 @@ class TotalCpuSample(object):
 
     The sample is taken at initialization time and can't be updated.
     """
+    __slots__ = ('user', 'sys', 'idle')
+
     def __init__(self):
         with open('/proc/stat') as f:
             self.user, userNice, self.sys, self.idle = \
@@ -124,27 +132,57 @@ class CpuCoreSample(object):
     A sample of the CPU consumption of each core
 
     The sample is taken at initialization time and can't be updated.
+
+    Counters are kept in flat arrays indexed by core id, so that rates can be
+    computed for all cores at once. Cores missing from /proc/stat (e.g.
+    offline cores) are marked as such in the `online` mask.
     """
+    __slots__ = ('user', 'userNice', 'sys', 'idle', 'online')
+
     CPU_CORE_STATS_PATTERN = re.compile(r'cpu(\d+)\s+(.*)')
 
+    # Number of cores seen in the last sample, used to preallocate the
+    # buffers of the next sample.
+    _size_hint = 0
+
     def __init__(self):
-        self.coresSample = {}
+        size = CpuCoreSample._size_hint
+        self.user = array('d', [0.0]) * size
+        self.userNice = array('d', [0.0]) * size
+        self.sys = array('d', [0.0]) * size
+        self.idle = array('d', [0.0]) * size
+        self.online = bytearray(size)
         with open('/proc/stat') as src:
             for line in src:
                 match = self.CPU_CORE_STATS_PATTERN.match(line)
                 if match:
-                    coreSample = {}
-                    user, userNice, sys, idle = \
-                        map(int, match.group(2).split()[0:4])
-                    coreSample['user'] = user
-                    coreSample['userNice'] = userNice
-                    coreSample['sys'] = sys
-                    coreSample['idle'] = idle
-                    self.coresSample[match.group(1)] = coreSample
+                    core = int(match.group(1))
+                    if core >= len(self.online):
+                        self._grow(core + 1)
+                    fields = match.group(2).split()
+                    self.user[core] = int(fields[0])
+                    self.userNice[core] = int(fields[1])
+                    self.sys[core] = int(fields[2])
+                    self.idle[core] = int(fields[3])
+                    self.online[core] = 1
+        CpuCoreSample._size_hint = len(self.online)
+
+    def _grow(self, size):
+        missing = size - len(self.online)
+        for counters in (self.user, self.userNice, self.sys, self.idle):
+            counters.extend([0.0] * missing)
+        self.online.extend(bytearray(missing))
 
     def getCoreSample(self, coreId):
-        strCoreId = str(coreId)
-        return self.coresSample.get(strCoreId)
+        core = int(coreId)
+        if core >= len(self.online) or not self.online[core]:
+            return None
+        return {
+            'user': self.user[core],
+            'userNice': self.userNice[core],
+            'sys': self.sys[core],
+            'idle': self.idle[core],
+        }
 
 
 class NumaNodeMemorySample(object):
@@ -153,6 +191,8 @@ class NumaNodeMemorySample(object):
 
     The sample is taken at initialization time and can't be updated.
     """
+    __slots__ = ('nodesMemSample',)
+
     def __init__(self):
         self.nodesMemSample = {}
         numaTopology = numa.topology()
@@ -175,6 +215,8 @@ class PidCpuSample(object):
 
     The sample is taken at initialization time and can't be updated.
     """
+    __slots__ = ('user', 'sys')
+
     def __init__(self, pid):
         with open('/proc/%s/stat' % pid) as stat:
             self.user, self.sys = \
@@ -182,6 +224,8 @@ class PidCpuSample(object):
 
 
 class TimedSample(object):
+    __slots__ = ('timestamp',)
+
     def __init__(self):
         self.timestamp = time.time()
 
@@ -206,6 +250,10 @@ class HostSample(TimedSample):
 
     Contains the state of the host at the time of initialization.
     """
+    __slots__ = ('interfaces', 'pidcpu', 'ncpus', 'totcpu', 'memUsed',
+                 'anonHugePages', 'cpuLoad', 'diskStats', 'thpState',
+                 'hugepages', 'cpuCores', 'numaNodeMem')
+
     MONITORED_PATHS = ['/tmp', '/var/log', '/var/log/core', P_VDSM_RUN]
 
     def _getDiskStats(self):
@@ -307,6 +355,11 @@ _StatsSample = namedtuple('StatsSample',
 
 
 class StatsSample(_StatsSample):
+
+    # Per-group intervals overriding `interval', for the stats groups sampled
+    # at their own pace (see StatsCache.put()); None if there are none.
+    intervals = None
+
     def is_empty(self):
         return (
             self.first_value is None and
@@ -350,6 +403,7 @@ class StatsCache(object):
         self._samples = SampleWindow(size=2, timefn=self._clock)
         self._last_sample_time = 0
         self._vm_last_timestamp = defaultdict(int)
+        self._group_samples = {}
 
     def add(self, vmid):
         """
@@ -358,7 +412,10 @@ class StatsCache(object):
         reporting, which may result in a VM wrongly reported as unresponsive.
         """
         with self._lock:
-            self._vm_last_timestamp[vmid] = self._clock()
+            now = self._clock()
+            self._vm_last_timestamp[vmid] = now
+            for group_samples in six.itervalues(self._group_samples):
+                group_samples.vm_last_timestamp[vmid] = now
 
     def remove(self, vmid):
         """
@@ -366,6 +423,8 @@ class StatsCache(object):
         """
         with self._lock:
             del self._vm_last_timestamp[vmid]
+            for group_samples in six.itervalues(self._group_samples):
+                group_samples.vm_last_timestamp.pop(vmid, None)
 
     def get(self, vmid):
         """
@@ -384,6 +443,10 @@ class StatsCache(object):
             if first_sample is None or last_sample is None:
                 return StatsSample(None, None, None, stats_age)
 
+            if self._group_samples:
+                return self._merge_groups(vmid, first_sample, last_sample,
+                                          interval, self._clock())
+
             return StatsSample(first_sample, last_sample,
                                interval, stats_age)
 
@@ -398,6 +461,15 @@ class StatsCache(object):
                 return None
 
             ts = self._clock()
+            if self._group_samples:
+                return {
+                    vm_id: self._merge_groups(
+                        vm_id, first_batch[vm_id], last_batch[vm_id],
+                        interval, ts)
+                    for vm_id in last_batch if (
+                        vm_id in first_batch and
+                        vm_id in self._vm_last_timestamp)
+                }
             return {
                 vm_id: StatsSample(
                     first_batch[vm_id], last_batch[vm_id], interval,
@@ -413,7 +485,7 @@ class StatsCache(object):
         """
         return self._clock()
 
-    def put(self, bulk_stats, monotonic_ts):
+    def put(self, bulk_stats, monotonic_ts, groups=None):
         """
         Add a new bulk sample to the collection.
         `monotonic_ts' is the sample time which must be associated with
@@ -421,7 +493,17 @@ class StatsCache(object):
         Discard silently out of order samples, which are assumed to be
         returned by unblocked stuck calls, to avoid overwrite fresh data
         with stale one.
+
+        `groups' is the frozenset of the stats groups (see STATS_GROUPS)
+        of a sample collected at its own interval. Such samples are kept
+        in their own window, so the rates of their groups are computed over
+        the right interval, and are merged into the samples returned by
+        get() and get_batch(). By default the sample goes to the main window.
         """
+        if groups is not None:
+            self._put_groups(bulk_stats, monotonic_ts, groups)
+            return
+
         with self._lock:
             last_sample_time = self._last_sample_time
             if monotonic_ts >= last_sample_time:
@@ -439,10 +521,169 @@ class StatsCache(object):
         for vmid in bulk_stats:
             self._vm_last_timestamp[vmid] = monotonic_ts
 
+    def _put_groups(self, bulk_stats, monotonic_ts, groups):
+        with self._lock:
+            group_samples = self._group_samples.get(groups)
+            if group_samples is None:
+                # The VMs known so far are as fresh as their main samples.
+                group_samples = _GroupSamples(
+                    SampleWindow(size=2, timefn=self._clock),
+                    dict(self._vm_last_timestamp))
+                self._group_samples[groups] = group_samples
+
+            if monotonic_ts < group_samples.last_sample_time:
+                self._log.warning(
+                    'dropped stale old sample for groups %s: '
+                    'sampled %f stored %f', ','.join(sorted(groups)),
+                    monotonic_ts, group_samples.last_sample_time)
+                return
+
+            group_samples.samples.append(bulk_stats)
+            group_samples.last_sample_time = monotonic_ts
+            vm_last_timestamp = group_samples.vm_last_timestamp
+            for vmid in bulk_stats:
+                if vmid in self._vm_last_timestamp:
+                    vm_last_timestamp[vmid] = monotonic_ts
+
+    def _merge_groups(self, vmid, first_sample, last_sample, interval, now):
+        """
+        Must be called with the lock held.
+
+        The VM is as responsive as its least recently sampled group, like
+        when all the groups are sampled at once.
+        """
+        first_sample = dict(first_sample)
+        last_sample = dict(last_sample)
+        stats_age = now - self._vm_last_timestamp[vmid]
+        intervals = {}
+
+        for groups, group_samples in six.iteritems(self._group_samples):
+            last_ts = group_samples.vm_last_timestamp.get(vmid, now)
+            stats_age = max(stats_age, now - last_ts)
+
+            first_batch, last_batch, group_interval = \
+                group_samples.samples.stats()
+            if first_batch is None:
+                continue
+            first_group = first_batch.get(vmid)
+            last_group = last_batch.get(vmid)
+            if first_group is None or last_group is None:
+                continue
+
+            first_sample.update(first_group)
+            last_sample.update(last_group)
+            for group in groups:
+                intervals[group] = group_interval
+
+        sample = StatsSample(first_sample, last_sample, interval, stats_age)
+        sample.intervals = intervals
+        return sample
+
+
+class _GroupSamples(object):
+
+    __slots__ = ('samples', 'vm_last_timestamp', 'last_sample_time')
+
+    def __init__(self, samples, vm_last_timestamp):
+        self.samples = samples
+        self.vm_last_timestamp = vm_last_timestamp
+        self.last_sample_time = 0
+
 
 stats_cache = StatsCache()
 
 
+# The bulk stats groups used by vmstats.
+STATS_GROUPS = {
+    'state': libvirt.VIR_DOMAIN_STATS_STATE,
+    'cpu': libvirt.VIR_DOMAIN_STATS_CPU_TOTAL,
+    'balloon': libvirt.VIR_DOMAIN_STATS_BALLOON,
+    'vcpu': libvirt.VIR_DOMAIN_STATS_VCPU,
+    'interface': libvirt.VIR_DOMAIN_STATS_INTERFACE,
+    'block': libvirt.VIR_DOMAIN_STATS_BLOCK,
+}
+
+
+# The stats groups needed by the consumers of the VM stats.
+STATS_PROFILES = {
+    # Vm.getStats(), reported to Engine.
+    'engine': frozenset(STATS_GROUPS),
+    # The MOM ballooning and KSM policies.
+    'mom': frozenset(['state', 'cpu', 'balloon']),
+    # vmstats.send_metrics()
+    'metrics': frozenset(['state', 'cpu', 'balloon', 'interface', 'block']),
+}
+
+
+def stats_flags(groups):
+    """
+    Return the libvirt bulk stats flags requesting the given groups.
+    """
+    flags = 0
+    for group in groups:
+        flags |= STATS_GROUPS[group]
+    return flags
+
+
+def stats_schedule(profiles, group_intervals, interval):
+    """
+    Plan the bulk stats sampling for the given consumers.
+
+    `profiles' is a list of STATS_PROFILES names, `group_intervals' maps
+    stats groups to their own sampling interval, and `interval' is the
+    default sampling interval.
+
+    Return a list of (groups, interval) tuples, one for each sampling
+    operation needed, sampling only the groups required by the profiles.
+    The first item is the main sampling, other items sample the groups
+    with their own interval; see StatsCache.put().
+    """
+    groups = set()
+    for name in profiles:
+        try:
+            groups.update(STATS_PROFILES[name])
+        except KeyError:
+            raise ValueError("Unknown stats profile: %r" % name)
+
+    if not groups:
+        # Still track the VM responsiveness.
+        groups.add('state')
+
+    by_interval = defaultdict(set)
+    for group in groups:
+        if group not in STATS_GROUPS:
+            raise ValueError("Unknown stats group: %r" % group)
+        by_interval[group_intervals.get(group, interval)].add(group)
+
+    # The main sampling tracks the VM responsiveness, so it must sample
+    # something even if every group has its own interval.
+    if interval not in by_interval:
+        interval = min(by_interval)
+
+    schedule = [(frozenset(by_interval.pop(interval, ())), interval)]
+    for group_interval, groups in sorted(six.iteritems(by_interval)):
+        schedule.append((frozenset(groups), group_interval))
+    return schedule
+
+
+def parse_group_intervals(value):
+    """
+    Parse the sampling:stats_group_intervals configuration value, e.g.
+    "vcpu:2,block:15", to a dict mapping stats groups to intervals.
+    """
+    intervals = {}
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        group, sep, interval = item.partition(':')
+        group = group.strip()
+        if not sep or group not in STATS_GROUPS:
+            raise ValueError("Invalid stats group interval: %r" % item)
+        intervals[group] = int(interval)
+    return intervals
+
+
 # this value can be tricky to tune.
 # we should avoid as much as we can to trigger
 # false positive fast flows (getAllDomainStats call).
@@ -455,11 +696,17 @@ _TTL = 40.0
 
 class VMBulkstatsMonitor(object):
     def __init__(self, conn, get_vms, stats_cache,
-                 stats_flags=0, ttl=_TTL):
+                 stats_flags=0, ttl=_TTL, groups=None):
+        """
+        `groups' is the frozenset of stats groups sampled at their own
+        interval by this monitor, or None for the main sampling; see
+        StatsCache.put().
+        """
         self._conn = conn
         self._get_vms = get_vms
         self._stats_cache = stats_cache
         self._stats_flags = stats_flags
+        self._groups = groups
         self._skip_doms = ExpiringCache(ttl)
         self._sampling = threading.Semaphore()  # used as glorified counter
         self._log = logging.getLogger("virt.sampling.VMBulkstatsMonitor")
@@ -490,7 +737,8 @@ class VMBulkstatsMonitor(object):
             self._log.exception("vm sampling failed")
             log_status = False
         else:
-            self._stats_cache.put(_translate(bulk_stats), timestamp)
+            self._stats_cache.put(_translate(bulk_stats), timestamp,
+                                  groups=self._groups)
         finally:
             if acquired:
                 self._sampling.release()
@@ -499,7 +747,8 @@ class VMBulkstatsMonitor(object):
                 'sampled timestamp %r elapsed %.3f acquired %r domains %s',
                 timestamp, self._stats_cache.clock() - timestamp, acquired,
                 'all' if fast_path else len(doms))
-        if _METRICS_ENABLED:
+        # The main sampling only, once per round.
+        if _METRICS_ENABLED and self._groups is None:
             self._send_metrics()
 
     def _send_metrics(self):
@@ -516,7 +765,8 @@ class VMBulkstatsMonitor(object):
             vm_data = vmstats.produce(vm_obj,
                                       vm_sample.first_value,
                                       vm_sample.last_value,
-                                      vm_sample.interval)
+                                      vm_sample.interval,
+                                      vm_sample.intervals)
             vm_data["vmName"] = vm_obj.name
             stats[vm_id] = vm_data
         vmstats.send_metrics(stats)
@@ -952,21 +952,23 @@ class Vm(object):
         self._preparePathsForDrives(drives)
 
     def _preparePathsForDrives(self, drives):
-        for drive in drives:
-            with self._volPrepareLock:
-                if self._destroy_requested.is_set():
-                    # A destroy request has been issued, exit early
-                    break
-                drive['path'] = self.cif.prepareVolumePath(drive, self.id)
+        with self._volPrepareLock:
+            if self._destroy_requested.is_set():
+                # A destroy request has been issued, exit early
+                return
+            # Preparing all the drives together activates the volumes of
+            # all the images on a storage domain at once.
+            paths = self.cif.prepareVolumePaths(drives, self.id)
+            for drive, path in zip(drives, paths):
+                drive['path'] = path
                 if isVdsmImage(drive):
                     # This is the only place we support manipulation of a
                     # prepared image, required for the localdisk hook. The hook
                     # may change drive parameters like path and format.
                     modified = hooks.after_disk_prepare(drive, self._custom)
                     drive.update(modified)
-        else:
-            # Now we got all the resources we needed
-            self.enableDriveMonitor()
+        # Now we got all the resources we needed
+        self.enableDriveMonitor()
 
     def _prepareTransientDisks(self, drives):
         for drive in drives:
@@ -1529,11 +1531,10 @@ class Vm(object):
                                      "for drive %s", drive, exc_info=True)
                     # Skip any exception as we don't want to interrupt the
                     # teardown process for any reason.
-                try:
-                    self.cif.teardownVolumePath(drive)
-                except Exception:
-                    self.log.exception("Drive teardown failure for %s",
-                                       drive)
+            try:
+                self.cif.teardownVolumePaths(drives)
+            except Exception:
+                self.log.exception("Drives teardown failure for %s", drives)
 
     def _cleanupGuestAgent(self):
         """
@@ -1688,7 +1689,8 @@ class Vm(object):
             decStats = vmstats.produce(self,
                                        vm_sample.first_value,
                                        vm_sample.last_value,
-                                       vm_sample.interval)
+                                       vm_sample.interval,
+                                       vm_sample.intervals)
             if monitorable:
                 self._setUnresponsiveIfTimeout(stats, vm_sample.stats_age)
         except Exception:
@@ -4719,7 +4721,10 @@ class Vm(object):
 
     def _updateDomainDescriptor(self):
         domainXML = self._dom.XMLDesc(0)
-        self._domain = DomainDescriptor(domainXML)
+        # Keep the current descriptor and its cached parse results if
+        # libvirt reports the same domain XML.
+        if domainXML != self._domain.xml:
+            self._domain = DomainDescriptor(domainXML)
 
     def _updateMetadataDescriptor(self):
         # load will overwrite any existing content, as per doc.
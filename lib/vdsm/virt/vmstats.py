@@ -34,16 +34,24 @@ from vdsm.virt.utils import isVdsmImage
 _log = logging.getLogger('virt.vmstats')
 
 
-def produce(vm, first_sample, last_sample, interval):
+def produce(vm, first_sample, last_sample, interval, intervals=None):
     """
     Translates vm samples into stats.
+
+    `intervals' optionally maps the bulk stats groups sampled at their own
+    pace to their interval, overriding `interval'.
     """
 
     stats = {}
-
-    cpu(stats, first_sample, last_sample, interval)
-    networks(vm, stats, first_sample, last_sample, interval)
-    disks(vm, stats, first_sample, last_sample, interval)
+    if intervals is None:
+        intervals = {}
+
+    cpu(stats, first_sample, last_sample,
+        intervals.get('cpu', interval))
+    networks(vm, stats, first_sample, last_sample,
+             intervals.get('interface', interval))
+    disks(vm, stats, first_sample, last_sample,
+          intervals.get('block', interval))
     balloon(vm, stats, last_sample)
     cpu_count(stats, last_sample)
     tune_io(vm, stats)
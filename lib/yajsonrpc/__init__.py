@@ -35,6 +35,9 @@ _STATE_INCOMING = 1
 _STATE_OUTGOING = 2
 _STATE_ONESHOT = 4
 
+# Methods served while vdsm is recovering running VMs.
+_RECOVERY_METHODS = frozenset(["Host.getRecoveryStatus"])
+
 
 class JsonRpcErrorBase(exception.ContextException):
     """ Base class for JSON RPC errors """
@@ -611,7 +614,7 @@ class JsonRpcServer(object):
 
         # VDSM should never respond to any request before all information about
         # running VMs is recovered, see https://bugzilla.redhat.com/1339291
-        if not self._cif.ready:
+        if not self._cif.ready and req.method not in _RECOVERY_METHODS:
             self.log.info("In recovery, ignoring '%s' in bridge with %s",
                           req.method, req.params)
             return JsonRpcResponse(
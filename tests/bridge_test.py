@@ -53,6 +53,10 @@ class Host():
     def ping(self):
         raise GeneralException("Kaboom!!!")
 
+    def setupNetworks(self, networks, bondings, options):
+        return {'status': {'code': 0, 'message': 'Done'},
+                'timings': {'add_networks': 1.5}}
+
     def getDeviceList(self, storageType=None, guids=(), checkStatus=True):
         if storageType != 3:
             return {'status': {'code': -1, 'message': 'Failed'}}
@@ -186,3 +190,13 @@ class BridgeTests(TestCaseBase):
 
         self.assertEqual(bridge.dispatch('Host.getDeviceList')(**params),
                          [])
+
+    @MonkeyPatch(DynamicBridge, '_get_api_instance', _get_api_instance)
+    def testSetupNetworksTimings(self):
+        bridge = DynamicBridge()
+
+        params = {'networks': {}, 'bondings': {}, 'options': {}}
+
+        self.assertEqual(bridge.dispatch('Host.setupNetworks')(**params),
+                         {'code': 0, 'message': 'Done',
+                          'timings': {'add_networks': 1.5}})
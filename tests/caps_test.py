@@ -24,7 +24,7 @@ import platform
 import tempfile
 import xml.etree.ElementTree as ET
 from testlib import VdsmTestCase as TestCaseBase
-from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatch, MonkeyPatchScope
 
 from vdsm.host import caps
 from vdsm import commands
@@ -174,6 +174,16 @@ class TestCaps(TestCaseBase):
         t = numa.autonuma_status()
         self.assertEqual(t, 0)
 
+    def testAutoNumaBalancingChanged(self):
+        with MonkeyPatchScope([(commands, 'execCmd',
+                                lambda x, raw: (0, ['0'], []))]):
+            self.assertEqual(numa.autonuma_status(),
+                             numa.AUTONUMA_STATUS_DISABLE)
+        with MonkeyPatchScope([(commands, 'execCmd',
+                                lambda x, raw: (0, ['1'], []))]):
+            self.assertEqual(numa.autonuma_status(),
+                             numa.AUTONUMA_STATUS_ENABLE)
+
     def testLiveSnapshotNoElementX86_64(self):
         '''old libvirt, backward compatibility'''
         capsData = self._readCaps("caps_libvirt_amd_6274.out")
@@ -349,3 +359,55 @@ class TestCaps(TestCaseBase):
         self.assertEqual(t.sockets, 1)
         self.assertEqual(t.online_cpus,
                          ['0', '1', '2', '3', '4', '5', '6', '7'])
+
+
+class TestSection(TestCaseBase):
+
+    def setUp(self):
+        self.calls = 0
+        self.source = 'a'
+
+    def collect(self):
+        self.calls += 1
+        return {'key': ['value']}
+
+    def test_collected_once(self):
+        section = caps._Section('test', self.collect)
+        self.assertEqual(section.get(), {'key': ['value']})
+        self.assertEqual(section.get(), {'key': ['value']})
+        self.assertEqual(self.calls, 1)
+
+    def test_collected_when_source_changes(self):
+        section = caps._Section('test', self.collect,
+                                sources=(lambda: self.source,))
+        section.get()
+        section.get()
+        self.source = 'b'
+        section.get()
+        self.assertEqual(self.calls, 2)
+
+    def test_volatile(self):
+        section = caps._Section('test', self.collect, sources=None)
+        section.get()
+        section.get()
+        self.assertEqual(self.calls, 2)
+
+    def test_caller_owns_caps(self):
+        section = caps._Section('test', self.collect)
+        section.get()['key'].append('other')
+        self.assertEqual(section.get(), {'key': ['value']})
+
+    def test_get_merges_sections(self):
+        sections = (caps._Section('a', lambda: {'a': 1}),
+                    caps._Section('b', lambda: {'b': 2}, sources=None))
+        with MonkeyPatchScope([(caps, '_SECTIONS', sections)]):
+            self.assertEqual(caps.get(), {'a': 1, 'b': 2})
+
+    def test_get_fails(self):
+        def fail():
+            raise RuntimeError('collect failed')
+
+        sections = (caps._Section('a', lambda: {'a': 1}),
+                    caps._Section('b', fail))
+        with MonkeyPatchScope([(caps, '_SECTIONS', sections)]):
+            self.assertRaises(RuntimeError, caps.get)
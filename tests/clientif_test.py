@@ -221,6 +221,88 @@ class ClientIFTests(TestCaseBase):
                           fakePayloadDrive())
 
 
+class FakeStorage(object):
+
+    def __init__(self, code=0):
+        self.code = code
+        self.calls = []
+
+    def prepareImages(self, images):
+        self.calls.append(('prepareImages', images))
+        if self.code:
+            return response.error('imageErr')
+        return {'status': {'code': 0, 'message': 'Done'},
+                'images': [{'path': '/run/%s' % img['volumeID'],
+                            'info': {'volumeID': img['volumeID']},
+                            'imgVolumesInfo': []} for img in images]}
+
+    def teardownImages(self, images):
+        self.calls.append(('teardownImages', images))
+        if self.code:
+            return response.error('imageErr')
+        return {'status': {'code': 0, 'message': 'Done'}}
+
+    def teardownImage(self, sd_id, sp_id, img_id):
+        self.calls.append(('teardownImage', img_id))
+        return {'status': {'code': 0, 'message': 'Done'}}
+
+
+def fakeImageDrive(vol_id):
+    return {
+        'device': 'disk',
+        'domainID': 'sd',
+        'poolID': 'sp',
+        'imageID': 'img-' + vol_id,
+        'volumeID': vol_id,
+    }
+
+
+class PrepareVolumePathsTests(TestCaseBase):
+
+    def setUp(self):
+        self.cif = FakeClientIF()
+        self.cif.irs = FakeStorage()
+
+    def test_prepare_images_together(self):
+        drives = [fakeImageDrive('vol1'), fakeDrive(), fakeImageDrive('vol2')]
+        paths = self.cif.prepareVolumePaths(drives)
+        self.assertEqual(paths, ['/run/vol1', ISOFS_PATH, '/run/vol2'])
+        self.assertEqual(len(self.cif.irs.calls), 1)
+        name, images = self.cif.irs.calls[0]
+        self.assertEqual(name, 'prepareImages')
+        self.assertEqual([img['volumeID'] for img in images],
+                         ['vol1', 'vol2'])
+        self.assertEqual(drives[0]['volumeInfo'], {'volumeID': 'vol1'})
+        self.assertEqual(drives[0]['volumeChain'], [])
+
+    def test_prepare_no_images(self):
+        paths = self.cif.prepareVolumePaths([fakeDrive()])
+        self.assertEqual(paths, [ISOFS_PATH])
+        self.assertEqual(self.cif.irs.calls, [])
+
+    def test_prepare_failure(self):
+        self.cif.irs.code = 1
+        self.assertRaises(VolumeError, self.cif.prepareVolumePaths,
+                          [fakeImageDrive('vol1')])
+
+    def test_teardown_images_together(self):
+        drives = [fakeImageDrive('vol1'), None, fakeImageDrive('vol2')]
+        self.cif.teardownVolumePaths(drives)
+        self.assertEqual(self.cif.irs.calls, [
+            ('teardownImages', [{'domainID': 'sd', 'imageID': 'img-vol1'},
+                                {'domainID': 'sd', 'imageID': 'img-vol2'}]),
+        ])
+
+    def test_teardown_failure_tears_down_one_by_one(self):
+        self.cif.irs.code = 1
+        drives = [fakeImageDrive('vol1'), fakeImageDrive('vol2')]
+        self.cif.teardownVolumePaths(drives)
+        self.assertEqual(self.cif.irs.calls[1:], [
+            ('teardownImage', 'img-vol1'),
+            ('teardownImage', 'img-vol2'),
+        ])
+
+
 class getVMsTests(TestCaseBase):
 
     def test_empty(self):
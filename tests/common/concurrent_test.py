@@ -188,6 +188,37 @@ class TMapTests(VdsmTestCase):
         expected = [concurrent.Result(False, error)] * 10
         self.assertEqual(results, expected)
 
+    def test_max_workers_results_order(self):
+        def func(x):
+            time.sleep(x)
+            return x
+        values = tuple(random.random() * 0.1 for x in range(10))
+        results = concurrent.tmap(func, values, max_workers=3)
+        expected = [concurrent.Result(True, x) for x in values]
+        self.assertEqual(results, expected)
+
+    def test_max_workers_concurrency(self):
+        running = [0]
+        max_running = [0]
+        lock = threading.Lock()
+
+        def func(x):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        start = time.time()
+        concurrent.tmap(func, range(12), max_workers=4)
+        elapsed = time.time() - start
+        self.assertEqual(max_running[0], 4)
+        self.assertGreater(elapsed, 0.15)
+
+    def test_max_workers_empty(self):
+        self.assertEqual(concurrent.tmap(lambda x: x, [], max_workers=4), [])
+
 
 @expandPermutations
 class ThreadTests(VdsmTestCase):
@@ -18,6 +18,8 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+import threading
+
 from vdsm.common import time
 from testlib import VdsmTestCase
 from monkeypatch import MonkeyPatch
@@ -112,3 +114,18 @@ class TestClock(VdsmTestCase):
         with self.assertRaises(RuntimeError):
             with c.run("stopped"):
                 pass
+
+
+class TestThreadTime(VdsmTestCase):
+
+    def test_busy(self):
+        start = time.thread_time()
+        deadline = time.monotonic_time() + 0.1
+        while time.monotonic_time() < deadline:
+            pass
+        self.assertGreater(time.thread_time() - start, 0.05)
+
+    def test_sleeping(self):
+        start = time.thread_time()
+        threading.Event().wait(0.1)
+        self.assertLess(time.thread_time() - start, 0.05)
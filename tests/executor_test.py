@@ -30,6 +30,7 @@ from vdsm.common import pthread
 
 from fakelib import FakeLogger
 from testValidation import slowtest
+from testValidation import stresstest
 from testlib import VdsmTestCase as TestCaseBase
 
 
@@ -292,6 +293,244 @@ class TestWorkerSystemNames(TestCaseBase):
                          ["bar/0", "bar/1", "foo/0", "foo/1"])
 
 
+class PriorityExecutorTests(TestCaseBase):
+
+    PRIORITIES = [('high', None), ('normal', None), ('low', 1)]
+
+    def setUp(self):
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.start()
+        self.executor = executor.Executor('test',
+                                          workers_count=1,
+                                          max_tasks=20,
+                                          scheduler=self.scheduler,
+                                          priorities=self.PRIORITIES)
+        self.executor.start()
+
+    def tearDown(self):
+        self.executor.stop()
+        self.scheduler.stop()
+
+    def test_priority_order(self):
+        order = []
+        blocked = threading.Event()
+        task = Task(event=blocked)
+        self.executor.dispatch(task, priority='high')
+        self.assertTrue(task.started.wait(1))
+
+        def record(name):
+            return lambda: order.append(name)
+
+        # The only worker is busy, so these are queued.
+        for name in ('low', 'normal', 'high'):
+            self.executor.dispatch(record(name), priority=name)
+        last = Task()
+        self.executor.dispatch(last, priority='low')
+        blocked.set()
+        self.assertTrue(last.executed.wait(1))
+        self.assertEqual(order, ['high', 'normal', 'low'])
+
+    def test_max_running(self):
+        self.executor.resize(3)
+        blocked = threading.Event()
+        try:
+            first = Task(event=blocked)
+            second = Task()
+            self.executor.dispatch(first, priority='low')
+            self.assertTrue(first.started.wait(1))
+            self.executor.dispatch(second, priority='low')
+            # Other classes are not blocked by the low priority limit.
+            other = Task()
+            self.executor.dispatch(other, priority='normal')
+            self.assertTrue(other.executed.wait(1))
+            self.assertFalse(second.started.wait(0.2))
+            blocked.set()
+            self.assertTrue(second.executed.wait(1))
+        finally:
+            blocked.set()
+
+    def test_default_priority(self):
+        task = Task()
+        self.executor.dispatch(task)
+        self.assertTrue(task.executed.wait(1))
+        self.assertEqual(self._wait_count('low'), 1)
+
+    def test_unknown_priority(self):
+        self.assertRaises(ValueError, self.executor.dispatch, Task(),
+                          priority='nosuchpriority')
+
+    def test_stats(self):
+        task = Task()
+        self.executor.dispatch(task, priority='high')
+        self.assertTrue(task.executed.wait(1))
+        stats = self.executor.stats()
+        self.assertEqual(stats['workers']['active'], 1)
+        self.assertEqual(sorted(stats['priorities']),
+                         ['high', 'low', 'normal'])
+        self.assertEqual(stats['priorities']['high']['queued'], 0)
+        self.assertEqual(self._wait_count('high'), 1)
+
+    def _wait_count(self, priority):
+        stats = self.executor.stats()
+        return sum(count for bound, count in
+                   stats['priorities'][priority]['wait'])
+
+
+class ScalingExecutorTests(TestCaseBase):
+
+    def setUp(self):
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.start()
+        self.executor = executor.Executor('test',
+                                          workers_count=1,
+                                          max_tasks=20,
+                                          scheduler=self.scheduler,
+                                          max_active_workers=4,
+                                          idle_timeout=0.2)
+        self.executor.start()
+
+    def tearDown(self):
+        self.executor.stop()
+        self.scheduler.stop()
+
+    def test_scale_up_and_down(self):
+        blocked = threading.Event()
+        barrier = concurrent.Barrier(4 + 1)
+        try:
+            for i in range(4):
+                self.executor.dispatch(
+                    Task(event=blocked, start_barrier=barrier))
+            # All tasks run at the same time only if workers were added.
+            barrier.wait(timeout=2)
+            self.assertEqual(self.executor.stats()['workers']['active'], 4)
+        finally:
+            blocked.set()
+        self.assertTrue(self._wait_for_workers(1))
+
+    def test_max_active_workers(self):
+        blocked = threading.Event()
+        try:
+            tasks = [Task(event=blocked) for i in range(6)]
+            for task in tasks:
+                self.executor.dispatch(task)
+            time.sleep(0.3)
+            self.assertEqual(len([t for t in tasks if t.started.is_set()]), 4)
+        finally:
+            blocked.set()
+        for task in tasks:
+            self.assertTrue(task.executed.wait(1))
+
+    def test_resize(self):
+        self.executor.resize(3, 3)
+        self.assertEqual(self.executor.stats()['workers']['active'], 3)
+        self.executor.resize(2)
+        self.assertTrue(self._wait_for_workers(2))
+
+    def test_invalid_limits(self):
+        self.assertRaises(ValueError, self.executor.resize, 4, 2)
+        self.assertRaises(ValueError, self.executor.resize, 1, 30)
+
+    def _wait_for_workers(self, count, timeout=2):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.executor.stats()['workers']['active'] == count:
+                return True
+            time.sleep(0.05)
+        return False
+
+
+class PriorityTaskQueueTests(TestCaseBase):
+
+    def setUp(self):
+        self.queue = executor.PriorityTaskQueue(
+            3, [('high', None), ('low', 1)])
+
+    def test_get_timeout(self):
+        self.assertIsNone(self.queue.get(0.05))
+
+    def test_too_many_tasks(self):
+        for i in range(3):
+            self.queue.put(executor.Task(None, None))
+        self.assertRaises(executor.TooManyTasks, self.queue.put,
+                          executor.Task(None, None))
+
+    def test_limit(self):
+        first = executor.Task(None, None, priority='low')
+        second = executor.Task(None, None, priority='low')
+        self.queue.put(first)
+        self.queue.put(second)
+        self.assertIs(self.queue.get(0), first)
+        self.assertIsNone(self.queue.get(0))
+        self.queue.task_done(first)
+        self.assertIs(self.queue.get(0), second)
+
+    def test_wakeup(self):
+        result = []
+        t = concurrent.thread(lambda: result.append(self.queue.get()))
+        t.start()
+        while self.queue.waiting == 0:
+            time.sleep(0.01)
+        self.queue.wakeup()
+        t.join(1)
+        self.assertEqual(result, [None])
+
+
+class ExecutorBenchmarkTests(TestCaseBase):
+
+    # Every STUCK_EVERY task blocks for STUCK_TIME seconds.
+    TASKS = 2000
+    STUCK_EVERY = 50
+    STUCK_TIME = 0.5
+
+    @stresstest
+    def test_mixed_fast_and_stuck_tasks(self):
+        for name, kwargs in [
+            ('fixed', {}),
+            ('autoscaling', {'max_active_workers': 16}),
+            ('priorities', {'max_active_workers': 16,
+                            'priorities': [('fast', None), ('slow', 4)]}),
+        ]:
+            elapsed, stats = self._run(**kwargs)
+            print("%s: %d tasks in %.3f seconds, wait histogram: %s" % (
+                name, self.TASKS, elapsed,
+                dict((str(prio), info['wait']) for prio, info in
+                     stats['priorities'].items())))
+
+    def _run(self, **kwargs):
+        scheduler = schedule.Scheduler()
+        exc = executor.Executor('bench',
+                                workers_count=4,
+                                max_tasks=self.TASKS,
+                                scheduler=scheduler,
+                                max_workers=64,
+                                **kwargs)
+        lock = threading.Lock()
+        completed = [0]
+        done = threading.Event()
+
+        def fast():
+            with lock:
+                completed[0] += 1
+                if completed[0] == self.TASKS:
+                    done.set()
+
+        def stuck():
+            time.sleep(self.STUCK_TIME)
+            fast()
+
+        with utils.running(scheduler), utils.running(exc):
+            start = time.time()
+            for i in range(self.TASKS):
+                if i % self.STUCK_EVERY == 0:
+                    exc.dispatch(stuck, timeout=1.0, priority='slow')
+                else:
+                    exc.dispatch(fast, timeout=1.0, priority='fast')
+            self.assertTrue(done.wait(60))
+            elapsed = time.time() - start
+            stats = exc.stats()
+        return elapsed, stats
+
+
 class ExecutorTaskTests(TestCaseBase):
 
     def test_duration_none_if_not_called(self):
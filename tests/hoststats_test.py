@@ -18,14 +18,18 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+from __future__ import print_function
+
 import os
 import tempfile
 import shutil
+import time
 
 from vdsm.host import stats as hoststats
 from vdsm import numa
 
 from testlib import VdsmTestCase as TestCaseBase
+from testValidation import stresstest
 from monkeypatch import MonkeyPatchScope
 import vmfakelib as fake
 
@@ -181,3 +185,58 @@ class HostStatsThreadTests(TestCaseBase):
         }
         hoststats.start(lambda: 0)
         self.assertEqual(hoststats.produce(None, None), expected)
+
+
+class FakeInterfaceSample(object):
+
+    def __init__(self, counter):
+        self.rx = self.tx = counter
+        self.rxDropped = self.txDropped = 0
+        self.rxErrors = self.txErrors = 0
+        self.operstate = 'up'
+        self.speed = 10000
+        self.duplex = 'full'
+
+
+class HostStatsBenchmarkTests(TestCaseBase):
+
+    CORES = 256
+    NICS = 100
+    NODES = 4
+    ROUNDS = 100
+
+    def _fakeNumaTopology(self):
+        per_node = self.CORES // self.NODES
+        return {
+            str(node): {'cpus': list(range(node * per_node,
+                                           (node + 1) * per_node))}
+            for node in range(self.NODES)
+        }
+
+    def _sample(self, timestamp, counter):
+        cores = {core: {'user': counter, 'sys': counter}
+                 for core in range(self.CORES)}
+        interfaces = {'eth%d' % i: FakeInterfaceSample(counter)
+                      for i in range(self.NICS)}
+        return fake.HostSample(timestamp, cores, interfaces)
+
+    @stresstest
+    def test_large_host(self):
+        first_sample = self._sample(1.0, 100)
+        last_sample = self._sample(16.0, 1600)
+
+        with MonkeyPatchScope([(numa, 'topology',
+                                self._fakeNumaTopology)]):
+            start = time.time()
+            for i in range(self.ROUNDS):
+                cpu_stats = hoststats._get_cpu_core_stats(
+                    first_sample, last_sample)
+                net_stats = hoststats._get_interfaces_stats(
+                    first_sample, last_sample)
+            elapsed = time.time() - start
+
+        print("%d cores, %d nics: %.3f msec per sample" % (
+            self.CORES, self.NICS, elapsed / self.ROUNDS * 1000))
+        self.assertEqual(len(cpu_stats), self.CORES)
+        self.assertEqual(len(net_stats['network']), self.NICS)
+        self.assertEqual(cpu_stats['0']['cpuUser'], '100.00')
@@ -67,6 +67,8 @@ class ProgressingJob(jobs.Job):
     def __init__(self):
         jobs.Job.__init__(self, str(uuid.uuid4()))
         self._progress = None
+        self._throughput = None
+        self._eta = None
 
     @property
     def progress(self):
@@ -76,6 +78,14 @@ class ProgressingJob(jobs.Job):
     def progress(self, value):
         self._progress = value
 
+    @property
+    def throughput(self):
+        return self._throughput
+
+    @property
+    def eta(self):
+        return self._eta
+
 
 class StuckJob(TestingJob):
 
@@ -275,6 +285,18 @@ class JobsTests(VdsmTestCase):
             job.progress = i
             self.assertEqual(i, job.info()['progress'])
 
+    def test_job_get_throughput(self):
+        job = ProgressingJob()
+        info = job.info()
+        self.assertNotIn('throughput', info)
+        self.assertNotIn('eta', info)
+
+        job._throughput = 1024
+        job._eta = 60
+        info = job.info()
+        self.assertEqual(1024, info['throughput'])
+        self.assertEqual(60, info['eta'])
+
     def test_job_get_error(self):
         job = TestingJob()
         self.assertIsNone(job.error)
@@ -22,13 +22,15 @@
 
 from __future__ import absolute_import
 
+import threading
+
 from nose.plugins.attrib import attr
 
 from vdsm.network import netinfo
 from vdsm.network.link.iface import DEFAULT_MTU
 
 from testlib import VdsmTestCase as TestCaseBase
-from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatch, MonkeyPatchScope
 
 from vdsm.network import errors
 from vdsm.network.configurators import ifcfg
@@ -123,3 +125,116 @@ FAKE_NETINFO = {
     'bondings': {'bond00': {'slaves': ['eth5', 'eth6']}},
     'nameservers': [],
 }
+
+
+@attr(type='unit')
+class TestDeferredIfups(TestCaseBase):
+
+    def setUp(self):
+        self.configurator = ifcfg.Ifcfg(
+            netinfo.cache.CachingNetInfo(FAKE_NETINFO))
+        self.ifups = []
+        self.lock = threading.Lock()
+
+    def _fake_ifup(self, iface):
+        with self.lock:
+            self.ifups.append(iface.name)
+
+    def _nic(self, name):
+        # Nics not used by any network, the nic mtu is not read.
+        return Nic(name, self.configurator,
+                   _netinfo=self.configurator.net_info)
+
+    def test_ifup_levels(self):
+        nic = self._nic('eth2')
+        vlan = Vlan(nic, 10, self.configurator)
+        bridge = Bridge('br10', self.configurator, port=vlan)
+        # eth4 is not brought up with the other devices.
+        other = Bridge('br20', self.configurator, port=self._nic('eth4'))
+
+        levels = ifcfg._ifup_levels([bridge, vlan, nic, other])
+
+        self.assertEqual([[iface.name for iface in level]
+                          for level in levels],
+                         [['eth2', 'br20'], ['eth2.10'], ['br10']])
+
+    def test_ifup_immediately(self):
+        nic = self._nic('eth2')
+        with MonkeyPatchScope([(ifcfg, '_ifup', self._fake_ifup)]):
+            self.configurator._ifup(nic)
+        self.assertEqual(self.ifups, ['eth2'])
+
+    def test_ifup_deferred(self):
+        nics = [self._nic(name) for name in ('eth2', 'eth4', 'eth9')]
+        vlans = [Vlan(nic, 10, self.configurator) for nic in nics]
+        bridges = [Bridge('br%d' % i, self.configurator, port=vlan)
+                   for i, vlan in enumerate(vlans)]
+
+        with MonkeyPatchScope([(ifcfg, '_ifup', self._fake_ifup)]):
+            self.configurator.defer_ifups()
+            for iface in bridges + vlans + nics:
+                self.configurator._ifup(iface)
+            self.assertEqual(self.ifups, [])
+            self.configurator.ifup_deferred()
+
+        self.assertEqual(sorted(self.ifups[:3]), ['eth2', 'eth4', 'eth9'])
+        self.assertEqual(sorted(self.ifups[3:6]),
+                         ['eth2.10', 'eth4.10', 'eth9.10'])
+        self.assertEqual(sorted(self.ifups[6:]), ['br0', 'br1', 'br2'])
+
+    def test_ifup_deferred_failure(self):
+        nic = self._nic('eth2')
+        bridge = Bridge('br0', self.configurator, port=nic)
+
+        def fail(iface):
+            self._fake_ifup(iface)
+            raise errors.ConfigNetworkError(errors.ERR_FAILED_IFUP, 'failed')
+
+        with MonkeyPatchScope([(ifcfg, '_ifup', fail)]):
+            self.configurator.defer_ifups()
+            self.configurator.defer_network('net0')
+            self.configurator._ifup(bridge)
+            self.configurator._ifup(nic)
+            failures = self.configurator.ifup_deferred()
+
+        self.assertEqual(list(failures), ['net0'])
+        self.assertEqual(failures['net0'].errCode, errors.ERR_FAILED_IFUP)
+        self.assertEqual(self.ifups, ['eth2'])
+
+    def test_ifup_deferred_other_networks_up(self):
+        nics = [self._nic(name) for name in ('eth2', 'eth4')]
+        bridges = [Bridge('br%d' % i, self.configurator, port=nic)
+                   for i, nic in enumerate(nics)]
+
+        def fail_eth2(iface):
+            self._fake_ifup(iface)
+            if iface.name == 'eth2':
+                raise errors.ConfigNetworkError(errors.ERR_FAILED_IFUP, '')
+
+        with MonkeyPatchScope([(ifcfg, '_ifup', fail_eth2)]):
+            self.configurator.defer_ifups()
+            for i, bridge in enumerate(bridges):
+                self.configurator.defer_network('net%d' % i)
+                self.configurator._ifup(bridge)
+                self.configurator._ifup(bridge.port)
+            failures = self.configurator.ifup_deferred()
+
+        self.assertEqual(list(failures), ['net0'])
+        self.assertEqual(sorted(self.ifups), ['br1', 'eth2', 'eth4'])
+
+    def test_failed_network_cleanup(self):
+        error = errors.ConfigNetworkError(errors.ERR_FAILED_IFUP, 'failed')
+        cleaned = []
+
+        def cleanup(network, attrs, configurator):
+            cleaned.append((network, attrs))
+
+        self.configurator.ifup_deferred = lambda: {'net0': error}
+        networks = {'net0': {'nic': 'eth2', 'bridged': True},
+                    'net1': {'nic': 'eth4', 'bridged': True}}
+        with MonkeyPatchScope([(legacy_switch, '_emergency_network_cleanup',
+                                cleanup)]):
+            with self.assertRaises(errors.ConfigNetworkError):
+                legacy_switch.ifup_added_networks(self.configurator, networks)
+
+        self.assertEqual(cleaned, [('net0', networks['net0'])])
@@ -0,0 +1,133 @@
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+from __future__ import absolute_import
+
+import os
+import time
+
+from nose.plugins.attrib import attr
+
+from monkeypatch import MonkeyClass
+from testlib import VdsmTestCase, namedTemporaryDir
+
+from vdsm.network.ip import dhclient
+from vdsm.network.ip import dhcp_registry
+
+DEVICE = 'eth0'
+
+_clock = [0]
+_dhclients = {}
+_scans = []
+
+
+def _running_dhclients():
+    _scans.append(None)
+    return dict(_dhclients)
+
+
+@attr(type='unit')
+@MonkeyClass(dhclient, 'running_dhclients', _running_dhclients)
+@MonkeyClass(dhcp_registry, 'monotonic_time', lambda: _clock[0])
+class TestDhcpRegistry(VdsmTestCase):
+
+    def setUp(self):
+        _clock[0] = 0
+        _dhclients.clear()
+        del _scans[:]
+        self.tmpdir = namedTemporaryDir()
+        self.dir = self.tmpdir.__enter__()
+        self.registry = dhcp_registry.DhcpRegistry(dirs=(self.dir,))
+        self.registry.start()
+
+    def tearDown(self):
+        self.registry.stop()
+        self.tmpdir.__exit__(None, None, None)
+
+    def test_read_once(self):
+        self.registry.running_dhclients()
+        self.registry.running_dhclients()
+        self.assertEqual(len(_scans), 1)
+
+    def test_resync(self):
+        self.registry.running_dhclients()
+        _clock[0] = dhcp_registry.RESYNC_INTERVAL
+        self.registry.running_dhclients()
+        self.assertEqual(len(_scans), 2)
+
+    def test_dhclient_pid_file_created(self):
+        self.assertEqual(self.registry.running_dhclients(), {})
+        _dhclients[DEVICE] = {dhclient.DHCP4: True, dhclient.DHCP6: False}
+        with open(os.path.join(self.dir, 'dhclient-eth0.pid'), 'w'):
+            pass
+        self._wait_for_scans(2)
+        self.assertEqual(self.registry.running_dhclients(), _dhclients)
+
+    def test_other_file_ignored(self):
+        self.registry.running_dhclients()
+        with open(os.path.join(self.dir, 'other.pid'), 'w'):
+            pass
+        # Let the notifier handle the event.
+        time.sleep(0.2)
+        self.registry.running_dhclients()
+        self.assertEqual(len(_scans), 1)
+
+    def test_missing_dir_created(self):
+        lease_dir = os.path.join(self.dir, 'dhclient')
+        registry = dhcp_registry.DhcpRegistry(dirs=(lease_dir,))
+        registry.start()
+        try:
+            registry.running_dhclients()
+            os.mkdir(lease_dir)
+            self._wait_for_scans(2, registry)
+            with open(os.path.join(lease_dir, 'dhclient--eth0.lease'), 'w'):
+                pass
+            self._wait_for_scans(3, registry)
+        finally:
+            registry.stop()
+
+    def test_invalidate_registry(self):
+        self.registry.running_dhclients()
+        dhclient.set_registry(self.registry)
+        try:
+            dhclient.invalidate_registry()
+        finally:
+            dhclient.set_registry(None)
+        self.registry.running_dhclients()
+        self.assertEqual(len(_scans), 2)
+
+    def test_dhcp_info(self):
+        _dhclients[DEVICE] = {dhclient.DHCP4: True, dhclient.DHCP6: False}
+        dhclient.set_registry(self.registry)
+        try:
+            info = dhclient.dhcp_info([DEVICE, 'eth1'])
+        finally:
+            dhclient.set_registry(None)
+        self.assertEqual(info, {
+            DEVICE: {dhclient.DHCP4: True, dhclient.DHCP6: False},
+            'eth1': {dhclient.DHCP4: False, dhclient.DHCP6: False}})
+
+    def _wait_for_scans(self, count, registry=None, timeout=2):
+        registry = registry or self.registry
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            registry.running_dhclients()
+            if len(_scans) >= count:
+                return
+            time.sleep(0.05)
+        raise AssertionError('dhclient file event was not handled')
@@ -19,6 +19,7 @@
 # Refer to the README and COPYING files for full details of the license
 #
 from __future__ import absolute_import
+import errno
 import os
 import io
 
@@ -32,8 +33,10 @@ from vdsm.network.ip.address import prefix2netmask
 from vdsm.network.link.bond import Bond
 from vdsm.network.link.bond.sysfs_driver import BONDING_MASTERS
 from vdsm.network.link.iface import random_iface_name
-from vdsm.network.netinfo import addresses, bonding, dns, misc, nics, routes
+from vdsm.network.netinfo import addresses, bonding, cache, dns, misc, nics
+from vdsm.network.netinfo import routes
 from vdsm.network.netinfo.cache import get
+from vdsm.network.netlink.libnl import RtKnownTables
 from vdsm.network.netlink import waitfor
 
 from modprobe import RequireBondingMod
@@ -445,3 +448,177 @@ class TestIPv6Addresses(TestCaseBase):
                                  ip_addrs[0]['address'][:len(IPV6_NETADDRESS)])
 
                 self.assertEqual('link', ip_addrs[1]['scope'])
+
+
+class FakeLink(object):
+
+    def __init__(self, name, index, master=None, mtu=1500, hidden=False):
+        self.name = name
+        self.index = index
+        self.master = master
+        self.mtu = mtu
+        self.hidden = hidden
+
+    def isHidden(self):
+        return self.hidden
+
+    def isDPDK(self):
+        return False
+
+
+@attr(type='unit')
+class TestDevicesCache(TestCaseBase):
+
+    def setUp(self):
+        self.links = {}
+        self.reads = []
+        for name, value in (('getLinks', self._get_links),
+                            ('getLink', self._get_link),
+                            ('getIpAddrs', lambda snapshot: {}),
+                            ('get_routes', lambda snapshot: {}),
+                            ('_device_info', self._device_info)):
+            patcher = mock.patch.object(cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(cache.nl_snapshot, 'take', lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(bonding, 'permanent_address', dict)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.add_link('eth0', 1)
+        self.add_link('eth1', 2)
+        self.add_link('bond0', 3)
+        self.devices_cache = cache._DevicesCache()
+        self.devices_cache.report()
+
+    def add_link(self, name, index, **kwargs):
+        self.links[name] = FakeLink(name, index, **kwargs)
+
+    def _get_links(self, snapshot):
+        return list(self.links.values())
+
+    def _get_link(self, name):
+        try:
+            return self.links[name]
+        except KeyError:
+            raise IOError(errno.ENODEV, 'No such device')
+
+    def _device_info(self, link, routes, ipaddrs):
+        self.reads.append(link.name)
+        if link.name.startswith('bond'):
+            slaves = sorted(dev.name for dev in self.links.values()
+                            if dev.master == link.name)
+            return 'bondings', {'mtu': link.mtu, 'slaves': slaves}
+        return 'nics', {'mtu': link.mtu}
+
+    def event(self, **event):
+        self.devices_cache._handle_event(event)
+
+    def report(self):
+        """
+        Return the cached report and the devices read to update it, checking
+        that it is the report built from scratch.
+        """
+        del self.reads[:]
+        report = self.devices_cache.report()
+        reads = sorted(self.reads)
+        self.assertEqual(report, cache._devices_report(None))
+        return report, reads
+
+    def test_report(self):
+        report, reads = self.report()
+        self.assertEqual(sorted(report['nics']), ['eth0', 'eth1'])
+        self.assertEqual(sorted(report['bondings']), ['bond0'])
+        self.assertEqual(reads, [])
+
+    def test_link_changed(self):
+        self.links['eth0'].mtu = 9000
+        self.event(event='new_link', name='eth0', index=1)
+        report, reads = self.report()
+        self.assertEqual(report['nics']['eth0']['mtu'], 9000)
+        self.assertEqual(reads, ['eth0'])
+
+    def test_link_added_and_removed(self):
+        self.add_link('eth2', 4)
+        self.event(event='new_link', name='eth2', index=4)
+        report, reads = self.report()
+        self.assertIn('eth2', report['nics'])
+        del self.links['eth2']
+        self.event(event='del_link', name='eth2', index=4)
+        report, reads = self.report()
+        self.assertNotIn('eth2', report['nics'])
+
+    def test_hidden_link_added(self):
+        self.add_link('eth2', 4, hidden=True)
+        self.event(event='new_link', name='eth2', index=4)
+        report, reads = self.report()
+        self.assertNotIn('eth2', report['nics'])
+
+    def test_link_renamed(self):
+        self.links['eth2'] = self.links.pop('eth1')
+        self.links['eth2'].name = 'eth2'
+        self.event(event='new_link', name='eth2', index=2)
+        report, reads = self.report()
+        self.assertEqual(sorted(report['nics']), ['eth0', 'eth2'])
+
+    def test_enslave_updates_master(self):
+        self.links['eth0'].master = 'bond0'
+        self.event(event='new_link', name='eth0', index=1, master='bond0')
+        report, reads = self.report()
+        self.assertEqual(report['bondings']['bond0']['slaves'], ['eth0'])
+        self.assertEqual(reads, ['bond0', 'eth0'])
+
+        self.links['eth0'].master = None
+        self.event(event='new_link', name='eth0', index=1)
+        report, reads = self.report()
+        self.assertEqual(report['bondings']['bond0']['slaves'], [])
+        self.assertEqual(reads, ['bond0', 'eth0'])
+
+    def test_addr_event(self):
+        self.event(event='new_addr', index=2)
+        report, reads = self.report()
+        self.assertEqual(reads, ['eth1'])
+
+    def test_addr_event_unknown_device_resyncs(self):
+        self.event(event='new_addr', index=42)
+        report, reads = self.report()
+        self.assertEqual(reads, ['bond0', 'eth0', 'eth1'])
+
+    def test_route_event(self):
+        self.event(event='new_route', destination='10.0.0.0/24',
+                   table=RtKnownTables.RT_TABLE_MAIN, oif='eth0',
+                   oif_index=1)
+        report, reads = self.report()
+        self.assertEqual(reads, ['eth0'])
+
+    def test_default_route_event_updates_all_devices(self):
+        self.event(event='new_route', destination='none',
+                   table=RtKnownTables.RT_TABLE_MAIN, oif='eth0',
+                   oif_index=1)
+        report, reads = self.report()
+        self.assertEqual(reads, ['bond0', 'eth0', 'eth1'])
+
+    def test_resync_interval(self):
+        now = cache.monotonic_time() + cache.RESYNC_INTERVAL
+        with mock.patch.object(cache, 'monotonic_time', lambda: now):
+            report, reads = self.report()
+        self.assertEqual(reads, ['bond0', 'eth0', 'eth1'])
+
+    def test_invalidate(self):
+        self.devices_cache.invalidate()
+        report, reads = self.report()
+        self.assertEqual(reads, ['bond0', 'eth0', 'eth1'])
+
+    def test_report_owned_by_caller(self):
+        self.devices_cache.report()['nics']['eth0']['mtu'] = 9000
+        report, reads = self.report()
+        self.assertEqual(report['nics']['eth0']['mtu'], 1500)
+
+    def test_check_mode_detects_missed_event(self):
+        devices_cache = cache._DevicesCache(check=True)
+        devices_cache.report()
+        self.links['eth0'].mtu = 9000
+        with self.assertRaises(cache.CacheInconsistency):
+            devices_cache.report()
@@ -24,11 +24,19 @@ import time
 
 from vdsm.common.time import monotonic_time
 
-from .nettestlib import Dummy
+from .nettestlib import Dummy, dummy_devices
+from vdsm.network import tc as tc_parser
+from vdsm.network.netlink import addr
+from vdsm.network.netlink import libnl
+from vdsm.network.netlink import link
 from vdsm.network.netlink import monitor
+from vdsm.network.netlink import route
+from vdsm.network.netlink import snapshot
+from vdsm.network.netlink import tc
 from vdsm.network.sysctl import is_disabled_ipv6
 
-from testValidation import ValidateRunningAsRoot, broken_on_ci
+from testValidation import ValidateRunningAsRoot, broken_on_ci, stresstest
+from monkeypatch import MonkeyPatchScope
 from testlib import start_thread, VdsmTestCase as TestCaseBase
 
 IP_ADDRESS = '192.0.2.1'
@@ -215,3 +223,89 @@ class NetlinkEventMonitorTests(TestCaseBase):
 
 def _is_subdict(subset, superset):
     return all(item in superset.items() for item in subset.items())
+
+
+class NetlinkSnapshotTests(TestCaseBase):
+
+    def test_snapshot(self):
+        snap = snapshot.take()
+        self.assertEqual(snap.links, list(link.iter_links()))
+        self.assertEqual(snap.addrs, list(addr.iter_addrs()))
+        self.assertEqual(snap.routes, list(route.iter_routes()))
+        self.assertEqual(snap.names,
+                         {lnk['index']: lnk['name'] for lnk in snap.links})
+
+    @ValidateRunningAsRoot
+    def test_snapshot_names_devices(self):
+        dummy = Dummy()
+        dummy_name = dummy.create()
+        try:
+            dummy.set_ip(IP_ADDRESS, IP_CIDR)
+            dummy.up()
+            snap = snapshot.take()
+        finally:
+            dummy.remove()
+        labels = [a['label'] for a in snap.addrs
+                  if a['address'] == IP_ADDRESS + '/' + IP_CIDR]
+        self.assertEqual(labels, [dummy_name])
+        self.assertIn(dummy_name, [r.get('oif') for r in snap.routes])
+
+
+class NetlinkTcTests(TestCaseBase):
+
+    def test_qdiscs(self):
+        def keys(qdiscs):
+            return sorted((q['dev'], q['kind'], q['handle'], q.get('root'),
+                           q.get('parent')) for q in qdiscs)
+
+        self.assertEqual(keys(tc.iter_qdiscs()),
+                         keys(tc_parser.qdiscs(None)))
+
+    def test_handle_str(self):
+        self.assertEqual(tc._handle_str(0x13890000), '1389:')
+        self.assertEqual(tc._handle_str(0x13895000), '1389:5000')
+
+    def test_hfsc_curves(self):
+        curves = {
+            'rsc': libnl.TcServiceCurve(0, 0, 3200 * 1000 // 8),
+            'fsc': libnl.TcServiceCurve(0, 0, 3200 * 1000 // 8),
+            'usc': libnl.TcServiceCurve(0, 0, 30000 * 1000 // 8),
+        }
+        with MonkeyPatchScope([
+            (libnl, 'rtnl_class_hfsc_get_' + name,
+             lambda cls, name=name: curves[name]) for name in curves
+        ]):
+            netlink_curves = tc._hfsc_curves(None)
+        out = ('class hfsc 1:10 parent 1: leaf 10: sc m1 0bit d 0us '
+               'm2 3200Kbit ul m1 0bit d 0us m2 30000Kbit')
+        parsed, = tc_parser.classes(None, out=out)
+        self.assertEqual(netlink_curves, parsed['hfsc'])
+
+    def test_hfsc_curves_not_set(self):
+        with MonkeyPatchScope([
+            (libnl, 'rtnl_class_hfsc_get_' + name, lambda cls: None)
+            for name in ('rsc', 'fsc', 'usc')
+        ]):
+            self.assertEqual(tc._hfsc_curves(None), {})
+
+
+class NetlinkSnapshotBenchmarkTests(TestCaseBase):
+
+    DEVICES = 2000
+
+    @stresstest
+    @ValidateRunningAsRoot
+    def test_snapshot(self):
+        with dummy_devices(self.DEVICES):
+            start = monotonic_time()
+            list(link.iter_links())
+            list(addr.iter_addrs())
+            list(route.iter_routes())
+            separate = monotonic_time() - start
+
+            start = monotonic_time()
+            snapshot.take()
+            single = monotonic_time() - start
+
+        print("%d devices: separate dumps: %.3f seconds, snapshot: %.3f "
+              "seconds" % (self.DEVICES, separate, single))
@@ -168,6 +168,21 @@ class TestOvsVsctlCommand(VdsmTestCase):
         self.assertEqual(
             TestOvsVsctlCommand.PROCESSED_VSCTL_LIST_BRIDGE_OUTPUT, cmd.result)
 
+    def test_monitor_line_parser(self):
+        line = (
+            '{"caption":"Port table","data":[["5e3b3a4e-1a4f-4ba0-a1c2-'
+            'f3b8e0c4a1d2","insert","ovstest0",["set",[]],["map",[["vdsm_'
+            'level","southbound"]]]]],"headings":["row","action","name",'
+            '"tag","other_config"]}')
+
+        changes = list(vsctl._parse_monitor_line(line, {}))
+
+        self.assertEqual(changes, [
+            ('Port', 'insert',
+             {'_uuid': UUID('5e3b3a4e-1a4f-4ba0-a1c2-f3b8e0c4a1d2'),
+              'name': 'ovstest0', 'tag': None,
+              'other_config': {'vdsm_level': 'southbound'}})])
+
 
 @attr(type='integration')
 class TestOvsApiBase(VdsmTestCase):
@@ -20,11 +20,12 @@ from __future__ import absolute_import
 
 from contextlib import contextmanager
 from copy import deepcopy
+from uuid import uuid4
 
 from nose.plugins.attrib import attr
 
 from .nettestlib import dummy_device, bond_device
-from .ovsnettestlib import OvsService, TEST_BRIDGE
+from .ovsnettestlib import FakeOvsDB, OvsService, TEST_BRIDGE
 from monkeypatch import MonkeyPatch
 from testValidation import ValidateRunningAsRoot
 from testlib import VdsmTestCase
@@ -409,3 +410,79 @@ class TestOvsNetInfo(VdsmTestCase):
         self.assertEqual(test_ovs_netinfo, self.TEST_BRIDGELESS_OVS_NETINFO)
         self.assertEqual(test_kernel_netinfo,
                          self.TEST_BRIDGELESS_KERNEL_NETINFO)
+
+
+@attr(type='unit')
+class TestOvsCache(VdsmTestCase):
+
+    def setUp(self):
+        self.ovsdb = FakeOvsDB()
+        self.ovsdb.add_bridge(TEST_BRIDGE)
+        self.ovsdb.add_port(TEST_BRIDGE, TEST_NIC, level=info.SOUTHBOUND)
+        self.ovsdb.add_port(TEST_BRIDGE, TEST_NETWORK, level=info.NORTHBOUND)
+        self.cache = info._OvsCache(ovsdb=self.ovsdb, check=True)
+        self.cache.start()
+
+    def tearDown(self):
+        self.cache.stop()
+
+    def info(self):
+        self.ovsdb.wait_for_monitors()
+        return self.cache.info()
+
+    def test_info(self):
+        bridges, bridges_by_sb, northbounds_by_sb = self.info()
+        self.assertEqual(bridges_by_sb, {TEST_NIC: TEST_BRIDGE})
+        self.assertEqual(northbounds_by_sb, {TEST_NIC: {TEST_NETWORK}})
+        self.assertEqual(bridges[TEST_BRIDGE]['ports'][TEST_NETWORK],
+                         {'level': info.NORTHBOUND, 'tag': None})
+
+    def test_tables_read_once(self):
+        self.info()
+        self.info()
+        # The check mode reads the tables for every info.
+        self.assertEqual(self.ovsdb.reads, 1 + 2)
+
+    def test_add_port(self):
+        self.info()
+        self.ovsdb.add_port(TEST_BRIDGE, TEST_VLANED_NETWORK, tag=TEST_VLAN,
+                            level=info.NORTHBOUND)
+        bridges, bridges_by_sb, northbounds_by_sb = self.info()
+        self.assertEqual(northbounds_by_sb,
+                         {TEST_NIC: {TEST_NETWORK, TEST_VLANED_NETWORK}})
+
+    def test_set_port(self):
+        self.info()
+        self.ovsdb.set_port(TEST_NETWORK, tag=TEST_VLAN)
+        bridges, bridges_by_sb, northbounds_by_sb = self.info()
+        self.assertEqual(bridges[TEST_BRIDGE]['ports'][TEST_NETWORK]['tag'],
+                         TEST_VLAN)
+
+    def test_del_bridge(self):
+        self.info()
+        self.ovsdb.del_bridge(TEST_BRIDGE)
+        self.assertEqual(self.info(), ({}, {}, {}))
+
+    def test_missing_row_resyncs(self):
+        self.info()
+        reads = self.ovsdb.reads
+        bridge = next(iter(self.ovsdb.tables['Bridge'].values()))
+        self.cache._update('Bridge', 'new',
+                           dict(bridge, ports=bridge['ports'] + [uuid4()]))
+        self.info()
+        # Resync and check mode read.
+        self.assertEqual(self.ovsdb.reads, reads + 2)
+
+    def test_caller_owns_info(self):
+        bridges, bridges_by_sb, northbounds_by_sb = self.info()
+        northbounds_by_sb[TEST_NIC].discard(TEST_NETWORK)
+        self.assertEqual(self.info()[2], {TEST_NIC: {TEST_NETWORK}})
+
+    def test_ovs_info_uses_cache(self):
+        info.start_cache(ovsdb=self.ovsdb)
+        try:
+            self.ovsdb.wait_for_monitors()
+            ovs_info = info.OvsInfo()
+        finally:
+            info.stop_cache()
+        self.assertEqual(ovs_info.bridges_by_sb, {TEST_NIC: TEST_BRIDGE})
@@ -18,6 +18,11 @@
 #
 from __future__ import absolute_import
 
+import copy
+import uuid
+
+from six.moves import queue
+
 from vdsm.network import cmd
 from vdsm.network.ovs.driver import create
 
@@ -49,3 +54,155 @@ class OvsService(object):
 
         if not self.ovs_init_state_is_up:
             cmd.exec_sync([OVS_CTL, 'stop'])
+
+
+class FakeOvsDB(object):
+    """
+    In memory stand-in for the OVS driver, answering the table listings and
+    monitors used by ovs.info. Rows are modified with the helpers below,
+    reporting the changes to the started monitors.
+    """
+
+    def __init__(self):
+        self.tables = {'Bridge': {}, 'Port': {}, 'Interface': {}}
+        # Number of transactions listing tables.
+        self.reads = 0
+        self._monitors = []
+
+    def transaction(self):
+        return _FakeTransaction(self)
+
+    def list_bridge_info(self):
+        return _FakeListCommand('Bridge')
+
+    def list_port_info(self):
+        return _FakeListCommand('Port')
+
+    def list_interface_info(self):
+        return _FakeListCommand('Interface')
+
+    def monitor(self, tables):
+        monitor = FakeMonitor()
+        self._monitors.append(monitor)
+        return monitor
+
+    def wait_for_monitors(self):
+        """
+        Wait until the changes reported so far were consumed.
+        """
+        for monitor in self._monitors:
+            monitor.join()
+
+    def add_bridge(self, name):
+        bridge = {'_uuid': uuid.uuid4(), 'name': name, 'ports': [],
+                  'stp_enable': False, 'datapath_type': ''}
+        self._insert('Bridge', bridge)
+        self.add_port(name, name)
+
+    def del_bridge(self, name):
+        bridge = self._find('Bridge', name)
+        for port_uuid in list(bridge['ports']):
+            self.del_port(name, self.tables['Port'][port_uuid]['name'])
+        self._delete('Bridge', bridge)
+
+    def add_port(self, bridge_name, name, tag=None, level=None):
+        iface = {'_uuid': uuid.uuid4(), 'name': name, 'mac_in_use': None}
+        self._insert('Interface', iface)
+        other_config = {} if level is None else {'vdsm_level': level}
+        port = {'_uuid': uuid.uuid4(), 'name': name, 'tag': tag,
+                'other_config': other_config,
+                'interfaces': [iface['_uuid']]}
+        self._insert('Port', port)
+        bridge = self._find('Bridge', bridge_name)
+        self._modify('Bridge', bridge,
+                     ports=bridge['ports'] + [port['_uuid']])
+
+    def del_port(self, bridge_name, name):
+        port = self._find('Port', name)
+        bridge = self._find('Bridge', bridge_name)
+        self._modify('Bridge', bridge,
+                     ports=[p for p in bridge['ports'] if p != port['_uuid']])
+        self._delete('Port', port)
+        for iface_uuid in port['interfaces']:
+            self._delete('Interface', self.tables['Interface'][iface_uuid])
+
+    def set_port(self, name, **columns):
+        self._modify('Port', self._find('Port', name), **columns)
+
+    def _find(self, table, name):
+        return next(row for row in self.tables[table].values()
+                    if row['name'] == name)
+
+    def _insert(self, table, row):
+        self.tables[table][row['_uuid']] = row
+        self._report(table, 'insert', row)
+
+    def _delete(self, table, row):
+        del self.tables[table][row['_uuid']]
+        self._report(table, 'delete', row)
+
+    def _modify(self, table, row, **columns):
+        self._report(table, 'old', row)
+        row.update(columns)
+        self._report(table, 'new', row)
+
+    def _report(self, table, action, row):
+        for monitor in self._monitors:
+            monitor.put((table, action, copy.deepcopy(row)))
+
+
+class FakeMonitor(object):
+
+    _STOP = object()
+
+    def __init__(self):
+        self._changes = queue.Queue()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self._changes.put(self._STOP)
+
+    def put(self, change):
+        self._changes.put(change)
+
+    def join(self):
+        self._changes.join()
+
+    def __iter__(self):
+        while True:
+            change = self._changes.get()
+            try:
+                if change is self._STOP:
+                    return
+                yield change
+            finally:
+                self._changes.task_done()
+
+
+class _FakeTransaction(object):
+
+    def __init__(self, ovsdb):
+        self._ovsdb = ovsdb
+        self._commands = []
+
+    def add(self, *commands):
+        self._commands += commands
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_val, tb):
+        if ex_type is None:
+            self._ovsdb.reads += 1
+            for command in self._commands:
+                command.result = copy.deepcopy(
+                    list(self._ovsdb.tables[command.table].values()))
+
+
+class _FakeListCommand(object):
+
+    def __init__(self, table):
+        self.table = table
+        self.result = None
@@ -20,9 +20,11 @@
 from __future__ import absolute_import
 from nose.plugins.attrib import attr
 
+from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase as TestCaseBase
 
 from vdsm.network.netinfo import qos
+from vdsm.network.netlink import tc as nl_tc
 from vdsm.network.tc import cls
 
 
@@ -53,3 +55,64 @@ class TestConversions(TestCaseBase):
                {'kind': 'sfq', 'handle': '20:', 'parent': '1:20',
                 'sfq': {'limit': 127, 'quantum': 1514}})
         self.assertEqual(qos.get_root_qdisc(inp), root)
+
+
+_QDISCS = [{'kind': 'hfsc', 'root': True, 'handle': '1389:', 'dev': 'eth0',
+            'index': 2}]
+_CLASSES = [{'kind': 'hfsc', 'root': True, 'handle': '1389:', 'dev': 'eth0'},
+            {'kind': 'hfsc', 'handle': '1389:' + qos.DEFAULT_CLASSID,
+             'parent': '1389:',
+             'dev': 'eth0', 'hfsc': {'ls': {'m1': 0, 'd': 0, 'm2': 1000}}}]
+
+
+@attr(type='unit')
+class TestTcCache(TestCaseBase):
+
+    def setUp(self):
+        self.dumps = []
+
+        def iter_qdiscs():
+            self.dumps.append('qdiscs')
+            return iter(_QDISCS)
+
+        def iter_classes(index):
+            self.dumps.append(('classes', index))
+            return iter(_CLASSES)
+
+        self.patch = MonkeyPatchScope([
+            (nl_tc, 'iter_qdiscs', iter_qdiscs),
+            (nl_tc, 'iter_classes', iter_classes),
+            (nl_tc, 'hfsc_supported', lambda: True),
+        ])
+        self.patch.__enter__()
+        self.cache = qos._TcCache()
+
+    def tearDown(self):
+        self.patch.__exit__(None, None, None)
+
+    def test_dumped_once(self):
+        self.assertEqual(self.cache.qdiscs(), {'eth0': _QDISCS})
+        self.assertEqual(
+            self.cache.classes('eth0', '1389:' + qos.DEFAULT_CLASSID),
+            _CLASSES[1:])
+        self.assertEqual(self.cache.classes('eth0', '1389:a'), [])
+        self.cache.qdiscs()
+        self.assertEqual(self.dumps, ['qdiscs', ('classes', 2)])
+
+    def test_invalidate(self):
+        self.cache.classes('eth0', '1389:a')
+        self.cache.invalidate()
+        self.cache.classes('eth0', '1389:a')
+        self.assertEqual(self.dumps, ['qdiscs', ('classes', 2)] * 2)
+
+    def test_report(self):
+        nets_info = {'net': {'iface': 'eth0'}}
+        devs_info = {'bridges': {}, 'vlans': {}}
+        self.cache.start()
+        try:
+            with MonkeyPatchScope([(qos, '_tc_cache', self.cache)]):
+                qos.report_network_qos(nets_info, devs_info)
+        finally:
+            self.cache.stop()
+        self.assertEqual(nets_info['net']['hostQos'],
+                         {'out': _CLASSES[1]['hfsc']})
@@ -278,6 +278,25 @@ class ConvertTests(TestCaseBase):
             qemuimg.convert('src', 'dst', dstFormat='qcow2',
                             backing='bak', backingFormat='qcow2')
 
+    def test_unordered_writes(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        '-W', 'src', '-O', 'raw', 'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', dstFormat='raw',
+                            unorderedWrites=True)
+
+    def test_coroutines(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        '-m', '8', 'src', '-O', 'raw', 'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', dstFormat='raw', coroutines=8)
+
     def test_qcow2_compat_invalid(self):
         with self.assertRaises(ValueError):
             qemuimg.convert('image', 'dst', dstFormat='qcow2',
@@ -178,6 +178,141 @@ class SchedulerTests(VdsmTestCase):
         self.scheduler.start()
 
 
+@expandPermutations
+class WheelSchedulerTests(SchedulerTests):
+
+    def create_scheduler(self, clock):
+        self.clock = clock
+        self.scheduler = schedule.WheelScheduler(clock=clock, tick=0.01)
+        self.scheduler.start()
+
+    @broken_on_ci("timing sensitive, may fail on overloaded machine")
+    @permutations(SchedulerTests.PERMUTATIONS)
+    def test_schedule_after_wheel0_wrap(self, clock):
+        offset = [0.0]
+        self.clock = lambda: clock() + offset[0]
+        self.scheduler = schedule.WheelScheduler(clock=self.clock, tick=0.01)
+        # Start near the end of the first wheel, so the call expires in a
+        # slot before the current one.
+        offset[0] = 2.01
+        self.scheduler.start()
+        task1 = Task(self.clock)
+        self.scheduler.schedule(0, task1)
+        task1.wait(self.GRACETIME)
+        self.assertNotEqual(task1.call_time, None)
+        delay = 1.0
+        task2 = Task(self.clock)
+        deadline = self.clock() + delay
+        self.scheduler.schedule(delay, task2)
+        task2.wait(delay + self.GRACETIME)
+        self.assertNotEqual(task2.call_time, None)
+        self.assertTrue(deadline <= task2.call_time)
+        self.assertTrue(task2.call_time < deadline + self.GRACETIME)
+
+
+class WheelSchedulerTicksTests(VdsmTestCase):
+
+    TICK = 0.1
+
+    def setUp(self):
+        self.now = 0.0
+        self.scheduler = schedule.WheelScheduler(
+            clock=lambda: self.now, tick=self.TICK)
+        self.called = []
+
+    def test_expire_in_order(self):
+        self.add(5.0, 'b')
+        self.add(0.25, 'a')
+        self.assertEqual(self.advance(0.2), [])
+        self.assertEqual(self.advance(0.3), ['a'])
+        self.assertEqual(self.advance(5.0), ['b'])
+
+    def test_never_early(self):
+        self.add(1.05, 'a')
+        self.assertEqual(self.advance(1.0), [])
+        self.assertEqual(self.advance(1.1), ['a'])
+
+    def test_expired_deadline(self):
+        self.advance(10.0)
+        self.add(-1.0, 'a')
+        # Run on the next tick.
+        self.assertEqual(self.advance(10.0), [])
+        self.assertEqual(self.advance(10.1), ['a'])
+
+    def test_cascade(self):
+        # Far enough to need every wheel.
+        delays = [30.0, 1700.0, 110000.0, 6000000.0]
+        for delay in delays:
+            self.add(delay, delay)
+        for delay in delays:
+            self.assertEqual(self.advance(delay - self.TICK), [])
+            self.assertEqual(self.advance(delay), [delay])
+
+    def test_cancel(self):
+        call = self.add(30.0, 'a')
+        self.add(30.0, 'b')
+        call.cancel()
+        self.assertEqual(self.advance(30.0), ['b'])
+
+    def test_next_tick(self):
+        self.assertEqual(self.scheduler._time_until_deadline(),
+                         schedule.Scheduler.DEFAULT_DELAY)
+        self.add(1.0, 'a')
+        self.assertAlmostEqual(self.scheduler._time_until_deadline(), 1.0)
+        self.add(0.5, 'b')
+        self.assertAlmostEqual(self.scheduler._time_until_deadline(), 0.5)
+
+    def test_next_tick_after_wrap(self):
+        # The call expires in a first wheel slot before the current one.
+        self.advance(25.0)
+        self.add(1.0, 'a')
+        self.assertAlmostEqual(self.scheduler._time_until_deadline(), 1.0)
+        self.assertEqual(self.advance(26.0), ['a'])
+
+    def add(self, delay, name):
+        call = schedule.ScheduledCall(self.now + delay,
+                                      lambda: self.called.append(name))
+        self.scheduler._add_call(call)
+        return call
+
+    def advance(self, now):
+        self.now = now
+        for call in self.scheduler._pop_expired_calls():
+            call._execute()
+        called = self.called
+        self.called = []
+        return called
+
+
+class SchedulerBenchmarkTests(VdsmTestCase):
+
+    CALLS = 500000
+
+    @stresstest
+    def test_schedule_cancel(self):
+        def noop():
+            pass
+
+        for scheduler in (schedule.Scheduler(), schedule.WheelScheduler()):
+            scheduler.start()
+            try:
+                start = time.time()
+                calls = [scheduler.schedule(1.0 + i % 20, noop)
+                         for i in range(self.CALLS)]
+                scheduled = time.time()
+                # Like periodic operations rescheduling themselves.
+                for i, call in enumerate(calls):
+                    call.cancel()
+                    scheduler.schedule(1.0 + i % 20, noop)
+                end = time.time()
+            finally:
+                scheduler.stop(wait=True)
+            print("%s: schedule %d calls: %.3f seconds, cancel and "
+                  "reschedule: %.3f seconds" % (
+                      scheduler.__class__.__name__, self.CALLS,
+                      scheduled - start, end - scheduled))
+
+
 class Task(object):
 
     def __init__(self, clock):
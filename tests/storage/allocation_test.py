@@ -0,0 +1,240 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import collections
+
+import pytest
+
+from vdsm.storage import allocation
+from vdsm.storage import constants as sc
+from vdsm.storage import qcow2
+from vdsm.storage import qemuimg
+
+from testlib import make_uuid
+
+CLUSTER = qcow2.CLUSTER_SIZE
+GB = 1024**3
+
+
+class FakeVolume(object):
+    """
+    Fake volume with qemu-img map runs.
+    """
+
+    def __init__(self, runs, size=GB, leaf=False, end=0):
+        self.sdUUID = "sd_id"
+        self.imgUUID = "img_id"
+        self.volUUID = make_uuid()
+        self.runs = runs
+        self.size = size
+        self.leaf = leaf
+        self.end = end
+        self.generation = 0
+        self.truesize = 0
+
+    def isLeaf(self):
+        return self.leaf
+
+    def getVolumePath(self):
+        return self.volUUID
+
+    def getSize(self):
+        return self.size // sc.BLOCK_SIZE
+
+    def getMetadata(self):
+        return {sc.GENERATION: self.generation}
+
+    def getVolumeTrueSize(self, bs=sc.BLOCK_SIZE):
+        return self.truesize // bs
+
+
+def data(start, length, depth=0):
+    return {"start": start, "length": length, "depth": depth, "data": True}
+
+
+def zero(start, length, depth=0):
+    return {"start": start, "length": length, "depth": depth, "data": False}
+
+
+@pytest.fixture
+def fake_qemuimg(monkeypatch):
+    volumes = {}
+    calls = collections.Counter()
+
+    def fake_map(path):
+        calls[path] += 1
+        return volumes[path].runs
+
+    def fake_check(path, format):
+        return {"offset": volumes[path].end}
+
+    def add(*vols):
+        for vol in vols:
+            volumes[vol.getVolumePath()] = vol
+
+    monkeypatch.setattr(qemuimg, "map", fake_map)
+    monkeypatch.setattr(qemuimg, "check", fake_check)
+    monkeypatch.setattr(allocation, "_cache", collections.OrderedDict())
+    add.calls = calls
+    return add
+
+
+@pytest.mark.parametrize("runs,ranges", [
+    ([], ()),
+    ([zero(0, GB)], ()),
+    # Data allocated in the backing chain.
+    ([data(0, CLUSTER, depth=1)], ()),
+    ([data(0, CLUSTER)], ((0, 1),)),
+    # Partial clusters allocate the entire cluster.
+    ([data(512, 512)], ((0, 1),)),
+    ([data(CLUSTER - 512, 1024)], ((0, 2),)),
+    # Adjacent runs are merged.
+    ([data(0, CLUSTER), zero(CLUSTER, CLUSTER, depth=1),
+      data(2 * CLUSTER, CLUSTER)],
+     ((0, 1), (2, 3))),
+    ([data(0, 512), data(512, CLUSTER)], ((0, 2),)),
+])
+def test_from_map(runs, ranges):
+    assert allocation.Clusters.from_map(runs).ranges == ranges
+
+
+@pytest.mark.parametrize("a,b,union,difference", [
+    ([], [], [], []),
+    ([(0, 4)], [], [(0, 4)], [(0, 4)]),
+    ([], [(0, 4)], [(0, 4)], []),
+    ([(0, 4)], [(0, 4)], [(0, 4)], []),
+    ([(0, 4)], [(4, 8)], [(0, 8)], [(0, 4)]),
+    ([(0, 8)], [(2, 4)], [(0, 8)], [(0, 2), (4, 8)]),
+    ([(2, 4)], [(0, 8)], [(0, 8)], []),
+    ([(0, 4), (6, 10)], [(3, 7), (9, 12)],
+     [(0, 12)], [(0, 3), (7, 9)]),
+    ([(0, 2), (4, 6), (8, 10)], [(1, 9)],
+     [(0, 10)], [(0, 1), (9, 10)]),
+])
+def test_union_difference(a, b, union, difference):
+    a = allocation.Clusters(a)
+    b = allocation.Clusters(b)
+    assert a.union(b) == allocation.Clusters(union)
+    assert a.difference(b) == allocation.Clusters(difference)
+
+
+def test_len_and_size():
+    clusters = allocation.Clusters([(0, 2), (10, 13)])
+    assert len(clusters) == 5
+    assert clusters.size() == 5 * CLUSTER
+
+
+def test_regions():
+    clusters = allocation.Clusters([(0, 1), (7, 9), (20, 21)])
+    assert clusters.regions(8) == {0, 1, 2}
+
+
+def test_leaf_not_cached(fake_qemuimg):
+    vol = FakeVolume([data(0, CLUSTER)], leaf=True)
+    fake_qemuimg(vol)
+    allocation.clusters(vol)
+    allocation.clusters(vol)
+    assert fake_qemuimg.calls[vol.getVolumePath()] == 2
+
+
+def test_internal_cached(fake_qemuimg):
+    vol = FakeVolume([data(0, CLUSTER)])
+    fake_qemuimg(vol)
+    first = allocation.clusters(vol)
+    assert allocation.clusters(vol) is first
+    assert fake_qemuimg.calls[vol.getVolumePath()] == 1
+
+
+@pytest.mark.parametrize("attr", ["generation", "truesize"])
+def test_cache_stale(fake_qemuimg, attr):
+    vol = FakeVolume([data(0, CLUSTER)])
+    fake_qemuimg(vol)
+    allocation.clusters(vol)
+    setattr(vol, attr, getattr(vol, attr) + 1)
+    vol.runs = [data(0, 2 * CLUSTER)]
+    assert len(allocation.clusters(vol)) == 2
+    assert fake_qemuimg.calls[vol.getVolumePath()] == 2
+
+
+def test_invalidate(fake_qemuimg):
+    vol = FakeVolume([data(0, CLUSTER)])
+    fake_qemuimg(vol)
+    allocation.clusters(vol)
+    allocation.invalidate("other_sd_id", vol.imgUUID)
+    allocation.clusters(vol)
+    assert fake_qemuimg.calls[vol.getVolumePath()] == 1
+    allocation.invalidate(vol.sdUUID, vol.imgUUID)
+    allocation.clusters(vol)
+    assert fake_qemuimg.calls[vol.getVolumePath()] == 2
+
+
+def test_cache_evicts_least_recently_used(fake_qemuimg, monkeypatch):
+    monkeypatch.setattr(allocation, "CACHE_SIZE", 2)
+    vols = [FakeVolume([]) for i in range(3)]
+    fake_qemuimg(*vols)
+    allocation.clusters(vols[0])
+    allocation.clusters(vols[1])
+    allocation.clusters(vols[0])
+    # Evicts vols[1], used before vols[0].
+    allocation.clusters(vols[2])
+    allocation.clusters(vols[0])
+    allocation.clusters(vols[1])
+    assert fake_qemuimg.calls[vols[0].getVolumePath()] == 1
+    assert fake_qemuimg.calls[vols[1].getVolumePath()] == 2
+
+
+def test_copy_size_empty(fake_qemuimg):
+    vol = FakeVolume([zero(0, GB)], leaf=True)
+    fake_qemuimg(vol)
+    assert allocation.copy_size([vol]) == qcow2.estimate_metadata_size(GB)
+
+
+def test_copy_size_chain(fake_qemuimg):
+    base = FakeVolume([data(0, 4 * CLUSTER)])
+    # Overwrites 2 clusters of base, 1 new cluster.
+    top = FakeVolume([data(2 * CLUSTER, 3 * CLUSTER),
+                      data(0, 2 * CLUSTER, depth=1)],
+                     size=2 * GB, leaf=True)
+    fake_qemuimg(base, top)
+    expected = qcow2.estimate_metadata_size(2 * GB) + 5 * CLUSTER
+    assert allocation.copy_size([base, top]) == expected
+
+
+def test_merge_size_rewrite(fake_qemuimg):
+    base = FakeVolume([data(0, 4 * CLUSTER)], end=10 * CLUSTER)
+    top = FakeVolume([data(CLUSTER, CLUSTER)], leaf=True)
+    fake_qemuimg(base, top)
+    assert allocation.merge_size(base, top) == 10 * CLUSTER
+
+
+def test_merge_size_append(fake_qemuimg):
+    base = FakeVolume([data(0, 4 * CLUSTER)], end=10 * CLUSTER)
+    # 2 new clusters in the same L2 table region as base, and 1 new cluster
+    # in a region not mapped by base.
+    top = FakeVolume([data(3 * CLUSTER, 3 * CLUSTER),
+                      data(allocation.L2_CLUSTERS * CLUSTER, CLUSTER)],
+                     leaf=True)
+    fake_qemuimg(base, top)
+    # 3 data clusters, 1 L2 table, 2 refcount blocks, L1 table and refcount
+    # table.
+    expected = 10 * CLUSTER + (3 + 1 + 2 + 1 + 1) * CLUSTER
+    assert allocation.merge_size(base, top) == expected
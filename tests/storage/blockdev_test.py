@@ -20,6 +20,8 @@
 
 import io
 import os
+import threading
+import time
 
 from contextlib import contextmanager
 
@@ -47,7 +49,7 @@ def loop_device(tmpdir):
         yield loop_device
 
 
-@pytest.fixture(params=["dd", "blkdiscard"])
+@pytest.fixture(params=["native", "dd", "blkdiscard"])
 def zero_method(request, monkeypatch):
     cfg = make_config([('irs', 'zero_method', request.param)])
     monkeypatch.setattr(blockdev, "config", cfg)
@@ -106,6 +108,32 @@ class TestZero:
             data = f.read(FILE_SIZE)
             assert data == b"x" * FILE_SIZE
 
+    def test_file_native(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(blockdev, "config", make_config(
+            [('irs', 'zero_method', 'native')]))
+        path = str(tmpdir.join("file"))
+        with io.open(path, "wb") as f:
+            f.write(b"x" * FILE_SIZE)
+        blockdev.zero(path, size=OPTIMAL_BLOCK_SIZE)
+        with io.open(path, "rb") as f:
+            data = f.read(OPTIMAL_BLOCK_SIZE)
+            assert data == b"\0" * OPTIMAL_BLOCK_SIZE
+            data = f.read(OPTIMAL_BLOCK_SIZE)
+            assert data == b"x" * OPTIMAL_BLOCK_SIZE
+
+    def test_invalid_method(self, monkeypatch):
+        monkeypatch.setattr(blockdev, "config", make_config(
+            [('irs', 'zero_method', 'invalid')]))
+        with pytest.raises(exception.InvalidConfiguration):
+            blockdev.zero("/no/such/path", size=OPTIMAL_BLOCK_SIZE)
+
+    def test_error(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(blockdev, "config", make_config(
+            [('irs', 'zero_method', 'native')]))
+        path = str(tmpdir.join("no-such-file"))
+        with pytest.raises(se.VolumesZeroingError):
+            blockdev.zero(path, size=OPTIMAL_BLOCK_SIZE)
+
     @pytest.mark.parametrize("size", [
         (FILE_SIZE - 1),
         (FILE_SIZE + 1),
@@ -115,6 +143,61 @@ class TestZero:
             blockdev.zero("/no/such/path", size=size)
 
 
+class TestLimit:
+
+    @pytest.mark.parametrize("limit", [1, 2])
+    def test_concurrency(self, limit, monkeypatch):
+        monkeypatch.setattr(blockdev, "config", make_config(
+            [('irs', 'zero_method', 'native'),
+             ('irs', 'zero_concurrency', str(limit))]))
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def fake_zero(device_path, size, task):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        monkeypatch.setattr(blockdev, "_zero_native", fake_zero)
+        threads = [threading.Thread(target=blockdev.zero, args=("/path",),
+                                    kwargs={"size": sc.BLOCK_SIZE})
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert max_running[0] == limit
+
+    def test_abort_waiting(self, monkeypatch):
+        monkeypatch.setattr(blockdev, "config", make_config(
+            [('irs', 'zero_method', 'native'),
+             ('irs', 'zero_concurrency', '1')]))
+        release = threading.Event()
+
+        def fake_zero(device_path, size, task):
+            release.wait(2)
+
+        monkeypatch.setattr(blockdev, "_zero_native", fake_zero)
+        t = threading.Thread(target=blockdev.zero, args=("/path",),
+                             kwargs={"size": sc.BLOCK_SIZE})
+        t.start()
+        try:
+            time.sleep(0.05)
+            task = AbortableTask()
+            threading.Timer(0.1, task.abort).start()
+            start = time.time()
+            with pytest.raises(exception.ActionStopped):
+                blockdev.zero("/path", size=sc.BLOCK_SIZE, task=task)
+            assert time.time() - start < 1
+        finally:
+            release.set()
+            t.join()
+
+
 class TestDiscard:
 
     def test_not_supported(self):
@@ -145,3 +228,21 @@ class AbortingTask(object):
         # it was started.
         cb()
         yield
+
+
+class AbortableTask(object):
+
+    def __init__(self):
+        self._callbacks = set()
+
+    @contextmanager
+    def abort_callback(self, cb):
+        self._callbacks.add(cb)
+        try:
+            yield
+        finally:
+            self._callbacks.discard(cb)
+
+    def abort(self):
+        for cb in list(self._callbacks):
+            cb()
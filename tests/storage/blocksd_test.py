@@ -23,11 +23,14 @@ import collections
 import os
 
 from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatchScope
 from testValidation import xfail
 from testlib import VdsmTestCase
 
 from vdsm.storage import blockSD
+from vdsm.storage import constants as sc
 from vdsm.storage import lvm
+from vdsm.storage import sd
 from vdsm import constants
 
 # Make it easy to test the values we care about
@@ -113,3 +116,76 @@ class TestDecodeValidity(VdsmTestCase):
     def test_decode_pv_comma(self):
         pvinfo = blockSD.decodePVInfo('pv:my,name')
         self.assertEqual(pvinfo["guid"], 'my,name')
+
+
+class FakeManifest(blockSD.BlockStorageDomainManifest):
+
+    def __init__(self, sd_id, all_vols):
+        self.sdUUID = sd_id
+        self.all_vols = all_vols
+
+    def getAllVolumes(self):
+        return self.all_vols
+
+
+class FakeBlockSD(blockSD.BlockStorageDomain):
+
+    def __init__(self, manifest):
+        self._manifest = manifest
+        self.links = []
+        self.removed_links = []
+
+    def createImageLinks(self, srcImgPath, imgUUID, volUUIDs):
+        self.links.append((srcImgPath, imgUUID, volUUIDs))
+        return os.path.join("/run", imgUUID)
+
+    def removeImageLinks(self, imgUUID):
+        self.removed_links.append(imgUUID)
+
+
+class TestActivateImages(VdsmTestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.sd_id = "sd"
+        # Two images based on a template.
+        all_vols = {
+            "template": sd.ImgsPar(("template-img", "img1", "img2"),
+                                   sc.BLANK_UUID),
+            "vol1": sd.ImgsPar(("img1",), "template"),
+            "vol2": sd.ImgsPar(("img2",), "template"),
+        }
+        self.dom = FakeBlockSD(FakeManifest(self.sd_id, all_vols))
+
+    def activateLVs(self, vgName, lvNames):
+        self.calls.append(("activate", vgName, list(lvNames)))
+
+    def deactivateLVs(self, vgName, lvNames):
+        self.calls.append(("deactivate", vgName, sorted(lvNames)))
+
+    def test_activate_images(self):
+        images = {"img1": ["template", "vol1"], "img2": ["template", "vol2"]}
+        with MonkeyPatchScope([(lvm, "activateLVs", self.activateLVs)]):
+            paths = self.dom.activateImages(images)
+        self.assertEqual(len(self.calls), 1)
+        op, vg, lvs = self.calls[0]
+        self.assertEqual(vg, self.sd_id)
+        self.assertEqual(sorted(lvs), ["template", "vol1", "vol2"])
+        self.assertEqual(paths, {"img1": "/run/img1", "img2": "/run/img2"})
+        self.assertEqual(sorted(img for _, img, _ in self.dom.links),
+                         ["img1", "img2"])
+
+    def test_activate_volumes(self):
+        with MonkeyPatchScope([(lvm, "activateLVs", self.activateLVs)]):
+            path = self.dom.activateVolumes("img1", ["template", "vol1"])
+        self.assertEqual(self.calls,
+                         [("activate", self.sd_id, ["template", "vol1"])])
+        self.assertEqual(path, "/run/img1")
+
+    def test_deactivate_images(self):
+        with MonkeyPatchScope([(lvm, "deactivateLVs", self.deactivateLVs)]):
+            self.dom.deactivateImages(["img1", "img2"])
+        # The template is used by other images.
+        self.assertEqual(self.calls,
+                         [("deactivate", self.sd_id, ["vol1", "vol2"])])
+        self.assertEqual(self.dom.removed_links, ["img1", "img2"])
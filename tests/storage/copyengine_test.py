@@ -0,0 +1,265 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import threading
+import time
+
+import pytest
+
+from vdsm.common.exception import ActionStopped
+from vdsm.storage import copyengine
+from vdsm.storage import qemuimg
+
+from testlib import make_config
+from testlib import make_uuid
+
+
+class Counter(object):
+    """
+    Count the operations running at the same time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.now = 0
+        self.max = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.now += 1
+            self.max = max(self.max, self.now)
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.now -= 1
+
+
+class FakeOperation(object):
+    """
+    Fake qemuimg.ProgressCommand copying for duration seconds.
+    """
+
+    def __init__(self, counter=None, duration=0.0, error=None):
+        self.counter = counter or Counter()
+        self.duration = duration
+        self.error = error
+        self.progress = 0.0
+        self.started = threading.Event()
+        self._aborted = threading.Event()
+
+    def run(self):
+        if self._aborted.is_set():
+            raise ActionStopped()
+        self.started.set()
+        with self.counter:
+            if self._aborted.wait(self.duration):
+                raise ActionStopped()
+            if self.error:
+                raise self.error
+            self.progress = 100.0
+
+    def abort(self):
+        self._aborted.set()
+
+
+@pytest.fixture
+def parallelism(monkeypatch, request):
+    limit = getattr(request, "param", 4)
+    monkeypatch.setattr(copyengine, "config", make_config(
+        [("irs", "copy_parallelism", str(limit))]))
+    monkeypatch.setattr(copyengine, "_slots", {})
+    return limit
+
+
+@pytest.fixture
+def counter():
+    return Counter()
+
+
+def make_copies(count, counter=None, size=1024, duration=0.0):
+    return [copyengine.Copy("vol%d" % i, size,
+                            FakeOperation(counter, duration=duration))
+            for i in range(count)]
+
+
+def test_run_sequential(parallelism):
+    copies = make_copies(1)
+    engine = copyengine.Engine(make_uuid(), copies)
+    engine.run()
+    assert all(c.done for c in copies)
+    assert engine.progress == 100.0
+
+
+@pytest.mark.parametrize("parallelism", [1, 2, 4], indirect=True)
+def test_run_concurrently(parallelism, counter):
+    copies = make_copies(8, counter, duration=0.05)
+    engine = copyengine.Engine(make_uuid(), copies)
+    start = time.time()
+    engine.run()
+    elapsed = time.time() - start
+    assert all(c.done for c in copies)
+    assert counter.max == parallelism
+    # 8 copies of 0.05 seconds
+    assert elapsed < 8 * 0.05 / parallelism + 0.2
+
+
+@pytest.mark.parametrize("parallelism", [2], indirect=True)
+def test_limit_shared_by_domain(parallelism, counter):
+    sd_id = make_uuid()
+    engines = [copyengine.Engine(sd_id,
+                                 make_copies(4, counter, duration=0.05))
+               for i in range(3)]
+    threads = [threading.Thread(target=e.run) for e in engines]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.max == parallelism
+
+
+@pytest.mark.parametrize("parallelism", [1], indirect=True)
+def test_domains_are_independent(parallelism, counter):
+    engines = [copyengine.Engine(make_uuid(),
+                                 make_copies(1, counter, duration=0.1))
+               for i in range(2)]
+    threads = [threading.Thread(target=e.run) for e in engines]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.max == 2
+
+
+def test_failure_aborts_other_copies(parallelism):
+    error = RuntimeError("copy failed")
+    copies = make_copies(8, duration=2)
+    copies[1].operation = FakeOperation(duration=0.05, error=error)
+    engine = copyengine.Engine(make_uuid(), copies)
+    start = time.time()
+    with pytest.raises(RuntimeError) as e:
+        engine.run()
+    assert e.value is error
+    assert time.time() - start < 1
+    assert not any(c.done for c in copies)
+
+
+def test_abort(parallelism):
+    copies = make_copies(8, duration=2)
+    engine = copyengine.Engine(make_uuid(), copies)
+    threading.Timer(0.1, engine.abort).start()
+    start = time.time()
+    with pytest.raises(ActionStopped):
+        engine.run()
+    assert time.time() - start < 1
+
+
+def test_abort_before_run(parallelism):
+    copies = make_copies(2)
+    engine = copyengine.Engine(make_uuid(), copies)
+    engine.abort()
+    with pytest.raises(ActionStopped):
+        engine.run()
+    assert not any(c.operation.started.is_set() for c in copies)
+
+
+@pytest.mark.parametrize("parallelism", [1], indirect=True)
+def test_abort_waiting_for_slot(parallelism):
+    sd_id = make_uuid()
+    running = copyengine.Engine(sd_id, make_copies(1, duration=2))
+    errors = []
+
+    def run():
+        try:
+            running.run()
+        except Exception as e:
+            errors.append(e)
+
+    t = threading.Thread(target=run)
+    t.start()
+    try:
+        copies = make_copies(1)
+        waiting = copyengine.Engine(sd_id, copies)
+        threading.Timer(0.1, waiting.abort).start()
+        with pytest.raises(ActionStopped):
+            waiting.run()
+        assert not copies[0].operation.started.is_set()
+    finally:
+        running.abort()
+        t.join()
+    assert len(errors) == 1
+    assert isinstance(errors[0], ActionStopped)
+
+
+def test_progress(parallelism):
+    copies = make_copies(3, size=1000)
+    copies[0].done = True
+    copies[1].operation.progress = 50.0
+    engine = copyengine.Engine(make_uuid(), copies)
+    assert engine.progress == 50.0
+
+
+def test_progress_weighted_by_size(parallelism):
+    copies = [copyengine.Copy("small", 100, FakeOperation()),
+              copyengine.Copy("large", 900, FakeOperation())]
+    copies[1].done = True
+    engine = copyengine.Engine(make_uuid(), copies)
+    assert engine.progress == 90.0
+
+
+def test_progress_empty_volumes(parallelism):
+    copies = make_copies(2, size=0)
+    copies[0].done = True
+    engine = copyengine.Engine(make_uuid(), copies)
+    assert engine.progress == 50.0
+
+
+def test_throughput_and_eta(parallelism, monkeypatch):
+    copies = make_copies(2, size=1000)
+    engine = copyengine.Engine(make_uuid(), copies)
+    assert engine.throughput is None
+    assert engine.eta is None
+
+    now = [100.0]
+    monkeypatch.setattr(copyengine.time, "monotonic_time", lambda: now[0])
+    engine._started = now[0]
+    now[0] += 10
+    copies[0].done = True
+    copies[1].operation.progress = 50.0
+    # 1500 bytes in 10 seconds, 500 bytes remaining.
+    assert engine.throughput == 150
+    assert engine.eta == 3
+
+
+@pytest.mark.parametrize("tunables,dst_format,backing,expected", [
+    ([], qemuimg.FORMAT.RAW, None, {}),
+    ([("copy_coroutines", "8")], qemuimg.FORMAT.QCOW2, "bak",
+     {"coroutines": 8}),
+    ([("copy_unordered_writes", "true")], qemuimg.FORMAT.RAW, None,
+     {"unorderedWrites": True}),
+    ([("copy_unordered_writes", "true")], qemuimg.FORMAT.QCOW2, None, {}),
+    ([("copy_unordered_writes", "true")], qemuimg.FORMAT.RAW, "bak", {}),
+])
+def test_convert_options(monkeypatch, tunables, dst_format, backing,
+                         expected):
+    config = make_config([("irs",) + t for t in tunables])
+    monkeypatch.setattr(copyengine, "config", config)
+    assert copyengine.convert_options(dst_format, backing) == expected
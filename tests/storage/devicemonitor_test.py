@@ -0,0 +1,207 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import threading
+import time
+
+import pytest
+from six.moves import queue
+
+from vdsm import udevadm
+from vdsm.storage import devicemonitor
+from vdsm.storage import sdc
+
+MONITOR_OUTPUT = """\
+monitor will print the received events for:
+UDEV - the event which udev sends out after rule processing
+
+UDEV  [1200.5] add      /devices/virtual/block/dm-3 (block)
+ACTION=add
+DEVNAME=/dev/dm-3
+DEVPATH=/devices/virtual/block/dm-3
+DEVTYPE=disk
+SEQNUM=2301
+SUBSYSTEM=block
+
+UDEV  [1200.6] change   /devices/virtual/block/dm-3 (block)
+ACTION=change
+DEVNAME=/dev/dm-3
+DM_NAME=360014052b6d8ac4b4a14e5eb8b3c4a2b
+SEQNUM=2302
+SUBSYSTEM=block
+
+"""
+
+
+class FakeMonitor(object):
+
+    def __init__(self, error=None):
+        self.events = queue.Queue()
+        self.error = error
+
+    def start(self):
+        if self.error:
+            raise self.error
+
+    def stop(self):
+        self.events.put(None)
+
+    def __iter__(self):
+        for event in iter(self.events.get, None):
+            yield event
+
+
+class FakeKernel(object):
+    """
+    Emit udev events, like the kernel and udev.
+    """
+
+    def __init__(self, path, monitor):
+        self.path = path
+        self.monitor = monitor
+        self.seqnum = 0
+        path.write("0\n")
+
+    def emit(self, action, devname, subsystem="block", deliver=True):
+        self.seqnum += 1
+        self.path.write("%d\n" % self.seqnum)
+        event = udevadm.Event(action, {
+            "ACTION": action,
+            "DEVNAME": "/dev/" + devname,
+            "SEQNUM": str(self.seqnum),
+            "SUBSYSTEM": subsystem,
+        })
+        if deliver:
+            self.monitor.events.put(event)
+        return event
+
+
+@pytest.fixture
+def tracker(monkeypatch, tmpdir):
+    seqnum = tmpdir.join("uevent_seqnum")
+    monkeypatch.setattr(devicemonitor, "SEQNUM_PATH", str(seqnum))
+    monkeypatch.setattr(devicemonitor, "SYNC_TIMEOUT", 0.5)
+    fake = FakeMonitor()
+    kernel = FakeKernel(seqnum, fake)
+    dm = devicemonitor.DeviceMonitor(fake)
+    dm.start()
+    # Changes before the first call are unknown.
+    assert dm.changes() is None
+    yield dm, kernel
+    dm.stop()
+
+
+def test_parse_events():
+    events = list(udevadm._parse_events(MONITOR_OUTPUT.splitlines(True)))
+    assert [e.action for e in events] == ["add", "change"]
+    assert events[1].properties["DM_NAME"] == \
+        "360014052b6d8ac4b4a14e5eb8b3c4a2b"
+    assert events[1].properties["SEQNUM"] == "2302"
+
+
+def test_no_changes(tracker):
+    dm, kernel = tracker
+    assert dm.changes() == devicemonitor.Changes(
+        frozenset(), frozenset(), frozenset())
+
+
+def test_changes(tracker):
+    dm, kernel = tracker
+    kernel.emit("add", "sdb")
+    kernel.emit("remove", "sdc")
+    kernel.emit("change", "dm-1")
+    kernel.emit("add", "ttyS0", subsystem="tty")
+    changes = dm.changes()
+    assert changes.added == {"sdb"}
+    assert changes.removed == {"sdc"}
+    assert changes.changed == {"dm-1"}
+    # Changes are reported once.
+    assert not any(dm.changes())
+
+
+def test_wait_for_events(tracker):
+    dm, kernel = tracker
+    # Emitted by the kernel, not yet sent by udev.
+    event = kernel.emit("add", "sdb", deliver=False)
+    threading.Timer(0.1, kernel.monitor.events.put, args=(event,)).start()
+    assert dm.changes().added == {"sdb"}
+
+
+def test_missed_event(tracker):
+    dm, kernel = tracker
+    kernel.emit("add", "sdb", deliver=False)
+    assert dm.changes() is None
+    # Tracking continues after the missed event.
+    kernel.emit("add", "sdc")
+    assert dm.changes().added == {"sdc"}
+
+
+def test_missed_event_with_later_events(tracker):
+    dm, kernel = tracker
+    kernel.emit("add", "sda")
+    assert dm.changes().added == {"sda"}
+    kernel.emit("add", "sdb", deliver=False)
+    # Received while waiting for the missed event.
+    threading.Timer(0.1, kernel.emit, args=("add", "sdc")).start()
+    assert dm.changes() is None
+    # The later event is not waited for again.
+    start = time.time()
+    assert dm.changes() is not None
+    assert time.time() - start < devicemonitor.SYNC_TIMEOUT
+
+
+def test_not_running(tracker):
+    dm, kernel = tracker
+    kernel.monitor.stop()
+    kernel.emit("add", "sdb", deliver=False)
+    assert dm.changes() is None
+
+
+def test_stop_not_started():
+    dm = devicemonitor.DeviceMonitor(FakeMonitor())
+    dm.stop()
+    assert not dm.running
+
+
+def test_start_failure(monkeypatch, tmpdir):
+    seqnum = tmpdir.join("uevent_seqnum")
+    seqnum.write("0\n")
+    monkeypatch.setattr(devicemonitor, "SEQNUM_PATH", str(seqnum))
+    monkeypatch.setattr(udevadm, "Monitor",
+                        lambda: FakeMonitor(RuntimeError()))
+    monkeypatch.setattr(devicemonitor, "_monitor", None)
+    with pytest.raises(RuntimeError):
+        devicemonitor.start()
+    # Shutting down must not fail.
+    devicemonitor.stop()
+    assert devicemonitor.changes() is None
+
+
+@pytest.mark.parametrize("changes,result", [
+    (devicemonitor.Changes(set(), set(), set()), False),
+    (devicemonitor.Changes(set(), set(), {"sdb"}), False),
+    (devicemonitor.Changes(set(), set(), {"dm-2"}), True),
+    (devicemonitor.Changes({"sdb"}, set(), set()), True),
+    (devicemonitor.Changes(set(), {"sdb"}, set()), True),
+])
+def test_devices_changed(changes, result):
+    assert sdc._devicesChanged(changes) == result
@@ -0,0 +1,72 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import pytest
+
+from vdsm.storage import hba
+
+
+@pytest.fixture
+def fc_hosts(monkeypatch, tmpdir):
+    monkeypatch.setattr(hba, "FC_HOSTS_DIR", str(tmpdir))
+    monkeypatch.setattr(hba, "_fcHosts", {})
+
+    def add(host, wwpn):
+        fch = tmpdir.mkdir(host)
+        fch.join(hba.PORT_NAME).write("0x%s\n" % wwpn)
+        fch.join(hba.NODE_NAME).write("0x20000000c9000001\n")
+        scsi_host = fch.mkdir("device").mkdir("scsi_host").mkdir(host)
+        scsi_host.join("modelname").write("LPe12002\n")
+        scsi_host.join("modeldesc").write("Emulex 8Gb FC HBA\n")
+        return fch
+
+    return add
+
+
+def test_fc_initiators(fc_hosts):
+    fc_hosts("host1", "10000000c9000001")
+    assert hba.getFCInitiators() == [{
+        "wwpn": "10000000c9000001",
+        "wwnn": "20000000c9000001",
+        "model": "LPe12002 - Emulex 8Gb FC HBA",
+    }]
+
+
+def test_fc_initiators_read_once(fc_hosts):
+    fch = fc_hosts("host1", "10000000c9000001")
+    hba.getFCInitiators()
+    fch.join(hba.PORT_NAME).write("0x10000000c9000002\n")
+    assert hba.getFCInitiators()[0]["wwpn"] == "10000000c9000001"
+
+
+def test_fc_initiators_hosts_changed(fc_hosts, tmpdir):
+    fc_hosts("host1", "10000000c9000001")
+    hba.getFCInitiators()
+    tmpdir.join("host1").remove()
+    fc_hosts("host2", "10000000c9000002")
+    wwpns = [h["wwpn"] for h in hba.getFCInitiators()]
+    assert wwpns == ["10000000c9000002"]
+
+
+def test_no_fc_hosts(monkeypatch, tmpdir):
+    monkeypatch.setattr(hba, "FC_HOSTS_DIR", str(tmpdir.join("missing")))
+    assert hba.getFCInitiators() == []
@@ -35,6 +35,8 @@ from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 from vdsm.storage import hsm
 from vdsm.storage import qemuimg
+from vdsm.storage import sd
+from vdsm.storage.constants import STORAGE
 
 
 class FakeHSM(hsm.HSM):
@@ -141,3 +143,179 @@ class TestVerifyUntrustedVolume(VdsmTestCase):
             make_file_volume(env.sd_manifest, self.SIZE, img_id, vol_id,
                              vol_format=vol_fmt)
             yield env.sd_manifest.produceVolume(img_id, vol_id)
+
+
+class FakeTask(object):
+
+    def __init__(self):
+        self.locks = []
+
+    def getSharedLock(self, namespace, name):
+        self.locks.append((namespace, name))
+
+
+class FakeThreadLocal(object):
+
+    def __init__(self, task):
+        self.task = task
+
+
+class FakeLease(object):
+    path = None
+    offset = None
+
+
+class FakeVolume(object):
+
+    def __init__(self, legality=sc.LEGAL_VOL):
+        self.legality = legality
+
+    def getLegality(self):
+        return self.legality
+
+    def getVmVolumeInfo(self):
+        return {"type": "file"}
+
+
+class FakeDomain(object):
+    """
+    Fake domain with a template volume, and images based on the template.
+    """
+
+    def __init__(self, sd_id, images):
+        self.sdUUID = sd_id
+        self.domaindir = "/rhev/" + sd_id
+        self.template_id = make_uuid()
+        self.volumes = {}
+        self.activated = []
+        self.deactivated = []
+        self.unlinked = []
+        all_images = tuple(images)
+        self.all_volumes = {
+            self.template_id: sd.ImgsPar(all_images, sc.BLANK_UUID)}
+        for img_id, vol_id in images.items():
+            self.all_volumes[vol_id] = sd.ImgsPar((img_id,),
+                                                  self.template_id)
+
+    def getAllVolumes(self):
+        return self.all_volumes
+
+    def produceVolume(self, img_id, vol_id):
+        return self.volumes.setdefault(vol_id, FakeVolume())
+
+    def activateImages(self, images):
+        self.activated.append(images)
+        return {img_id: "/run/%s/%s" % (self.sdUUID, img_id)
+                for img_id in images}
+
+    def deactivateImages(self, img_ids):
+        self.deactivated.append(img_ids)
+
+    def linkBCImage(self, img_path, img_id):
+        return "/rhev/pool/%s/images/%s" % (self.sdUUID, img_id)
+
+    def unlinkBCImage(self, img_id):
+        self.unlinked.append(img_id)
+
+    def getVolumeLease(self, img_id, vol_id):
+        return FakeLease()
+
+
+class FakeSDCache(object):
+
+    def __init__(self, domains):
+        self.domains = {dom.sdUUID: dom for dom in domains}
+
+    def produce(self, sdUUID):
+        return self.domains[sdUUID]
+
+
+class TestPrepareImages(VdsmTestCase):
+
+    def setUp(self):
+        self.task = FakeTask()
+        self.images = {}
+        self.domains = []
+        for i in range(2):
+            images = {make_uuid(): make_uuid() for j in range(3)}
+            self.images.update(images)
+            self.domains.append(FakeDomain(make_uuid(), images))
+        self.hsm = FakeHSM()
+
+    def drives(self):
+        return [{'domainID': dom.sdUUID, 'poolID': sd.BLANK_UUID,
+                 'imageID': img_id, 'volumeID': self.images[img_id]}
+                for dom in self.domains
+                for img_id in dom.getAllVolumes()[dom.template_id].imgs]
+
+    @contextmanager
+    def fake_env(self):
+        with MonkeyPatchScope([
+            (hsm, 'sdCache', FakeSDCache(self.domains)),
+            (hsm, 'vars', FakeThreadLocal(self.task)),
+        ]):
+            yield
+
+    def test_activate_once_per_domain(self):
+        drives = self.drives()
+        with self.fake_env():
+            res = self.hsm.prepareImages(drives)
+
+        for dom in self.domains:
+            self.assertEqual(len(dom.activated), 1)
+            activated = dom.activated[0]
+            self.assertEqual(len(activated), 3)
+            for img_id, vol_ids in activated.items():
+                self.assertEqual(sorted(vol_ids),
+                                 sorted([dom.template_id,
+                                         self.images[img_id]]))
+
+        self.assertEqual(sorted(self.task.locks),
+                         sorted((STORAGE, dom.sdUUID)
+                                for dom in self.domains))
+
+        # Results are in the order of the drives.
+        self.assertEqual(len(res['images']), len(drives))
+        for drive, img in zip(drives, res['images']):
+            self.assertEqual(img['path'], "/run/%s/%s/%s" % (
+                drive['domainID'], drive['imageID'], drive['volumeID']))
+            vol_ids = sorted(v['volumeID'] for v in img['imgVolumesInfo'])
+            self.assertIn(drive['volumeID'], vol_ids)
+
+    def test_missing_leaf(self):
+        drives = self.drives()
+        drives[-1]['volumeID'] = make_uuid()
+        with self.fake_env():
+            self.assertRaises(se.VolumeDoesNotExist,
+                              self.hsm.prepareImages, drives)
+
+    def test_illegal_volume(self):
+        drives = self.drives()
+        dom = self.domains[0]
+        dom.volumes[dom.template_id] = FakeVolume(sc.ILLEGAL_VOL)
+        with self.fake_env():
+            self.assertRaises(se.prepareIllegalVolumeError,
+                              self.hsm.prepareImages, drives)
+            self.assertEqual(dom.activated, [])
+            res = self.hsm.prepareImages(drives, allowIllegal=True)
+        self.assertEqual(len(res['images']), len(drives))
+
+    def test_prepare_image(self):
+        drive = self.drives()[0]
+        with self.fake_env():
+            res = self.hsm.prepareImage(drive['domainID'], drive['poolID'],
+                                        drive['imageID'], drive['volumeID'])
+        dom = self.domains[0]
+        self.assertEqual(list(dom.activated[0]), [drive['imageID']])
+        self.assertEqual(res['path'], "/run/%s/%s/%s" % (
+            drive['domainID'], drive['imageID'], drive['volumeID']))
+
+    def test_teardown_once_per_domain(self):
+        drives = self.drives()
+        with self.fake_env():
+            self.hsm.teardownImages(drives)
+        for dom in self.domains:
+            img_ids = [d['imageID'] for d in drives
+                       if d['domainID'] == dom.sdUUID]
+            self.assertEqual(dom.deactivated, [img_ids])
+            self.assertEqual(dom.unlinked, img_ids)
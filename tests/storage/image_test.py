@@ -74,9 +74,20 @@ class TestCalculateVolAlloc(VdsmTestCase):
         (dict(size=GB_IN_BLK * 2,
               volFormat=sc.COW_FORMAT,
               apparentsize=GB_IN_BLK,
-              parent=sc.BLANK_UUID),
+              parent=sc.BLANK_UUID,
+              imgUUID="imgUUID",
+              volUUID="volUUID"),
          sc.COW_FORMAT,
          GB_IN_BLK),
+        # copy single cow with unused clusters to cow, using estimated size
+        (dict(size=GB_IN_BLK * 2,
+              volFormat=sc.COW_FORMAT,
+              apparentsize=GB_IN_BLK * 3,
+              parent=sc.BLANK_UUID,
+              imgUUID="imgUUID",
+              volUUID="volUUID"),
+         sc.COW_FORMAT,
+         GB_IN_BLK * 2.25),
         # copy qcow chain to cow, using estimated chain size
         (dict(size=GB_IN_BLK * 2,
               volFormat=sc.COW_FORMAT,
@@ -1,3 +1,4 @@
+import errno
 import os
 from contextlib import contextmanager
 
@@ -192,3 +193,83 @@ class TestIscsiTarget(VdsmTestCase):
                 3260),
             2, "iqn.2014-06.com.example:t1")
         self.assertEqual(target.address, "[3ffe:2a00:100:7031::1]:3260,2")
+
+
+class FakeSupervdsm(object):
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.calls = []
+
+    def readSessionsInfo(self, session_ids):
+        self.calls.append(session_ids)
+        return {sid: self.sessions[sid] for sid in session_ids
+                if sid in self.sessions}
+
+
+def make_session(sid):
+    portal = iscsi.IscsiPortal("10.0.0.1", 3260)
+    target = iscsi.IscsiTarget(portal, 1, "iqn.2017-01.com.example:%d" % sid)
+    return iscsi.IscsiSession(sid, iscsi.IscsiInterface("default"), target,
+                              None)
+
+
+@pytest.fixture
+def fake_sessions(monkeypatch, tmpdir):
+    sessions = {}
+    proxy = FakeSupervdsm(sessions)
+
+    def add(sid):
+        sessions[sid] = make_session(sid)
+        tmpdir.mkdir("session%d" % sid)
+
+    def remove(sid):
+        del sessions[sid]
+        tmpdir.join("session%d" % sid).remove()
+
+    monkeypatch.setattr(iscsi, "ISCSI_SESSIONS_DIR", str(tmpdir))
+    monkeypatch.setattr(iscsi, "_sessions", {})
+    monkeypatch.setattr(iscsi.supervdsm, "getProxy", lambda: proxy)
+    add.remove = remove
+    add.calls = proxy.calls
+    return add
+
+
+def session_ids(sessions):
+    return [session.id for session in sessions]
+
+
+def test_iterate_sessions_read_once(fake_sessions):
+    fake_sessions(1)
+    fake_sessions(2)
+    assert session_ids(iscsi.iterateIscsiSessions()) == [1, 2]
+    assert session_ids(iscsi.iterateIscsiSessions()) == [1, 2]
+    assert fake_sessions.calls == [[1, 2]]
+
+
+def test_iterate_sessions_changed(fake_sessions):
+    fake_sessions(1)
+    fake_sessions(2)
+    list(iscsi.iterateIscsiSessions())
+    fake_sessions.remove(1)
+    fake_sessions(3)
+    assert session_ids(iscsi.iterateIscsiSessions()) == [2, 3]
+    assert fake_sessions.calls == [[1, 2], [3]]
+
+
+def test_iterate_sessions_removed_while_reading(fake_sessions, tmpdir):
+    fake_sessions(1)
+    # The session directory exists, but the session is gone when read.
+    tmpdir.mkdir("session2")
+    assert session_ids(iscsi.iterateIscsiSessions()) == [1]
+
+
+def test_read_sessions_info_skips_missing(monkeypatch):
+    def read(sid):
+        if sid == 2:
+            raise OSError(errno.ENOENT, "No such session")
+        return make_session(sid)
+
+    monkeypatch.setattr(iscsi, "readSessionInfo", read)
+    sessions = iscsi.readSessionsInfo([1, 2])
+    assert list(sessions) == [1]
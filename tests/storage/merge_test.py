@@ -19,6 +19,7 @@
 #
 
 from __future__ import absolute_import
+import os
 from contextlib import contextmanager
 from collections import namedtuple
 from functools import partial
@@ -108,12 +109,26 @@ def make_env(env_type, base, top):
             env.lvm.extendLV(env.sd_manifest.sdUUID, top_id,
                              top.physical * GB / MB)
 
+        # Simulate qcow2 images with data at the start of the image.
+        allocated = {base_id: base.physical * GB, top_id: top.physical * GB}
+
+        def fake_map(path):
+            length = allocated[os.path.basename(path)]
+            if length == 0:
+                return []
+            return [{"start": 0, "length": length, "depth": 0, "data": True}]
+
+        def fake_check(path, format=None):
+            return {"offset": allocated[os.path.basename(path)]}
+
         rm = FakeResourceManager()
         with MonkeyPatchScope([
             (guarded, 'context', fake_guarded_context()),
             (merge, 'sdCache', env.sdcache),
             (blockVolume, 'rm', rm),
             (blockVolume, 'sdCache', env.sdcache),
+            (qemuimg, 'map', fake_map),
+            (qemuimg, 'check', fake_check),
             (image.Image, 'getChain', lambda self, sdUUID, imgUUID:
                 [env.subchain.base_vol, env.subchain.top_vol]),
             (blockVolume.BlockVolume, 'extendSize',
@@ -232,10 +247,14 @@ class TestPrepareMerge(VdsmTestCase):
     @permutations((
         # No capacity update, no allocation update
         (Volume('raw', 1, 1), Volume('cow', 1, 1), Expected(1, 1)),
-        # No capacity update, increase LV size
-        (Volume('cow', 10, 2), Volume('cow', 10, 2), Expected(10, 5)),
-        # Update capacity and increase LV size
-        (Volume('cow', 3, 1), Volume('cow', 5, 1), Expected(5, 3)),
+        # No capacity update, top data rewritten in base, add leaf chunk
+        (Volume('cow', 10, 2), Volume('cow', 10, 2), Expected(10, 3)),
+        # Update capacity, top data rewritten in base, add leaf chunk
+        (Volume('cow', 3, 1), Volume('cow', 5, 1), Expected(5, 2)),
+        # Append 2 GiB of top data and 9 metadata clusters (4 L2 tables,
+        # 3 refcount blocks, L1 table and refcount table), add leaf chunk,
+        # rounded up to extent size
+        (Volume('cow', 10, 1), Volume('cow', 10, 3), Expected(10, 4.125)),
     ))
     def test_block_cow(self, base, top, expected):
         with make_env('block', base, top) as env:
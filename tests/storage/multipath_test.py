@@ -0,0 +1,112 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import pytest
+
+from testlib import make_config
+
+from vdsm.storage import multipath
+
+
+class FakeSupervdsm(object):
+
+    def __init__(self, serials):
+        self.serials = serials
+        self.calls = []
+
+    def getProxy(self):
+        return self
+
+    def getScsiSerials(self, devs):
+        self.calls.append(devs)
+        return {dev: self.serials.get(dev, "") for dev in devs}
+
+
+@pytest.fixture
+def fake_supervdsm(monkeypatch):
+    svdsm = FakeSupervdsm({"dm-1": "serial-1", "dm-2": "serial-2"})
+    monkeypatch.setattr(multipath, "supervdsm", svdsm)
+    monkeypatch.setattr(multipath, "_serials", {})
+    return svdsm
+
+
+def test_serials(fake_supervdsm):
+    devs = [("dm-1", "guid-1"), ("dm-2", "guid-2")]
+    assert multipath._getSerials(devs) == {
+        ("dm-1", "guid-1"): "serial-1",
+        ("dm-2", "guid-2"): "serial-2",
+    }
+    assert fake_supervdsm.calls == [["dm-1", "dm-2"]]
+
+
+def test_serials_read_once(fake_supervdsm):
+    multipath._getSerials([("dm-1", "guid-1")])
+    multipath._getSerials([("dm-1", "guid-1"), ("dm-2", "guid-2")])
+    assert fake_supervdsm.calls == [["dm-1"], ["dm-2"]]
+
+
+def test_serials_device_replaced(fake_supervdsm):
+    multipath._getSerials([("dm-1", "guid-1")])
+    # A new device using the dm id of a removed device.
+    fake_supervdsm.serials["dm-1"] = "serial-3"
+    serials = multipath._getSerials([("dm-1", "guid-3")])
+    assert serials == {("dm-1", "guid-3"): "serial-3"}
+    assert fake_supervdsm.calls == [["dm-1"], ["dm-1"]]
+
+
+def test_serials_partial_keeps_cache(fake_supervdsm):
+    multipath._getSerials([("dm-1", "guid-1"), ("dm-2", "guid-2")])
+    # Reading some of the devices does not drop the others.
+    multipath._getSerials([("dm-2", "guid-2")])
+    multipath._getSerials([("dm-1", "guid-1"), ("dm-2", "guid-2")])
+    assert fake_supervdsm.calls == [["dm-1", "dm-2"]]
+
+
+def test_serials_evict(fake_supervdsm):
+    multipath._getSerials([("dm-1", "guid-1"), ("dm-2", "guid-2")])
+    # dm-1 was removed.
+    multipath._getSerials([("dm-2", "guid-2")], evict=True)
+    assert list(multipath._serials) == [("dm-2", "guid-2")]
+
+
+def test_serials_empty_not_cached(fake_supervdsm):
+    multipath._getSerials([("dm-3", "guid-3")])
+    multipath._getSerials([("dm-3", "guid-3")])
+    assert fake_supervdsm.calls == [["dm-3"], ["dm-3"]]
+
+
+@pytest.mark.parametrize("workers", ["1", "4"])
+def test_get_scsi_serials(monkeypatch, workers):
+    cfg = make_config([("irs", "scsi_id_workers", workers)])
+    monkeypatch.setattr(multipath, "config", cfg)
+    monkeypatch.setattr(multipath, "getScsiSerial", lambda dev: "id-" + dev)
+    devs = ["dm-%d" % i for i in range(8)]
+    assert multipath.getScsiSerials(devs) == {d: "id-" + d for d in devs}
+
+
+def test_get_scsi_serials_error(monkeypatch):
+    def fail(dev):
+        raise OSError("scsi_id failed")
+
+    monkeypatch.setattr(multipath, "getScsiSerial", fail)
+    with pytest.raises(OSError):
+        multipath.getScsiSerials(["dm-1"])
@@ -114,6 +114,17 @@ class FailAfterSwitchFactory(rm.SimpleResourceFactory):
         return s
 
 
+class SlowResourceFactory(rm.SimpleResourceFactory):
+    """
+    A resource factory that takes time to create resources.
+    """
+    def __init__(self, delay):
+        self.delay = delay
+
+    def createResource(self, name, lockType):
+        time.sleep(self.delay)
+
+
 def manager():
     """
     Create fresh _ResourceManager instance for testing.
@@ -653,6 +664,136 @@ class TestResourceManager(VdsmTestCase):
         for t in releaseThreads:
             t.join()
 
+    @MonkeyPatch(rm, "_manager", manager())
+    def testStatsUncontended(self):
+        with rm.acquireResource("storage", "resource", rm.SHARED):
+            with rm.acquireResource("storage", "resource", rm.SHARED):
+                stats = rm.getStats()["storage.resource"]
+                self.assertEqual(stats["state"], rm.LockState.shared)
+                self.assertEqual(stats["users"], 2)
+                self.assertEqual(stats["queue"], 0)
+
+        # Freed resources are accounted in their namespace.
+        stats = rm.getStats()
+        self.assertNotIn("storage.resource", stats)
+        stats = stats["storage"]
+        self.assertEqual(stats["acquired"], 2)
+        self.assertEqual(stats["contended"], 0)
+        self.assertEqual(stats["wait_time"], 0)
+        # Both users held the resource in the same lock period.
+        self.assertEqual(stats["holds"], 1)
+        self.assertEqual(stats["max_queue"], 0)
+        self.assertEqual(stats["state"], rm.LockState.free)
+        self.assertEqual(stats["users"], 0)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def testStatsContended(self):
+        resources = []
+
+        def callback(req, res):
+            resources.append(res)
+
+        exclusive = rm.acquireResource("storage", "resource", rm.EXCLUSIVE)
+        for i in range(2):
+            rm._registerResource("storage", "resource", rm.SHARED, callback)
+
+        stats = rm.getStats()["storage.resource"]
+        self.assertEqual(stats["state"], rm.LockState.locked)
+        self.assertEqual(stats["queue"], 2)
+        self.assertEqual(stats["max_queue"], 2)
+
+        time.sleep(0.05)
+        exclusive.release()
+        for res in resources:
+            res.release()
+
+        stats = rm.getStats()["storage"]
+        self.assertEqual(stats["acquired"], 3)
+        self.assertEqual(stats["contended"], 2)
+        self.assertGreaterEqual(stats["max_wait_time"], 0.04)
+        self.assertGreaterEqual(stats["wait_time"], stats["max_wait_time"])
+        self.assertEqual(stats["holds"], 2)
+        self.assertGreaterEqual(stats["max_hold_time"], 0.04)
+        self.assertEqual(stats["queue"], 0)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def testStatsFreedResources(self):
+        names = ["resource%d" % i for i in range(rm.NAMESPACE_SHARDS + 1)]
+        for name in names:
+            with rm.acquireResource("storage", name, rm.EXCLUSIVE):
+                pass
+
+        with rm.acquireResource("storage", "used", rm.EXCLUSIVE):
+            stats = rm.getStats()
+            self.assertEqual(stats["storage.used"]["acquired"], 1)
+            self.assertEqual(stats["storage.used"]["users"], 1)
+
+        # No entry is kept for the freed resources.
+        stats = rm.getStats()
+        self.assertNotIn("storage.used", stats)
+        self.assertFalse(any(name.startswith("storage.") for name in stats))
+        self.assertEqual(stats["storage"]["acquired"], len(names) + 1)
+        self.assertEqual(stats["storage"]["holds"], len(names) + 1)
+        self.assertEqual(stats["storage"]["state"], rm.LockState.free)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def testResourcesInSameNamespaceDoNotBlock(self):
+        # Find two resources in the same shard and two in different shards.
+        namespace = rm._manager._namespaces["storage"]
+        names = ["resource%d" % i for i in range(rm.NAMESPACE_SHARDS + 1)]
+        shards = set(namespace.shard(name) for name in names)
+        self.assertGreater(len(shards), 1)
+        with rm.acquireResource("storage", names[0], rm.EXCLUSIVE):
+            for name in names[1:]:
+                with rm.acquireResource("storage", name, rm.EXCLUSIVE,
+                                        timeout=1):
+                    pass
+
+    @MonkeyPatch(rm, "_manager", manager())
+    def testUnregisterNamespaceWithResources(self):
+        for i in range(rm.NAMESPACE_SHARDS):
+            name = "resource%d" % i
+            with rm.acquireResource("storage", name, rm.EXCLUSIVE):
+                self.assertRaises(rm.ResourceManagerError,
+                                  rm.unregisterNamespace, "storage")
+        rm.unregisterNamespace("storage")
+        self.assertRaises(ValueError, rm.acquireResource,
+                          "storage", "resource", rm.SHARED)
+
+    @MonkeyPatch(rm, "_manager", manager())
+    @pytest.mark.stress
+    def testSlowFactoryThroughput(self):
+        """
+        Many threads taking shared locks on different images of the same
+        storage domain, like starting many VMs. Creating a resource takes
+        time (e.g. activating logical volumes), but should block only the
+        resources in the same shard.
+        """
+        threads = 100
+        acquires = 10
+        rm.registerNamespace("slow", SlowResourceFactory(0.01))
+        ready = threading.Event()
+
+        def worker(n):
+            ready.wait()
+            for i in range(acquires):
+                name = "image%d-%d" % (n, i)
+                with rm.acquireResource("slow", name, rm.SHARED):
+                    pass
+
+        workers = [threading.Thread(target=worker, args=(n,))
+                   for n in range(threads)]
+        for t in workers:
+            t.start()
+        start = time.time()
+        ready.set()
+        for t in workers:
+            t.join()
+        elapsed = time.time() - start
+        print("%d shared acquires in %.3f seconds (%d acquires/s)"
+              % (threads * acquires, elapsed,
+                 threads * acquires / elapsed))
+
 
 @expandPermutations
 class TestResourceManagerLock(VdsmTestCase):
@@ -30,6 +30,7 @@ from testlib import start_thread, LockingThread
 
 from vdsm import utils
 from vdsm.common.concurrent import Barrier
+from vdsm.storage import rwlock
 from vdsm.storage.rwlock import RWLock
 
 
@@ -310,6 +311,191 @@ class TestRWLockStress(VdsmTestCase):
               % (avg_reads, med_reads, min_reads, max_reads))
 
 
+class TestRWLockTimeout(VdsmTestCase):
+
+    def test_read_timeout(self):
+        lock = RWLock()
+        writer = LockingThread(lock.exclusive)
+        with utils.running(writer):
+            if not writer.acquired.wait(2):
+                raise RuntimeError("Timeout waiting for writer thread")
+            start = time.time()
+            self.assertFalse(lock.acquire_read(timeout=0.1))
+            self.assertTrue(time.time() - start >= 0.1)
+        # The lock is not held by this thread.
+        self.assertRaises(RuntimeError, lock.release)
+
+    def test_write_timeout(self):
+        lock = RWLock()
+        reader = LockingThread(lock.shared)
+        with utils.running(reader):
+            if not reader.acquired.wait(2):
+                raise RuntimeError("Timeout waiting for reader thread")
+            self.assertFalse(lock.acquire_write(timeout=0.1))
+        self.assertTrue(lock.acquire_write(timeout=0))
+        lock.release()
+
+    def test_acquire_uncontended(self):
+        lock = RWLock()
+        self.assertTrue(lock.acquire_read(timeout=0))
+        lock.release()
+        self.assertTrue(lock.acquire_write(timeout=0))
+        lock.release()
+
+    def test_timed_out_writer_grants_readers(self):
+        lock = RWLock()
+        reader = LockingThread(lock.shared)
+        with utils.running(reader):
+            if not reader.acquired.wait(2):
+                raise RuntimeError("Timeout waiting for reader thread")
+            # Wait for the lock in another thread, queuing the next reader
+            # behind it.
+            results = []
+            writer = start_thread(
+                lambda: results.append(lock.acquire_write(timeout=0.5)))
+            time.sleep(0.1)
+            blocked = LockingThread(lock.shared)
+            with utils.running(blocked):
+                if not blocked.ready.wait(1):
+                    raise RuntimeError("Timeout waiting for reader thread")
+                self.assertFalse(blocked.acquired.wait(0.2))
+                writer.join()
+                self.assertEqual(results, [False])
+                # The writer gave up, the reader behind it must not wait for
+                # the first reader.
+                self.assertTrue(blocked.acquired.wait(1))
+
+
+class TestRWLockStats(VdsmTestCase):
+
+    def test_unnamed_not_instrumented(self):
+        before = rwlock.stats()
+        lock = RWLock()
+        with lock.exclusive:
+            pass
+        self.assertEqual(rwlock.stats(), before)
+
+    def test_uncontended(self):
+        lock = RWLock(name="test_uncontended")
+        with lock.exclusive:
+            pass
+        with lock.shared:
+            with lock.shared:
+                pass
+        info = rwlock.stats()["test_uncontended"]
+        self.assertEqual(info["reads"], 1)
+        self.assertEqual(info["writes"], 1)
+        self.assertEqual(info["contended"], 0)
+        self.assertEqual(info["timeouts"], 0)
+        self.assertEqual(sum(count for bound, count in info["wait"]), 2)
+        self.assertEqual(sum(count for bound, count in info["hold"]), 2)
+        self.assertEqual(info["longest_waits"], [])
+
+    def test_contended(self):
+        lock = RWLock(name="test_contended")
+        writer = LockingThread(lock.exclusive)
+        with utils.running(writer):
+            if not writer.acquired.wait(2):
+                raise RuntimeError("Timeout waiting for writer thread")
+            self.assertFalse(lock.acquire_read(timeout=0.05))
+            threading.Timer(0.1, writer.done.set).start()
+            with lock.shared:
+                pass
+
+        info = rwlock.stats()["test_contended"]
+        self.assertEqual(info["reads"], 1)
+        self.assertEqual(info["writes"], 1)
+        self.assertEqual(info["contended"], 1)
+        self.assertEqual(info["timeouts"], 1)
+        # Held by the writer for more than 0.1 second.
+        hold = dict(info["hold"])
+        self.assertEqual(hold[1.0], 1)
+
+        longest, = info["longest_waits"]
+        self.assertEqual(longest["mode"], "read")
+        self.assertEqual(longest["thread"], threading.current_thread().name)
+        self.assertTrue(longest["wait"] >= 0.05)
+        self.assertIn("test_contended", longest["stack"])
+        self.assertNotIn("rwlock.py", longest["stack"])
+
+    def test_shared_by_name(self):
+        for i in range(3):
+            lock = RWLock(name="test_shared_by_name")
+            with lock.exclusive:
+                pass
+        info = rwlock.stats()["test_shared_by_name"]
+        self.assertEqual(info["writes"], 3)
+
+    def test_longest_waits_limit(self):
+        lock_stats = rwlock.LockStats()
+        for i in range(rwlock.LONGEST_WAITS * 2):
+            lock_stats.acquired(False, i + 1)
+        waits = [w["wait"] for w in lock_stats.info()["longest_waits"]]
+        expected = list(range(rwlock.LONGEST_WAITS * 2, 0, -1))
+        self.assertEqual(waits, expected[:rwlock.LONGEST_WAITS])
+
+    def test_histogram(self):
+        h = rwlock.Histogram()
+        for seconds in (0, 0.00005, 0.005, 0.005, 5, 50):
+            h.add(seconds)
+        self.assertEqual(h.counts(), [
+            (0.0001, 2),
+            (0.001, 0),
+            (0.01, 2),
+            (0.1, 0),
+            (1.0, 0),
+            (10.0, 1),
+            (float('inf'), 1),
+        ])
+
+
+@expandPermutations
+class TestRWLockManyReaders(VdsmTestCase):
+
+    @pytest.mark.stress
+    @permutations([
+        # readers, name
+        (1000, None),
+        (1000, "test_many_readers"),
+        (3000, None),
+        (3000, "test_many_readers"),
+    ])
+    def test_many_readers(self, readers, name):
+        lock = RWLock(name=name)
+        ready = Barrier(readers + 1)
+        reads = 100
+        threads = []
+
+        def read():
+            ready.wait()
+            for i in range(reads):
+                with lock.shared:
+                    pass
+                # Let a writer in from time to time.
+                if i % 50 == 0:
+                    with lock.exclusive:
+                        pass
+
+        try:
+            for i in range(readers):
+                threads.append(start_thread(read))
+            ready.wait(30)
+            start = time.time()
+        finally:
+            for t in threads:
+                t.join()
+        elapsed = time.time() - start
+
+        print()
+        print("%d readers, %s: %d acquires in %.3f seconds (%d/s)"
+              % (readers, "instrumented" if name else "plain",
+                 readers * (reads + 2), elapsed,
+                 readers * (reads + 2) / elapsed))
+        if name:
+            info = rwlock.stats()[name]
+            print("contended=%d wait=%s" % (info["contended"], info["wait"]))
+
+
 def stats(seq):
     seq = sorted(seq)
     avg = sum(seq) / float(len(seq))
@@ -0,0 +1,161 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+
+import os
+import threading
+
+import pytest
+
+from testlib import make_config
+
+from vdsm.storage import task
+from vdsm.storage import taskjournal
+
+
+def snapshot(state):
+    return {"task": ["state = %s" % state], "jobs": [], "recoveries": []}
+
+
+@pytest.fixture
+def store(tmpdir):
+    return str(tmpdir)
+
+
+def test_empty(store):
+    journal = taskjournal.Journal(store)
+    assert journal.load() == {}
+    assert not journal.exists()
+
+
+def test_save_load(store):
+    journal = taskjournal.Journal(store)
+    journal.save("task1", snapshot("running"))
+    journal.save("task2", snapshot("running"))
+    journal.save("task1", snapshot("finished"))
+
+    loaded = taskjournal.Journal(store).load()
+    assert loaded == {
+        "task1": snapshot("finished"),
+        "task2": snapshot("running"),
+    }
+
+
+def test_remove(store):
+    journal = taskjournal.Journal(store)
+    journal.save("task1", snapshot("running"))
+    journal.save("task2", snapshot("running"))
+    journal.remove("task1")
+
+    assert taskjournal.Journal(store).load() == {
+        "task2": snapshot("running"),
+    }
+
+
+def test_remove_missing(store):
+    journal = taskjournal.Journal(store)
+    journal.remove("task1")
+    assert not journal.exists()
+
+
+def test_invalid_record(store):
+    journal = taskjournal.Journal(store)
+    journal.save("task1", snapshot("running"))
+    with open(journal.path, "a") as f:
+        f.write('{"id": "task2", "ta\n')
+
+    journal = taskjournal.Journal(store)
+    assert journal.load() == {"task1": snapshot("running")}
+
+    # The next commit drops the invalid record.
+    journal.save("task3", snapshot("running"))
+    with open(journal.path) as f:
+        assert len(f.readlines()) == 2
+    assert not os.path.exists(journal.path + taskjournal.TEMP_EXT)
+
+
+def test_write_error(tmpdir):
+    # The tasks directory is missing, like a master mount gone.
+    journal = taskjournal.Journal(str(tmpdir.join("missing")))
+    with pytest.raises(EnvironmentError):
+        journal.save("task1", snapshot("running"))
+    assert journal.stats()["commits"] == 0
+
+
+def test_concurrent_writers(store):
+    journal = taskjournal.Journal(store)
+    writers = 20
+    updates = 10
+
+    def write(n):
+        for i in range(updates):
+            journal.save("task%d" % n, snapshot(i))
+
+    threads = [threading.Thread(target=write, args=(n,))
+               for n in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    loaded = taskjournal.Journal(store).load()
+    assert loaded == {"task%d" % n: snapshot(updates - 1)
+                      for n in range(writers)}
+    stats = journal.stats()
+    assert stats["tasks"] == writers
+    assert stats["commits"] <= writers * updates
+
+
+@pytest.mark.parametrize("enabled", ["true", "false"])
+def test_clean_store(store, monkeypatch, enabled):
+    monkeypatch.setattr(task, "config",
+                        make_config([("irs", "task_journal", enabled)]))
+    journal = taskjournal.get(store)
+    journal.save("task1", snapshot("finished"))
+    journal.save("task2", snapshot("running"))
+
+    task._cleanStore(store, "task1")
+
+    assert taskjournal.Journal(store).load() == {
+        "task2": snapshot("running"),
+    }
+
+
+def test_is_journal():
+    assert taskjournal.is_journal(taskjournal.JOURNAL_NAME)
+    assert taskjournal.is_journal(taskjournal.JOURNAL_NAME +
+                                  taskjournal.TEMP_EXT)
+    assert not taskjournal.is_journal("4f9e2c1a-task-id")
+
+
+def test_task_snapshot():
+    t = task.Task("task-id", name="name", tag="tag")
+    t.jobs.append(task.Job("job", lambda: None))
+    t.recoveries.append(task.Recovery("recovery", "module", "object",
+                                      "function", ["arg"]))
+    t.njobs = len(t.jobs)
+    t.nrecoveries = len(t.recoveries)
+    t.state.moveto(task.State.preparing)
+    snapshot = t._snapshot()
+
+    loaded = task.Task.loadJournaledTask("task-id", snapshot)
+    assert loaded.dumpTask() == t.dumpTask()
+    assert loaded._snapshot() == snapshot
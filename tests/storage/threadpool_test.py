@@ -0,0 +1,222 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import threading
+import time
+
+import pytest
+
+from vdsm.storage.threadPool import ThreadPool
+
+
+@pytest.fixture
+def pool():
+    tp = ThreadPool("test", 4, maxTasks=10)
+    yield tp
+    tp.joinAll(waitForTasks=False)
+
+
+def test_run_tasks(pool):
+    done = threading.Event()
+    results = []
+
+    def task(arg):
+        return arg * 2
+
+    def callback(result):
+        results.append(result)
+        if len(results) == 10:
+            done.set()
+
+    for i in range(10):
+        assert pool.queueTask(i, task, i, callback)
+
+    assert done.wait(2)
+    assert sorted(results) == [i * 2 for i in range(10)]
+
+
+def test_not_callable(pool):
+    assert not pool.queueTask("id", "not callable")
+
+
+def test_stats(pool):
+    done = threading.Event()
+
+    def busy(args):
+        end = time.time() + 0.1
+        while time.time() < end:
+            pass
+
+    def fail(args):
+        raise RuntimeError("task failed")
+
+    pool.queueTask("busy", busy)
+    pool.queueTask("fail", fail, taskCallback=lambda r: None)
+    pool.queueTask("last", lambda args: None,
+                   taskCallback=lambda r: done.set())
+    done.wait(2)
+    pool.joinAll()
+
+    stats = pool.stats()
+    assert stats['completed'] == 2
+    assert stats['failed'] == 1
+    assert stats['wall_time'] >= 0.09
+    assert 0 < stats['cpu_time'] <= stats['wall_time']
+    assert stats['threads'] == 0
+    assert stats['queued'] == 0
+    assert stats['running'] == 0
+
+
+def test_running_tasks(pool):
+    started = threading.Event()
+    release = threading.Event()
+
+    def task(args):
+        started.set()
+        release.wait(2)
+
+    pool.queueTask("id", task)
+    try:
+        assert started.wait(2)
+        assert pool.getRunningTasks() == 1
+    finally:
+        release.set()
+    pool.joinAll()
+    assert pool.getRunningTasks() == 0
+
+
+def test_queue_full_timeout():
+    tp = ThreadPool("test", 1, maxTasks=1, queueTimeout=0.1)
+    release = threading.Event()
+    try:
+        assert tp.queueTask("running", lambda args: release.wait(2))
+        # Wait until the worker took the first task.
+        while tp.getRunningTasks() == 0:
+            time.sleep(0.01)
+        assert tp.queueTask("queued", lambda args: None)
+
+        start = time.time()
+        assert not tp.queueTask("rejected", lambda args: None)
+        assert time.time() - start >= 0.1
+    finally:
+        release.set()
+        tp.joinAll()
+
+
+def test_queue_full_blocks_until_room():
+    tp = ThreadPool("test", 1, maxTasks=1)
+    release = threading.Event()
+    try:
+        tp.queueTask("running", lambda args: release.wait(2))
+        tp.queueTask("queued", lambda args: None)
+        threading.Timer(0.1, release.set).start()
+        assert tp.queueTask("waiting", lambda args: None)
+    finally:
+        release.set()
+        tp.joinAll()
+    assert tp.stats()['completed'] == 3
+
+
+def test_join_waits_for_tasks():
+    tp = ThreadPool("test", 2)
+    results = []
+    for i in range(20):
+        tp.queueTask(i, lambda args: time.sleep(0.01),
+                     taskCallback=results.append)
+    tp.joinAll()
+    assert len(results) == 20
+
+
+def test_join_drops_queued_tasks():
+    tp = ThreadPool("test", 1)
+    release = threading.Event()
+    results = []
+    tp.queueTask("running", lambda args: release.wait(2),
+                 taskCallback=results.append)
+    for i in range(10):
+        tp.queueTask(i, lambda args: None, taskCallback=results.append)
+    threading.Timer(0.1, release.set).start()
+    tp.joinAll(waitForTasks=False)
+    assert results == [True]
+
+
+def test_join_is_fast():
+    tp = ThreadPool("test", 10)
+    start = time.time()
+    tp.joinAll()
+    assert time.time() - start < 0.5
+
+
+def test_reject_after_join(pool):
+    pool.joinAll()
+    assert not pool.queueTask("id", lambda args: None)
+    assert not pool.setThreadCount(2)
+
+
+@pytest.mark.parametrize("count", [1, 8, 2])
+def test_set_thread_count(pool, count):
+    pool.setThreadCount(count)
+    assert pool.getThreadCount() == count
+    done = threading.Event()
+    results = []
+
+    def callback(result):
+        results.append(result)
+        if len(results) == 10:
+            done.set()
+
+    for i in range(10):
+        pool.queueTask(i, lambda args: args, i, callback)
+    assert done.wait(2)
+
+
+def test_shrink_stops_workers(pool):
+    before = threading.active_count()
+    pool.setThreadCount(1)
+    deadline = time.time() + 2
+    while threading.active_count() > before - 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == before - 3
+
+
+@pytest.mark.stress
+@pytest.mark.parametrize("threads", [1, 10, 50])
+def test_short_tasks(threads):
+    tasks = 50000
+    tp = ThreadPool("test", threads, maxTasks=1000)
+    try:
+        start = time.time()
+        for i in range(tasks):
+            tp.queueTask(i, lambda args: None)
+        tp.joinAll()
+        elapsed = time.time() - start
+    finally:
+        tp.joinAll(waitForTasks=False)
+
+    stats = tp.stats()
+    assert stats['completed'] == tasks
+    print()
+    print("%d threads: %d tasks in %.3f seconds (%d tasks/s), "
+          "wall=%.3f cpu=%.3f"
+          % (threads, tasks, elapsed, tasks / elapsed,
+             stats['wall_time'], stats['cpu_time']))
@@ -0,0 +1,154 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import division
+
+import errno
+import io
+import threading
+import time
+
+import pytest
+
+from testlib import make_config
+
+from vdsm.common.exception import ActionStopped
+from vdsm.common.time import monotonic_time
+from vdsm.storage import zeroing
+
+SIZE = 3 * 1024**2
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(zeroing, "CHUNK_SIZE", 1024**2)
+    monkeypatch.setattr(zeroing, "WRITE_SIZE", 256 * 1024)
+    monkeypatch.setattr(zeroing, "_zero_buffer", None)
+
+
+@pytest.fixture
+def rate_limit(monkeypatch, request):
+    cfg = make_config([("irs", "zero_rate_limit", str(request.param))])
+    monkeypatch.setattr(zeroing, "config", cfg)
+    monkeypatch.setattr(zeroing, "_throttle", zeroing._Throttle())
+    return request.param
+
+
+@pytest.fixture
+def dirty_file(tmpdir):
+    path = str(tmpdir.join("file"))
+    with io.open(path, "wb") as f:
+        f.write(b"x" * SIZE)
+    return path
+
+
+def unsupported(fd, offset, length):
+    raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+
+def check_zeroed(path, size):
+    with io.open(path, "rb") as f:
+        assert f.read(size) == b"\0" * size
+        assert f.read() == b"x" * (SIZE - size)
+
+
+@pytest.mark.parametrize("size", [SIZE, 512, 1024**2 + 512])
+def test_zero(small_chunks, dirty_file, size):
+    op = zeroing.Zero(dirty_file, size)
+    op.run()
+    check_zeroed(dirty_file, size)
+    assert op.progress == 100.0
+
+
+def test_file_uses_punch_hole(small_chunks, dirty_file):
+    # BLKZEROOUT is supported only by block devices.
+    op = zeroing.Zero(dirty_file, SIZE)
+    op.run()
+    assert op.method == "punch_hole"
+
+
+def test_fallback_to_write(small_chunks, dirty_file, monkeypatch):
+    monkeypatch.setattr(zeroing, "_punch_hole", unsupported)
+    op = zeroing.Zero(dirty_file, SIZE)
+    op.run()
+    assert op.method == "write"
+    check_zeroed(dirty_file, SIZE)
+
+
+def test_error(small_chunks, dirty_file, monkeypatch):
+    def fail(fd, offset, length):
+        raise OSError(errno.EIO, "I/O error")
+
+    monkeypatch.setattr(zeroing, "_punch_hole", fail)
+    op = zeroing.Zero(dirty_file, SIZE)
+    with pytest.raises(OSError) as e:
+        op.run()
+    assert e.value.errno == errno.EIO
+
+
+def test_abort_before_run(small_chunks, dirty_file):
+    op = zeroing.Zero(dirty_file, SIZE)
+    op.abort()
+    with pytest.raises(ActionStopped):
+        op.run()
+    check_zeroed(dirty_file, 0)
+
+
+@pytest.mark.parametrize("rate_limit", [1], indirect=True)
+def test_abort_while_throttled(small_chunks, dirty_file, rate_limit):
+    op = zeroing.Zero(dirty_file, SIZE)
+    threading.Timer(0.2, op.abort).start()
+    start = time.time()
+    with pytest.raises(ActionStopped):
+        op.run()
+    assert time.time() - start < 1
+    # Only the first chunk was zeroed.
+    assert op.progress == 100 / 3
+
+
+@pytest.mark.parametrize("rate_limit", [10], indirect=True)
+def test_rate_limit(small_chunks, dirty_file, rate_limit):
+    ops = [zeroing.Zero(dirty_file, SIZE) for i in range(2)]
+    threads = [threading.Thread(target=op.run) for op in ops]
+    start = monotonic_time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = monotonic_time() - start
+    # 6 MiB at 10 MiB/s, the first chunk is not delayed.
+    assert elapsed >= 0.5
+    check_zeroed(dirty_file, SIZE)
+
+
+@pytest.mark.parametrize("rate_limit", [0], indirect=True)
+def test_throttle_unlimited(rate_limit):
+    throttle = zeroing._Throttle()
+    assert throttle.reserve(1024**3) == 0.0
+
+
+@pytest.mark.parametrize("rate_limit", [1], indirect=True)
+def test_throttle_schedules_in_order(rate_limit, monkeypatch):
+    monkeypatch.setattr(zeroing.time, "monotonic_time", lambda: 100.0)
+    throttle = zeroing._Throttle()
+    assert throttle.reserve(1024**2) == 0.0
+    assert throttle.reserve(1024**2) == 1.0
+    assert throttle.reserve(512 * 1024) == 2.0
@@ -97,6 +97,15 @@ NO_REBOOT = """
 </domain>
 """
 
+NAMESPACED_DEVICES = """
+<domain xmlns:ovirt="http://ovirt.org/vm/1.0">
+    <uuid>xyz</uuid>
+    <devices>
+        <ovirt:device name="foo"/>
+    </devices>
+</domain>
+"""
+
 
 class DevicesHashTests(VdsmTestCase):
 
@@ -120,6 +129,11 @@ class DevicesHashTests(VdsmTestCase):
         desc2 = DomainDescriptor(SOME_DEVICES)
         self.assertEqual(desc1.devices_hash, desc2.devices_hash)
 
+    def test_hash_does_not_parse(self):
+        desc = DomainDescriptor(SOME_DEVICES)
+        desc.devices_hash
+        self.assertIsNone(desc._root)
+
 
 @expandPermutations
 class DomainDescriptorTests(XMLTestCase):
@@ -144,6 +158,17 @@ class DomainDescriptorTests(XMLTestCase):
         desc = descriptor(SOME_DEVICES)
         self.assertEqual(len(list(desc.get_device_elements(tag))), result)
 
+    def test_devices_parsed_lazily(self):
+        desc = DomainDescriptor(SOME_DEVICES)
+        self.assertEqual(len(list(desc.get_device_elements('device'))), 2)
+        self.assertIsNone(desc._root)
+        self.assertEqual(desc.id, 'xyz')
+        self.assertIsNotNone(desc._root)
+
+    def test_devices_with_namespace_prefix(self):
+        desc = DomainDescriptor(NAMESPACED_DEVICES)
+        self.assertEqual(len(list(desc.devices)), 1)
+
     @permutations([
         # xml_data, expected
         [MEMORY_SIZE, False],
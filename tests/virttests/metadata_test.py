@@ -255,6 +255,49 @@ class DescriptorTests(XMLTestCase):
             expected_xml
         )
 
+    def test_dump_unchanged_content(self):
+        dom = FakeDomain.with_metadata(u'''<vm>
+          <foobar type="int">21</foobar>
+        </vm>''')
+        self.md_desc.load(dom)
+        dom.xml.clear()
+        self.md_desc.dump(dom)
+        self.assertEqual(dom.xml, {})
+
+    def test_dump_unchanged_values(self):
+        dom = FakeDomain()
+        self.md_desc.load(dom)
+        with self.md_desc.values() as vals:
+            vals['foobar'] = 42
+        self.md_desc.dump(dom)
+        dom.xml.clear()
+        with self.md_desc.values() as vals:
+            vals['foobar'] = 42
+        self.md_desc.dump(dom)
+        self.assertEqual(dom.xml, {})
+
+    def test_dump_changed_nested_device_value(self):
+        dom = FakeDomain()
+        self.md_desc.load(dom)
+        with self.md_desc.device(id='alias0') as dev:
+            dev['volumeChain'] = [{'path': '/a'}]
+        self.md_desc.dump(dom)
+        dom.xml.clear()
+        with self.md_desc.device(id='alias0') as dev:
+            dev['volumeChain'].append({'path': '/b'})
+        self.md_desc.dump(dom)
+        self.assertIn('/b', dom.xml[xmlconstants.METADATA_VM_VDSM_URI])
+
+    def test_dump_to_another_domain(self):
+        dom = FakeDomain()
+        self.md_desc.load(dom)
+        other_dom = FakeDomain(vmid='e1b3e3ba-1c54-4ea5-8d9b-3c5a2ad7c3f4')
+        self.md_desc.dump(other_dom)
+        self.assertXMLEqual(
+            other_dom.xml.get(xmlconstants.METADATA_VM_VDSM_URI),
+            u'''<vm />'''
+        )
+
     def test_update_domain(self):
         # libvirt takes care of namespace massaging
         base_xml = u'''<vm>
@@ -221,6 +221,132 @@ class StatsCacheTests(TestCaseBase):
             self.cache.put(*sample)
 
 
+class StatsCacheGroupsTests(TestCaseBase):
+
+    BLOCK = frozenset(['block'])
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = sampling.StatsCache(clock=self.clock)
+        self.cache.add('a')
+
+    def test_merge_groups(self):
+        self._put({'a': {'cpu.time': 1}}, 1)
+        self._put({'a': {'block.count': 10}}, 1, self.BLOCK)
+        self._put({'a': {'cpu.time': 2}}, 3)
+        self._put({'a': {'block.count': 20}}, 5, self.BLOCK)
+        self.clock.freeze(value=5)
+        res = self.cache.get('a')
+        self.assertEqual(res, ({'cpu.time': 1, 'block.count': 10},
+                               {'cpu.time': 2, 'block.count': 20},
+                               2, 2))
+        self.assertEqual(res.intervals, {'block': 4})
+
+    def test_missing_group_samples(self):
+        self._put({'a': {'cpu.time': 1}}, 1)
+        self._put({'a': {'block.count': 10}}, 1, self.BLOCK)
+        self._put({'a': {'cpu.time': 2}}, 2)
+        res = self.cache.get('a')
+        self.assertEqual(res[:2], ({'cpu.time': 1}, {'cpu.time': 2}))
+        self.assertEqual(res.intervals, {})
+
+    def test_stats_age_from_stale_group(self):
+        self._put({'a': {'cpu.time': 1}}, 1)
+        self._put({'a': {'block.count': 10}}, 1, self.BLOCK)
+        self._put({'a': {'cpu.time': 2}}, 2)
+        self._put({'a': {'cpu.time': 3}}, 30)
+        self.clock.freeze(value=31)
+        res = self.cache.get('a')
+        self.assertEqual(res.stats_age, 30)
+
+    def test_drop_stale_group_sample(self):
+        self._put({'a': {'cpu.time': 1}}, 1)
+        self._put({'a': {'cpu.time': 2}}, 2)
+        self._put({'a': {'block.count': 10}}, 3, self.BLOCK)
+        self._put({'a': {'block.count': 20}}, 1, self.BLOCK)
+        self._put({'a': {'block.count': 30}}, 4, self.BLOCK)
+        res = self.cache.get('a')
+        self.assertEqual(res.last_value['block.count'], 30)
+        self.assertEqual(res.first_value['block.count'], 10)
+
+    def test_get_batch(self):
+        self._put({'a': {'cpu.time': 1}}, 1)
+        self._put({'a': {'block.count': 10}}, 1, self.BLOCK)
+        self._put({'a': {'cpu.time': 2}}, 2)
+        self._put({'a': {'block.count': 20}}, 3, self.BLOCK)
+        res = self.cache.get_batch()
+        self.assertEqual(list(res.keys()), ['a'])
+        self.assertEqual(res['a'].last_value,
+                         {'cpu.time': 2, 'block.count': 20})
+        self.assertEqual(res['a'].intervals, {'block': 2})
+
+    def _put(self, bulk_stats, timestamp, groups=None):
+        self.clock.freeze(value=timestamp)
+        self.cache.put(bulk_stats, timestamp, groups=groups)
+
+
+@expandPermutations
+class StatsScheduleTests(TestCaseBase):
+
+    ALL = frozenset(sampling.STATS_GROUPS)
+
+    def test_default(self):
+        self.assertEqual(sampling.stats_schedule(['engine'], {}, 15),
+                         [(self.ALL, 15)])
+
+    def test_union_of_profiles(self):
+        schedule = sampling.stats_schedule(['mom', 'metrics'], {}, 15)
+        self.assertEqual(schedule, [(sampling.STATS_PROFILES['metrics'], 15)])
+
+    def test_group_intervals(self):
+        schedule = sampling.stats_schedule(
+            ['engine'], {'vcpu': 2, 'block': 30, 'interface': 30}, 15)
+        self.assertEqual(schedule, [
+            (frozenset(['state', 'cpu', 'balloon']), 15),
+            (frozenset(['vcpu']), 2),
+            (frozenset(['block', 'interface']), 30),
+        ])
+
+    def test_unused_group_interval(self):
+        schedule = sampling.stats_schedule(['mom'], {'block': 30}, 15)
+        self.assertEqual(schedule, [(sampling.STATS_PROFILES['mom'], 15)])
+
+    def test_all_groups_with_own_interval(self):
+        schedule = sampling.stats_schedule(
+            ['mom'], {'state': 2, 'cpu': 2, 'balloon': 5}, 15)
+        self.assertEqual(schedule, [
+            (frozenset(['state', 'cpu']), 2),
+            (frozenset(['balloon']), 5),
+        ])
+
+    def test_no_profiles(self):
+        self.assertEqual(sampling.stats_schedule([], {}, 15),
+                         [(frozenset(['state']), 15)])
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            sampling.stats_schedule(['nosuchprofile'], {}, 15)
+
+    @permutations([
+        # value, intervals
+        ('', {}),
+        ('vcpu:2', {'vcpu': 2}),
+        (' vcpu:2, block:15 ', {'vcpu': 2, 'block': 15}),
+    ])
+    def test_parse_group_intervals(self, value, intervals):
+        self.assertEqual(sampling.parse_group_intervals(value), intervals)
+
+    @permutations([('vcpu',), ('nosuchgroup:2',), ('vcpu:fast',)])
+    def test_parse_group_intervals_invalid(self, value):
+        with self.assertRaises(ValueError):
+            sampling.parse_group_intervals(value)
+
+    def test_stats_flags(self):
+        self.assertEqual(
+            sampling.stats_flags(['state', 'block']),
+            sampling.STATS_GROUPS['state'] | sampling.STATS_GROUPS['block'])
+
+
 class NumaNodeMemorySampleTests(TestCaseBase):
 
     def _monkeyPatchedMemorySample(self, freeMemory, totalMemory):
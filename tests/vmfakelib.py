@@ -103,9 +103,16 @@ class ClientIF(object):
     def prepareVolumePath(self, paramFilespec):
         return paramFilespec
 
+    def prepareVolumePaths(self, drives, vmId=None):
+        return [self.prepareVolumePath(drive) for drive in drives]
+
     def teardownVolumePath(self, paramFilespec):
         pass
 
+    def teardownVolumePaths(self, drives):
+        for drive in drives:
+            self.teardownVolumePath(drive)
+
     def getVMs(self):
         with self.vmContainerLock:
             return self.vmContainer.copy()
@@ -323,6 +330,14 @@ class CpuCoreSample(object):
 
     def __init__(self, samples):
         self._samples = samples
+        size = max(samples) + 1 if samples else 0
+        self.user = [0.0] * size
+        self.sys = [0.0] * size
+        self.online = [0] * size
+        for core, sample in samples.items():
+            self.user[core] = sample['user']
+            self.sys[core] = sample['sys']
+            self.online[core] = 1
 
     def getCoreSample(self, key):
         return self._samples.get(key)
@@ -330,9 +345,10 @@ class CpuCoreSample(object):
 
 class HostSample(object):
 
-    def __init__(self, timestamp, samples):
+    def __init__(self, timestamp, samples, interfaces=None):
         self.timestamp = timestamp
         self.cpuCores = CpuCoreSample(samples)
+        self.interfaces = interfaces or {}
 
 
 CREATED = "created"
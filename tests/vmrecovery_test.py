@@ -259,3 +259,41 @@ class VmRecoveryTests(TestCaseBase):
             testvm.run()
 
             self.assertTrue(done.wait(1))
+
+
+class ProgressTests(TestCaseBase):
+
+    def setUp(self):
+        self.now = 100.0
+        self.progress = recovery.Progress(clock=lambda: self.now)
+
+    def test_initial(self):
+        self.assertEqual(self.progress.info(), {
+            'stage': recovery.Progress.STARTING,
+            'total': 0,
+            'done': 0,
+            'failed': 0,
+            'elapsed': 0.0,
+        })
+
+    def test_items(self):
+        self.progress.start_stage(recovery.Progress.RUNNING_DOMAINS, 3)
+        self.assertEqual(self.progress.item_done(), 1)
+        self.assertEqual(self.progress.item_done(succeeded=False), 2)
+        self.now += 5.0
+        self.assertEqual(self.progress.info(), {
+            'stage': recovery.Progress.RUNNING_DOMAINS,
+            'total': 3,
+            'done': 2,
+            'failed': 1,
+            'elapsed': 5.0,
+        })
+
+    def test_new_stage_resets_counters(self):
+        self.progress.start_stage(recovery.Progress.RUNNING_DOMAINS, 2)
+        self.progress.item_done(succeeded=False)
+        self.progress.start_stage(recovery.Progress.DONE)
+        info = self.progress.info()
+        self.assertEqual(info['stage'], recovery.Progress.DONE)
+        self.assertEqual((info['total'], info['done'], info['failed']),
+                         (0, 0, 0))